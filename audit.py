@@ -1,15 +1,234 @@
-import psycopg2
+"""
+Audit Logging
+=============
+
+log_event() records a row in audit_logs. By default events are queued in
+memory and written by a background thread in batched multi-row INSERTs, so
+audit latency stays off the request path.
+
+- Bounded queue (AUDIT_QUEUE_SIZE). If it fills up the event is written
+  synchronously instead of being dropped.
+- Security-critical events (MUST_PERSIST_ACTIONS, or must_persist=True) are
+  always written synchronously before log_event returns.
+- Pending events are flushed at interpreter shutdown (atexit).
+- api.py hands in its pooled connection context manager via configure();
+  standalone scripts fall back to a single DATABASE_URL connection.
+
+Set AUDIT_ASYNC=0 to restore fully synchronous behaviour.
+"""
+
+import atexit
+import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
-def log_event(username, actor, action, details=None):
+from psycopg2.extras import execute_values
+
+from db_connection import direct_connection
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', '1').lower() in ('1', 'true', 'yes')
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '0.5'))
+
+# Actions that must be durable before the caller continues
+MUST_PERSIST_ACTIONS = frozenset({
+    'auth_bypass_attempt',
+    'crisis_detected',
+    'database_reset_completed',
+    'database_wiped',
+    'encryption_key_missing',
+    'fhir_export',
+    'high_risk_detected',
+    'password_changed_all_sessions_invalidated',
+    'password_reset_completed',
+    'user_deleted',
+})
+
+INSERT_SQL = "INSERT INTO audit_logs (username, actor, action, details, timestamp) VALUES %s"
+
+_SHUTDOWN = object()
+
+
+class AuditLogWriter:
+    """Background, batching writer for audit_logs rows."""
+
+    def __init__(self, connection_factory=None, max_queue=AUDIT_QUEUE_SIZE,
+                 batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL):
+        self.connection_factory = connection_factory or direct_connection
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self.stats = {'queued': 0, 'written': 0, 'sync_writes': 0, 'failed': 0}
+
+    # ---- writing ----
+
+    def write_rows(self, rows):
+        """Insert rows in a single multi-row statement. Raises on failure."""
+        if not rows:
+            return
+        with self.connection_factory() as conn:
+            try:
+                cur = conn.cursor()
+                execute_values(cur, INSERT_SQL, rows, page_size=self.batch_size)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self.stats['written'] += len(rows)
+
+    def write_sync(self, row):
+        try:
+            self.write_rows([row])
+            self.stats['sync_writes'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.warning(f"Audit write failed: {e}")
+
+    # ---- queueing ----
+
+    def _ensure_worker(self):
+        """Start the drain thread (again after fork, since threads do not survive it)."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, row):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(row)
+            self.stats['queued'] += 1
+        except queue.Full:
+            # Back-pressure: never drop an audit event
+            self.write_sync(row)
+
+    def _run(self):
+        q = self._queue
+        while True:
+            try:
+                item = q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is _SHUTDOWN:
+                q.task_done()
+                self._drain(q)
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _SHUTDOWN:
+                    q.task_done()
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            # Only now is the batch done, so flush() waits for the INSERT too
+            for _ in batch:
+                q.task_done()
+            if stop:
+                self._drain(q)
+                return
+
+    def _write_batch(self, batch, attempts=3):
+        for attempt in range(attempts):
+            try:
+                self.write_rows(batch)
+                return
+            except Exception as e:
+                if attempt == attempts - 1:
+                    self.stats['failed'] += len(batch)
+                    logger.error(f"Audit batch of {len(batch)} events could not be written: {e}")
+                    return
+                time.sleep(0.1 * (2 ** attempt))
+
+    def _drain(self, q):
+        batch = []
+        while True:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _SHUTDOWN:
+                q.task_done()
+            else:
+                batch.append(item)
+        for i in range(0, len(batch), self.batch_size):
+            self._write_batch(batch[i:i + self.batch_size], attempts=1)
+        for _ in batch:
+            q.task_done()
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been written (or given up on),
+        including a batch the drain thread has taken off the queue but not yet
+        committed. Returns False if that did not happen within timeout."""
+        q = self._queue
+        if q is None or self._pid != os.getpid():
+            return True
+        # Queue.join() without its unbounded wait: every get() is matched by a
+        # task_done() once the row's batch has been written
+        with q.all_tasks_done:
+            return q.all_tasks_done.wait_for(lambda: not q.unfinished_tasks, timeout)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the drain thread after writing any pending events."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_SHUTDOWN, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._thread = None
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+_writer = AuditLogWriter()
+atexit.register(_writer.shutdown)
+
+
+def configure(connection_factory=None, async_mode=None):
+    """Point the audit writer at a connection provider (a zero-arg callable
+    returning a connection context manager, e.g. api.get_db_connection_pooled)."""
+    global AUDIT_ASYNC
+    if connection_factory is not None:
+        _writer.connection_factory = connection_factory
+    if async_mode is not None:
+        AUDIT_ASYNC = bool(async_mode)
+
+
+def get_writer():
+    return _writer
+
+
+def log_event(username, actor, action, details=None, must_persist=False):
+    row = (username, actor, action, details or "", datetime.now())
     try:
-        conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-        cur = conn.cursor()
-        cur.execute("INSERT INTO audit_logs (username, actor, action, details, timestamp) VALUES (%s,%s,%s,%s,%s)",
-                     (username, actor, action, details or "", datetime.now()))
-        conn.commit()
-        conn.close()
+        if must_persist or not AUDIT_ASYNC or action in MUST_PERSIST_ACTIONS:
+            _writer.write_sync(row)
+        else:
+            _writer.enqueue(row)
     except Exception:
         # Best-effort logging; avoid crashing app if audit fails
         pass
@@ -0,0 +1,204 @@
+"""
+Chat Context Loader
+===================
+
+Everything /api/therapy/chat needs before calling the LLM, loaded in one
+round trip: the active chat session, its recent history, the AI memory
+summary, the ai_memory_core context and the patient's active suggestions.
+(Risk keywords come from the compiled matcher cache in risk_signals.)
+
+The slow-changing parts (memory summary, memory core, suggestions) are kept in
+a per-process, per-user cache for CHAT_CONTEXT_TTL seconds. Writers call
+invalidate(username), or update_cached() when they already hold the new value;
+the TTL bounds staleness from writes made by other processes. Session and
+history are always read fresh, since consecutive turns may land on different
+workers.
+
+CountingCursor and record_turn() give the queries-per-chat-turn figures
+reported by the developer monitoring endpoint.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+CHAT_CONTEXT_TTL = float(os.getenv('CHAT_CONTEXT_TTL', '120'))
+HISTORY_LIMIT = 10
+SUGGESTION_LIMIT = 10
+
+# Slow-changing, cacheable part of the context
+UserContext = namedtuple('UserContext', ['memory_summary', 'memory_core', 'suggestions'])
+
+SESSION_HISTORY_SQL = """
+    WITH active_chat_session AS (
+        SELECT id FROM chat_sessions
+        WHERE username = %(username)s AND is_active = 1
+        ORDER BY id DESC LIMIT 1
+    )
+    SELECT
+        (SELECT id FROM active_chat_session) AS session_id,
+        (SELECT COALESCE(json_agg(json_build_array(h.sender, h.message) ORDER BY h.timestamp DESC), '[]'::json)
+           FROM (SELECT sender, message, timestamp FROM chat_history
+                 WHERE chat_session_id = (SELECT id FROM active_chat_session)
+                 ORDER BY timestamp DESC LIMIT {history_limit}) h) AS history{user_columns}
+"""
+
+USER_COLUMNS_SQL = """,
+        (SELECT memory_summary FROM ai_memory WHERE username = %(username)s) AS memory_summary,
+        (SELECT memory_data FROM ai_memory_core WHERE username = %(username)s) AS memory_core,
+        (SELECT COALESCE(json_agg(s.suggestion_text ORDER BY s.created_at DESC), '[]'::json)
+           FROM (SELECT suggestion_text, created_at FROM patient_suggestions
+                 WHERE username = %(username)s AND is_active = TRUE
+                 ORDER BY created_at DESC LIMIT {suggestion_limit}) s) AS suggestions"""
+
+CREATE_SESSION_SQL = "INSERT INTO chat_sessions (username, session_name, is_active) VALUES (%s, 'Main Chat', 1) RETURNING id"
+
+
+def _json(value, default):
+    if value is None:
+        return default
+    if isinstance(value, (str, bytes)):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return default
+    return value
+
+
+class ChatContext:
+    """Prompt inputs for one chat turn."""
+
+    __slots__ = ('username', 'session_id', 'history', 'memory_summary', 'memory_core', 'suggestions',
+                 'from_cache', 'created_session')
+
+    def __init__(self, username, session_id, history, user_context, from_cache=False, created_session=False):
+        self.username = username
+        self.session_id = session_id
+        self.created_session = created_session  # caller commits the new chat_sessions row
+        self.history = history                  # [(sender, message)], newest first
+        self.memory_summary = user_context.memory_summary
+        self.memory_core = user_context.memory_core
+        self.suggestions = user_context.suggestions
+        self.from_cache = from_cache
+
+
+class ChatContextLoader:
+    """Loads ChatContext in one query, caching the per-user part."""
+
+    def __init__(self, ttl=CHAT_CONTEXT_TTL):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.stats = {'loads': 0, 'cache_hits': 0, 'cache_misses': 0, 'invalidations': 0}
+
+    def _cached(self, username):
+        entry = self._cache.get(username)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _store(self, username, user_context):
+        with self._lock:
+            self._cache[username] = (time.monotonic() + self.ttl, user_context)
+
+    def load(self, cur, username):
+        """Return the ChatContext for username, creating the default session if needed.
+
+        Runs one query (plus an INSERT the first time a user chats); the
+        caller commits when ``created_session`` is set.
+        """
+        self.stats['loads'] += 1
+        cached = self._cached(username)
+        user_columns = '' if cached else USER_COLUMNS_SQL.format(suggestion_limit=SUGGESTION_LIMIT)
+        sql = SESSION_HISTORY_SQL.format(history_limit=HISTORY_LIMIT, user_columns=user_columns)
+        row = cur.execute(sql, {'username': username}).fetchone()
+
+        session_id = row[0] if row else None
+        history = [tuple(h) for h in _json(row[1] if row else None, [])]
+        if cached:
+            self.stats['cache_hits'] += 1
+            user_context = cached
+        else:
+            self.stats['cache_misses'] += 1
+            user_context = UserContext(
+                memory_summary=row[2] if row else None,
+                memory_core=_json(row[3] if row else None, {}) or {},
+                suggestions=list(_json(row[4] if row else None, [])),
+            )
+            self._store(username, user_context)
+
+        created = session_id is None
+        if created:
+            cur.execute(CREATE_SESSION_SQL, (username,))
+            session_id = cur.fetchone()[0]
+        return ChatContext(username, session_id, history, user_context,
+                           from_cache=bool(cached), created_session=created)
+
+    def invalidate(self, username):
+        with self._lock:
+            if self._cache.pop(username, None) is not None:
+                self.stats['invalidations'] += 1
+
+    def update_cached(self, username, **fields):
+        """Write-through for callers that already hold the new value (e.g. memory_core)."""
+        with self._lock:
+            entry = self._cache.get(username)
+            if entry:
+                self._cache[username] = (entry[0], entry[1]._replace(**fields))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class CountingCursor:
+    """Cursor proxy counting execute() calls (queries-per-turn instrumentation)."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.queries = 0
+
+    def execute(self, query, params=()):
+        self.queries += 1
+        self.cursor.execute(query, params)
+        return self
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+turn_stats = {'turns': 0, 'queries': 0, 'last_turn_queries': 0, 'max_turn_queries': 0}
+_turn_lock = threading.Lock()
+
+
+def record_turn(queries):
+    with _turn_lock:
+        turn_stats['turns'] += 1
+        turn_stats['queries'] += queries
+        turn_stats['last_turn_queries'] = queries
+        turn_stats['max_turn_queries'] = max(turn_stats['max_turn_queries'], queries)
+
+
+def snapshot():
+    """Counters for the monitoring endpoint."""
+    turns = turn_stats['turns']
+    return {
+        **turn_stats,
+        'avg_turn_queries': round(turn_stats['queries'] / turns, 2) if turns else 0,
+        'context_cache': dict(loader.stats),
+    }
+
+
+loader = ChatContextLoader()
+
+
+def invalidate(username):
+    loader.invalidate(username)
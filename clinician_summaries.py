@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Clinician Summary Batch
+=======================
+
+Builds the monthly clinician_summaries row for every approved
+clinician-patient pair. Runs as the 'clinician_summaries' background job
+(queued by POST /api/clinician/summaries/generate) or from the command line.
+
+- Pairs are read from patient_approvals in keyset order, CLINICIAN_SUMMARY_BATCH_SIZE
+  at a time. Each batch's wellness, therapy, mood and flag aggregates come
+  from four grouped queries over the whole batch, not four per patient.
+- Summaries are computed in a process pool (CLINICIAN_SUMMARY_WORKERS; 0 or 1
+  computes in-process) while the next batch is being read.
+- Each batch is written with one execute_values upsert, in the same
+  transaction that advances the run's progress row in clinician_summary_runs.
+  A run that stops part-way (crash, deploy, failed batch) is resumed from its
+  last committed pair by the next run for the same month.
+- Only one run executes at a time (session advisory lock).
+
+Usage:
+    python clinician_summaries.py                   # current month
+    python clinician_summaries.py --month 2026-09   # a past month
+    python clinician_summaries.py --restart         # ignore an unfinished run
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from psycopg2.extras import execute_values
+
+from db_connection import direct_connection
+
+logger = logging.getLogger(__name__)
+
+CLINICIAN_SUMMARY_BATCH_SIZE = int(os.getenv('CLINICIAN_SUMMARY_BATCH_SIZE', '500'))
+CLINICIAN_SUMMARY_WORKERS = int(os.getenv('CLINICIAN_SUMMARY_WORKERS', '2'))
+ADVISORY_LOCK_KEY = 7316001  # serialises runs across processes
+
+CREATE_RUNS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS clinician_summary_runs (
+        id SERIAL PRIMARY KEY,
+        month_start_date DATE NOT NULL,
+        status TEXT NOT NULL DEFAULT 'running',
+        total INTEGER NOT NULL DEFAULT 0,
+        processed INTEGER NOT NULL DEFAULT 0,
+        last_patient TEXT,
+        last_clinician TEXT,
+        last_error TEXT,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP,
+        CONSTRAINT valid_summary_run_status CHECK (status IN ('running', 'done', 'failed'))
+    )
+"""
+
+RUNS_INDEX_SQLS = [
+    "CREATE INDEX IF NOT EXISTS idx_summary_runs_month ON clinician_summary_runs(month_start_date, id)",
+]
+
+LOCK_SQL = "SELECT pg_try_advisory_lock(%s)"
+UNLOCK_SQL = "SELECT pg_advisory_unlock(%s)"
+
+COUNT_PAIRS_SQL = """
+    SELECT COUNT(*) FROM (
+        SELECT DISTINCT patient_username, clinician_username
+        FROM patient_approvals WHERE status = 'approved'
+    ) pairs
+"""
+
+PAIRS_SQL = """
+    SELECT DISTINCT patient_username, clinician_username
+    FROM patient_approvals
+    WHERE status = 'approved' AND (patient_username, clinician_username) > (%s, %s)
+    ORDER BY patient_username, clinician_username
+    LIMIT %s
+"""
+
+WELLNESS_SQL = """
+    SELECT username, AVG(mood), COUNT(*), AVG(sleep_quality), COUNT(DISTINCT DATE(timestamp))
+    FROM wellness_logs
+    WHERE username = ANY(%s) AND timestamp >= %s AND timestamp < %s + INTERVAL '1 day'
+    GROUP BY username
+"""
+
+THERAPY_SQL = """
+    SELECT session_id, COUNT(*)
+    FROM chat_history
+    WHERE session_id = ANY(%s) AND timestamp >= %s AND timestamp < %s + INTERVAL '1 day'
+    GROUP BY session_id
+"""
+
+MOOD_SQL = """
+    SELECT username, AVG(mood_val), COUNT(*)
+    FROM mood_logs
+    WHERE username = ANY(%s) AND entrestamp >= %s AND entrestamp < %s + INTERVAL '1 day'
+      AND deleted_at IS NULL
+    GROUP BY username
+"""
+
+FLAGS_SQL = """
+    SELECT username, flag_type, severity_level, occurrences_count
+    FROM ai_memory_flags
+    WHERE username = ANY(%s) AND flag_status = 'active'
+"""
+
+UPSERT_SQL = """
+    INSERT INTO clinician_summaries
+        (username, clinician_username, month_start_date, month_end_date, summary_data)
+    VALUES %s
+    ON CONFLICT (username, clinician_username, month_start_date)
+    DO UPDATE SET summary_data = EXCLUDED.summary_data, generated_at = CURRENT_TIMESTAMP
+"""
+
+RUN_COLUMNS = ('id', 'month_start_date', 'status', 'total', 'processed', 'last_patient',
+               'last_clinician', 'last_error', 'started_at', 'updated_at', 'finished_at')
+
+LATEST_RUN_SQL = f"""
+    SELECT {', '.join(RUN_COLUMNS)} FROM clinician_summary_runs
+    WHERE month_start_date = %s ORDER BY id DESC LIMIT 1
+"""
+
+START_RUN_SQL = """
+    INSERT INTO clinician_summary_runs (month_start_date, total) VALUES (%s, %s) RETURNING id
+"""
+
+RESUME_RUN_SQL = """
+    UPDATE clinician_summary_runs
+    SET status = 'running', total = %s, last_error = NULL, updated_at = NOW(), finished_at = NULL
+    WHERE id = %s
+"""
+
+PROGRESS_SQL = """
+    UPDATE clinician_summary_runs
+    SET processed = processed + %s, last_patient = %s, last_clinician = %s, updated_at = NOW()
+    WHERE id = %s
+"""
+
+FINISH_SQL = """
+    UPDATE clinician_summary_runs
+    SET status = %s, last_error = %s, updated_at = NOW(), finished_at = NOW()
+    WHERE id = %s
+"""
+
+
+class RunInProgress(RuntimeError):
+    """Another process holds the summary run lock."""
+
+
+def month_bounds(day):
+    """First and last date of day's month."""
+    start = date(day.year, day.month, 1)
+    following = date(day.year + 1, 1, 1) if day.month == 12 else date(day.year, day.month + 1, 1)
+    return start, following - timedelta(days=1)
+
+
+def build_summary(wellness, therapy_count, mood, flags, days_in_month):
+    """
+    summary_data for one patient from their month's aggregates.
+
+    wellness is (avg_mood, total, avg_sleep, days_logged) or None, mood is
+    (avg_mood, total) or None, flags is a list of
+    (flag_type, severity_level, occurrences_count).
+    """
+    return {
+        "wellness_metrics": {
+            "average_mood": float(wellness[0]) if wellness and wellness[0] else None,
+            "total_entries": wellness[1] if wellness else 0,
+            "average_sleep": float(wellness[2]) if wellness and wellness[2] else None,
+            "days_logged": wellness[3] if wellness else 0,
+            "completion_rate": round((wellness[3] / days_in_month) * 100, 1) if wellness and wellness[3] else 0
+        },
+        "mood_logs": {
+            "average_mood": float(mood[0]) if mood and mood[0] else None,
+            "total_entries": mood[1] if mood else 0
+        },
+        "therapy_activity": {
+            "total_messages": therapy_count,
+            "average_per_week": round(therapy_count / max(1, days_in_month / 7), 1),
+            "engagement_level": "high" if therapy_count > 16 else "medium" if therapy_count > 8 else "low"
+        },
+        "active_concerns": [
+            {"flag": f[0], "severity": f[1], "occurrences": f[2]}
+            for f in flags
+        ]
+    }
+
+
+def compute_batch(batch):
+    """
+    Rows for UPSERT_SQL from one batch (runs in a pool process, so it takes
+    and returns plain picklable data).
+    """
+    month_start, month_end = batch['month_start'], batch['month_end']
+    days_in_month = (month_end - month_start).days + 1
+    rows = []
+    for patient, clinician in batch['pairs']:
+        summary = build_summary(batch['wellness'].get(patient),
+                                batch['therapy'].get(patient, 0),
+                                batch['mood'].get(patient),
+                                batch['flags'].get(patient, []),
+                                days_in_month)
+        rows.append((patient, clinician, month_start, month_end, json.dumps(summary)))
+    return rows
+
+
+def _run_status(row):
+    if not row:
+        return None
+    run = dict(zip(RUN_COLUMNS, row))
+    for key in ('month_start_date', 'started_at', 'updated_at', 'finished_at'):
+        if run[key] is not None:
+            run[key] = run[key].isoformat()
+    return run
+
+
+def latest_run(cur, month_start):
+    """Progress of the most recent run for the month, as a JSON-ready dict (None if never run)."""
+    cur.execute(LATEST_RUN_SQL, (month_start,))
+    return _run_status(cur.fetchone())
+
+
+class SummaryBatch:
+    """One run of the monthly summary generator."""
+
+    def __init__(self, connection_factory=None, batch_size=CLINICIAN_SUMMARY_BATCH_SIZE,
+                 workers=CLINICIAN_SUMMARY_WORKERS, progress=None):
+        self.connection_factory = connection_factory or direct_connection
+        self.batch_size = batch_size
+        self.workers = workers
+        self.progress = progress
+
+    def _load_batch(self, cur, after, month_start, month_end):
+        """Next batch of pairs after the keyset position, with their aggregates (None when done)."""
+        cur.execute(PAIRS_SQL, (after[0], after[1], self.batch_size))
+        pairs = [tuple(p) for p in cur.fetchall()]
+        if not pairs:
+            return None
+        patients = sorted({p for p, _ in pairs})
+        window = (month_start, month_end)
+
+        cur.execute(WELLNESS_SQL, (patients,) + window)
+        wellness = {r[0]: tuple(r[1:]) for r in cur.fetchall()}
+        cur.execute(THERAPY_SQL, ([f"{p}_session" for p in patients],) + window)
+        therapy = {r[0][:-len('_session')]: r[1] for r in cur.fetchall()}
+        cur.execute(MOOD_SQL, (patients,) + window)
+        mood = {r[0]: tuple(r[1:]) for r in cur.fetchall()}
+        cur.execute(FLAGS_SQL, (patients,))
+        flags = {}
+        for username, *flag in cur.fetchall():
+            flags.setdefault(username, []).append(tuple(flag))
+
+        return {'month_start': month_start, 'month_end': month_end, 'pairs': pairs,
+                'wellness': wellness, 'therapy': therapy, 'mood': mood, 'flags': flags}
+
+    def _start(self, cur, month_start, resume):
+        """Resume the month's unfinished run, or start a new one. Returns (run_id, keyset position)."""
+        cur.execute(COUNT_PAIRS_SQL)
+        total = cur.fetchone()[0]
+        cur.execute(LATEST_RUN_SQL, (month_start,))
+        run = _run_status(cur.fetchone())
+        if resume and run and run['status'] != 'done':
+            cur.execute(RESUME_RUN_SQL, (total, run['id']))
+            logger.info(f"Resuming summary run {run['id']} after {run['processed']} pairs")
+            return run['id'], (run['last_patient'] or '', run['last_clinician'] or '')
+        cur.execute(START_RUN_SQL, (month_start, total))
+        return cur.fetchone()[0], ('', '')
+
+    def _write(self, conn, cur, run_id, rows):
+        execute_values(cur, UPSERT_SQL, rows, page_size=len(rows))
+        cur.execute(PROGRESS_SQL, (len(rows), rows[-1][0], rows[-1][1], run_id))
+        conn.commit()
+
+    def run(self, month_start=None, resume=True):
+        """Generate every summary for the month; returns the finished run's status dict."""
+        month_start, month_end = month_bounds(month_start or date.today())
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            cur.execute(LOCK_SQL, (ADVISORY_LOCK_KEY,))
+            if not cur.fetchone()[0]:
+                conn.rollback()
+                raise RunInProgress('Another clinician summary run is in progress')
+            try:
+                run_id, after = self._start(cur, month_start, resume)
+                conn.commit()
+                try:
+                    self._generate(conn, cur, run_id, after, month_start, month_end)
+                except Exception as e:
+                    conn.rollback()
+                    cur.execute(FINISH_SQL, ('failed', str(e)[:500], run_id))
+                    conn.commit()
+                    raise
+                cur.execute(FINISH_SQL, ('done', None, run_id))
+                conn.commit()
+                return latest_run(cur, month_start)
+            finally:
+                try:
+                    conn.rollback()
+                    cur.execute(UNLOCK_SQL, (ADVISORY_LOCK_KEY,))
+                    conn.commit()
+                except Exception as e:
+                    # A lost connection releases the session lock with it
+                    logger.warning(f"Could not release summary run lock: {e}")
+
+    def _generate(self, conn, cur, run_id, after, month_start, month_end):
+        if self.workers <= 1:
+            while True:
+                batch = self._load_batch(cur, after, month_start, month_end)
+                if batch is None:
+                    return
+                self._write(conn, cur, run_id, compute_batch(batch))
+                after = batch['pairs'][-1]
+                self._report(cur, month_start)
+
+        # Read ahead while the pool computes; write strictly in keyset order
+        # so the progress row is always a valid resume point.
+        pending = deque()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            while True:
+                batch = self._load_batch(cur, after, month_start, month_end)
+                if batch is not None:
+                    pending.append(pool.submit(compute_batch, batch))
+                    after = batch['pairs'][-1]
+                if pending and (batch is None or len(pending) > self.workers):
+                    self._write(conn, cur, run_id, pending.popleft().result())
+                    self._report(cur, month_start)
+                elif batch is None:
+                    return
+
+    def _report(self, cur, month_start):
+        if self.progress:
+            self.progress(latest_run(cur, month_start))
+
+
+def run(connection_factory=None, month_start=None, resume=True, **kwargs):
+    return SummaryBatch(connection_factory, **kwargs).run(month_start, resume=resume)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate monthly clinician summaries')
+    parser.add_argument('--month', help='month to summarise, YYYY-MM (default: current month)')
+    parser.add_argument('--workers', type=int, default=CLINICIAN_SUMMARY_WORKERS,
+                        help='compute processes (default CLINICIAN_SUMMARY_WORKERS)')
+    parser.add_argument('--batch-size', type=int, default=CLINICIAN_SUMMARY_BATCH_SIZE,
+                        help='pairs per batch (default CLINICIAN_SUMMARY_BATCH_SIZE)')
+    parser.add_argument('--restart', action='store_true', help='start a new run instead of resuming')
+    args = parser.parse_args()
+
+    month = datetime.strptime(args.month, '%Y-%m').date() if args.month else date.today()
+
+    def progress(status):
+        print(f"  {status['processed']}/{status['total']} pairs", flush=True)
+
+    try:
+        status = run(month_start=month, resume=not args.restart, workers=args.workers,
+                     batch_size=args.batch_size, progress=progress)
+    except RunInProgress as e:
+        print(e)
+        sys.exit(1)
+    print(f"Summaries for {month.strftime('%B %Y')}: {status['processed']} of {status['total']} pairs, run {status['id']}")
+
+
+if __name__ == '__main__':
+    main()
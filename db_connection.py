@@ -0,0 +1,24 @@
+"""
+Database Connection
+===================
+
+Fallback connection for the modules that take a connection factory (audit,
+job_queue, clinician_summaries, migrations). api.py hands them its pooled
+connection context manager; used standalone, without one, they open a
+single DATABASE_URL connection through direct_connection().
+"""
+
+import os
+from contextlib import contextmanager
+
+import psycopg2
+
+
+@contextmanager
+def direct_connection():
+    """Fallback connection for standalone use (no pool configured)."""
+    conn = psycopg2.connect(os.getenv("DATABASE_URL"))
+    try:
+        yield conn
+    finally:
+        conn.close()
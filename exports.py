@@ -0,0 +1,416 @@
+"""
+Data Exports
+============
+
+Streaming renderers for the patient data exports (CSV, PDF) and the chat
+history export (txt, csv, json).
+
+- Rows are read through server-side (named) cursors EXPORT_FETCH_SIZE at a
+  time and written out as they arrive, so memory stays flat however much
+  history a patient has. Text output is flushed in EXPORT_CHUNK_BYTES pieces.
+- PDFs are rendered by reportlab into a SpooledTemporaryFile (kept in memory
+  up to EXPORT_SPOOL_MAX_MEMORY, then on disk) and streamed from it; long
+  tables break across pages with their header row repeated.
+- Large exports can run as 'data_export' background jobs instead:
+  create_export() records a data_exports row, run_export() renders it into
+  data_export_chunks (so any web process can serve it) and iter_download()
+  streams it back. Finished exports expire after EXPORT_RETENTION_HOURS.
+"""
+
+import csv
+import itertools
+import json
+import logging
+import os
+import secrets
+import tempfile
+from datetime import datetime
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', '500'))
+EXPORT_CHUNK_BYTES = int(os.getenv('EXPORT_CHUNK_BYTES', str(64 * 1024)))
+EXPORT_SPOOL_MAX_MEMORY = int(os.getenv('EXPORT_SPOOL_MAX_MEMORY', str(1024 * 1024)))
+EXPORT_RETENTION_HOURS = int(os.getenv('EXPORT_RETENTION_HOURS', '24'))
+STORE_CHUNK_BYTES = 1024 * 1024  # size of each stored data_export_chunks row
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS data_exports (
+        id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        params JSONB NOT NULL DEFAULT '{}',
+        filename TEXT NOT NULL,
+        content_type TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        size_bytes BIGINT NOT NULL DEFAULT 0,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL,
+        CONSTRAINT valid_export_status CHECK (status IN ('queued', 'running', 'done', 'failed'))
+    )
+"""
+
+INDEX_SQLS = [
+    "CREATE INDEX IF NOT EXISTS idx_data_exports_expires ON data_exports(expires_at)",
+]
+
+CREATE_CHUNKS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS data_export_chunks (
+        export_id TEXT NOT NULL REFERENCES data_exports(id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        data BYTEA NOT NULL,
+        PRIMARY KEY (export_id, seq)
+    )
+"""
+
+INSERT_EXPORT_SQL = """
+    INSERT INTO data_exports (id, username, kind, params, filename, content_type, expires_at)
+    VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(hours => %s))
+"""
+
+GET_EXPORT_SQL = """
+    SELECT id, username, kind, params, filename, content_type, status, size_bytes, error,
+           created_at, finished_at, expires_at
+    FROM data_exports WHERE id = %s AND expires_at > CURRENT_TIMESTAMP
+"""
+
+START_EXPORT_SQL = "UPDATE data_exports SET status = 'running', error = NULL WHERE id = %s"
+CLEAR_CHUNKS_SQL = "DELETE FROM data_export_chunks WHERE export_id = %s"
+INSERT_CHUNK_SQL = "INSERT INTO data_export_chunks (export_id, seq, data) VALUES (%s, %s, %s)"
+
+FINISH_EXPORT_SQL = """
+    UPDATE data_exports
+    SET status = %s, size_bytes = %s, error = %s, finished_at = CURRENT_TIMESTAMP
+    WHERE id = %s
+"""
+
+CHUNKS_SQL = "SELECT data FROM data_export_chunks WHERE export_id = %s ORDER BY seq"
+PURGE_SQL = "DELETE FROM data_exports WHERE expires_at <= CURRENT_TIMESTAMP"
+
+PROFILE_SQL = "SELECT full_name, dob, conditions FROM users WHERE username=%s"
+
+# (section title, header row, query) for the patient CSV export, in file order
+CSV_SECTIONS = [
+    ("MOOD_LOGS",
+     ["timestamp", "mood_val", "sleep_val", "meds", "notes", "sentiment", "exercise_mins", "outside_mins", "water_pints"],
+     "SELECT entrestamp, mood_val, sleep_val, meds, COALESCE(notes, ''), sentiment, exercise_mins, outside_mins, water_pints "
+     "FROM mood_logs WHERE username=%s ORDER BY entrestamp DESC"),
+    ("GRATITUDE_LOGS",
+     ["timestamp", "entry"],
+     "SELECT entry_timestamp, entry FROM gratitude_logs WHERE username=%s ORDER BY entry_timestamp DESC"),
+    ("CBT_RECORDS",
+     ["timestamp", "situation", "thought", "evidence"],
+     "SELECT entry_timestamp, situation, thought, evidence FROM cbt_records WHERE username=%s ORDER BY entry_timestamp DESC"),
+    ("CLINICAL_SCALES",
+     ["timestamp", "scale_name", "score", "severity"],
+     "SELECT entry_timestamp, scale_name, score, severity FROM clinical_scales WHERE username=%s ORDER BY entry_timestamp DESC"),
+]
+
+CHAT_HISTORY_SQL = """
+    SELECT sender, message, timestamp FROM chat_history
+    WHERE {column} = %s AND timestamp BETWEEN %s AND %s
+    ORDER BY timestamp ASC
+"""
+
+PDF_MOODS_SQL = ("SELECT entrestamp, mood_val, sleep_val, meds, exercise_mins FROM mood_logs "
+                 "WHERE username = %s ORDER BY entrestamp DESC LIMIT 15")
+PDF_GRATITUDE_SQL = ("SELECT entry_timestamp, entry FROM gratitude_logs "
+                     "WHERE username = %s ORDER BY entry_timestamp DESC LIMIT 10")
+
+CHAT_CONTENT_TYPES = {'json': 'application/json', 'csv': 'text/csv', 'txt': 'text/plain'}
+
+_cursor_names = itertools.count(1)
+
+
+class ExportUnavailable(RuntimeError):
+    """The export cannot be produced here (e.g. reportlab is not installed)."""
+
+
+# ---- streaming helpers ----
+
+def server_side_rows(conn, sql, params, fetch_size=None):
+    """Yield the rows of a query through a named cursor, fetch_size rows per round trip."""
+    fetch_size = fetch_size or EXPORT_FETCH_SIZE
+    cur = conn.cursor(name=f"export_{next(_cursor_names)}")
+    try:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cur.close()
+
+
+def buffered(pieces, size=None):
+    """Join str/bytes pieces into UTF-8 chunks of at least size bytes."""
+    size = size or EXPORT_CHUNK_BYTES
+    buffer, length = [], 0
+    for piece in pieces:
+        if isinstance(piece, str):
+            piece = piece.encode('utf-8')
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_file(f, size=None):
+    """Yield a file's contents in chunks, closing it at the end."""
+    try:
+        f.seek(0)
+        while True:
+            chunk = f.read(size or EXPORT_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        f.close()
+
+
+class _Line:
+    """File-like target that hands csv.writer's output straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _as_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _date_str(value):
+    return str(value)[:10] if value else 'N/A'
+
+
+# ---- renderers ----
+
+def patient_csv(conn, username):
+    """Yield the patient data export as CSV text, section by section."""
+    line = csv.writer(_Line())
+
+    cur = conn.cursor()
+    cur.execute(PROFILE_SQL, (username,))
+    prof = cur.fetchone()
+    yield line.writerow(["USER PROFILE"])
+    if prof:
+        yield line.writerow(["username", username])
+        yield line.writerow(["full_name", prof[0]])
+        yield line.writerow(["dob", prof[1]])
+        yield line.writerow(["conditions", prof[2]])
+
+    for title, header, sql in CSV_SECTIONS:
+        yield line.writerow([])
+        yield line.writerow([title])
+        yield line.writerow(header)
+        for row in server_side_rows(conn, sql, (username,)):
+            yield line.writerow(row)
+
+
+def chat_history(conn, username, from_date, to_date, export_format='txt', chat_session_id=None):
+    """Yield a chat history export (txt, csv or json) for the inclusive date range."""
+    from_datetime = datetime.strptime(from_date, '%Y-%m-%d')
+    to_datetime = datetime.strptime(to_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+    if chat_session_id:
+        sql, key = CHAT_HISTORY_SQL.format(column='chat_session_id'), chat_session_id
+    else:
+        sql, key = CHAT_HISTORY_SQL.format(column='session_id'), f"{username}_session"
+    rows = server_side_rows(conn, sql, (key, from_datetime, to_datetime))
+
+    if export_format == 'json':
+        first = True
+        yield '['
+        for sender, message, timestamp in rows:
+            item = json.dumps({'sender': sender, 'message': message, 'timestamp': timestamp},
+                              indent=2, default=str)
+            yield ('\n' if first else ',\n') + '\n'.join('  ' + l for l in item.split('\n'))
+            first = False
+        yield ']' if first else '\n]'
+
+    elif export_format == 'csv':
+        line = csv.writer(_Line())
+        yield line.writerow(['Sender', 'Message', 'Timestamp'])
+        for row in rows:
+            yield line.writerow(row)
+
+    else:
+        yield f"Chat History Export for {username}\n"
+        yield f"Date Range: {from_date} to {to_date}\n"
+        yield "=" * 80 + "\n\n"
+        total = 0
+        for sender, message, timestamp in rows:
+            formatted_time = _as_datetime(timestamp).strftime('%Y-%m-%d %I:%M %p')
+            yield f"[{formatted_time}] {sender.upper()}:\n{message}\n\n"
+            total += 1
+        yield "=" * 80 + "\n"
+        yield f"Total messages: {total}\n"
+
+
+def patient_pdf(conn, username):
+    """Render the personal wellness report; returns a spooled file positioned at 0."""
+    try:
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+    except ImportError:
+        raise ExportUnavailable('PDF library not available. Please install reportlab.')
+
+    out = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_MEMORY)
+    doc = SimpleDocTemplate(out, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+    story = []
+    styles = getSampleStyleSheet()
+
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#667eea'),
+        spaceAfter=12,
+        alignment=TA_CENTER
+    )
+    story.append(Paragraph("Personal Wellness Report", title_style))
+    story.append(Paragraph(f"<i>{username}</i>", styles['Normal']))
+    story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
+    story.append(Spacer(1, 0.3*inch))
+
+    mood_data = [['Date', 'Mood', 'Sleep (hrs)', 'Exercise (mins)', 'Medications']]
+    for m in server_side_rows(conn, PDF_MOODS_SQL, (username,)):
+        mood_data.append([
+            _date_str(m[0]),
+            f"{m[1]}/10" if m[1] else 'N/A',
+            f"{m[2]}" if m[2] else 'N/A',
+            f"{m[4]}" if m[4] else '0',
+            m[3] if m[3] else 'None'
+        ])
+    if len(mood_data) > 1:
+        story.append(Paragraph("<b>Recent Mood & Wellness Tracking</b>", styles['Heading2']))
+        table = Table(mood_data, colWidths=[1.2*inch, 0.8*inch, 1*inch, 1.2*inch, 2*inch], repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+        ]))
+        story.append(table)
+        story.append(Spacer(1, 0.2*inch))
+
+    gratitudes = [Paragraph(f"<i>{_date_str(g[0])}:</i> {g[1]}", styles['Normal'])
+                  for g in server_side_rows(conn, PDF_GRATITUDE_SQL, (username,))]
+    if gratitudes:
+        story.append(Paragraph("<b>Gratitude Journal Highlights</b>", styles['Heading2']))
+        story.extend(gratitudes)
+        story.append(Spacer(1, 0.2*inch))
+
+    try:
+        doc.build(story)
+    except Exception:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def describe(kind, username, params):
+    """(filename, content type) for an export."""
+    if kind == 'csv':
+        return f"{username}_data.csv", 'text/csv'
+    if kind == 'pdf':
+        return f"{username}_wellness_report.pdf", 'application/pdf'
+    if kind == 'chat':
+        export_format = params.get('format', 'txt')
+        if export_format not in CHAT_CONTENT_TYPES:
+            export_format = 'txt'
+        return (f"chat_export_{params['from_date']}_to_{params['to_date']}.{export_format}",
+                CHAT_CONTENT_TYPES[export_format])
+    raise ValueError(f"Unknown export kind: {kind}")
+
+
+def render(conn, kind, username, params):
+    """Yield an export's content as str/bytes pieces."""
+    if kind == 'csv':
+        return patient_csv(conn, username)
+    if kind == 'pdf':
+        return iter_file(patient_pdf(conn, username))
+    if kind == 'chat':
+        return chat_history(conn, username, params['from_date'], params['to_date'],
+                            params.get('format', 'txt'), params.get('chat_session_id'))
+    raise ValueError(f"Unknown export kind: {kind}")
+
+
+# ---- background exports ----
+
+def create_export(cur, username, kind, params=None):
+    """Record a queued export in the caller's transaction; returns its id (an unguessable token)."""
+    params = params or {}
+    filename, content_type = describe(kind, username, params)
+    export_id = secrets.token_urlsafe(24)
+    cur.execute(INSERT_EXPORT_SQL, (export_id, username, kind, json.dumps(params), filename,
+                                    content_type, EXPORT_RETENTION_HOURS))
+    return export_id
+
+
+def _export_status(row):
+    if not row:
+        return None
+    keys = ('id', 'username', 'kind', 'params', 'filename', 'content_type', 'status', 'size_bytes',
+            'error', 'created_at', 'finished_at', 'expires_at')
+    export = dict(zip(keys, row))
+    if isinstance(export['params'], str):
+        export['params'] = json.loads(export['params'])
+    for key in ('created_at', 'finished_at', 'expires_at'):
+        if export[key] is not None and not isinstance(export[key], str):
+            export[key] = export[key].isoformat()
+    return export
+
+
+def get_export(cur, export_id):
+    """An unexpired export's details as a JSON-ready dict, or None."""
+    cur.execute(GET_EXPORT_SQL, (export_id,))
+    return _export_status(cur.fetchone())
+
+
+def run_export(connection_factory, export_id):
+    """Render a queued export into data_export_chunks (one transaction)."""
+    with connection_factory() as conn:
+        cur = conn.cursor()
+        export = get_export(cur, export_id)
+        if not export or export['status'] == 'done':
+            conn.rollback()
+            return
+        cur.execute(START_EXPORT_SQL, (export_id,))
+        conn.commit()
+        try:
+            cur.execute(CLEAR_CHUNKS_SQL, (export_id,))
+            size = 0
+            pieces = render(conn, export['kind'], export['username'], export['params'])
+            for seq, chunk in enumerate(buffered(pieces, STORE_CHUNK_BYTES)):
+                cur.execute(INSERT_CHUNK_SQL, (export_id, seq, psycopg2.Binary(chunk)))
+                size += len(chunk)
+            cur.execute(FINISH_EXPORT_SQL, ('done', size, None, export_id))
+            cur.execute(PURGE_SQL)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            cur.execute(FINISH_EXPORT_SQL, ('failed', 0, str(e)[:500], export_id))
+            conn.commit()
+            raise
+
+
+def iter_download(conn, export_id):
+    """Yield a finished export's stored bytes, a chunk per round trip."""
+    for row in server_side_rows(conn, CHUNKS_SQL, (export_id,), fetch_size=1):
+        yield bytes(row[0])
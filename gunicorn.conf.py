@@ -0,0 +1,139 @@
+"""
+Gunicorn configuration
+======================
+
+Production server settings for ``gunicorn -c gunicorn.conf.py api:app``
+(Procfile, railway.toml). Every value can be overridden from the environment.
+
+- Workers default to 2 x cores + 1, capped so that workers x DB_POOL_MAX fits
+  the WEB_DB_CONNECTIONS budget (WEB_CONCURRENCY overrides).
+- GUNICORN_WORKER_CLASS=gthread (the default) gives each worker
+  GUNICORN_THREADS threads; gevent/eventlet give it GUNICORN_WORKER_CONNECTIONS
+  greenlets. Both default to DB_POOL_MAX - DB_POOL_HEADROOM -
+  DB_POOL_REQUEST_RESERVE. The worker's pool also serves the audit writer,
+  embedded job worker (which also delivers scheduled messages) and the
+  risk-analysis executor (the headroom defaults to their thread counts). Repeat get_db_connection() calls
+  in a request reuse its connection; the reserve covers requests that open a
+  get_db_connection_pooled() connection while holding their own. When the pool
+  is empty, getconn() waits up to DB_POOL_TIMEOUT rather than failing at once
+  (api.BlockingConnectionPool).
+- Cooperative workers are monkey-patched here, before the app is imported,
+  so its locks, queues and sockets are green. psycopg2 gets a wait callback
+  that yields to the hub instead of blocking it (what psycogreen does).
+  gevent/eventlet are optional dependencies: install the one you select.
+- The app is preloaded once in the master. The master closes its database
+  pool before each fork, and each worker builds its own on first use
+  (api._get_db_pool checks the pid). Background threads (audit writer, job
+  worker) already restart per pid.
+"""
+
+import multiprocessing
+import os
+import sys
+
+
+def _int_env(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+DB_POOL_MAX = _int_env('DB_POOL_MAX', 20)
+# Connections held by background threads: audit writer, job worker threads,
+# risk-analysis executor
+DB_POOL_HEADROOM = _int_env('DB_POOL_HEADROOM',
+                            1 + _int_env('JOB_WORKER_THREADS', 2) + _int_env('RISK_ANALYSIS_WORKERS', 4))
+# Second connections taken by requests that already hold one (get_db_connection_pooled)
+DB_POOL_REQUEST_RESERVE = _int_env('DB_POOL_REQUEST_RESERVE', 2)
+REQUEST_CONCURRENCY = max(1, DB_POOL_MAX - DB_POOL_HEADROOM - DB_POOL_REQUEST_RESERVE)
+# Postgres connections the web service may use in total (leave room for worker.py and migrations)
+WEB_DB_CONNECTIONS = _int_env('WEB_DB_CONNECTIONS', 80)
+COOPERATIVE_WORKERS = ('gevent', 'eventlet')
+
+
+def default_workers(cores, pool_max=DB_POOL_MAX, budget=WEB_DB_CONNECTIONS):
+    return max(1, min(2 * cores + 1, budget // max(pool_max, 1)))
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread').lower()
+workers = _int_env('WEB_CONCURRENCY', default_workers(available_cores()))
+threads = _int_env('GUNICORN_THREADS', REQUEST_CONCURRENCY) if worker_class == 'gthread' else 1
+worker_connections = _int_env('GUNICORN_WORKER_CONNECTIONS', REQUEST_CONCURRENCY)
+# Chat completions take seconds; the LLM client gives up long before this
+timeout = _int_env('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _int_env('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _int_env('GUNICORN_KEEPALIVE', 5)
+preload_app = os.getenv('GUNICORN_PRELOAD', '1').lower() in ('1', 'true', 'yes')
+max_requests = _int_env('GUNICORN_MAX_REQUESTS', 0)
+max_requests_jitter = _int_env('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def make_psycopg_green(kind):
+    """Make psycopg2 yield to the gevent/eventlet hub while waiting on the server."""
+    from psycopg2 import OperationalError, extensions
+
+    if kind == 'gevent':
+        from gevent.socket import wait_read, wait_write
+    else:
+        from eventlet.hubs import trampoline
+
+        def wait_read(fd, timeout=None):
+            trampoline(fd, read=True, timeout=timeout)
+
+        def wait_write(fd, timeout=None):
+            trampoline(fd, write=True, timeout=timeout)
+
+    def wait_callback(conn, timeout=None):
+        while True:
+            state = conn.poll()
+            if state == extensions.POLL_OK:
+                break
+            elif state == extensions.POLL_READ:
+                wait_read(conn.fileno(), timeout=timeout)
+            elif state == extensions.POLL_WRITE:
+                wait_write(conn.fileno(), timeout=timeout)
+            else:
+                raise OperationalError(f"Bad result from poll: {state!r}")
+
+    extensions.set_wait_callback(wait_callback)
+
+
+def patch_for(kind):
+    """Monkey-patch the stdlib for a cooperative worker class (before the app is imported)."""
+    if kind == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    elif kind == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    else:
+        return False
+    make_psycopg_green(kind)
+    return True
+
+
+if worker_class in COOPERATIVE_WORKERS:
+    patch_for(worker_class)
+
+
+def when_ready(server):
+    concurrency = threads if worker_class == 'gthread' else worker_connections
+    server.log.info(f"{workers} {worker_class} worker(s) x {concurrency} concurrent requests, "
+                    f"DB pool max {DB_POOL_MAX} per worker, preload={preload_app}")
+
+
+def pre_fork(server, worker):
+    # Children must not share the master's database sockets
+    api = sys.modules.get('api')
+    if api is not None:
+        api.close_db_pool()
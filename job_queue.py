@@ -0,0 +1,448 @@
+"""
+Background Job Queue
+====================
+
+Durable queue for work that should not run on the request thread. Jobs are
+rows in background_jobs and are claimed with SELECT ... FOR UPDATE SKIP LOCKED,
+so any number of worker threads and processes can share the table.
+
+- Job types are registered with @register(job_type, concurrency=..., max_attempts=...).
+  ``concurrency`` caps how many jobs of that type run at once across all
+  workers (checked under a per-type advisory lock while claiming).
+- Periodic job types (register(..., interval=seconds)) take no payload and keep
+  a single row: workers seed it when none is queued or running, and each run,
+  successful or not, requeues it ``interval`` seconds later.
+- enqueue() uses the caller's cursor, so jobs commit atomically with the rows
+  that triggered them. A dedupe_key skips the insert while an identical job is
+  still waiting.
+- Failed jobs are retried with exponential backoff (JOB_RETRY_BASE_SECONDS)
+  until max_attempts, then kept as status='failed' with last_error. A retry
+  is dropped (marked done) when a job with the same dedupe_key is already
+  queued, since that job will do the same work.
+- Jobs left 'running' by a dead worker are requeued after
+  JOB_VISIBILITY_TIMEOUT seconds; finished jobs are purged after
+  JOB_RETENTION_DAYS.
+- ``python worker.py`` runs a standalone worker. With JOB_WORKER_MODE=embedded
+  (the default) each web process also runs JOB_WORKER_THREADS worker threads,
+  started on first use.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+
+from db_connection import direct_connection
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKER_MODE = os.getenv('JOB_WORKER_MODE', 'embedded').lower()
+JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', '2'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
+JOB_VISIBILITY_TIMEOUT = int(os.getenv('JOB_VISIBILITY_TIMEOUT', '900'))
+JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', '10'))
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', '7'))
+REAP_INTERVAL = 60.0
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS background_jobs (
+        id BIGSERIAL PRIMARY KEY,
+        job_type TEXT NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 3,
+        dedupe_key TEXT,
+        run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        locked_at TIMESTAMP,
+        locked_by TEXT,
+        last_error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP,
+        CONSTRAINT valid_job_status CHECK (status IN ('queued', 'running', 'done', 'failed'))
+    )
+"""
+
+INDEX_SQLS = [
+    "CREATE INDEX IF NOT EXISTS idx_background_jobs_ready ON background_jobs(job_type, run_at, id) WHERE status = 'queued'",
+    "CREATE INDEX IF NOT EXISTS idx_background_jobs_running ON background_jobs(job_type, locked_at) WHERE status = 'running'",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_background_jobs_dedupe ON background_jobs(dedupe_key) WHERE status = 'queued'",
+]
+
+INSERT_SQL = """
+    INSERT INTO background_jobs (job_type, payload, max_attempts, dedupe_key, run_at)
+    VALUES {values}
+    ON CONFLICT (dedupe_key) WHERE status = 'queued' DO NOTHING
+"""
+
+CLAIM_SQL = """
+    UPDATE background_jobs
+    SET status = 'running', attempts = attempts + 1, locked_at = NOW(), locked_by = %s
+    WHERE id = (
+        SELECT id FROM background_jobs
+        WHERE status = 'queued' AND job_type = %s AND run_at <= NOW()
+        ORDER BY run_at, id
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, job_type, payload, attempts, max_attempts
+"""
+
+COMPLETE_SQL = """
+    UPDATE background_jobs
+    SET status = 'done', finished_at = NOW(), locked_at = NULL, last_error = NULL
+    WHERE id = %s
+"""
+
+# A retry is superseded (marked done) when a job with the same dedupe_key was
+# queued while it ran: the unique index allows only one queued row per key.
+FAIL_SQL = """
+    UPDATE background_jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'failed'
+                      WHEN waiting.superseded THEN 'done' ELSE 'queued' END,
+        finished_at = CASE WHEN attempts >= max_attempts OR waiting.superseded THEN NOW() END,
+        run_at = NOW() + make_interval(secs => %s),
+        locked_at = NULL, locked_by = NULL, last_error = %s
+    FROM (
+        SELECT EXISTS (
+            SELECT 1 FROM background_jobs other
+            WHERE other.dedupe_key = job.dedupe_key AND other.status = 'queued'
+        ) AS superseded
+        FROM background_jobs job WHERE job.id = %s
+    ) waiting
+    WHERE id = %s
+"""
+
+# Same rule for abandoned runs; of several stale retryable runs sharing a
+# dedupe_key only the oldest is requeued.
+REQUEUE_STALE_SQL = """
+    UPDATE background_jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'failed'
+                      WHEN stale.superseded THEN 'done' ELSE 'queued' END,
+        finished_at = CASE WHEN attempts >= max_attempts OR stale.superseded THEN NOW() END,
+        run_at = NOW(), locked_at = NULL, locked_by = NULL,
+        last_error = 'worker lost (visibility timeout)'
+    FROM (
+        SELECT job.id AS job_id,
+               job.dedupe_key IS NOT NULL AND (
+                   EXISTS (
+                       SELECT 1 FROM background_jobs other
+                       WHERE other.dedupe_key = job.dedupe_key AND other.status = 'queued'
+                   )
+                   OR ROW_NUMBER() OVER (
+                       PARTITION BY job.dedupe_key, job.attempts < job.max_attempts ORDER BY job.id
+                   ) > 1
+               ) AS superseded
+        FROM background_jobs job
+        WHERE job.status = 'running' AND job.locked_at < NOW() - make_interval(secs => %s)
+    ) stale
+    WHERE background_jobs.id = stale.job_id
+"""
+
+# Seed a periodic job type unless a run of it is already waiting or in progress
+SCHEDULE_PERIODIC_SQL = """
+    INSERT INTO background_jobs (job_type, payload, max_attempts, dedupe_key, run_at)
+    SELECT %s, '{}', %s, %s, NOW()
+    WHERE NOT EXISTS (
+        SELECT 1 FROM background_jobs WHERE job_type = %s AND status IN ('queued', 'running')
+    )
+    ON CONFLICT (dedupe_key) WHERE status = 'queued' DO NOTHING
+"""
+
+# Put a finished periodic job back in the queue for its next run
+RESCHEDULE_SQL = """
+    UPDATE background_jobs
+    SET status = 'queued', attempts = 0, run_at = NOW() + make_interval(secs => %s),
+        locked_at = NULL, locked_by = NULL, last_error = %s
+    WHERE id = %s AND NOT EXISTS (
+        SELECT 1 FROM background_jobs other
+        WHERE other.dedupe_key = background_jobs.dedupe_key AND other.status = 'queued'
+    )
+"""
+
+PURGE_SQL = """
+    DELETE FROM background_jobs
+    WHERE status = 'done' AND finished_at < NOW() - make_interval(days => %s)
+"""
+
+JobType = namedtuple('JobType', ['name', 'handler', 'concurrency', 'max_attempts', 'interval'],
+                     defaults=(None,))
+Job = namedtuple('Job', ['id', 'job_type', 'payload', 'attempts', 'max_attempts'])
+
+_registry = {}
+
+
+def register(job_type, concurrency=1, max_attempts=3, interval=None):
+    """Decorator registering handler(**payload) for job_type (run every
+    ``interval`` seconds, with no payload, when given)."""
+    def decorator(func):
+        _registry[job_type] = JobType(job_type, func, concurrency, max_attempts, interval)
+        return func
+    return decorator
+
+
+def get_job_type(job_type):
+    return _registry[job_type]
+
+
+def job_types():
+    return list(_registry.values())
+
+
+def enqueue(cur, jobs):
+    """
+    Insert jobs in the caller's transaction (the caller commits).
+
+    ``jobs`` is an iterable of (job_type, payload) or
+    (job_type, payload, dedupe_key) tuples. A job whose dedupe_key matches one
+    that is still queued is skipped.
+    """
+    placeholders = []
+    params = []
+    for job in jobs:
+        job_type, payload = job[0], job[1]
+        dedupe_key = job[2] if len(job) > 2 else None
+        spec = get_job_type(job_type)  # unknown job types fail at enqueue time
+        placeholders.append("(%s, %s, %s, %s, NOW())")
+        params.extend([job_type, json.dumps(payload or {}, default=str), spec.max_attempts, dedupe_key])
+    if not placeholders:
+        return
+    cur.execute(INSERT_SQL.format(values=', '.join(placeholders)), tuple(params))
+
+
+def run_inline(jobs):
+    """Run jobs synchronously in this thread (fallback when they cannot be queued)."""
+    for job in jobs:
+        try:
+            get_job_type(job[0]).handler(**(job[1] or {}))
+        except Exception as e:
+            logger.warning(f"Inline job {job[0]} failed: {e}")
+
+
+class Worker:
+    """Claims and runs queued jobs on a fixed number of threads."""
+
+    def __init__(self, connection_factory=None, threads=JOB_WORKER_THREADS,
+                 poll_interval=JOB_POLL_INTERVAL, name=None):
+        self.connection_factory = connection_factory or direct_connection
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+        self._rotation = 0
+        self._last_reap = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'claimed': 0, 'succeeded': 0, 'retried': 0, 'failed': 0, 'requeued': 0}
+
+    # ---- claiming ----
+
+    def claim(self, cur, spec):
+        """Claim one ready job of this type, or None (at its concurrency limit / nothing ready)."""
+        cur.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", (f"background_jobs:{spec.name}",))
+        if not cur.fetchone()[0]:
+            return None  # another worker is claiming this type right now
+        cur.execute(
+            "SELECT COUNT(*) FROM background_jobs WHERE job_type = %s AND status = 'running'",
+            (spec.name,)
+        )
+        if cur.fetchone()[0] >= spec.concurrency:
+            return None
+        cur.execute(CLAIM_SQL, (self.name, spec.name))
+        row = cur.fetchone()
+        return Job(*row) if row else None
+
+    def _next_job(self):
+        specs = job_types()
+        if not specs:
+            return None
+        with self._lock:
+            start = self._rotation = (self._rotation + 1) % len(specs)
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                for i in range(len(specs)):
+                    spec = specs[(start + i) % len(specs)]
+                    job = self.claim(cur, spec)
+                    conn.commit()  # releases the advisory lock either way
+                    if job:
+                        self.stats['claimed'] += 1
+                        return job
+            except Exception:
+                conn.rollback()
+                raise
+        return None
+
+    # ---- running ----
+
+    def _finish(self, sql, params):
+        with self.connection_factory() as conn:
+            try:
+                conn.cursor().execute(sql, params)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _reschedule(self, job, interval, error=None):
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(RESCHEDULE_SQL, (interval, error, job.id))
+                if not cur.rowcount:
+                    # Another run is already waiting: this one is simply done
+                    cur.execute(COMPLETE_SQL, (job.id,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def execute(self, job):
+        spec = get_job_type(job.job_type)
+        payload = job.payload if isinstance(job.payload, dict) else json.loads(job.payload or '{}')
+        try:
+            spec.handler(**payload)
+        except Exception as e:
+            logger.warning(f"Job {job.id} ({job.job_type}) attempt {job.attempts}/{job.max_attempts} failed: {e}")
+            if spec.interval:
+                self.stats['retried'] += 1
+                self._reschedule(job, spec.interval, str(e)[:1000])
+                return False
+            final = job.attempts >= job.max_attempts
+            self.stats['failed' if final else 'retried'] += 1
+            delay = JOB_RETRY_BASE_SECONDS * (2 ** (job.attempts - 1))
+            self._finish(FAIL_SQL, (delay, str(e)[:1000], job.id, job.id))
+            return False
+        if spec.interval:
+            self._reschedule(job, spec.interval)
+        else:
+            self._finish(COMPLETE_SQL, (job.id,))
+        self.stats['succeeded'] += 1
+        return True
+
+    def run_once(self):
+        """Claim and run at most one job. Returns True if a job was run."""
+        if time.time() - self._last_reap > REAP_INTERVAL:
+            self._last_reap = time.time()
+            self.reap()
+        job = self._next_job()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def reap(self):
+        """Requeue jobs abandoned by dead workers, seed periodic jobs that are
+        not scheduled and purge old finished jobs."""
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(REQUEUE_STALE_SQL, (JOB_VISIBILITY_TIMEOUT,))
+                self.stats['requeued'] += max(cur.rowcount or 0, 0)
+                for spec in job_types():
+                    if spec.interval:
+                        cur.execute(SCHEDULE_PERIODIC_SQL, (spec.name, spec.max_attempts, spec.name, spec.name))
+                cur.execute(PURGE_SQL, (JOB_RETENTION_DAYS,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    # ---- thread management ----
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                worked = self.run_once()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                worked = False
+                logger.warning(f"Job worker error: {e}")
+            if not worked:
+                # Back off while the database is unreachable
+                self._wake.wait(min(self.poll_interval * (2 ** min(failures, 5)), 30.0))
+                self._wake.clear()
+
+    def start(self):
+        self._stop.clear()
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wake(self):
+        self._wake.set()
+
+    def is_alive(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        """Blocking entry point for the standalone worker process."""
+        self.start()
+        try:
+            while self.is_alive():
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+_connection_factory = None
+_embedded = None
+_embedded_pid = None
+_embedded_lock = threading.Lock()
+
+
+def configure(connection_factory=None, worker_mode=None):
+    """Point queue workers at a connection provider (a zero-arg callable
+    returning a connection context manager, e.g. api.get_db_connection_pooled)."""
+    global _connection_factory, JOB_WORKER_MODE
+    if connection_factory is not None:
+        _connection_factory = connection_factory
+    if worker_mode is not None:
+        JOB_WORKER_MODE = worker_mode
+
+
+def create_worker(threads=JOB_WORKER_THREADS, **kwargs):
+    return Worker(_connection_factory, threads=threads, **kwargs)
+
+
+def get_embedded_worker():
+    return _embedded
+
+
+def ensure_started():
+    """Start this process's embedded worker if it is not running yet (it also
+    runs the periodic jobs, so web processes call this on every request)."""
+    global _embedded, _embedded_pid
+    if JOB_WORKER_MODE != 'embedded':
+        return None
+    if _embedded is None or _embedded_pid != os.getpid():
+        with _embedded_lock:
+            # Threads do not survive a fork, so each worker process starts its own
+            if _embedded is None or _embedded_pid != os.getpid():
+                _embedded = create_worker()
+                _embedded_pid = os.getpid()
+                _embedded.start()
+    return _embedded
+
+
+def wake():
+    """Nudge the embedded worker after committing new jobs (starting it if needed)."""
+    worker = ensure_started()
+    if worker is not None:
+        worker.wake()
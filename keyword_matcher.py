@@ -0,0 +1,136 @@
+"""
+Risk Keyword Matcher
+====================
+
+Aho-Corasick automaton over the risk_keywords table. One pass over the text
+finds every keyword occurrence (case-insensitive substring match, the same
+semantics as ``keyword.lower() in text.lower()``), so matching cost depends on
+text length and number of hits rather than on the number of keywords.
+
+compile_keywords() keeps the most recently built automaton keyed by a stable
+fingerprint of the keyword rows, so it is rebuilt only when the table changes.
+"""
+
+import hashlib
+import json
+import threading
+from collections import deque, namedtuple
+
+Match = namedtuple('Match', ['start', 'end', 'keyword', 'category', 'weight'])
+
+
+def fingerprint(keywords):
+    """Stable (cross-process) digest of keyword rows, order-sensitive."""
+    blob = json.dumps([[k, c, w] for k, c, w in keywords])
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+class KeywordMatcher:
+    """Compiled multi-pattern matcher for (keyword, category, weight) rows."""
+
+    def __init__(self, keywords, fp=None):
+        self.keywords = [(k, c, w) for k, c, w in keywords]
+        self.fingerprint = fp or fingerprint(self.keywords)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [None]        # pattern indices ending exactly at this node
+        self._link = [0]          # nearest failure ancestor with output (0 = none)
+        self._lengths = []
+        self._by_keyword = {}
+        for idx, (keyword, _, _) in enumerate(self.keywords):
+            self._by_keyword.setdefault(keyword, []).append(idx)
+            self._add(keyword.lower(), idx)
+        self._build()
+
+    def _add(self, pattern, idx):
+        self._lengths.append(len(pattern))
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+                self._link.append(0)
+            node = nxt
+        if self._out[node] is None:
+            self._out[node] = []
+        self._out[node].append(idx)
+
+    def _build(self):
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[child] = target if target != child else 0
+                link[child] = fail[child] if out[fail[child]] else link[fail[child]]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def _iter_hits(self, text):
+        """Yield (end, pattern index) for every occurrence in text.lower()."""
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        node = 0
+        for i, ch in enumerate(text.lower()):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if out[node] else link[node]
+            while hit:
+                for idx in out[hit]:
+                    yield i + 1, idx
+                hit = link[hit]
+
+    def find(self, text):
+        """Every occurrence as Match(start, end, ...), positions into text.lower()."""
+        if not text or len(self._goto) == 1:
+            return []
+        keywords, lengths = self.keywords, self._lengths
+        return [Match(end - lengths[idx], end, *keywords[idx]) for end, idx in self._iter_hits(text)]
+
+    def matched_keywords(self, text):
+        """Distinct matched keywords, in keyword-table order."""
+        if not text or len(self._goto) == 1:
+            return []
+        indices = sorted({idx for _, idx in self._iter_hits(text)})
+        return list(dict.fromkeys(self.keywords[idx][0] for idx in indices))
+
+    def rows_for(self, keywords):
+        """Keyword rows for previously matched keyword strings, in table order."""
+        indices = sorted(i for k in set(keywords) for i in self._by_keyword.get(k, ()))
+        return [self.keywords[i] for i in indices]
+
+    def scan(self, text):
+        """Per-category hits: {category: [Match, ...]} in text order."""
+        by_category = {}
+        for m in self.find(text):
+            by_category.setdefault(m.category, []).append(m)
+        return by_category
+
+
+_compiled = None
+_compiled_lock = threading.Lock()
+
+
+def compile_keywords(keywords, fp=None):
+    """Return a KeywordMatcher for these rows, reusing the last build if unchanged."""
+    global _compiled
+    fp = fp or fingerprint(keywords)
+    current = _compiled
+    if current is not None and current.fingerprint == fp:
+        return current
+    with _compiled_lock:
+        if _compiled is None or _compiled.fingerprint != fp:
+            _compiled = KeywordMatcher(keywords, fp)
+        return _compiled
@@ -0,0 +1,190 @@
+"""
+LLM Response Cache
+==================
+
+Postgres-backed cache for LLM output that is a pure function of its prompt:
+greetings, patient/clinician insights and clinician AI summaries.
+
+- Entries are content-addressed: the key is a SHA-256 of the feature name,
+  its template version, the model and the prompt inputs (which embed the
+  patient's data), so any change to the data produces a new key.
+- Entries expire after a per-feature TTL (LLM_CACHE_TTL by default) and the
+  table is trimmed to LLM_CACHE_MAX_ENTRIES by least-recent use.
+- Writes to a patient's mood, CBT, chat or assessment data queue an
+  llm_cache_invalidate job with the write; the job later calls
+  invalidate(cur, username) on its own connection, dropping every entry for
+  that patient. Invalidation is eventually consistent: until the job runs, a
+  lookup can still return a response built from the earlier data.
+- A cache that cannot be reached is skipped: the response is generated as if
+  it had missed.
+
+snapshot() reports hits, misses and the tokens hits have saved, for the
+developer monitoring endpoint.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import llm_client
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '86400'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+EVICT_EVERY = 100  # stores between eviction passes
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS llm_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        username TEXT,
+        feature TEXT NOT NULL,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        completion_tokens INTEGER NOT NULL DEFAULT 0,
+        hit_count INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_hit_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL
+    )
+"""
+
+INDEX_SQLS = [
+    "CREATE INDEX IF NOT EXISTS idx_llm_cache_username ON llm_response_cache(username)",
+    "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_response_cache(last_hit_at)",
+]
+
+GET_SQL = """
+    UPDATE llm_response_cache
+    SET hit_count = hit_count + 1, last_hit_at = CURRENT_TIMESTAMP
+    WHERE cache_key = %s AND expires_at > CURRENT_TIMESTAMP
+    RETURNING response, prompt_tokens, completion_tokens
+"""
+
+PUT_SQL = """
+    INSERT INTO llm_response_cache
+        (cache_key, username, feature, model, response, prompt_tokens, completion_tokens, expires_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+    ON CONFLICT (cache_key) DO UPDATE SET
+        response = EXCLUDED.response,
+        prompt_tokens = EXCLUDED.prompt_tokens,
+        completion_tokens = EXCLUDED.completion_tokens,
+        last_hit_at = CURRENT_TIMESTAMP,
+        expires_at = EXCLUDED.expires_at
+"""
+
+INVALIDATE_SQL = "DELETE FROM llm_response_cache WHERE username = %s"
+
+EVICT_SQL = """
+    DELETE FROM llm_response_cache
+    WHERE expires_at <= CURRENT_TIMESTAMP
+       OR cache_key IN (SELECT cache_key FROM llm_response_cache ORDER BY last_hit_at DESC OFFSET %s)
+"""
+
+
+def cache_key(feature, template_version, model, inputs):
+    """Content address for a prompt: SHA-256 over canonical JSON."""
+    canonical = json.dumps([feature, template_version, model, inputs],
+                           sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """get_or_generate() front for the llm_response_cache table."""
+
+    def __init__(self, connection_factory=None, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.connection_factory = connection_factory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stores = 0
+        self.stats = {'hits': 0, 'misses': 0, 'errors': 0, 'invalidations': 0,
+                      'saved_prompt_tokens': 0, 'saved_completion_tokens': 0}
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, n in increments.items():
+                self.stats[name] += n
+
+    def _lookup(self, key):
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            cur.execute(GET_SQL, (key,))
+            row = cur.fetchone()
+            conn.commit()
+            return row
+
+    def _store(self, key, username, feature, model, response, usage, ttl):
+        with self._lock:
+            self._stores += 1
+            evict = self._stores % EVICT_EVERY == 0
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            cur.execute(PUT_SQL, (key, username, feature, model, response,
+                                  usage.get('prompt_tokens') or 0, usage.get('completion_tokens') or 0, ttl))
+            if evict:
+                cur.execute(EVICT_SQL, (self.max_entries,))
+            conn.commit()
+
+    def get_or_generate(self, feature, username, inputs, generate, template_version=1,
+                        model=llm_client.DEFAULT_MODEL, ttl=None):
+        """
+        Return the cached response for these prompt inputs, or call
+        generate() (which returns the response text) and cache its result.
+        Exceptions from generate() propagate and nothing is cached.
+        """
+        key = cache_key(feature, template_version, model, inputs)
+        if self.connection_factory:
+            try:
+                row = self._lookup(key)
+                if row:
+                    self._count(hits=1, saved_prompt_tokens=row[1] or 0, saved_completion_tokens=row[2] or 0)
+                    return row[0]
+            except Exception as e:
+                self._count(errors=1)
+                logger.warning(f"LLM cache lookup failed for {feature}: {e}")
+
+        self._count(misses=1)
+        response = generate()
+        if self.connection_factory and response:
+            try:
+                self._store(key, username, feature, model, response,
+                            llm_client.client.last_usage() or {}, ttl or self.ttl)
+            except Exception as e:
+                self._count(errors=1)
+                logger.warning(f"LLM cache store failed for {feature}: {e}")
+        return response
+
+    def invalidate(self, cur, username):
+        """Drop a patient's cached responses, in the caller's transaction."""
+        cur.execute(INVALIDATE_SQL, (username,))
+        self._count(invalidations=1)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+cache = LLMResponseCache()
+
+
+def configure(connection_factory):
+    cache.connection_factory = connection_factory
+
+
+def get_or_generate(*args, **kwargs):
+    return cache.get_or_generate(*args, **kwargs)
+
+
+def invalidate(cur, username):
+    cache.invalidate(cur, username)
+
+
+def snapshot():
+    return cache.snapshot()
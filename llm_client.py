@@ -0,0 +1,283 @@
+"""
+LLM Client
+==========
+
+Shared HTTP client for every Groq (OpenAI-compatible) chat-completions call.
+
+- One requests.Session per process with a keep-alive connection pool
+  (LLM_POOL_SIZE), so calls reuse TLS connections instead of handshaking
+  each time.
+- A semaphore caps in-flight calls (LLM_MAX_CONCURRENCY); callers that cannot
+  get a slot within LLM_ACQUIRE_TIMEOUT seconds fail fast. Blocking calls hold
+  the slot until the body is read, streaming calls until the response headers
+  arrive.
+- Connection errors, timeouts, 429 and 5xx responses are retried up to
+  LLM_MAX_RETRIES times with exponential backoff and jitter (honouring
+  Retry-After). Any other error while calling counts as a failed call.
+- A circuit breaker opens after LLM_BREAKER_THRESHOLD consecutive failed calls
+  and rejects calls for LLM_BREAKER_COOLDOWN seconds, after which one trial
+  call is let through. Rejected calls raise LLMUnavailable; chat callers answer
+  with SAFE_REPLY.
+- Per-purpose latency and token counters are exposed by snapshot() for the
+  developer monitoring endpoint.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', '10'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_ACQUIRE_TIMEOUT = float(os.getenv('LLM_ACQUIRE_TIMEOUT', '5'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '8'))
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', '30'))
+
+DEFAULT_MODEL = 'llama-3.3-70b-versatile'
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+LATENCY_WINDOW = 500
+
+SAFE_REPLY = (
+    "I'm sorry, I'm having trouble responding right now. Please try again in a few minutes. "
+    "If you need to talk to someone now, you can call Samaritans free on 116 123 (24/7), "
+    "call NHS 111, or text SHOUT to 85258. If you are in immediate danger, call 999."
+)
+
+
+class LLMUnavailable(RuntimeError):
+    """The LLM could not be called: circuit open, no free slot, or retries exhausted."""
+
+
+class LLMError(RuntimeError):
+    """The LLM answered with a non-retryable error or an unusable body."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half_open -> closed)."""
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go ahead; in half_open only one trial call at a time."""
+        with self._lock:
+            if self.state == 'open':
+                if self.clock() - self.opened_at < self.cooldown:
+                    return False
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def cancel(self):
+        """Give back a trial slot taken by allow() for a call that was never made."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                if self.state != 'open':
+                    logger.warning(f"LLM circuit opened after {self.failures} consecutive failures")
+                self.state = 'open'
+                self.opened_at = self.clock()
+
+
+class LLMClient:
+    """Pooled chat-completions client with retries, a concurrency cap and a circuit breaker."""
+
+    def __init__(self, pool_size=LLM_POOL_SIZE, max_concurrency=LLM_MAX_CONCURRENCY,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE,
+                 acquire_timeout=LLM_ACQUIRE_TIMEOUT, breaker=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.acquire_timeout = acquire_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._metrics_lock = threading.Lock()
+        self.metrics = {}
+        self.sleep = time.sleep
+        self._local = threading.local()
+
+    # ---- metrics ----
+
+    def _record(self, purpose, outcome, latency=None, usage=None, retries=0):
+        with self._metrics_lock:
+            m = self.metrics.setdefault(purpose, {
+                'calls': 0, 'ok': 0, 'errors': 0, 'rejected': 0, 'retries': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0, 'latencies': deque(maxlen=LATENCY_WINDOW),
+            })
+            m['calls'] += 1
+            m[outcome] += 1
+            m['retries'] += retries
+            if latency is not None:
+                m['latencies'].append(latency)
+            if usage:
+                m['prompt_tokens'] += usage.get('prompt_tokens') or 0
+                m['completion_tokens'] += usage.get('completion_tokens') or 0
+
+    def add_usage(self, purpose, usage):
+        """Token usage reported at the end of a streamed response."""
+        if not usage:
+            return
+        with self._metrics_lock:
+            m = self.metrics.get(purpose)
+            if m:
+                m['prompt_tokens'] += usage.get('prompt_tokens') or 0
+                m['completion_tokens'] += usage.get('completion_tokens') or 0
+
+    def last_usage(self):
+        """Token usage of this thread's last successful blocking call (None if unknown)."""
+        return getattr(self._local, 'usage', None)
+
+    def snapshot(self):
+        """Breaker state and per-purpose counters (latencies in ms)."""
+        out = {'breaker': {'state': self.breaker.state, 'consecutive_failures': self.breaker.failures}, 'calls': {}}
+        with self._metrics_lock:
+            for purpose, m in self.metrics.items():
+                lat = sorted(m['latencies'])
+                stats = {k: v for k, v in m.items() if k != 'latencies'}
+                stats['latency_p50_ms'] = round(lat[len(lat) // 2] * 1000, 1) if lat else None
+                stats['latency_p95_ms'] = round(lat[int(len(lat) * 0.95)] * 1000, 1) if lat else None
+                out['calls'][purpose] = stats
+        return out
+
+    # ---- requests ----
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_BACKOFF_MAX)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * (2 ** attempt), LLM_BACKOFF_MAX)
+        return delay * (0.5 + random.random() / 2)
+
+    def post(self, url, api_key, payload, timeout=30, stream=False, purpose='chat'):
+        """
+        POST payload to url and return the 200 response.
+
+        Raises LLMUnavailable when the breaker is open, no slot frees up, or
+        every attempt failed with a retryable error; LLMError for any other
+        non-200 status.
+        """
+        self._local.usage = None
+        if not self.breaker.allow():
+            self._record(purpose, 'rejected')
+            raise LLMUnavailable('LLM circuit open')
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self.breaker.cancel()
+            self._record(purpose, 'rejected')
+            raise LLMUnavailable('LLM concurrency limit reached')
+
+        headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
+        start = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                response = None
+                try:
+                    response = self.session.post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+                    if response.status_code == 200:
+                        break
+                    if response.status_code not in RETRY_STATUSES:
+                        detail = response.text[:200] if response.text else 'No error detail'
+                        response.close()
+                        # The service answered; a bad request does not count against the breaker
+                        self.breaker.record_success()
+                        self._record(purpose, 'errors', time.perf_counter() - start, retries=attempt)
+                        raise LLMError(f'Groq API error: {response.status_code} - {detail}', response.status_code)
+                    error = f'HTTP {response.status_code}'
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = f'{type(e).__name__}: {e}'
+                except requests.RequestException as e:
+                    # Broken body, bad encoding, redirect loop: not worth retrying
+                    if response is not None:
+                        response.close()
+                    self.breaker.record_failure()
+                    self._record(purpose, 'errors', time.perf_counter() - start, retries=attempt)
+                    raise LLMUnavailable(f'LLM call failed: {type(e).__name__}: {e}') from e
+                if attempt >= self.max_retries:
+                    if response is not None:
+                        response.close()
+                    self.breaker.record_failure()
+                    self._record(purpose, 'errors', time.perf_counter() - start, retries=attempt)
+                    raise LLMUnavailable(f'LLM call failed after {attempt + 1} attempts: {error}')
+                delay = self._backoff(attempt, response)
+                if response is not None:
+                    response.close()
+                attempt += 1
+                self.sleep(delay)
+        except (LLMError, LLMUnavailable):
+            raise
+        except BaseException:
+            # Anything else (including a green-thread timeout) still ends the
+            # call, and must release a half-open trial slot
+            self.breaker.record_failure()
+            self._record(purpose, 'errors', time.perf_counter() - start, retries=attempt)
+            raise
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        if stream:
+            self._record(purpose, 'ok', time.perf_counter() - start, retries=attempt)
+            return response
+        try:
+            usage = response.json().get('usage')
+        except ValueError:
+            usage = None
+        self._local.usage = usage
+        self._record(purpose, 'ok', time.perf_counter() - start, usage, retries=attempt)
+        return response
+
+    def chat_completion(self, url, api_key, messages, model=DEFAULT_MODEL, timeout=30, purpose='chat', **params):
+        """Blocking chat completion; returns the first choice's message content."""
+        payload = {'model': model, 'messages': messages, **params}
+        result = self.post(url, api_key, payload, timeout=timeout, purpose=purpose).json()
+        if not result.get('choices'):
+            raise LLMError('No response from Groq API')
+        return result['choices'][0]['message']['content']
+
+
+client = LLMClient()
+
+
+def snapshot():
+    return client.snapshot()
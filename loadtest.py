@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Chat load test.
+
+Measures how many /api/therapy/chat requests the server completes
+concurrently when every completion takes a fixed time, using a fake
+OpenAI-compatible LLM backend instead of Groq (point the server at it with
+API_URL). Run the server with gunicorn.conf.py to compare worker classes.
+
+The chat endpoint is rate limited (30 messages a minute per IP and per user),
+so keep --requests at 30 or below; 429s are reported rather than retried.
+
+Usage:
+    python loadtest.py fake-llm --port 8999 --latency 2
+        # then: API_URL=http://127.0.0.1:8999/v1/chat/completions gunicorn -c gunicorn.conf.py api:app
+    python loadtest.py chat --url http://127.0.0.1:8000 --username alice --password ... --pin 1234
+    python loadtest.py compare --username alice --password ... --pin 1234 \\
+        --worker-class sync --worker-class gthread --worker-class gevent
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+FAKE_REPLY = "That sounds like a lot to carry. What would help most right now?"
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Answers any chat-completions POST after ``server.latency`` seconds."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            payload = {}
+        time.sleep(self.server.latency)
+        self.server.calls += 1
+        usage = {'prompt_tokens': 100, 'completion_tokens': 20, 'total_tokens': 120}
+        if payload.get('stream'):
+            events = [{'choices': [{'delta': {'content': word + ' '}}]} for word in FAKE_REPLY.split()]
+            events.append({'choices': [{'delta': {}, 'finish_reason': 'stop'}], 'x_groq': {'usage': usage}})
+            body = ''.join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+            self._send(body.encode(), 'text/event-stream')
+        else:
+            body = {'id': 'fake', 'object': 'chat.completion', 'model': payload.get('model', 'fake'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': FAKE_REPLY},
+                                 'finish_reason': 'stop'}],
+                    'usage': usage}
+            self._send(json.dumps(body).encode(), 'application/json')
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_llm(port=0, latency=2.0):
+    """Serve the fake backend from a daemon thread; returns (server, chat-completions URL)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.calls = 0
+    threading.Thread(target=server.serve_forever, name='fake-llm', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+def run_load(send, total, concurrency):
+    """Call send() ``total`` times from ``concurrency`` threads.
+
+    send() returns an HTTP status (or raises). Returns throughput and latency
+    statistics; only 2xx responses count towards throughput.
+    """
+    def one(_):
+        start = time.perf_counter()
+        try:
+            status = send()
+        except Exception as e:
+            status = type(e).__name__
+        return status, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(latency for status, latency in results if isinstance(status, int) and 200 <= status < 300)
+    ok = len(latencies)
+    return {
+        'requests': total, 'concurrency': concurrency, 'ok': ok, 'statuses': statuses,
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(ok / elapsed, 2) if elapsed else None,
+        'latency_p50_s': round(latencies[len(latencies) // 2], 2) if latencies else None,
+        'latency_p95_s': round(latencies[min(int(len(latencies) * 0.95), ok - 1)], 2) if latencies else None,
+        'latency_max_s': round(latencies[-1], 2) if latencies else None,
+    }
+
+
+def chat_sender(base_url, username, password, pin, message='I have been feeling anxious about work this week'):
+    """Log in once and return send() posting one chat message per call."""
+    login = requests.Session()
+    token = login.get(f"{base_url}/api/csrf-token", timeout=10).json()['csrf_token']
+    resp = login.post(f"{base_url}/api/auth/login", headers={'X-CSRF-Token': token}, timeout=30,
+                      json={'username': username, 'password': password, 'pin': pin})
+    if resp.status_code != 200:
+        raise SystemExit(f"Login failed ({resp.status_code}): {resp.text[:200]}")
+    cookies = login.cookies.get_dict()
+    local = threading.local()
+
+    def send():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+            local.session.cookies.update(cookies)
+        return local.session.post(f"{base_url}/api/therapy/chat", headers={'X-CSRF-Token': token}, timeout=300,
+                                  json={'username': username, 'message': message}).status_code
+    return send
+
+
+def spawn_server(worker_class, port, api_url, workers=None):
+    """Start ``gunicorn -c gunicorn.conf.py api:app`` with the given worker class; waits for /api/health."""
+    env = dict(os.environ, PORT=str(port), GUNICORN_WORKER_CLASS=worker_class, API_URL=api_url,
+               GUNICORN_ACCESS_LOG='', GROQ_API_KEY=os.getenv('GROQ_API_KEY') or 'fake-key-for-load-test')
+    if workers:
+        env['WEB_CONCURRENCY'] = str(workers)
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api:app'],
+                               cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+    deadline = time.time() + 90
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn ({worker_class}) exited with {process.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/api/health", timeout=2).status_code < 500:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit(f"gunicorn ({worker_class}) did not become healthy")
+
+
+def print_report(label, stats):
+    print(f"{label:<10} {stats['ok']:>3}/{stats['requests']:<3} ok  {stats['elapsed_s']:>7.2f}s  "
+          f"{stats['throughput_rps'] or 0:>6.2f} req/s  p50 {stats['latency_p50_s']}s  "
+          f"p95 {stats['latency_p95_s']}s  max {stats['latency_max_s']}s  {stats['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent chat load test with a fake LLM backend')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    fake = sub.add_parser('fake-llm', help='run only the fake LLM backend')
+    fake.add_argument('--port', type=int, default=8999)
+    fake.add_argument('--latency', type=float, default=2.0, help='seconds per completion')
+
+    for name in ('chat', 'compare'):
+        p = sub.add_parser(name, help='load a running server' if name == 'chat' else 'spawn gunicorn per worker class')
+        p.add_argument('--username', required=True)
+        p.add_argument('--password', required=True)
+        p.add_argument('--pin', required=True)
+        p.add_argument('--concurrency', type=int, default=30)
+        p.add_argument('--requests', type=int, default=30)
+        if name == 'chat':
+            p.add_argument('--url', default='http://127.0.0.1:8000')
+        else:
+            p.add_argument('--worker-class', action='append', dest='worker_classes')
+            p.add_argument('--workers', type=int, default=1, help='gunicorn workers per run (default 1)')
+            p.add_argument('--port', type=int, default=8765)
+            p.add_argument('--latency', type=float, default=2.0, help='seconds per fake completion')
+    args = parser.parse_args()
+
+    if args.command == 'fake-llm':
+        server, url = start_fake_llm(args.port, args.latency)
+        print(f"Fake LLM ({args.latency:g}s per completion) at {url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    if args.command == 'chat':
+        send = chat_sender(args.url.rstrip('/'), args.username, args.password, args.pin)
+        print_report('chat', run_load(send, args.requests, args.concurrency))
+        return
+
+    server, api_url = start_fake_llm(latency=args.latency)
+    print(f"Fake LLM: {args.latency:g}s per completion; {args.requests} chats at concurrency {args.concurrency}, "
+          f"{args.workers} worker(s)")
+    for worker_class in args.worker_classes or ['sync', 'gthread']:
+        process = spawn_server(worker_class, args.port, api_url, args.workers)
+        try:
+            send = chat_sender(f"http://127.0.0.1:{args.port}", args.username, args.password, args.pin)
+            print_report(worker_class, run_load(send, args.requests, args.concurrency))
+        finally:
+            process.terminate()
+            process.wait(30)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Message Dispatcher
+==================
+
+Delivers scheduled messages and the daily mood reminders from a polling loop
+that any number of processes can run side by side.
+
+- MessageService.schedule_message() stores rows with delivery_status
+  'scheduled'. Each tick claims up to DISPATCH_BATCH_SIZE due rows through a
+  partial index on scheduled_for, with FOR UPDATE SKIP LOCKED, and marks them
+  'delivering' in a short transaction of its own.
+- A claimed batch is delivered in one transaction: one multi-row insert into
+  notifications, one UPDATE marking the messages 'sent' (sent_at = delivery
+  time) and one touching their conversations.
+- scheduled_for and mood_logs.entrestamp are naive server-local times, so
+  "due" and "today" come from the application's clock and are passed to the
+  statements rather than read from the database's NOW()/CURRENT_DATE, which
+  may run in another time zone.
+- Delivery is at-least-once. Rows left 'delivering' by a dispatcher that died
+  go back to 'scheduled' after DISPATCH_VISIBILITY_TIMEOUT seconds. Every
+  notification carries an idempotency_key ('message:<id>') under a unique
+  index, so a redelivered message never notifies its recipient twice.
+- Once MOOD_REMINDER_HOUR has passed, a single INSERT ... SELECT with an
+  anti-join on today's mood_logs reminds every patient who has not logged.
+  Its key ('mood_reminder:<username>:<date>') makes it safe to run from
+  every process as well as from /api/mood/check-reminder.
+- Ticks run as the periodic 'message_dispatch' job on the job_queue workers,
+  every DISPATCH_INTERVAL seconds, wherever JOB_WORKER_MODE runs them
+  (embedded in the web processes or ``python worker.py``).
+  MESSAGE_DISPATCHER_MODE=off disables delivery.
+"""
+
+import logging
+import os
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_DISPATCHER_MODE = os.getenv('MESSAGE_DISPATCHER_MODE', 'on').lower()
+DISPATCH_INTERVAL = float(os.getenv('DISPATCH_INTERVAL', '15'))
+DISPATCH_BATCH_SIZE = int(os.getenv('DISPATCH_BATCH_SIZE', '200'))
+DISPATCH_VISIBILITY_TIMEOUT = int(os.getenv('DISPATCH_VISIBILITY_TIMEOUT', '300'))
+# Local hour after which patients who have not logged a mood are reminded (-1 disables)
+MOOD_REMINDER_HOUR = int(os.getenv('MOOD_REMINDER_HOUR', '20'))
+MOOD_REMINDER_TEXT = "🕗 Reminder: Don't forget to log your mood and habits for today!"
+
+# The baseline schema (init_db) names the column entry_timestamp; production
+# databases were renamed to entrestamp by fix_production_database.py. Do the
+# same here so the reminder index and anti-join work on a fresh database.
+MOOD_LOGS_ENTRESTAMP_SQL = """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'mood_logs' AND column_name = 'entrestamp') THEN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'mood_logs' AND column_name = 'entry_timestamp') THEN
+                ALTER TABLE mood_logs RENAME COLUMN entry_timestamp TO entrestamp;
+            ELSE
+                ALTER TABLE mood_logs ADD COLUMN entrestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+            END IF;
+        END IF;
+    END
+    $$
+"""
+
+SCHEMA_SQLS = [
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS delivery_claimed_at TIMESTAMP",
+    "CREATE INDEX IF NOT EXISTS idx_messages_due ON messages(scheduled_for, id) WHERE delivery_status = 'scheduled'",
+    "CREATE INDEX IF NOT EXISTS idx_messages_delivering ON messages(delivery_claimed_at) WHERE delivery_status = 'delivering'",
+    "ALTER TABLE notifications ADD COLUMN IF NOT EXISTS idempotency_key TEXT",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_idempotency ON notifications(idempotency_key) WHERE idempotency_key IS NOT NULL",
+    MOOD_LOGS_ENTRESTAMP_SQL,
+    "CREATE INDEX IF NOT EXISTS idx_mood_logs_user_time ON mood_logs(username, entrestamp)",
+]
+
+CLAIM_SQL = """
+    UPDATE messages m
+    SET delivery_status = 'delivering', delivery_claimed_at = NOW()
+    FROM (
+        SELECT id FROM messages
+        WHERE delivery_status = 'scheduled' AND scheduled_for <= %s
+        ORDER BY scheduled_for, id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ) due
+    WHERE m.id = due.id
+    RETURNING m.id, m.conversation_id, m.sender_username, m.recipient_username, m.subject, m.content
+"""
+
+NOTIFY_SQL = """
+    INSERT INTO notifications (recipient_username, message, notification_type, idempotency_key)
+    VALUES %s
+    ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+"""
+
+MARK_SENT_SQL = """
+    UPDATE messages
+    SET delivery_status = 'sent', sent_at = NOW(), delivery_claimed_at = NULL
+    WHERE id = ANY(%s) AND delivery_status = 'delivering'
+"""
+
+TOUCH_CONVERSATIONS_SQL = """
+    UPDATE conversations SET last_message_at = NOW()
+    WHERE id = ANY(%s) AND (last_message_at IS NULL OR last_message_at < NOW())
+"""
+
+REQUEUE_STALE_SQL = """
+    UPDATE messages
+    SET delivery_status = 'scheduled', delivery_claimed_at = NULL
+    WHERE delivery_status = 'delivering' AND delivery_claimed_at < NOW() - make_interval(secs => %s)
+"""
+
+MOOD_REMINDER_SQL = """
+    INSERT INTO notifications (recipient_username, message, notification_type, idempotency_key)
+    SELECT u.username, %s, 'mood_reminder', 'mood_reminder:' || u.username || ':' || %s::date
+    FROM users u
+    WHERE u.role = 'user'
+      AND NOT EXISTS (
+          SELECT 1 FROM mood_logs ml
+          WHERE ml.username = u.username AND ml.deleted_at IS NULL
+            AND ml.entrestamp >= %s::date AND ml.entrestamp < %s::date + 1
+      )
+    ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+"""
+
+
+def notification_text(sender, subject, content):
+    """The in-app notification for a delivered message (same text as an immediate send)."""
+    return f"New message from {sender}: {subject if subject else (content or '')[:50]}"
+
+
+def send_mood_reminders(cur, today):
+    """Remind every patient without a mood log on ``today`` (the app's local
+    date), in the caller's transaction.
+
+    Returns the number of reminders created (patients already reminded that
+    day are skipped).
+    """
+    cur.execute(MOOD_REMINDER_SQL, (MOOD_REMINDER_TEXT, today, today, today))
+    return max(cur.rowcount or 0, 0)
+
+
+def job_interval():
+    """Seconds between 'message_dispatch' jobs, or None when delivery is off."""
+    return None if MESSAGE_DISPATCHER_MODE == 'off' else DISPATCH_INTERVAL
+
+
+class Dispatcher:
+    """Claims and delivers due scheduled messages; sends the daily mood reminders."""
+
+    def __init__(self, connection_factory, batch_size=DISPATCH_BATCH_SIZE, reminder_hour=MOOD_REMINDER_HOUR,
+                 clock=datetime.now):
+        self.connection_factory = connection_factory
+        self.clock = clock
+        self.batch_size = batch_size
+        self.reminder_hour = reminder_hour
+        self._reminded_on = None
+        self.stats = {'delivered': 0, 'notified': 0, 'requeued': 0, 'reminders': 0, 'errors': 0}
+
+    # ---- scheduled messages ----
+
+    def claim(self, cur):
+        cur.execute(CLAIM_SQL, (self.clock(), self.batch_size))
+        return cur.fetchall()
+
+    def deliver(self, cur, rows):
+        """Notify recipients and mark a claimed batch sent (the caller commits)."""
+        execute_values(cur, NOTIFY_SQL, [
+            (recipient, notification_text(sender, subject, content), 'message', f"message:{message_id}")
+            for message_id, _, sender, recipient, subject, content in rows
+        ], page_size=len(rows))
+        notified = max(cur.rowcount or 0, 0)
+        cur.execute(MARK_SENT_SQL, ([r[0] for r in rows],))
+        delivered = max(cur.rowcount or 0, 0)
+        conversation_ids = sorted({r[1] for r in rows if r[1] is not None})
+        if conversation_ids:
+            cur.execute(TOUCH_CONVERSATIONS_SQL, (conversation_ids,))
+        return delivered, notified
+
+    def dispatch_once(self):
+        """Deliver one batch of due messages. Returns how many were claimed."""
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                rows = self.claim(cur)
+                conn.commit()
+                if not rows:
+                    return 0
+                delivered, notified = self.deliver(cur, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self.stats['delivered'] += delivered
+        self.stats['notified'] += notified
+        return len(rows)
+
+    def requeue_stale(self):
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(REQUEUE_STALE_SQL, (DISPATCH_VISIBILITY_TIMEOUT,))
+                requeued = max(cur.rowcount or 0, 0)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self.stats['requeued'] += requeued
+        return requeued
+
+    # ---- mood reminders ----
+
+    def remind_if_due(self, now=None):
+        """Send today's mood reminders once the reminder hour has passed."""
+        now = now or self.clock()
+        if self.reminder_hour < 0 or now.hour < self.reminder_hour or self._reminded_on == now.date():
+            return 0
+        with self.connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                sent = send_mood_reminders(cur, now.date())
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._reminded_on = now.date()
+        self.stats['reminders'] += sent
+        if sent:
+            logger.info(f"Sent {sent} mood reminders for {now.date()}")
+        return sent
+
+    # ---- tick ----
+
+    def tick(self):
+        """One pass: requeue abandoned rows, drain due messages, send reminders."""
+        self.requeue_stale()
+        while self.dispatch_once() >= self.batch_size:
+            pass
+        self.remind_if_due()
+
+
+_dispatcher = None
+
+
+def run(connection_factory):
+    """The 'message_dispatch' job: one tick on this process's dispatcher, which
+    keeps the day's reminder state and the counters between runs."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = Dispatcher(connection_factory)
+    try:
+        _dispatcher.tick()
+    except Exception:
+        _dispatcher.stats['errors'] += 1
+        raise
+
+
+def get_dispatcher():
+    return _dispatcher
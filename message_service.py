@@ -9,6 +9,8 @@ import json
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Tuple, Any
 
+import search_index
+
 class MessageService:
     """
     World-class messaging service with full feature set.
@@ -246,9 +248,66 @@ class MessageService:
     
     # ==================== MESSAGE RETRIEVAL ====================
     
+    # Lists are newest-first and paginated by keyset on (timestamp, id): pass
+    # the last row's (timestamp, id) as ``before`` to get the next page. Each
+    # page is one index range scan, however far back it is.
+
+    MESSAGE_COLUMNS = """id, sender_username, recipient_username, subject, content,
+                   is_read, read_at, sent_at, message_type"""
+    # Scheduled messages stay hidden until message_dispatcher delivers them
+    DELIVERED_SQL = "COALESCE(delivery_status, 'sent') NOT IN ('scheduled', 'delivering')"
+
+    @staticmethod
+    def _iso(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    @staticmethod
+    def _keyset(before, columns: str = 'sent_at, id') -> Tuple[str, tuple]:
+        """SQL condition resuming a newest-first scan after the ``before`` row."""
+        if not before:
+            return "", ()
+        return f" AND ({columns}) < (%s::timestamp, %s)", (before[0], before[1])
+
+    def _message_dict(self, row) -> Dict[str, Any]:
+        return {
+            'id': row[0],
+            'sender': row[1],
+            'recipient': row[2],
+            'subject': row[3],
+            'content': row[4],
+            'is_read': bool(row[5]),
+            'read_at': self._iso(row[6]) if row[6] else None,
+            'sent_at': self._iso(row[7]) if row[7] else None,
+            'message_type': row[8]
+        }
+
+    def _thread_page(self, rows, limit: int) -> Dict[str, Any]:
+        """Oldest-first page of message dicts from newest-first rows (one extra row = more pages)."""
+        has_more = len(rows) > limit
+        rows = list(rows[:limit])
+        last = rows[-1] if rows else None
+        messages = [self._message_dict(r) for r in reversed(rows)]
+        return {
+            'messages': messages,
+            'has_more': has_more,
+            'next_before': (self._iso(last[7]), last[0]) if has_more else None
+        }
+
+    def _mark_read(self, rows):
+        unread = [r[0] for r in rows if r[2] == self.username and not r[5]]
+        if unread:
+            self.cur.execute("""
+                UPDATE messages SET is_read = 1, read_at = CURRENT_TIMESTAMP
+                WHERE id = ANY(%s)
+            """, (unread,))
+
     def get_conversations_list(self, page: int = 1, limit: int = 20,
-                               unread_only: bool = False) -> Dict[str, Any]:
-        """Get user's conversation list with pagination"""
+                               unread_only: bool = False, before=None) -> Dict[str, Any]:
+        """Get user's conversation list, most recently active first.
+
+        ``before`` is the (last activity, conversation id) of the previous
+        page's last entry; without it ``page`` is used as an offset.
+        """
         if not self.username:
             raise ValueError("Authentication required")
         
@@ -257,86 +316,84 @@ class MessageService:
         if limit < 1 or limit > 100:
             limit = 20
         
-        # Get distinct conversation partners
-        self.cur.execute("""
-            SELECT DISTINCT conversation_id
-            FROM conversation_participants
-            WHERE username = %s
-            ORDER BY conversation_id DESC
-        """, (self.username,))
-        
-        conv_ids = [row[0] for row in self.cur.fetchall()]
-        
-        conversations = []
-        for conv_id in conv_ids:
-            # Get latest message
-            self.cur.execute("""
-                SELECT sender_username, content, sent_at
-                FROM messages
-                WHERE conversation_id = %s AND deleted_at IS NULL
-                ORDER BY sent_at DESC LIMIT 1
-            """, (conv_id,))
-            
-            latest = self.cur.fetchone()
-            
-            # Get unread count
-            self.cur.execute("""
-                SELECT COUNT(*) FROM messages
-                WHERE conversation_id = %s AND recipient_username = %s
-                AND is_read = 0 AND deleted_at IS NULL
-            """, (conv_id, self.username))
-            unread_result = self.cur.fetchone()
-            unread_count = unread_result[0] if unread_result else 0
-            
-            if unread_only and unread_count == 0:
-                continue  # Skip read conversations
-            
-            # Get conversation details
-            self.cur.execute("""
-                SELECT subject, type, participant_count, last_message_at
-                FROM conversations WHERE id = %s
-            """, (conv_id,))
-            conv_details = self.cur.fetchone()
-            
-            # Get the other participant(s) in this conversation
-            self.cur.execute("""
+        unread_sql = f""" AND EXISTS (
+                SELECT 1 FROM messages m
+                WHERE m.conversation_id = c.id AND m.recipient_username = %s
+                AND m.is_read = 0 AND m.deleted_at IS NULL AND {self.DELIVERED_SQL}
+            )""" if unread_only else ""
+        unread_params = (self.username,) if unread_only else ()
+        keyset_sql, keyset_params = self._keyset(before, 'COALESCE(latest.sent_at, c.created_at), c.id')
+        offset = 0 if before else (page - 1) * limit
+
+        # One query for the page: latest message and other participant per conversation
+        self.cur.execute(f"""
+            SELECT c.id, c.subject, c.type, c.participant_count,
+                   latest.sender_username, latest.content, latest.sent_at,
+                   other.username, COALESCE(latest.sent_at, c.created_at) AS activity_at
+            FROM conversation_participants cp
+            JOIN conversations c ON c.id = cp.conversation_id
+            LEFT JOIN LATERAL (
+                SELECT sender_username, content, sent_at FROM messages
+                WHERE conversation_id = c.id AND deleted_at IS NULL AND {self.DELIVERED_SQL}
+                ORDER BY sent_at DESC, id DESC LIMIT 1
+            ) latest ON TRUE
+            LEFT JOIN LATERAL (
                 SELECT username FROM conversation_participants
-                WHERE conversation_id = %s AND username != %s
+                WHERE conversation_id = c.id AND username != %s
                 LIMIT 1
-            """, (conv_id, self.username))
-            other_user_result = self.cur.fetchone()
-            other_user = other_user_result[0] if other_user_result else 'Unknown User'
-            
-            conversations.append({
-                'conversation_id': conv_id,
-                'with_user': other_user,  # ← KEY FIELD MISSING BEFORE
-                'subject': conv_details[0] if conv_details else None,
-                'type': conv_details[1] if conv_details else 'direct',
-                'last_message': latest[1][:100] if latest else None,
-                'last_sender': latest[0] if latest else None,
-                'last_message_time': latest[2].isoformat() if latest else None,
-                'unread_count': unread_count,
-                'participant_count': conv_details[3] if conv_details else 2
-            })
-        
-        # Sort by most recent
-        conversations.sort(key=lambda x: x['last_message_time'] or '', reverse=True)
-        
-        # Paginate
-        total = len(conversations)
-        offset = (page - 1) * limit
-        paginated = conversations[offset:offset + limit]
-        
+            ) other ON TRUE
+            WHERE cp.username = %s{unread_sql}{keyset_sql}
+            ORDER BY activity_at DESC NULLS LAST, c.id DESC
+            LIMIT %s OFFSET %s
+        """, (self.username, self.username) + unread_params + keyset_params + (limit + 1, offset))
+        rows = self.cur.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Unread counts for the page in one grouped query
+        unread_counts = {}
+        if rows:
+            self.cur.execute(f"""
+                SELECT conversation_id, COUNT(*) FROM messages
+                WHERE conversation_id = ANY(%s) AND recipient_username = %s
+                AND is_read = 0 AND deleted_at IS NULL AND {self.DELIVERED_SQL}
+                GROUP BY conversation_id
+            """, ([r[0] for r in rows], self.username))
+            unread_counts = dict(self.cur.fetchall())
+
+        self.cur.execute(f"""
+            SELECT COUNT(*) FROM conversation_participants cp
+            JOIN conversations c ON c.id = cp.conversation_id
+            WHERE cp.username = %s{unread_sql}
+        """, (self.username,) + unread_params)
+        total_row = self.cur.fetchone()
+        total = total_row[0] if total_row else 0
+
+        conversations = [{
+            'conversation_id': r[0],
+            'with_user': r[7] or 'Unknown User',
+            'subject': r[1],
+            'type': r[2] or 'direct',
+            'last_message': r[5][:100] if r[5] else None,
+            'last_sender': r[4],
+            'last_message_time': self._iso(r[6]) if r[6] else None,
+            'unread_count': unread_counts.get(r[0], 0),
+            'participant_count': r[3] or 2
+        } for r in rows]
+
+        last = rows[-1] if rows else None
         return {
-            'conversations': paginated,
+            'conversations': conversations,
             'total_conversations': total,
             'page': page,
             'page_size': limit,
-            'total_pages': (total + limit - 1) // limit
+            'total_pages': (total + limit - 1) // limit,
+            'has_more': has_more,
+            'next_before': (self._iso(last[8]), last[0]) if has_more else None
         }
     
-    def get_conversation_thread(self, conversation_id: int, limit: int = 50) -> Dict[str, Any]:
-        """Get full conversation thread"""
+    def get_conversation_thread(self, conversation_id: int, limit: int = 50, before=None) -> Dict[str, Any]:
+        """Get a page of a conversation thread (oldest first within the page)"""
         if not self.username:
             raise ValueError("Authentication required")
         
@@ -352,78 +409,121 @@ class MessageService:
         if not access:
             raise ValueError("Access denied")
         
-        # Get messages
-        self.cur.execute("""
-            SELECT id, sender_username, recipient_username, subject, content,
-                   is_read, read_at, sent_at, message_type
+        keyset_sql, keyset_params = self._keyset(before)
+        self.cur.execute(f"""
+            SELECT {self.MESSAGE_COLUMNS}
             FROM messages
-            WHERE conversation_id = %s AND deleted_at IS NULL
-            ORDER BY sent_at ASC LIMIT %s
-        """, (conversation_id, limit))
-        
-        messages = []
-        for row in self.cur.fetchall():
-            # Mark as read if recipient
-            if row[2] == self.username and not row[5]:
-                self.cur.execute("""
-                    UPDATE messages SET is_read = 1, read_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (row[0],))
-            
-            messages.append({
-                'id': row[0],
-                'sender': row[1],
-                'recipient': row[2],
-                'subject': row[3],
-                'content': row[4],
-                'is_read': bool(row[5]),
-                'read_at': row[6].isoformat() if row[6] else None,
-                'sent_at': row[7].isoformat() if row[7] else None,
-                'message_type': row[8]
-            })
-        
+            WHERE conversation_id = %s AND deleted_at IS NULL AND {self.DELIVERED_SQL}{keyset_sql}
+            ORDER BY sent_at DESC, id DESC LIMIT %s
+        """, (conversation_id,) + keyset_params + (limit + 1,))
+        rows = self.cur.fetchall()
+
+        page = self._thread_page(rows, limit)
+        self._mark_read(rows[:limit])
         self.conn.commit()
         
         return {
             'conversation_id': conversation_id,
-            'messages': messages,
-            'message_count': len(messages)
+            'messages': page['messages'],
+            'message_count': len(page['messages']),
+            'has_more': page['has_more'],
+            'next_before': page['next_before']
         }
+
+    def get_conversation(self, recipient_username: str, limit: int = 50, before=None) -> Dict[str, Any]:
+        """Get a page of the direct messages between the user and recipient_username"""
+        if not self.username:
+            raise ValueError("Authentication required")
+        if not recipient_username:
+            raise ValueError("Recipient required")
+
+        if limit < 1 or limit > 500:
+            limit = 50
+
+        # One index range per direction, merged; each branch reads at most a page
+        keyset_sql, keyset_params = self._keyset(before)
+        branch = f"""(SELECT {self.MESSAGE_COLUMNS} FROM messages
+                WHERE sender_username = %s AND recipient_username = %s AND deleted_at IS NULL
+                AND {self.DELIVERED_SQL}{keyset_sql}
+                ORDER BY sent_at DESC, id DESC LIMIT %s)"""
+        self.cur.execute(f"""
+            SELECT * FROM (
+                {branch}
+                UNION ALL
+                {branch}
+            ) pair
+            ORDER BY sent_at DESC, id DESC LIMIT %s
+        """, (self.username, recipient_username) + keyset_params + (limit + 1,)
+             + (recipient_username, self.username) + keyset_params + (limit + 1,)
+             + (limit + 1,))
+        rows = self.cur.fetchall()
+
+        page = self._thread_page(rows, limit)
+        page['with_user'] = recipient_username
+        return page
+
+    def mark_conversation_as_read(self, other_username: str) -> int:
+        """Mark every unread message from other_username to the user as read"""
+        if not self.username:
+            raise ValueError("Authentication required")
+
+        self.cur.execute(f"""
+            UPDATE messages SET is_read = 1, read_at = CURRENT_TIMESTAMP
+            WHERE sender_username = %s AND recipient_username = %s
+            AND is_read = 0 AND deleted_at IS NULL AND {self.DELIVERED_SQL}
+        """, (other_username, self.username))
+        self.conn.commit()
+        return self.cur.rowcount or 0
     
-    def get_sent_messages(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get messages sent by the authenticated user"""
+    def get_sent_messages_page(self, limit: int = 100, before=None) -> Dict[str, Any]:
+        """Get a page of messages sent by the authenticated user, newest first"""
         if not self.username:
-            return []
+            return {'messages': [], 'has_more': False, 'next_before': None}
         
         if limit < 1 or limit > 1000:
             limit = 100
         
-        # Get sent messages
-        self.cur.execute("""
+        keyset_sql, keyset_params = self._keyset(before)
+        self.cur.execute(f"""
             SELECT id, recipient_username, subject, content, is_read, sent_at, 
                    message_type, conversation_id
             FROM messages
             WHERE sender_username = %s AND (is_deleted_by_sender = 0 OR is_deleted_by_sender IS NULL)
-            ORDER BY sent_at DESC LIMIT %s
-        """, (self.username, limit))
+            AND {self.DELIVERED_SQL}{keyset_sql}
+            ORDER BY sent_at DESC, id DESC LIMIT %s
+        """, (self.username,) + keyset_params + (limit + 1,))
+        rows = self.cur.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         messages = []
-        for row in self.cur.fetchall():
+        for row in rows:
             messages.append({
                 'id': row[0],
                 'recipient': row[1],
                 'subject': row[2],
                 'content': row[3],
                 'is_read': bool(row[4]),
-                'sent_at': row[5].isoformat() if row[5] else None,
+                'sent_at': self._iso(row[5]) if row[5] else None,
                 'message_type': row[6],
                 'conversation_id': row[7]
             })
         
-        return messages
+        return {
+            'messages': messages,
+            'has_more': has_more,
+            'next_before': (messages[-1]['sent_at'], messages[-1]['id']) if has_more else None
+        }
+
+    def get_sent_messages(self, limit: int = 100, before=None) -> List[Dict[str, Any]]:
+        """Get messages sent by the authenticated user"""
+        return self.get_sent_messages_page(limit, before)['messages']
     
-    def search_messages(self, query: str, limit: int = 50) -> Dict[str, Any]:
-        """Full-text search across user's messages"""
+    def search_messages(self, query: str, limit: int = 50, after=None) -> Dict[str, Any]:
+        """Full-text search across user's messages, best match first.
+
+        ``after`` is the previous page's ``next_after`` (rank, id).
+        """
         if not self.username:
             raise ValueError("Authentication required")
         
@@ -433,21 +533,14 @@ class MessageService:
         if len(query) > self.MAX_SEARCH_QUERY_LENGTH:
             raise ValueError(f"Search query exceeds {self.MAX_SEARCH_QUERY_LENGTH} characters")
         
-        search_term = f"%{query}%"
+        if limit < 1 or limit > 100:
+            limit = 50
         
-        # Search in messages
-        self.cur.execute("""
-            SELECT id, conversation_id, sender_username, recipient_username,
-                   subject, content, sent_at, is_read
-            FROM messages
-            WHERE (sender_username = %s OR recipient_username = %s)
-            AND deleted_at IS NULL
-            AND (content ILIKE %s OR subject ILIKE %s)
-            ORDER BY sent_at DESC LIMIT %s
-        """, (self.username, self.username, search_term, search_term, limit))
+        # Ranked tsvector match (see search_index.py)
+        rows, has_more, next_after = search_index.search_messages(self.cur, self.username, query, limit, after)
         
         results = []
-        for row in self.cur.fetchall():
+        for row in rows:
             results.append({
                 'message_id': row[0],
                 'conversation_id': row[1],
@@ -455,14 +548,17 @@ class MessageService:
                 'recipient': row[3],
                 'subject': row[4],
                 'content': row[5][:200] + '...' if len(row[5]) > 200 else row[5],
-                'sent_at': row[6].isoformat() if row[6] else None,
-                'is_read': bool(row[7])
+                'sent_at': self._iso(row[6]) if row[6] else None,
+                'is_read': bool(row[7]),
+                'rank': row[8]
             })
         
         return {
             'query': query,
             'results': results,
-            'count': len(results)
+            'count': len(results),
+            'has_more': has_more,
+            'next_after': next_after
         }
     
     # ==================== MESSAGE MANAGEMENT ====================
@@ -839,9 +935,10 @@ class MessageService:
         if not self.username:
             return 0
         
-        result = self.cur.execute("""
+        result = self.cur.execute(f"""
             SELECT COUNT(*) FROM messages
             WHERE recipient_username = %s AND is_read = 0 AND deleted_at IS NULL
+            AND {self.DELIVERED_SQL}
         """, (self.username,)).fetchone()
         
         return result[0] if result else 0
@@ -851,10 +948,10 @@ class MessageService:
         if not self.username:
             return 0
         
-        result = self.cur.execute("""
+        result = self.cur.execute(f"""
             SELECT COUNT(*) FROM messages
             WHERE conversation_id = %s AND recipient_username = %s
-            AND is_read = 0 AND deleted_at IS NULL
+            AND is_read = 0 AND deleted_at IS NULL AND {self.DELIVERED_SQL}
         """, (conversation_id, self.username)).fetchone()
         
         return result[0] if result else 0
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Schema Migrations
+=================
+
+Versioned schema changes, applied once per database as a release step
+instead of on every worker boot.
+
+- Migrations are registered with @migration(version, name), or as a list of
+  statements with sql_migration(). They run on the runner's connection and
+  must not commit: the runner records each one in schema_version (version,
+  name, applied_at, duration_ms) and commits it with its changes before the
+  next starts. A failure rolls back and stops the run.
+- Runners serialise on a Postgres advisory lock, so concurrent deploys (or
+  several instances with MIGRATE_ON_STARTUP=1) apply each migration exactly
+  once; later runners wait, then find nothing pending.
+- Version 1 is the baseline schema that init_db() built on every boot
+  (see api.py), frozen as it was; unlike later versions it commits statement
+  by statement and logs the ones an old database rejects. New schema changes
+  are new versions, never edits to old ones.
+- Web and worker processes only check the recorded version at boot: one
+  query, whatever the number of migrations. A database that is behind is
+  logged, and migrated in place only when MIGRATE_ON_STARTUP=1.
+
+Usage:
+    python migrations.py              # apply pending migrations
+    python migrations.py --status     # print applied/pending and exit
+    python migrations.py --target 3   # apply up to version 3
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import namedtuple
+
+import psycopg2
+
+from db_connection import direct_connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATE_ON_STARTUP = os.getenv('MIGRATE_ON_STARTUP', '0').lower() in ('1', 'true', 'yes')
+# Arbitrary key shared by every migration runner
+MIGRATION_LOCK_KEY = 7261740001
+
+SCHEMA_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        duration_ms INTEGER
+    )
+"""
+LOCK_SQL = "SELECT pg_advisory_lock(%s)"
+UNLOCK_SQL = "SELECT pg_advisory_unlock(%s)"
+APPLIED_SQL = "SELECT version FROM schema_version"
+RECORD_SQL = "INSERT INTO schema_version (version, name, duration_ms) VALUES (%s, %s, %s)"
+CURRENT_VERSION_SQL = "SELECT MAX(version) FROM schema_version"
+
+Migration = namedtuple('Migration', ['version', 'name', 'apply'])
+
+_registry = {}
+
+
+def migration(version, name):
+    """Decorator registering apply(conn) as schema version ``version``."""
+    def decorator(func):
+        if version in _registry:
+            raise ValueError(f"Duplicate migration version {version}")
+        _registry[version] = Migration(version, name, func)
+        return func
+    return decorator
+
+
+def sql_migration(version, name, statements):
+    """Register a migration that executes ``statements`` in order."""
+    statements = list(statements)
+
+    def apply(conn):
+        cur = conn.cursor()
+        for sql in statements:
+            cur.execute(sql)
+    apply.statements = statements
+    migration(version, name)(apply)
+
+
+def migrations():
+    return [_registry[v] for v in sorted(_registry)]
+
+
+def latest_version():
+    return max(_registry, default=0)
+
+
+_connection_factory = None
+
+
+def configure(connection_factory=None):
+    """Point the runner at a connection provider (e.g. api.get_db_connection_pooled)."""
+    global _connection_factory
+    if connection_factory is not None:
+        _connection_factory = connection_factory
+
+
+def current_version(cur):
+    """Highest applied version, or 0 on a database that has never been migrated
+    (the caller rolls back)."""
+    try:
+        cur.execute(CURRENT_VERSION_SQL)
+        row = cur.fetchone()
+    except psycopg2.errors.UndefinedTable:
+        return 0
+    return (row[0] if row else None) or 0
+
+
+def migrate(connection_factory=None, target=None):
+    """Apply pending migrations in order under the advisory lock.
+
+    Returns the versions applied by this call (empty when up to date).
+    """
+    applied = []
+    with (connection_factory or _connection_factory or direct_connection)() as conn:
+        cur = conn.cursor()
+        # Session-level, so it spans the per-migration commits below
+        cur.execute(LOCK_SQL, (MIGRATION_LOCK_KEY,))
+        try:
+            cur.execute(SCHEMA_VERSION_SQL)
+            cur.execute(APPLIED_SQL)
+            done = {row[0] for row in cur.fetchall()}
+            conn.commit()
+            for m in migrations():
+                if m.version in done or (target is not None and m.version > target):
+                    continue
+                logger.info(f"Applying migration {m.version}: {m.name}")
+                started = time.perf_counter()
+                try:
+                    m.apply(conn)
+                    cur.execute(RECORD_SQL, (m.version, m.name, int((time.perf_counter() - started) * 1000)))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    logger.error(f"Migration {m.version} ({m.name}) failed", exc_info=True)
+                    raise
+                applied.append(m.version)
+        finally:
+            conn.rollback()
+            cur.execute(UNLOCK_SQL, (MIGRATION_LOCK_KEY,))
+            conn.commit()
+    return applied
+
+
+def check(connection_factory=None):
+    """Boot-time check: one query, or a migration run with MIGRATE_ON_STARTUP=1.
+
+    Returns the database's schema version after the check.
+    """
+    with (connection_factory or _connection_factory or direct_connection)() as conn:
+        cur = conn.cursor()
+        version = current_version(cur)
+        conn.rollback()
+    if version >= latest_version():
+        return version
+    if MIGRATE_ON_STARTUP:
+        migrate(connection_factory)
+        return latest_version()
+    logger.warning(f"Database schema is at version {version}, code expects {latest_version()}; "
+                   f"run `python migrations.py` (or set MIGRATE_ON_STARTUP=1)")
+    return version
+
+
+def status(connection_factory=None):
+    """(version, name, applied_at or None) for every registered migration."""
+    with (connection_factory or _connection_factory or direct_connection)() as conn:
+        cur = conn.cursor()
+        cur.execute(SCHEMA_VERSION_SQL)
+        cur.execute("SELECT version, applied_at FROM schema_version")
+        applied_at = dict(cur.fetchall())
+        conn.commit()
+    return [(m.version, m.name, applied_at.get(m.version)) for m in migrations()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--status', action='store_true', help='list applied and pending migrations')
+    parser.add_argument('--target', type=int, default=None, help='apply up to this version')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # Migrations are registered (and the pool configured) when the app is imported.
+    # They land in the imported module, not in this __main__ copy.
+    import api  # noqa: F401
+    import migrations as runner
+
+    if args.status:
+        for version, name, applied_at in runner.status():
+            print(f"{version:>4}  {'applied ' + str(applied_at) if applied_at else 'pending':<36}  {name}")
+        return
+    started = time.perf_counter()
+    applied = runner.migrate(target=args.target)
+    print(f"Applied {len(applied)} migration(s) {applied} in {time.perf_counter() - started:.1f}s"
+          if applied else "Schema is up to date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Pets
+====
+
+Virtual pet state for the /api/pet endpoints and activity rewards.
+
+- The pet table lives in the main database and is reached through the shared
+  connection pool like every other table.
+- Stats decay lazily. Stored hunger, energy and hygiene are the values as of
+  ``last_updated``; reads apply the decay since then (decayed()), and there is
+  no write just to decay. Decay is DECAY_PER_HOUR points an hour (hygiene a
+  third of that) and never takes a stat below DECAY_FLOOR.
+- Every interaction is one ``UPDATE ... RETURNING``. It folds the pending
+  decay into the stored stats, applies its change, clamps to 0..100, evolves
+  the stage and advances ``last_updated`` by exactly the time the folded decay
+  accounts for, so no partial decay is lost. It folds whole multiples of
+  HYGIENE_DECAY_DIVISOR points only, so that time is fully consumed by
+  hygiene's slower decay as well; the remainder stays pending for every stat.
+  Preconditions (enough coins, enough energy, adventure over) sit in its
+  WHERE clause, so concurrent requests cannot spend the same coins twice.
+"""
+
+import math
+import time
+
+DECAY_PER_HOUR = 0.3
+DECAY_FLOOR = 20
+HYGIENE_DECAY_DIVISOR = 3
+# XP at which each stage is reached (one stage per interaction)
+EVOLUTION = [('Baby', 'Child', 500), ('Child', 'Adult', 1500)]
+
+PET_COLUMNS = ("id, username, name, species, gender, hunger, happiness, energy, hygiene, "
+               "coins, xp, stage, adventure_end, last_updated, hat")
+
+SELECT_PET_SQL = f"SELECT {PET_COLUMNS} FROM pet WHERE username = %s"
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS pet (
+        id SERIAL PRIMARY KEY,
+        username TEXT NOT NULL UNIQUE,
+        name TEXT, species TEXT, gender TEXT,
+        hunger INTEGER DEFAULT 70, happiness INTEGER DEFAULT 70,
+        energy INTEGER DEFAULT 70, hygiene INTEGER DEFAULT 80,
+        coins INTEGER DEFAULT 0, xp INTEGER DEFAULT 0,
+        stage TEXT DEFAULT 'Baby', adventure_end REAL DEFAULT 0,
+        last_updated REAL, hat TEXT DEFAULT 'None'
+    )
+"""
+
+UPSERT_SQL = """
+    INSERT INTO pet (username, name, species, gender, hunger, happiness, energy, hygiene,
+                     coins, xp, stage, adventure_end, last_updated, hat)
+    VALUES (%s, %s, %s, %s, 70, 70, 70, 80, 0, 0, 'Baby', 0, %s, 'None')
+    ON CONFLICT(username) DO UPDATE SET
+        name = EXCLUDED.name,
+        species = EXCLUDED.species,
+        gender = EXCLUDED.gender,
+        hunger = 70,
+        happiness = 70,
+        energy = 70,
+        hygiene = 80,
+        coins = 0,
+        xp = 0,
+        stage = 'Baby',
+        adventure_end = 0,
+        last_updated = EXCLUDED.last_updated,
+        hat = 'None'
+"""
+
+# Whole decay points accrued since last_updated
+_POINTS_SQL = (f"FLOOR(GREATEST(%(now)s - COALESCE(last_updated, %(now)s), 0)"
+               f" * {DECAY_PER_HOUR} / 3600.0)::int")
+
+
+# The part of them an update folds in: whole hygiene points' worth
+_FOLD_POINTS_SQL = f"({_POINTS_SQL} / {HYGIENE_DECAY_DIVISOR} * {HYGIENE_DECAY_DIVISOR})"
+
+
+def _decayed_sql(column, divisor=1, points=_POINTS_SQL):
+    if divisor != 1:
+        points = f"({points} / {divisor})"
+    return f"GREATEST(LEAST({column}, {DECAY_FLOOR}), {column} - {points})"
+
+
+def _stage_sql():
+    cases = ' '.join(f"WHEN stage = '{old}' AND xp + %(xp)s >= {threshold} THEN '{new}'"
+                     for old, new, threshold in EVOLUTION)
+    return f"CASE {cases} ELSE stage END"
+
+
+def _decay_points(last_updated, now):
+    if not last_updated:
+        return 0
+    return int(math.floor(max(now - float(last_updated), 0) * DECAY_PER_HOUR / 3600.0))
+
+
+def _decay(value, points):
+    return max(min(value, DECAY_FLOOR), value - points)
+
+
+def decayed(row, now=None):
+    """A pet row (PET_COLUMNS order) with hunger, energy and hygiene decayed to ``now``."""
+    if not row:
+        return None
+    now = time.time() if now is None else now
+    row = list(row)
+    points = _decay_points(row[13], now)
+    row[5] = _decay(int(row[5]), points)
+    row[7] = _decay(int(row[7]), points)
+    row[8] = _decay(int(row[8]), points // HYGIENE_DECAY_DIVISOR)
+    return tuple(row)
+
+
+def get_pet(cur, username, now=None):
+    """The user's pet with decay applied, or None."""
+    cur.execute(SELECT_PET_SQL, (username,))
+    return decayed(cur.fetchone(), now)
+
+
+def create_pet(cur, username, name, species, gender, now=None):
+    """Create the user's pet, or reset an existing one (the caller commits)."""
+    cur.execute(UPSERT_SQL, (username, name, species, gender, time.time() if now is None else now))
+
+
+def update_pet(cur, username, hunger=0, happiness=0, energy=0, hygiene=0, coins=0, xp=0,
+               min_coins=0, min_energy=None, returned_by=None, hat=None, adventure_end=None, now=None):
+    """Apply one interaction atomically; returns the updated row (decayed to
+    ``now``) or None.
+
+    Deltas are added to the decayed stats. None is returned when the user has
+    no pet or a precondition failed: ``min_coins`` (coins before the change),
+    ``min_energy`` (decayed energy) or ``returned_by`` (an adventure that has
+    ended by this time). ``hat`` and ``adventure_end`` replace those columns.
+    """
+    now = time.time() if now is None else now
+    params = {'now': now, 'username': username, 'hunger': hunger, 'happiness': happiness,
+              'energy': energy, 'hygiene': hygiene, 'coins': coins, 'xp': xp, 'min_coins': min_coins}
+    assignments = [
+        f"hunger = LEAST(100, GREATEST(0, {_decayed_sql('hunger', points=_FOLD_POINTS_SQL)} + %(hunger)s))",
+        "happiness = LEAST(100, GREATEST(0, happiness + %(happiness)s))",
+        f"energy = LEAST(100, GREATEST(0, {_decayed_sql('energy', points=_FOLD_POINTS_SQL)} + %(energy)s))",
+        f"hygiene = LEAST(100, GREATEST(0, "
+        f"{_decayed_sql('hygiene', HYGIENE_DECAY_DIVISOR, _FOLD_POINTS_SQL)} + %(hygiene)s))",
+        "coins = coins + %(coins)s",
+        "xp = xp + %(xp)s",
+        f"stage = {_stage_sql()}",
+        f"last_updated = CASE WHEN last_updated IS NULL THEN %(now)s"
+        f" ELSE last_updated + {_FOLD_POINTS_SQL} * 3600.0 / {DECAY_PER_HOUR} END",
+    ]
+    conditions = ["username = %(username)s", "coins >= %(min_coins)s"]
+    if hat is not None:
+        assignments.append("hat = %(hat)s")
+        params['hat'] = hat
+    if adventure_end is not None:
+        assignments.append("adventure_end = %(adventure_end)s")
+        params['adventure_end'] = adventure_end
+    if min_energy is not None:
+        conditions.append(f"{_decayed_sql('energy')} >= %(min_energy)s")
+        params['min_energy'] = min_energy
+    if returned_by is not None:
+        conditions.append("adventure_end > 0 AND adventure_end <= %(returned_by)s")
+        params['returned_by'] = returned_by
+    cur.execute(f"""
+        UPDATE pet SET {', '.join(assignments)}
+        WHERE {' AND '.join(conditions)}
+        RETURNING {PET_COLUMNS}
+    """, params)
+    return decayed(cur.fetchone(), now)
+
+
+def evolved(row, xp_gain):
+    """Whether the interaction that returned ``row`` moved the pet up a stage."""
+    if not row or not xp_gain:
+        return False
+    return any(row[11] == new and row[10] - xp_gain < threshold <= row[10]
+               for _, new, threshold in EVOLUTION)
@@ -0,0 +1,165 @@
+"""
+Query Statistics
+================
+
+Database instrumentation for the cursor wrapper and the pooled connection
+helpers in api.py.
+
+- Off unless DB_QUERY_STATS=1, and switched at runtime with enable() (or the
+  developer query-stats endpoint). While off, each statement costs the
+  wrapper one attribute check and nothing is recorded.
+- Between begin() and finish() a request counts its statements, their total
+  time and the time spent waiting for a pooled connection. api.py reports the
+  totals in a Server-Timing header and logs one line per request (a warning
+  from REQUEST_QUERY_WARN statements up).
+- Statements taking SLOW_QUERY_MS or longer, in a request or not, go to a
+  rolling log of the last SLOW_QUERY_LOG_SIZE. They are normalised (literals
+  and parameters replaced with ?) so that repeats of one statement group
+  together in snapshot().
+- State is per process: each gunicorn worker counts, and is toggled, on its own.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv('DB_QUERY_STATS', '0').lower() in ('1', 'true', 'yes')
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', '200'))
+REQUEST_QUERY_WARN = int(os.getenv('REQUEST_QUERY_WARN', '100'))
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|%s|\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize(query):
+    """Statement text with literals and parameters as ?, IN lists folded and
+    whitespace collapsed."""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    sql = _LITERAL.sub('?', str(query))
+    sql = _VALUE_LIST.sub('(?, ...)', sql)
+    return ' '.join(sql.split())
+
+
+class RequestStats:
+    __slots__ = ('label', 'queries', 'db_seconds', 'pool_waits', 'pool_wait_seconds')
+
+    def __init__(self, label=None):
+        self.label = label
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_waits = 0
+        self.pool_wait_seconds = 0.0
+
+    def server_timing(self):
+        """Server-Timing header value (durations in ms)."""
+        return (f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries", '
+                f'db-pool;dur={self.pool_wait_seconds * 1000:.1f}')
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_slow_log = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_totals = {'requests': 0, 'queries': 0, 'db_ms': 0.0, 'pool_wait_ms': 0.0, 'slow_queries': 0}
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = bool(on)
+    logger.info(f"DB query statistics {'enabled' if ENABLED else 'disabled'}")
+
+
+def reset():
+    with _lock:
+        _slow_log.clear()
+        for key in _totals:
+            _totals[key] = 0
+
+
+def begin(label=None):
+    """Start counting for the current request (a no-op while disabled)."""
+    _local.request = RequestStats(label) if ENABLED else None
+
+
+def current():
+    return getattr(_local, 'request', None)
+
+
+def finish():
+    """Stop counting; returns the request's RequestStats, or None if it was not tracked."""
+    stats = getattr(_local, 'request', None)
+    _local.request = None
+    if stats is not None:
+        with _lock:
+            _totals['requests'] += 1
+            _totals['queries'] += stats.queries
+            _totals['db_ms'] += stats.db_seconds * 1000
+            _totals['pool_wait_ms'] += stats.pool_wait_seconds * 1000
+    return stats
+
+
+def record(query, seconds):
+    """Account one executed statement (called by the wrapper only while enabled)."""
+    stats = getattr(_local, 'request', None)
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        _record_slow(query, seconds, stats)
+
+
+def record_pool_wait(seconds):
+    stats = getattr(_local, 'request', None)
+    if stats is not None:
+        stats.pool_waits += 1
+        stats.pool_wait_seconds += seconds
+
+
+def _record_slow(query, seconds, stats):
+    statement = normalize(query)
+    entry = {
+        'statement': statement,
+        'ms': round(seconds * 1000, 1),
+        'request': stats.label if stats is not None else None,
+        'at': datetime.now(timezone.utc).isoformat(),
+    }
+    with _lock:
+        _slow_log.append(entry)
+        _totals['slow_queries'] += 1
+    logger.warning(f"Slow query ({entry['ms']:.0f} ms, {entry['request'] or 'background'}): {statement[:300]}")
+
+
+def slow_queries():
+    """The rolling slow-query log, newest first."""
+    with _lock:
+        return list(reversed(_slow_log))
+
+
+def snapshot(top=10):
+    """Totals plus the slowest statements in the log, grouped by normalised text."""
+    with _lock:
+        totals = dict(_totals)
+        entries = list(_slow_log)
+    grouped = {}
+    for entry in entries:
+        group = grouped.setdefault(entry['statement'], {'statement': entry['statement'], 'count': 0,
+                                                        'total_ms': 0.0, 'max_ms': 0.0})
+        group['count'] += 1
+        group['total_ms'] += entry['ms']
+        group['max_ms'] = max(group['max_ms'], entry['ms'])
+    requests = totals['requests']
+    return {
+        'enabled': ENABLED,
+        'slow_query_ms': SLOW_QUERY_MS,
+        **{k: round(v, 1) if isinstance(v, float) else v for k, v in totals.items()},
+        'avg_queries_per_request': round(totals['queries'] / requests, 2) if requests else 0,
+        'avg_db_ms_per_request': round(totals['db_ms'] / requests, 1) if requests else 0,
+        'slowest': [dict(g, total_ms=round(g['total_ms'], 1))
+                    for g in sorted(grouped.values(), key=lambda g: g['total_ms'], reverse=True)[:top]],
+    }
@@ -0,0 +1,241 @@
+"""
+Rate Limit Backends
+===================
+
+Storage backends for api.RateLimiter.
+
+Both backends implement a sliding-window *counter*: each key keeps only the
+hit count for the current fixed window and the one before it, and the
+effective rate is estimated as
+
+    previous * (1 - elapsed_fraction_of_current_window) + current
+
+This is O(1) time and memory per key (no per-request timestamp lists).
+
+- InMemoryRateLimitBackend: per-process, lock-striped so one hot key does not
+  serialise every other key in the worker.
+- PostgresRateLimitBackend: shared across gunicorn workers/instances via an
+  UNLOGGED table (no WAL cost; counters are disposable on crash), created by
+  a migration (CREATE_TABLE_SQL). Falls back to the in-memory backend if the
+  database is unavailable.
+- cleanup() drops counters that can no longer affect a decision; api.py runs
+  it as the periodic 'rate_limit_cleanup' job. The in-memory backend also
+  prunes itself every CLEANUP_INTERVAL seconds, since each process has its own.
+
+Select with RATE_LIMIT_BACKEND=memory|postgres (see create_backend).
+"""
+
+import math
+import os
+import threading
+import time
+import zlib
+import logging
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_INTERVAL = float(os.getenv('RATE_LIMIT_CLEANUP_INTERVAL', '300'))
+
+CREATE_TABLE_SQL = """
+    CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_counters (
+        bucket_key TEXT NOT NULL,
+        window_index BIGINT NOT NULL,
+        window_seconds INTEGER NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket_key, window_index)
+    )
+"""
+
+
+def _window_state(now: float, window: int) -> Tuple[int, float]:
+    """Return (window_index, elapsed_fraction) for a fixed window length."""
+    index = int(now // window)
+    return index, (now - index * window) / window
+
+
+def _estimate(previous: int, current: int, elapsed_fraction: float) -> float:
+    return previous * (1.0 - elapsed_fraction) + current
+
+
+def _wait_seconds(previous: int, current: int, max_requests: int, window: int,
+                  now: float, window_index: int) -> int:
+    """Seconds until the estimated rate drops below max_requests."""
+    elapsed = now - window_index * window
+    if current >= max_requests:
+        # Must roll into the next window, where `current` becomes `previous`
+        # and decays linearly: current * (1 - f) < max_requests
+        return int(window - elapsed + window * (1.0 - max_requests / current)) + 1
+    if previous <= 0:
+        return 0
+    # previous * (1 - (elapsed + t) / window) + current < max_requests
+    t = window * (1.0 - (max_requests - current) / previous) - elapsed
+    return int(max(t, 0.0)) + 1 if t > 0 else 0
+
+
+class InMemoryRateLimitBackend:
+    """Per-process sliding-window counter with striped locks."""
+
+    name = 'memory'
+
+    def __init__(self, stripes: int = 64):
+        self._stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        # key -> [window_index, previous_count, current_count, window_seconds]
+        self._counters = {}
+        self._last_cleanup = time.time()
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        return self._locks[zlib.crc32(key.encode('utf-8')) % self._stripes]
+
+    def _roll(self, key: str, window_index: int, window: int) -> list:
+        state = self._counters.get(key)
+        if state is None:
+            state = [window_index, 0, 0, window]
+            self._counters[key] = state
+        elif state[0] != window_index:
+            # Current window becomes previous only if it is directly adjacent
+            state[1] = state[2] if state[0] == window_index - 1 else 0
+            state[2] = 0
+            state[0] = window_index
+        return state
+
+    def _view(self, key: str, window_index: int) -> Optional[Tuple[int, int]]:
+        """(previous, current) as _roll would leave them, without changing the counters."""
+        state = self._counters.get(key)
+        if state is None:
+            return None
+        if state[0] == window_index:
+            return state[1], state[2]
+        return (state[2] if state[0] == window_index - 1 else 0), 0
+
+    def hit(self, key: str, max_requests: int, window: int, now: Optional[float] = None) -> bool:
+        """Record a request if allowed. Returns True when under the limit."""
+        now = time.time() if now is None else now
+        if now - self._last_cleanup >= CLEANUP_INTERVAL:
+            self._last_cleanup = now
+            self.cleanup(now=now)
+        window_index, fraction = _window_state(now, window)
+        with self._lock_for(key):
+            state = self._roll(key, window_index, window)
+            if _estimate(state[1], state[2], fraction) >= max_requests:
+                return False
+            state[2] += 1
+            return True
+
+    def wait_time(self, key: str, max_requests: int, window: int, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        window_index, fraction = _window_state(now, window)
+        with self._lock_for(key):
+            counts = self._view(key, window_index)
+        if counts is None or _estimate(counts[0], counts[1], fraction) < max_requests:
+            return 0
+        return _wait_seconds(counts[0], counts[1], max_requests, window, now, window_index)
+
+    def cleanup(self, max_window: int = 0, now: Optional[float] = None):
+        """Drop keys whose counters can no longer affect a decision
+        (both the current and previous windows have fully elapsed)."""
+        now = time.time() if now is None else now
+        for key in list(self._counters.keys()):
+            with self._lock_for(key):
+                state = self._counters.get(key)
+                if state is not None and (state[0] + 2) * state[3] <= now:
+                    del self._counters[key]
+
+    def __len__(self):
+        return len(self._counters)
+
+    def reset(self):
+        self._counters.clear()
+
+
+class PostgresRateLimitBackend:
+    """Sliding-window counter shared across processes via an UNLOGGED table."""
+
+    name = 'postgres'
+
+    HIT_SQL = """
+        WITH cur AS (
+            INSERT INTO rate_limit_counters (bucket_key, window_index, window_seconds, hits)
+            VALUES (%s, %s, %s, 1)
+            ON CONFLICT (bucket_key, window_index)
+            DO UPDATE SET hits = rate_limit_counters.hits + 1
+            RETURNING hits
+        )
+        SELECT cur.hits,
+               COALESCE((SELECT hits FROM rate_limit_counters
+                         WHERE bucket_key = %s AND window_index = %s), 0)
+        FROM cur
+    """
+
+    def __init__(self, connection_factory: Callable, fallback: Optional[InMemoryRateLimitBackend] = None):
+        """connection_factory: zero-arg callable returning a connection context manager
+        (e.g. api.get_db_connection_pooled)."""
+        self._connection_factory = connection_factory
+        self._fallback = fallback or InMemoryRateLimitBackend()
+
+    def hit(self, key: str, max_requests: int, window: int, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        window_index, fraction = _window_state(now, window)
+        try:
+            with self._connection_factory() as conn:
+                cur = conn.cursor()
+                cur.execute(self.HIT_SQL, (key, window_index, window, key, window_index - 1))
+                current, previous = cur.fetchone()
+                # The hit was counted optimistically; the estimate excludes it
+                allowed = _estimate(previous, current - 1, fraction) < max_requests
+                if not allowed:
+                    cur.execute(
+                        "UPDATE rate_limit_counters SET hits = hits - 1 WHERE bucket_key = %s AND window_index = %s",
+                        (key, window_index)
+                    )
+                conn.commit()
+                return allowed
+        except Exception as e:
+            logger.warning(f"Shared rate limit backend unavailable, using in-process counts: {e}")
+            return self._fallback.hit(key, max_requests, window, now)
+
+    def wait_time(self, key: str, max_requests: int, window: int, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        window_index, fraction = _window_state(now, window)
+        try:
+            with self._connection_factory() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "SELECT window_index, hits FROM rate_limit_counters WHERE bucket_key = %s AND window_index IN (%s, %s)",
+                    (key, window_index, window_index - 1)
+                )
+                counts = {row[0]: row[1] for row in cur.fetchall()}
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"Shared rate limit backend unavailable, using in-process counts: {e}")
+            return self._fallback.wait_time(key, max_requests, window, now)
+        previous, current = counts.get(window_index - 1, 0), counts.get(window_index, 0)
+        if _estimate(previous, current, fraction) < max_requests:
+            return 0
+        return _wait_seconds(previous, current, max_requests, window, now, window_index)
+
+    def cleanup(self, max_window: int = 0, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        try:
+            with self._connection_factory() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "DELETE FROM rate_limit_counters WHERE (window_index + 2) * window_seconds < %s",
+                    (math.floor(now),)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"Rate limit counter cleanup failed: {e}")
+        self._fallback.cleanup(max_window, now)
+
+
+def create_backend(kind: str = 'memory', connection_factory: Optional[Callable] = None):
+    """Build a backend by name. Unknown names, or 'postgres' without a
+    connection factory, fall back to the in-memory backend."""
+    kind = (kind or 'memory').lower()
+    if kind == 'postgres' and connection_factory is not None:
+        return PostgresRateLimitBackend(connection_factory)
+    if kind != 'memory':
+        logger.warning(f"Unknown or unconfigured rate limit backend '{kind}', using in-memory")
+    return InMemoryRateLimitBackend()
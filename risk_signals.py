@@ -0,0 +1,449 @@
+"""
+Incremental Risk Signals
+========================
+
+Running per-patient aggregates behind RiskScoringEngine. Rather than rescanning
+assessments, mood history, CBT activity and chat text on every score, each
+patient has one small state document (patient_risk_signals.state) holding only
+what the scoring rules look at:
+
+- latest PHQ-9 / GAD-7 score
+- alert timestamps (7 days)
+- last mood time and mood entries (7 days)
+- CBT entry timestamps (30 days)
+- late-night (02:00-04:59) chat timestamps (7 days)
+- the last 50 user chat messages (7 days), stored as matched keywords only
+
+Events (mood log, assessment, alert, CBT entry, chat message) are folded in as
+they arrive, so an update costs O(new event). Windows are pruned on every
+write, which keeps the document bounded.
+
+The state is rebuilt from the source tables (hydrate) when it is missing, older
+than RISK_SIGNALS_REFRESH seconds, from an older format, or when the active
+risk keyword set has changed. RiskScoringEngine's per-table calculations remain
+the full-recompute path and are what check_consistency() compares against.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from keyword_matcher import compile_keywords
+
+SIGNALS_VERSION = 1
+RISK_SIGNALS_REFRESH = int(os.getenv('RISK_SIGNALS_REFRESH', '21600'))
+KEYWORD_CACHE_TTL = 60
+
+DAY = 86400
+MOOD_WINDOW = 7 * DAY
+MOOD_DROP_WINDOW = 2 * DAY
+ALERT_WINDOW = 7 * DAY
+CBT_RECENT_WINDOW = 7 * DAY
+CBT_WINDOW = 30 * DAY
+CHAT_WINDOW = 7 * DAY
+MESSAGE_LIMIT = 50
+LATE_NIGHT_HOURS = (2, 3, 4)
+
+ACTIVE_KEYWORDS_SQL = (
+    "SELECT keyword, category, severity_weight FROM risk_keywords WHERE is_active = TRUE ORDER BY id"
+)
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS patient_risk_signals (
+        username TEXT PRIMARY KEY,
+        state JSONB NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+UPSERT_SQL = """
+    INSERT INTO patient_risk_signals (username, state, updated_at)
+    VALUES (%s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (username) DO UPDATE
+    SET state = EXCLUDED.state, updated_at = EXCLUDED.updated_at
+"""
+
+
+def to_epoch(value):
+    """Seconds since the epoch for a datetime, 'YYYY-mm-dd HH:MM:SS' string or number."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value.timestamp()
+
+
+def empty_state(keywords_fp=None, now=None):
+    return {
+        'v': SIGNALS_VERSION,
+        'hydrated_at': now if now is not None else time.time(),
+        'keywords_fp': keywords_fp,
+        'phq9': None,           # [score, ts]
+        'gad7': None,
+        'alerts': [],           # [ts, ...]
+        'last_mood_at': None,
+        'moods': [],            # [[ts, mood_val], ...] sorted by ts
+        'cbt': [],              # [ts, ...]
+        'late_night': [],       # [ts, ...]
+        'messages': [],         # [[ts, [keyword, ...]], ...] sorted by ts
+    }
+
+
+# ==================== EVENT APPLICATION ====================
+
+def _insort(items, item):
+    """Insert keeping time order; list entries are ordered by their timestamp only."""
+    if isinstance(item, list):
+        bisect.insort(items, item, key=lambda entry: entry[0])
+    else:
+        bisect.insort(items, item)
+
+
+def apply_assessment(state, scale_name, score, at):
+    key = {'PHQ-9': 'phq9', 'GAD-7': 'gad7'}.get(scale_name)
+    if key is None or score is None:
+        return
+    current = state.get(key)
+    if current is None or at >= current[1]:
+        state[key] = [score, at]
+
+
+def apply_alert(state, at):
+    _insort(state['alerts'], at)
+
+
+def apply_mood(state, mood_val, at):
+    if state['last_mood_at'] is None or at > state['last_mood_at']:
+        state['last_mood_at'] = at
+    _insort(state['moods'], [at, mood_val])
+
+
+def apply_cbt_entry(state, at):
+    _insort(state['cbt'], at)
+
+
+def apply_chat_message(state, sender, message, at, matcher):
+    if datetime.fromtimestamp(at).hour in LATE_NIGHT_HOURS:
+        _insort(state['late_night'], at)
+    if sender == 'user':
+        _insort(state['messages'], [at, matcher.matched_keywords(message)])
+        del state['messages'][:-MESSAGE_LIMIT]
+
+
+def prune(state, now):
+    """Drop everything that has aged out of every window that reads it."""
+    state['alerts'] = [t for t in state['alerts'] if t >= now - ALERT_WINDOW]
+    state['moods'] = [m for m in state['moods'] if m[0] >= now - MOOD_WINDOW]
+    state['cbt'] = [t for t in state['cbt'] if t >= now - CBT_WINDOW]
+    state['late_night'] = [t for t in state['late_night'] if t >= now - CHAT_WINDOW]
+    state['messages'] = [m for m in state['messages'] if m[0] >= now - CHAT_WINDOW][-MESSAGE_LIMIT:]
+    return state
+
+
+# ==================== SCORING ====================
+# Same rules as RiskScoringEngine.calculate_*_score, evaluated over the state.
+
+def clinical_score(state, now):
+    score = 0
+    factors = []
+
+    if state.get('phq9'):
+        phq_score = state['phq9'][0]
+        if phq_score >= 20:
+            score += 15
+            factors.append(f"PHQ-9 severe: {phq_score}")
+        elif phq_score >= 15:
+            score += 10
+            factors.append(f"PHQ-9 moderately severe: {phq_score}")
+        elif phq_score >= 10:
+            score += 5
+            factors.append(f"PHQ-9 moderate: {phq_score}")
+
+    if state.get('gad7'):
+        gad_score = state['gad7'][0]
+        if gad_score >= 15:
+            score += 10
+            factors.append(f"GAD-7 severe: {gad_score}")
+        elif gad_score >= 10:
+            score += 5
+            factors.append(f"GAD-7 moderate: {gad_score}")
+
+    recent_alerts = sum(1 for t in state['alerts'] if t >= now - ALERT_WINDOW)
+    if recent_alerts > 0:
+        score += min(15, recent_alerts * 5)
+        factors.append(f"Recent safety alerts: {recent_alerts}")
+
+    return min(score, 40), factors
+
+
+def behavioral_score(state, now):
+    score = 0
+    factors = []
+
+    if state.get('last_mood_at'):
+        days_since = int((now - state['last_mood_at']) // DAY)
+        if days_since >= 7:
+            score += 10
+            factors.append(f"No mood log in {days_since} days")
+        elif days_since >= 3:
+            score += 5
+            factors.append(f"No mood log in {days_since} days")
+    else:
+        score += 5
+        factors.append("No mood logs recorded")
+
+    recent_moods = [m for m in state['moods'] if m[0] >= now - MOOD_DROP_WINDOW]
+    if len(recent_moods) >= 2:
+        first_mood = recent_moods[0][1]
+        last_mood_val = recent_moods[-1][1]
+        if first_mood and last_mood_val and (first_mood - last_mood_val) >= 4:
+            score += 10
+            factors.append(f"Sudden mood drop: {first_mood} -> {last_mood_val}")
+
+    low_days = {datetime.fromtimestamp(t).date() for t, val in state['moods']
+                if t >= now - MOOD_WINDOW and val is not None and val <= 3}
+    if len(low_days) >= 5:
+        score += 10
+        factors.append(f"Consistently low mood for {len(low_days)} days")
+
+    recent_cbt = sum(1 for t in state['cbt'] if t >= now - CBT_RECENT_WINDOW)
+    older_cbt = sum(1 for t in state['cbt'] if now - CBT_WINDOW <= t < now - CBT_RECENT_WINDOW)
+    if older_cbt >= 3 and recent_cbt == 0:
+        score += 5
+        factors.append("Stopped using CBT tools (was previously active)")
+
+    late_night = sum(1 for t in state['late_night'] if t >= now - CHAT_WINDOW)
+    if late_night >= 3:
+        score += 5
+        factors.append(f"Late-night activity: {late_night} sessions (2-5am)")
+
+    return min(score, 30), factors
+
+
+# (category, points cap, uses weight * 2, critical flag, factor label)
+_CATEGORY_RULES = [
+    ('suicide', 15, True, 'suicide_risk', 'Suicide-related language detected'),
+    ('self_harm', 10, True, 'self_harm', 'Self-harm language detected'),
+    ('crisis', 8, False, None, 'Crisis language detected'),
+    ('substance', 5, False, None, 'Substance concern'),
+    ('violence', 5, False, None, 'Violence concern'),
+]
+
+
+def conversational_score(state, matcher, now):
+    factors = []
+    critical_flags = []
+    if not len(matcher):
+        return 0, factors, critical_flags
+
+    messages = [m for m in state['messages'] if m[0] >= now - CHAT_WINDOW][-MESSAGE_LIMIT:]
+    if not messages:
+        return 0, factors, critical_flags
+
+    matched = set()
+    for _, hits in messages:
+        matched.update(hits)
+
+    category_hits = {}
+    for keyword, category, weight in matcher.rows_for(matched):
+        hit = category_hits.setdefault(category, {'count': 0, 'max_weight': 0, 'keywords': []})
+        hit['count'] += 1
+        hit['max_weight'] = max(hit['max_weight'], weight)
+        hit['keywords'].append(keyword)
+
+    score = 0
+    for category, cap, doubled, flag, label in _CATEGORY_RULES:
+        hit = category_hits.get(category)
+        if not hit:
+            continue
+        score += min(cap, hit['max_weight'] * 2 if doubled else hit['max_weight'])
+        factors.append(f"{label}: {', '.join(hit['keywords'][:3])}")
+        if flag and hit['max_weight'] >= 8:
+            critical_flags.append(flag)
+
+    return min(score, 30), factors, critical_flags
+
+
+# ==================== PERSISTENCE ====================
+
+def hydrate(cur, username, matcher, now=None):
+    """Full rebuild of a patient's state from the source tables (bounded windows)."""
+    now = now if now is not None else time.time()
+    state = empty_state(matcher.fingerprint, now)
+
+    for scale_name, score, ts in cur.execute(
+        """SELECT DISTINCT ON (scale_name) scale_name, score, entry_timestamp
+           FROM clinical_scales
+           WHERE username = %s AND scale_name IN ('PHQ-9', 'GAD-7')
+           ORDER BY scale_name, entry_timestamp DESC""",
+        (username,)
+    ).fetchall():
+        apply_assessment(state, scale_name, score, to_epoch(ts) or 0.0)
+
+    for (ts,) in cur.execute(
+        "SELECT created_at FROM alerts WHERE username = %s AND created_at >= CURRENT_TIMESTAMP - INTERVAL '7 days'",
+        (username,)
+    ).fetchall():
+        apply_alert(state, to_epoch(ts))
+
+    last_mood = cur.execute(
+        "SELECT MAX(entrestamp) FROM mood_logs WHERE username = %s", (username,)
+    ).fetchone()
+    state['last_mood_at'] = to_epoch(last_mood[0]) if last_mood else None
+    for mood_val, ts in cur.execute(
+        """SELECT mood_val, entrestamp FROM mood_logs
+           WHERE username = %s AND entrestamp >= CURRENT_TIMESTAMP - INTERVAL '7 days'""",
+        (username,)
+    ).fetchall():
+        _insort(state['moods'], [to_epoch(ts), mood_val])
+
+    for (ts,) in cur.execute(
+        "SELECT created_at FROM cbt_tool_entries WHERE username = %s AND created_at >= CURRENT_TIMESTAMP - INTERVAL '30 days'",
+        (username,)
+    ).fetchall():
+        apply_cbt_entry(state, to_epoch(ts))
+
+    for (ts,) in cur.execute(
+        """SELECT timestamp FROM chat_history
+           WHERE session_id LIKE %s
+           AND EXTRACT(HOUR FROM timestamp) BETWEEN 2 AND 4
+           AND timestamp >= CURRENT_TIMESTAMP - INTERVAL '7 days'""",
+        (f"{username}_%",)
+    ).fetchall():
+        _insort(state['late_night'], to_epoch(ts))
+
+    for message, ts in cur.execute(
+        """SELECT message, timestamp FROM chat_history
+           WHERE session_id LIKE %s AND sender = 'user'
+           AND timestamp >= CURRENT_TIMESTAMP - INTERVAL '7 days'
+           ORDER BY timestamp DESC LIMIT 50""",
+        (f"{username}_%",)
+    ).fetchall():
+        _insort(state['messages'], [to_epoch(ts), matcher.matched_keywords(message)])
+
+    return prune(state, now)
+
+
+class IncrementalRiskEngine:
+    """Loads, updates and scores patient_risk_signals rows.
+
+    All methods take a cursor so callers control the transaction; record()
+    expects to run in the same transaction as its save (it locks the row).
+    """
+
+    def __init__(self, refresh_seconds=RISK_SIGNALS_REFRESH, keyword_ttl=KEYWORD_CACHE_TTL):
+        self.refresh_seconds = refresh_seconds
+        self.keyword_ttl = keyword_ttl
+        self._matcher = None
+        self._keywords_loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'events': 0, 'hydrations': 0, 'scores': 0}
+
+    # ---- keywords ----
+
+    def matcher(self, cur):
+        """Compiled matcher over the active risk keywords.
+
+        The rows are re-read every keyword_ttl seconds (so edits made on other
+        workers are picked up); the automaton is only rebuilt if they changed.
+        """
+        if self._matcher is not None and time.time() - self._keywords_loaded_at < self.keyword_ttl:
+            return self._matcher
+        rows = cur.execute(ACTIVE_KEYWORDS_SQL).fetchall()
+        matcher = compile_keywords([(r[0], r[1], r[2]) for r in rows])
+        with self._lock:
+            self._matcher = matcher
+            self._keywords_loaded_at = time.time()
+        return matcher
+
+    def invalidate_keywords(self):
+        """Force a reload (and per-patient rescan) after risk_keywords changes."""
+        with self._lock:
+            self._matcher = None
+            self._keywords_loaded_at = 0.0
+
+    # ---- state ----
+
+    def _is_stale(self, state, matcher, now):
+        return (state.get('v') != SIGNALS_VERSION
+                or now - state.get('hydrated_at', 0) > self.refresh_seconds
+                or state.get('keywords_fp') != matcher.fingerprint)
+
+    def load(self, cur, username, now=None, for_update=False):
+        """Return (state, hydrated). Rebuilds from source tables when needed."""
+        now = now if now is not None else time.time()
+        matcher = self.matcher(cur)
+        row = cur.execute(
+            "SELECT state FROM patient_risk_signals WHERE username = %s" + (" FOR UPDATE" if for_update else ""),
+            (username,)
+        ).fetchone()
+        state = None
+        if row and row[0]:
+            state = row[0] if isinstance(row[0], dict) else json.loads(row[0])
+        if state is None or self._is_stale(state, matcher, now):
+            state = hydrate(cur, username, matcher, now)
+            self.stats['hydrations'] += 1
+            return state, True
+        return state, False
+
+    def save(self, cur, username, state):
+        cur.execute(UPSERT_SQL, (username, json.dumps(state)))
+
+    def record(self, cur, username, event, now=None, **fields):
+        """Fold one event into the patient's state and persist it.
+
+        event is one of 'mood', 'assessment', 'alert', 'cbt_entry', 'chat_message'.
+        The source row must already be written: if the state has to be rebuilt,
+        the rebuild already includes it and the event is not applied twice.
+        Chat messages are folded in by a job after their commit, so one at or
+        before the state's hydrated_at is skipped too: a rebuild in between
+        (e.g. by score()) already counted it.
+        """
+        now = now if now is not None else time.time()
+        at = to_epoch(fields.get('at')) or now
+        state, hydrated = self.load(cur, username, now, for_update=True)
+        if not hydrated:
+            if event == 'mood':
+                apply_mood(state, fields.get('mood_val'), at)
+            elif event == 'assessment':
+                apply_assessment(state, fields.get('scale_name'), fields.get('score'), at)
+            elif event == 'alert':
+                apply_alert(state, at)
+            elif event == 'cbt_entry':
+                apply_cbt_entry(state, at)
+            elif event == 'chat_message':
+                if at > state.get('hydrated_at', 0):
+                    apply_chat_message(state, fields.get('sender'), fields.get('message'), at, self.matcher(cur))
+            else:
+                raise ValueError(f"Unknown risk signal event: {event}")
+        self.save(cur, username, prune(state, now))
+        self.stats['events'] += 1
+        return state
+
+    def score(self, cur, username, now=None):
+        """Sub-scores for a patient from their materialised state.
+
+        Returns (clinical, clinical_factors, behavioral, behavioral_factors,
+        conversational, conversational_factors, critical_flags).
+        """
+        now = now if now is not None else time.time()
+        state, hydrated = self.load(cur, username, now)
+        if hydrated:
+            self.save(cur, username, state)
+        matcher = self.matcher(cur)
+        c_score, c_factors = clinical_score(state, now)
+        b_score, b_factors = behavioral_score(state, now)
+        v_score, v_factors, flags = conversational_score(state, matcher, now)
+        self.stats['scores'] += 1
+        return c_score, c_factors, b_score, b_factors, v_score, v_factors, flags
+
+
+engine = IncrementalRiskEngine()
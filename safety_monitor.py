@@ -25,6 +25,65 @@ class RiskLevel(Enum):
     RED = "red"          # 76-100: High risk, immediate assessment needed
 
 
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_PHRASE_TOKEN_RE = re.compile(r'(\w+)(?:\[(\w+)\]\*)?', re.UNICODE)
+
+
+def _tokenize(text: str) -> Tuple[List[str], List[str]]:
+    """Split text into word tokens and the exact separators between them."""
+    tokens = []
+    seps = []
+    last_end = None
+    for m in _WORD_RE.finditer(text):
+        if last_end is not None:
+            seps.append(text[last_end:m.start()])
+        tokens.append(m.group())
+        last_end = m.end()
+    return tokens, seps
+
+
+def _expand_optional_suffixes(keyword: str) -> List[str]:
+    """
+    Expand the optional suffix markup used in RISK_KEYWORDS.
+
+    '[ing]*' means an optional 'ing' anywhere, '[ed]* ' an optional 'ed'
+    before a space. Any other '[chars]*' is left for _parse_phrase, where it
+    means any run of those characters at the end of the word.
+    """
+    variants = [keyword]
+    for marker, suffix in (('[ing]*', 'ing'), ('[ed]* ', 'ed ')):
+        expanded = []
+        for v in variants:
+            parts = v.split(marker)
+            options = ['']
+            for part in parts[:-1]:
+                options = [o + part + alt for o in options for alt in (suffix, suffix[len(suffix.rstrip()):])]
+            expanded.extend(o + parts[-1] for o in options)
+        variants = expanded
+    return list(dict.fromkeys(variants))
+
+
+def _parse_phrase(phrase: str):
+    """Phrase -> (tokens, separators); 'stem[chars]*' tokens become (stem, chars)."""
+    phrase = phrase.lower()
+    tokens = []
+    seps = []
+    last_end = None
+    for m in _PHRASE_TOKEN_RE.finditer(phrase):
+        if last_end is not None:
+            seps.append(phrase[last_end:m.start()])
+        tokens.append((m.group(1), m.group(2)) if m.group(2) else m.group(1))
+        last_end = m.end()
+    return tuple(tokens), tuple(seps)
+
+
+def _token_matches(token: str, pattern) -> bool:
+    if isinstance(pattern, str):
+        return token == pattern
+    stem, chars = pattern
+    return token.startswith(stem) and all(c in chars for c in token[len(stem):])
+
+
 class SafetyMonitor:
     """
     Real-time risk detection for therapy chat messages.
@@ -36,6 +95,9 @@ class SafetyMonitor:
     
     Architecture:
     - analyze_message(message, history) → {risk_score: 0-100, risk_level: str, indicators: [], action_needed: bool}
+    - analyze_batch(messages) for re-scoring stored history
+    - Single tokenised pass per message: risk categories, context mitigators and
+      protective factors come out of one phrase-index lookup per word
     - Non-blocking (processes instantly, <10ms)
     - No message storage (stateless analysis)
     - Returns both score and human-readable indicators
@@ -234,41 +296,85 @@ class SafetyMonitor:
         'committed to', 'committed to living', 'committed to recovery',
     ]
     
+    # Multiplier applied to the score when a mitigator type is present
+    MITIGATION_WEIGHTS = {
+        'asking_for_help': 0.5,  # Asking for help = good sign
+        'past_tense': 0.6,       # Past tense = less imminent
+        'hypothetical': 0.7,     # Hypothetical = less certain
+        'denial': 0.4,           # Direct denial = potentially protective
+    }
+
     def __init__(self):
-        """Initialize SafetyMonitor with compiled regex patterns"""
-        # Compile all keyword patterns for faster matching
-        self.keyword_patterns = {}
+        """Initialize SafetyMonitor with a single phrase index over all pattern lists"""
+        # first token -> [(group, order, tokens, separators)]
+        self._index = {}
+        # (stem, suffix chars, entries) for phrases whose first token is 'stem[chars]*'
+        self._stem_index = []
+
         for category, data in self.RISK_KEYWORDS.items():
-            patterns = []
-            for kw in data['keywords']:
-                # Convert keyword to regex pattern (handle [brackets] for variations)
-                pattern = kw.replace('[ing]*', r'(?:ing)?')
-                pattern = pattern.replace('[ed]* ', r'(?:ed)? ')
-                pattern = pattern.replace('[ing]* ', r'(?:ing)? ')
-                patterns.append(f"\\b{pattern}\\b")
-            # Compile single pattern that matches any of the keywords
-            self.keyword_patterns[category] = re.compile(
-                '|'.join(patterns),
-                re.IGNORECASE | re.UNICODE
-            )
-        
-        # Compile mitigating factors
-        self.mitigator_patterns = {}
+            for order, kw in enumerate(data['keywords']):
+                for variant in _expand_optional_suffixes(kw):
+                    self._add_phrase(('risk', category), order, variant)
         for mtype, keywords in self.CONTEXT_MITIGATORS.items():
-            patterns = [f"\\b{kw}\\b" for kw in keywords]
-            self.mitigator_patterns[mtype] = re.compile(
-                '|'.join(patterns),
-                re.IGNORECASE | re.UNICODE
-            )
-        
-        # Compile protective factors
-        patterns = [f"\\b{kw}\\b" for kw in self.PROTECTIVE_FACTORS]
-        self.protective_pattern = re.compile(
-            '|'.join(patterns),
-            re.IGNORECASE | re.UNICODE
-        )
-    
-    def analyze_message(self, message: str, conversation_history: List[Dict] = None) -> Dict:
+            for order, kw in enumerate(keywords):
+                self._add_phrase(('mitigator', mtype), order, kw)
+        for order, kw in enumerate(self.PROTECTIVE_FACTORS):
+            self._add_phrase(('protective', None), order, kw)
+
+    def _add_phrase(self, group, order, phrase):
+        tokens, seps = _parse_phrase(phrase)
+        entry = (group, order, tokens, seps)
+        first = tokens[0]
+        if isinstance(first, str):
+            self._index.setdefault(first, []).append(entry)
+            return
+        for stem, chars, entries in self._stem_index:
+            if (stem, chars) == first:
+                entries.append(entry)
+                return
+        self._stem_index.append((first[0], first[1], [entry]))
+
+    def scan(self, text: str) -> Dict[Tuple[str, Optional[str]], int]:
+        """
+        Single pass over the tokenised text.
+
+        Returns {group: match_count} for every risk category ('risk', name),
+        mitigator type ('mitigator', name) and ('protective', None) that matched.
+        Counts follow regex findall semantics: leftmost, first-listed phrase
+        wins at a position, non-overlapping.
+        """
+        tokens, seps = _tokenize(text.lower())
+        hits = {}
+        n_tokens = len(tokens)
+        for i, tok in enumerate(tokens):
+            candidates = self._index.get(tok, ())
+            for stem, chars, entries in self._stem_index:
+                if tok.startswith(stem) and all(c in chars for c in tok[len(stem):]):
+                    candidates = list(candidates) + entries
+            for group, order, ptokens, pseps in candidates:
+                n = len(ptokens)
+                if i + n > n_tokens:
+                    continue
+                for j in range(1, n):
+                    if seps[i + j - 1] != pseps[j - 1] or not _token_matches(tokens[i + j], ptokens[j]):
+                        break
+                else:
+                    hits.setdefault(group, []).append((i, order, i + n))
+
+        counts = {}
+        for group, matches in hits.items():
+            matches.sort()
+            cursor = 0
+            count = 0
+            for start, _, end in matches:
+                if start >= cursor:
+                    count += 1
+                    cursor = end
+            counts[group] = count
+        return counts
+
+    def analyze_message(self, message: str, conversation_history: List[Dict] = None,
+                        _ideation_cache: Optional[Dict[str, bool]] = None) -> Dict:
         """
         Analyze a single message for suicide risk.
         
@@ -302,46 +408,39 @@ class SafetyMonitor:
         indicators = []
         matched_categories = []
         
-        # Step 1: Check for keyword matches
-        for category, pattern in self.keyword_patterns.items():
-            matches = pattern.findall(message_lower)
-            if matches:
-                category_weight = self.RISK_KEYWORDS[category]['weight']
+        # One pass finds risk categories, mitigators and protective factors together
+        counts = self.scan(message_lower)
+
+        # Step 1: Keyword matches (in category order)
+        for category, data in self.RISK_KEYWORDS.items():
+            match_count = counts.get(('risk', category), 0)
+            if match_count:
                 # Multiple matches in same category increase risk
-                match_count = len(matches)
-                category_score = category_weight * min(match_count, 3)  # Cap at 3x weight
+                category_score = data['weight'] * min(match_count, 3)  # Cap at 3x weight
                 score += category_score
                 indicators.append(f"{category.replace('_', ' ')}")
                 matched_categories.append(category)
         
         # Step 2: Apply context mitigating factors (reduce score)
         mitigation_factor = 1.0
-        
-        for mtype, pattern in self.mitigator_patterns.items():
-            if pattern.search(message_lower):
-                # Different reduction levels by type
-                if mtype == 'asking_for_help':
-                    mitigation_factor *= 0.5  # Asking for help = good sign
-                elif mtype == 'past_tense':
-                    mitigation_factor *= 0.6  # Past tense = less imminent
-                elif mtype == 'hypothetical':
-                    mitigation_factor *= 0.7  # Hypothetical = less certain
-                elif mtype == 'denial':
-                    mitigation_factor *= 0.4  # Direct denial = potentially protective
+        for mtype in self.CONTEXT_MITIGATORS:
+            if counts.get(('mitigator', mtype)):
+                mitigation_factor *= self.MITIGATION_WEIGHTS[mtype]
         
         score = score * mitigation_factor
         
         # Step 3: Check for protective factors (further reduce)
-        protective_matches = self.protective_pattern.findall(message_lower)
+        protective_matches = counts.get(('protective', None), 0)
         if protective_matches:
-            protective_factor = 1.0 - (len(protective_matches) * 0.15)
+            protective_factor = 1.0 - (protective_matches * 0.15)
             score = score * max(protective_factor, 0.0)
         
         # Step 4: Use conversation history to assess trajectory (is risk escalating?)
         trajectory_factor = self._assess_escalation(
             message, 
             conversation_history,
-            matched_categories
+            matched_categories,
+            _ideation_cache
         )
         score = score * trajectory_factor
         
@@ -393,6 +492,24 @@ class SafetyMonitor:
             'confidence': round(confidence, 2),
             'reasoning': reasoning[:200],
         }
+
+    def analyze_batch(self, messages: List, history: List[Dict] = None) -> List[Dict]:
+        """
+        Analyze many messages, e.g. when re-scoring stored chat history.
+
+        Each item is either a message string (scored against the shared
+        ``history``) or a (message, history) tuple. History messages are only
+        scanned once across the whole batch.
+        """
+        ideation_cache = {}
+        results = []
+        for item in messages:
+            if isinstance(item, tuple):
+                message, item_history = item
+            else:
+                message, item_history = item, history
+            results.append(self.analyze_message(message, item_history, ideation_cache))
+        return results
     
     def _no_risk_response(self) -> Dict:
         """Return standard no-risk response"""
@@ -410,7 +527,8 @@ class SafetyMonitor:
     def _assess_escalation(self, 
                           current_message: str, 
                           history: List[Dict] = None,
-                          matched_categories: List[str] = None) -> float:
+                          matched_categories: List[str] = None,
+                          ideation_cache: Optional[Dict[str, bool]] = None) -> float:
         """
         Assess if risk is escalating based on conversation trajectory.
         Returns a multiplier: 1.0 = stable, > 1.0 = escalating, < 1.0 = improving
@@ -436,13 +554,21 @@ class SafetyMonitor:
             ]
             ideation_count = sum(
                 1 for msg in recent_user_messages
-                if self.keyword_patterns['direct_ideation'].search(msg)
+                if self._has_ideation(msg, ideation_cache)
             )
             if ideation_count >= 2:
                 escalation_multiplier = 1.3  # Repeated ideation = concerning
         
         return escalation_multiplier
     
+    def _has_ideation(self, text: str, cache: Optional[Dict[str, bool]] = None) -> bool:
+        if cache is not None and text in cache:
+            return cache[text]
+        found = ('risk', 'direct_ideation') in self.scan(text)
+        if cache is not None:
+            cache[text] = found
+        return found
+
     def get_risk_prompt(self, risk_level: str) -> str:
         """
         Get appropriate user-facing message based on risk level.
@@ -520,3 +646,8 @@ def analyze_chat_message(message: str, history: List[Dict] = None) -> Dict:
     """
     monitor = get_safety_monitor()
     return monitor.analyze_message(message, history)
+
+
+def analyze_chat_messages(messages: List, history: List[Dict] = None) -> List[Dict]:
+    """Batch form of analyze_chat_message (see SafetyMonitor.analyze_batch)."""
+    return get_safety_monitor().analyze_batch(messages, history)
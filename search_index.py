@@ -0,0 +1,312 @@
+"""
+Search Index
+============
+
+Ranked full-text search over messages, chat history and community posts,
+and a blind index for user names and emails that may be stored encrypted.
+
+- messages, chat_history and community_posts carry a ``search_vector``
+  tsvector kept current by a BEFORE INSERT/UPDATE trigger and backed by a GIN
+  index. Queries go through websearch_to_tsquery (quoted phrases, ``or``,
+  ``-term``) and are ranked with ts_rank.
+- Result pages are keyset-paginated on (rank, id): pass the last row's
+  (rank, id) back as ``after`` to continue.
+- users.full_name and users.email may be Fernet-encrypted, so Postgres never
+  sees them in plaintext and cannot index them. The application stores
+  ``name_search_tokens`` instead: keyed HMAC-SHA256 digests of each
+  normalised word prefix and of the whole email address. A search hashes the
+  query's words the same way and matches them with the GIN-indexed ``@>``
+  operator. The digests show which users share a name prefix, never the
+  name. Other encrypted columns (dob, phone, conditions) are not indexed.
+- Usernames are plaintext and are matched by substring through a pg_trgm
+  index.
+- Rows written before these columns existed, or by paths that do not call
+  name_tokens(), are filled in batches by backfill() (the 'search_backfill'
+  job queued by init_db).
+
+The blind-index key is SEARCH_BLIND_INDEX_KEY. Only in DEBUG does api.py pass
+a key provider to configure() (the encryption key) to derive one from, since
+rotating that key would silently orphan every stored token; without either,
+names are not indexed and name search falls back to usernames. Changing the
+key invalidates every stored token: clear users.name_search_tokens and run
+backfill() again.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import re
+import unicodedata
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TEXT_CONFIG = os.getenv('SEARCH_TEXT_CONFIG', 'english')
+SEARCH_BACKFILL_BATCH = int(os.getenv('SEARCH_BACKFILL_BATCH', '5000'))
+SEARCH_BLIND_INDEX_KEY = os.getenv('SEARCH_BLIND_INDEX_KEY', '')
+MIN_PREFIX = 2
+MAX_PREFIX = 16
+
+if not re.fullmatch(r'[a-z_]+', SEARCH_TEXT_CONFIG):
+    raise ValueError(f"SEARCH_TEXT_CONFIG must be a text search configuration name, got {SEARCH_TEXT_CONFIG!r}")
+
+# Indexed text columns and their ts_rank weights, per table
+SEARCH_TABLES = {
+    'messages': {'subject': 'A', 'content': 'B'},
+    'chat_history': {'message': 'B'},
+    'community_posts': {'message': 'B'},
+}
+
+SET_NAME_TOKENS_SQL = "UPDATE users SET name_search_tokens = %s WHERE username = %s"
+
+# users.name_search_tokens match for every hashed query word
+NAME_MATCH_SQL = "u.name_search_tokens @> %s::text[]"
+
+
+def document_sql(columns, row=''):
+    """Weighted tsvector expression over a table's columns (``row`` = 'NEW.' in triggers)."""
+    return ' || '.join(
+        f"setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce({row}{column}, '')), '{weight}')"
+        for column, weight in columns.items()
+    )
+
+
+def schema_sqls():
+    """Statements creating the search columns, triggers and indexes (each idempotent)."""
+    sqls = []
+    for table, columns in SEARCH_TABLES.items():
+        sqls += [
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector",
+            f"""
+            CREATE OR REPLACE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {document_sql(columns, 'NEW.')};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+            f"""
+            DO $$ BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = '{table}_search_vector') THEN
+                    CREATE TRIGGER {table}_search_vector
+                    BEFORE INSERT OR UPDATE OF {', '.join(columns)} ON {table}
+                    FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update();
+                END IF;
+            END $$
+            """,
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_search ON {table} USING GIN (search_vector)",
+        ]
+    sqls += [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_users_username_trgm ON users USING GIN (username gin_trgm_ops)",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS name_search_tokens TEXT[]",
+        "CREATE INDEX IF NOT EXISTS idx_users_name_search_tokens ON users USING GIN (name_search_tokens)",
+    ]
+    return sqls
+
+
+# ==================== BLIND INDEX ====================
+
+_key_provider = None
+_key = None
+_warned = False
+
+
+def configure(key_provider=None):
+    """Set the callable returning the secret the blind-index key is derived from
+    when SEARCH_BLIND_INDEX_KEY is unset (api.py passes one only in DEBUG)."""
+    global _key_provider, _key
+    _key_provider = key_provider
+    _key = None
+
+
+def _blind_key():
+    """The HMAC key, or None if no key can be obtained (names are then not indexed)."""
+    global _key, _warned
+    if _key is None:
+        if SEARCH_BLIND_INDEX_KEY:
+            _key = SEARCH_BLIND_INDEX_KEY.encode()
+        elif _key_provider is not None:
+            try:
+                secret = _key_provider()
+            except Exception as e:
+                logger.warning(f"Blind-index key unavailable, name search limited to usernames: {e}")
+                return None
+            secret = secret.encode() if isinstance(secret, str) else secret
+            _key = hmac.new(secret, b'healing-space-search-blind-index', hashlib.sha256).digest()
+        elif not _warned:
+            _warned = True
+            logger.warning("SEARCH_BLIND_INDEX_KEY is not set: names are not indexed, "
+                           "name search is limited to usernames")
+    return _key
+
+
+def _digest(key, kind, value):
+    return hmac.new(key, f'{kind}:{value}'.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _words(text):
+    """Casefolded, accent-stripped alphanumeric words."""
+    text = unicodedata.normalize('NFKD', text or '').casefold()
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r'[^\W_]+', text)
+
+
+def name_tokens(full_name, email=None):
+    """Blind-index tokens for a user's plaintext name and email.
+
+    Every prefix (MIN_PREFIX..MAX_PREFIX characters) of every word is hashed so
+    the composer and patient search can match as the user types. Returns None
+    without a key, leaving the row for backfill().
+    """
+    key = _blind_key()
+    if key is None:
+        return None
+    tokens = set()
+    for word in _words(full_name) + _words((email or '').split('@')[0]):
+        for end in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1):
+            tokens.add(_digest(key, 'p', word[:end]))
+    if email and '@' in email:
+        tokens.add(_digest(key, 'e', email.strip().casefold()))
+    return sorted(tokens)
+
+
+def query_tokens(query):
+    """Tokens a user's name_search_tokens must all contain to match ``query``.
+
+    Returns [] when the query has no searchable word or there is no key
+    (callers then skip the name match rather than matching everyone).
+    """
+    key = _blind_key()
+    query = (query or '').strip()
+    if key is None:
+        return []
+    if '@' in query:
+        return [_digest(key, 'e', query.casefold())]
+    return sorted({_digest(key, 'p', word[:MAX_PREFIX]) for word in _words(query) if len(word) >= MIN_PREFIX})
+
+
+def set_name_tokens(cur, username, full_name, email=None):
+    """Store a user's blind-index tokens, in the caller's transaction."""
+    tokens = name_tokens(full_name, email)
+    if tokens is not None:
+        cur.execute(SET_NAME_TOKENS_SQL, (tokens, username))
+
+
+# ==================== RANKED SEARCH ====================
+
+def _ranked_page(cur, table, columns, filters, params, query, limit, after):
+    """One page of ``table`` rows matching ``query``, best first.
+
+    Returns (rows, has_more, next_after); each row is ``columns`` plus rank.
+    """
+    keyset_sql, keyset_params = "", ()
+    if after:
+        keyset_sql = "WHERE (rank, id) < (%s, %s)"
+        keyset_params = (float(after[0]), int(after[1]))
+    cur.execute(f"""
+        SELECT * FROM (
+            SELECT {columns}, ts_rank(t.search_vector, q)::float8 AS rank
+            FROM {table} t, websearch_to_tsquery('{SEARCH_TEXT_CONFIG}', %s) q
+            WHERE t.search_vector @@ q AND {filters}
+        ) ranked
+        {keyset_sql}
+        ORDER BY rank DESC, id DESC
+        LIMIT %s
+    """, (query,) + tuple(params) + keyset_params + (limit + 1,))
+    rows = cur.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_after = (rows[-1][-1], rows[-1][0]) if has_more else None
+    return rows, has_more, next_after
+
+
+def search_messages(cur, username, query, limit=50, after=None):
+    """Messages sent or received by ``username`` matching ``query``."""
+    return _ranked_page(
+        cur, 'messages',
+        "t.id, t.conversation_id, t.sender_username, t.recipient_username, t.subject, t.content, t.sent_at, t.is_read",
+        "(t.sender_username = %s OR t.recipient_username = %s) AND t.deleted_at IS NULL"
+        " AND COALESCE(t.delivery_status, 'sent') NOT IN ('scheduled', 'delivering')",
+        (username, username), query, limit, after)
+
+
+def search_chat_history(cur, username, query, limit=50, after=None):
+    """A user's therapy chat messages matching ``query``."""
+    return _ranked_page(
+        cur, 'chat_history',
+        "t.id, t.sender, t.message, t.timestamp, t.chat_session_id",
+        "t.session_id = %s",
+        (f"{username}_session",), query, limit, after)
+
+
+def search_community_posts(cur, query, category=None, limit=20, after=None):
+    """Community posts (optionally in one category) matching ``query``."""
+    filters, params = "TRUE", ()
+    if category:
+        filters, params = "t.category = %s", (category,)
+    return _ranked_page(
+        cur, 'community_posts',
+        "t.id, t.username, t.message, t.likes, t.entry_timestamp, t.category, COALESCE(t.is_pinned, 0)",
+        filters, params, query, limit, after)
+
+
+def user_match(query):
+    """SQL condition (on ``users u``) and params matching a username substring or name/email words."""
+    like = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    tokens = query_tokens(query)
+    if not tokens:
+        return "u.username ILIKE %s", [like]
+    return f"(u.username ILIKE %s OR {NAME_MATCH_SQL})", [like, tokens]
+
+
+# ==================== BACKFILL ====================
+
+def backfill(connection_factory, decrypt=None, batch_size=SEARCH_BACKFILL_BATCH):
+    """Fill search columns left NULL, one committed batch at a time.
+
+    ``decrypt`` maps a list of stored name/email values to plaintext (the
+    values may be encrypted). Returns the number of rows filled per table.
+    """
+    filled = {}
+    with connection_factory() as conn:
+        cur = conn.cursor()
+        for table, columns in SEARCH_TABLES.items():
+            filled[table] = 0
+            while True:
+                cur.execute(f"""
+                    UPDATE {table} SET search_vector = {document_sql(columns)}
+                    WHERE id IN (SELECT id FROM {table} WHERE search_vector IS NULL LIMIT %s)
+                """, (batch_size,))
+                count = cur.rowcount
+                conn.commit()
+                filled[table] += count
+                if count < batch_size:
+                    break
+
+        filled['users'] = 0
+        while _blind_key() is not None:
+            cur.execute(
+                "SELECT username, full_name, email FROM users WHERE name_search_tokens IS NULL LIMIT %s",
+                (batch_size,))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            names = [r[1] for r in rows]
+            emails = [r[2] for r in rows]
+            if decrypt:
+                names, emails = decrypt(names), decrypt(emails)
+            execute_values(cur, """
+                UPDATE users SET name_search_tokens = v.tokens
+                FROM (VALUES %s) AS v(username, tokens)
+                WHERE users.username = v.username
+            """, [(r[0], name_tokens(n, e)) for r, n, e in zip(rows, names, emails)],
+                template="(%s, %s::text[])")
+            conn.commit()
+            filled['users'] += len(rows)
+            if len(rows) < batch_size:
+                break
+    logger.info("Search backfill filled %s", filled)
+    return filled
@@ -1,6 +1,9 @@
 #!/bin/bash
 # Daily Mood Reminder Script
 # Runs at 8pm to notify users who haven't logged their mood
+# The message dispatcher (message_dispatcher.py) sends these itself after
+# MOOD_REMINDER_HOUR; this cron is only needed when MESSAGE_DISPATCHER_MODE=off.
+# Reminders are keyed per user and day, so running both never sends twice.
 
 # Determine the API URL (use localhost for local dev, or your Railway URL for production)
 API_URL="${API_URL:-http://localhost:5000}"
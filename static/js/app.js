@@ -0,0 +1,11024 @@
+        // Script loading - v2026.01.29-SECURITY-FIX
+        let currentUser = null;
+        let currentUserRole = 'user';
+        let currentClinicianName = null; // Store assigned clinician's name
+        let csrfToken = null; // CSRF token for secure requests
+
+        // ========== DARK MODE / THEME SYSTEM ==========
+        function initTheme() {
+            // Check for saved theme preference or system preference
+            const savedTheme = localStorage.getItem('theme');
+            const systemPrefersDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
+
+            if (savedTheme === 'dark' || (!savedTheme && systemPrefersDark)) {
+                document.documentElement.setAttribute('data-theme', 'dark');
+                const toggle = document.getElementById('darkModeToggle');
+                if (toggle) toggle.checked = true;
+            }
+        }
+
+        function toggleDarkMode() {
+            const currentTheme = document.documentElement.getAttribute('data-theme');
+            const isDark = currentTheme === 'dark';
+            
+            // Toggle the theme
+            if (isDark) {
+                document.documentElement.removeAttribute('data-theme');
+                localStorage.setItem('theme', 'light');
+            } else {
+                document.documentElement.setAttribute('data-theme', 'dark');
+                localStorage.setItem('theme', 'dark');
+            }
+            
+            // Sync both toggles
+            const darkModeToggle = document.getElementById('darkModeToggle');
+            const authDarkModeToggle = document.getElementById('authDarkModeToggle');
+            
+            const newTheme = document.documentElement.getAttribute('data-theme');
+            const isNowDark = newTheme === 'dark';
+            
+            if (darkModeToggle) {
+                darkModeToggle.checked = isNowDark;
+            }
+            if (authDarkModeToggle) {
+                authDarkModeToggle.checked = isNowDark;
+            }
+        }
+        
+        // Initialize theme and set toggle state correctly
+        function initializeTheme() {
+            const savedTheme = localStorage.getItem('theme');
+            const systemPrefersDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
+            
+            // Determine if should be dark
+            const shouldBeDark = savedTheme === 'dark' || (!savedTheme && systemPrefersDark);
+            
+            // Apply theme to document
+            if (shouldBeDark) {
+                document.documentElement.setAttribute('data-theme', 'dark');
+            } else {
+                document.documentElement.removeAttribute('data-theme');
+            }
+            
+            // Set all toggle switches to correct state
+            const darkModeToggle = document.getElementById('darkModeToggle');
+            const authDarkModeToggle = document.getElementById('authDarkModeToggle');
+            
+            if (darkModeToggle) {
+                darkModeToggle.checked = shouldBeDark;
+            }
+            if (authDarkModeToggle) {
+                authDarkModeToggle.checked = shouldBeDark;
+            }
+        }
+
+        // Apply theme immediately on page load (before DOMContentLoaded)
+        (function() {
+            const savedTheme = localStorage.getItem('theme');
+            const systemPrefersDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
+            if (savedTheme === 'dark' || (!savedTheme && systemPrefersDark)) {
+                document.documentElement.setAttribute('data-theme', 'dark');
+            }
+        })();
+
+        // ========== PRODUCTION MODE: Suppress console logging ==========
+        // Set to true in production to hide debug info from browser console
+        const PRODUCTION_MODE = window.location.hostname !== 'localhost' && window.location.hostname !== '127.0.0.1';
+
+        if (PRODUCTION_MODE) {
+            // Store original console methods for critical errors only
+            const originalError = console.error;
+            console.log = function() {}; // Suppress logs
+            console.warn = function() {}; // Suppress warnings
+            console.error = function(...args) {
+                // Only log errors without sensitive details
+                if (args[0] && typeof args[0] === 'string' && !args[0].includes('token') && !args[0].includes('password')) {
+                    originalError.apply(console, ['[App Error]']);
+                }
+            };
+        }
+
+        // ========== SECURITY: HTML SANITIZATION ==========
+        // Prevents XSS attacks by escaping HTML special characters
+        function sanitizeHTML(str) {
+            if (str === null || str === undefined) return '';
+            const temp = document.createElement('div');
+            temp.textContent = str;
+            return temp.innerHTML;
+        }
+
+        // For displaying user content that should preserve some formatting (newlines only)
+        function sanitizeWithLineBreaks(str) {
+            return sanitizeHTML(str).replace(/\n/g, '<br>');
+        }
+
+        // ========== CSRF TOKEN HANDLING ==========
+        async function fetchCsrfToken() {
+            try {
+                const response = await fetch('/api/csrf-token');
+                const data = await response.json();
+                csrfToken = data.csrf_token;
+                console.log('CSRF token obtained');
+                return csrfToken;
+            } catch (error) {
+                console.error('Failed to fetch CSRF token:', error);
+                return null;
+            }
+        }
+
+        // Override fetch to automatically include CSRF token and handle errors
+        const originalFetch = window.fetch;
+        window.fetch = async function(url, options = {}) {
+            // Always send cookies (session, CSRF) for all requests
+            options.credentials = 'include';
+            // Ensure we have a CSRF token for non-GET requests
+            if (options.method && options.method.toUpperCase() !== 'GET') {
+                if (!csrfToken) {
+                    await fetchCsrfToken();
+                }
+                if (csrfToken) {
+                    options.headers = options.headers || {};
+                    if (options.headers instanceof Headers) {
+                        options.headers.set('X-CSRF-Token', csrfToken);
+                    } else {
+                        options.headers['X-CSRF-Token'] = csrfToken;
+                    }
+                }
+            }
+            try {
+                const response = await originalFetch(url, options);
+                return response;
+            } catch (networkError) {
+                // Handle network errors gracefully
+                console.error('Network error:', networkError.message);
+                // Return a mock response that won't break JSON parsing
+                return {
+                    ok: false,
+                    status: 0,
+                    statusText: 'Network Error',
+                    json: async () => ({ error: 'Connection failed. Please check your internet connection.' }),
+                    text: async () => 'Connection failed'
+                };
+            }
+        };
+
+        // Safe JSON parsing helper
+        async function safeParseJSON(response) {
+            try {
+                return await response.json();
+            } catch (parseError) {
+                console.error('JSON parse error');
+                return { error: 'Invalid response from server' };
+            }
+        }
+
+        // Fetch CSRF token on page load
+        fetchCsrfToken();
+        let selectedMoodValue = null;
+        let medications = [];
+        let currentAssessment = null;
+        let assessmentScores = [];
+        let tempLoginData = null; // Store login data for disclaimer flow
+
+        const speciesEmojis = {Dog: '🐶', Cat: '🐱', Rabbit: '🐰', Fox: '🦊', Panda: '🐼', Penguin: '🐧'};
+
+        // ========== HOME TAB CONSTANTS AND FUNCTIONS ==========
+
+        const DAILY_TASK_TYPES = [
+            { type: 'log_mood', label: '📊 Log your mood', icon: '📊' },
+            { type: 'practice_gratitude', label: '🙏 Write gratitude entry', icon: '🙏' },
+            { type: 'check_pet', label: '🐾 Care for your pet (feed & walk)', icon: '🐾' },
+            { type: 'breathing_exercise', label: '🫁 Start a breathing exercise', icon: '🫁' },
+            { type: 'therapy_session', label: '🤖 Chat with AI therapy', icon: '🤖' },
+            { type: 'affirmation', label: '💡 Get a positive affirmation', icon: '💡' }
+        ];
+
+        const MOTIVATIONAL_QUOTES = [
+            "Every day is a fresh start. You're doing great! 🌟",
+            "Small steps lead to big changes. Keep going! 💪",
+            "Your mental health matters. We're here for you. 💙",
+            "Progress, not perfection. You're on the right path. 🌈",
+            "Taking time for yourself is a sign of strength. ✨",
+            "You've got this. One moment at a time. 🌻",
+            "Be kind to yourself today. You deserve it. 💜",
+            "Every breath is a new beginning. 🌊",
+            "You are stronger than you know. 🦋",
+            "Today is full of possibilities. 🌅"
+        ];
+
+        async function loadHomeTabData() {
+            try {
+                const response = await fetch(`/api/home/data`, {
+                    method: 'GET',
+                    credentials: 'include', // Ensure session cookies are sent
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                if (response.ok) {
+                    const data = await response.json();
+                    renderHomeTab(data);
+                } else {
+                    // Show static content on error
+                    renderHomeTabStatic();
+                }
+            } catch (error) {
+                console.error('Error loading home data:', error);
+                renderHomeTabStatic();
+            }
+        }
+
+        function renderHomeTab(data) {
+            // Welcome message
+            const welcomeEl = document.getElementById('homeWelcomeMessage');
+            const lastLoginEl = document.getElementById('homeLastLogin');
+
+            if (welcomeEl) {
+                welcomeEl.textContent = `Welcome back, ${currentUser}!`;
+            }
+
+            if (lastLoginEl) {
+                if (data.last_login) {
+                    const lastDate = new Date(data.last_login);
+                    lastLoginEl.textContent = `Last visit: ${lastDate.toLocaleDateString('en-GB', {
+                        weekday: 'long', year: 'numeric', month: 'long', day: 'numeric',
+                        hour: '2-digit', minute: '2-digit'
+                    })}`;
+                } else {
+                    lastLoginEl.textContent = "Welcome to Healing Space UK!";
+                }
+            }
+
+            // Motivational quote
+            const quoteEl = document.getElementById('homeMotivationalQuote');
+            if (quoteEl) {
+                quoteEl.textContent = MOTIVATIONAL_QUOTES[Math.floor(Math.random() * MOTIVATIONAL_QUOTES.length)];
+            }
+
+            // Daily tasks
+            const completedTasks = data.daily_tasks || [];
+            renderDailyTasks(completedTasks);
+
+            // Streak
+            const streakEl = document.getElementById('streakCount');
+            if (streakEl && data.streak) {
+                streakEl.textContent = data.streak.current || 0;
+            }
+
+            // Pet info
+            if (data.pet) {
+                const petNameEl = document.getElementById('homePetName');
+                const petCoinsEl = document.getElementById('homePetCoins');
+                const petXPEl = document.getElementById('homePetXP');
+                const petEmojiEl = document.getElementById('homePetEmoji');
+
+                if (petNameEl) petNameEl.textContent = data.pet.name || 'Your Pet';
+                if (petCoinsEl) petCoinsEl.textContent = data.pet.coins || 0;
+                if (petXPEl) petXPEl.textContent = data.pet.xp || 0;
+                // Pet emoji would need species info - use generic for now
+                if (petEmojiEl) petEmojiEl.textContent = '🐾';
+            }
+        }
+
+        function renderHomeTabStatic() {
+            // Render static content when API fails
+            const welcomeEl = document.getElementById('homeWelcomeMessage');
+            if (welcomeEl) {
+                welcomeEl.textContent = `Welcome, ${currentUser}!`;
+            }
+
+            const lastLoginEl = document.getElementById('homeLastLogin');
+            if (lastLoginEl) {
+                lastLoginEl.textContent = "Ready to start your wellness journey?";
+            }
+
+            const quoteEl = document.getElementById('homeMotivationalQuote');
+            if (quoteEl) {
+                quoteEl.textContent = MOTIVATIONAL_QUOTES[Math.floor(Math.random() * MOTIVATIONAL_QUOTES.length)];
+            }
+
+            renderDailyTasks([]);
+        }
+
+        function renderDailyTasks(completedTasks) {
+            const container = document.getElementById('dailyTasksList');
+            if (!container) return;
+
+            const completedTypes = completedTasks.map(t => t.task_type);
+            const completedCount = completedTypes.length;
+
+            // Update progress bar
+            const progressBar = document.getElementById('dailyProgressBar');
+            const progressText = document.getElementById('dailyProgressText');
+            const percentage = (completedCount / DAILY_TASK_TYPES.length) * 100;
+
+            if (progressBar) progressBar.style.width = `${percentage}%`;
+            if (progressText) progressText.textContent = `${completedCount}/${DAILY_TASK_TYPES.length} completed`;
+
+            // Render task list (always visible, interactive)
+            container.innerHTML = DAILY_TASK_TYPES.map(task => {
+                const isCompleted = completedTypes.includes(task.type);
+                return `
+                    <div class="daily-task-item ${isCompleted ? 'completed' : ''}" onclick="navigateToTask('${task.type}')" tabindex="0" role="button" aria-pressed="${isCompleted}">
+                        <span class="task-checkbox">${isCompleted ? '✅' : '⬜'}</span>
+                        <span class="task-label">${task.label}</span>
+                        <span class="task-status">${isCompleted ? 'Done' : 'To do'}</span>
+                    </div>
+                `;
+            }).join('');
+
+            // Always show streak and progress
+            const streakDisplay = document.getElementById('streakDisplay');
+            if (streakDisplay) streakDisplay.style.display = 'block';
+
+            // Check for daily completion celebration
+            if (completedCount === DAILY_TASK_TYPES.length) {
+                showDailyCompletionCelebration();
+            }
+        }
+
+        function navigateToTask(taskType) {
+            if (taskType === 'check_pet') {
+                switchTab('pet', document.querySelector('[onclick*="pet"]'));
+                showPetTaskInstructions();
+            } else if (taskType === 'breathing_exercise') {
+                switchTab('cbt', document.querySelector('[onclick*="cbt"]'));
+                showBreathingTaskInstructions();
+            } else if (taskType === 'affirmation') {
+                showAffirmationModal();
+            } else {
+                // Default: switch to mapped tab
+                const taskTabMap = {
+                    'log_mood': 'mood',
+                    'practice_gratitude': 'gratitude',
+                    'therapy_session': 'therapy'
+                };
+                const tabName = taskTabMap[taskType];
+                if (tabName) {
+                    const tabBtn = document.querySelector(`[onclick*="${tabName}"]`);
+                    switchTab(tabName, tabBtn);
+                }
+            }
+        }
+
+        // --- PET TASK LOGIC ---
+        let petTaskState = { fed: false, walked: false };
+        function showPetTaskInstructions() {
+            let msg = '';
+            if (!petTaskState.fed && !petTaskState.walked) {
+                msg = 'To complete this task, you must feed and walk your pet.';
+            } else if (!petTaskState.fed) {
+                msg = 'Feed your pet to complete this part of the task.';
+            } else if (!petTaskState.walked) {
+                msg = 'Walk your pet to complete this part of the task.';
+            } else {
+                msg = 'Pet task complete!';
+            }
+            let el = document.getElementById('petTaskInstructions');
+            if (!el) {
+                el = document.createElement('div');
+                el.id = 'petTaskInstructions';
+                el.style.margin = '12px 0';
+                el.style.color = '#888';
+                const petTab = document.getElementById('petTab');
+                if (petTab) petTab.insertBefore(el, petTab.firstChild);
+            }
+            el.innerText = msg;
+            // Add feed/walk buttons if not complete
+            let btns = document.getElementById('petTaskBtns');
+            if (!btns) {
+                btns = document.createElement('div');
+                btns.id = 'petTaskBtns';
+                btns.style.margin = '8px 0';
+                const petTab = document.getElementById('petTab');
+                if (petTab) petTab.insertBefore(btns, el.nextSibling);
+            }
+            btns.innerHTML = '';
+            if (!petTaskState.fed) {
+                const feedBtn = document.createElement('button');
+                feedBtn.innerText = 'Feed Pet';
+                feedBtn.className = 'btn btn-secondary';
+                feedBtn.onclick = function() { petTaskState.fed = true; showPetTaskInstructions(); checkPetTaskComplete(); };
+                btns.appendChild(feedBtn);
+            }
+            if (!petTaskState.walked) {
+                const walkBtn = document.createElement('button');
+                walkBtn.innerText = 'Walk Pet';
+                walkBtn.className = 'btn btn-secondary';
+                walkBtn.style.marginLeft = '8px';
+                walkBtn.onclick = function() { petTaskState.walked = true; showPetTaskInstructions(); checkPetTaskComplete(); };
+                btns.appendChild(walkBtn);
+            }
+            if (petTaskState.fed && petTaskState.walked) {
+                btns.innerHTML = '<span style="color: #27ae60;">✅ Pet cared for today!</span>';
+            }
+        }
+        function checkPetTaskComplete() {
+            if (petTaskState.fed && petTaskState.walked) {
+                markDailyTaskComplete('check_pet');
+            }
+        }
+
+        // --- BREATHING TASK LOGIC ---
+        let breathingTaskStarted = false;
+        function showBreathingTaskInstructions() {
+            let el = document.getElementById('breathingTaskInstructions');
+            if (!el) {
+                el = document.createElement('div');
+                el.id = 'breathingTaskInstructions';
+                el.style.margin = '12px 0';
+                el.style.color = '#888';
+                const cbtTab = document.getElementById('cbtTab');
+                if (cbtTab) cbtTab.insertBefore(el, cbtTab.firstChild);
+            }
+            if (!breathingTaskStarted) {
+                el.innerText = 'Click below to start a breathing exercise.';
+                let btn = document.getElementById('breathingTaskStartBtn');
+                if (!btn) {
+                    btn = document.createElement('button');
+                    btn.id = 'breathingTaskStartBtn';
+                    btn.className = 'btn btn-secondary';
+                    btn.innerText = 'Start Breathing Exercise';
+                    btn.onclick = function() { breathingTaskStarted = true; showBreathingTaskInstructions(); markDailyTaskComplete('breathing_exercise'); };
+                    el.parentNode.insertBefore(btn, el.nextSibling);
+                }
+                btn.style.display = '';
+            } else {
+                el.innerText = 'Breathing exercise started!';
+                let btn = document.getElementById('breathingTaskStartBtn');
+                if (btn) btn.style.display = 'none';
+            }
+        }
+
+        // --- AFFIRMATION TASK LOGIC ---
+        const POSITIVE_AFFIRMATIONS = [
+            'You are capable of amazing things.',
+            'Every day is a fresh start.',
+            'You have the strength to overcome challenges.',
+            'You are worthy of love and respect.',
+            'Your feelings are valid.',
+            'You are making progress, even if it’s slow.',
+            'You bring value to those around you.',
+            'You can handle whatever comes your way.',
+            'You are enough just as you are.',
+            'You have the power to create change.',
+            'You are growing stronger every day.',
+            'You deserve peace and happiness.',
+            'You are allowed to take things one step at a time.',
+            'Your efforts matter.',
+            'You are learning and evolving.',
+            'You have survived difficult days before.',
+            'You are doing the best you can right now.',
+            'Your voice deserves to be heard.',
+            'You are resilient and brave.',
+            'You are not defined by your mistakes.',
+            'You deserve kindness, especially from yourself.',
+            'Your future holds new possibilities.',
+            'You are allowed to rest without guilt.',
+            'You are worthy of care and compassion.',
+            'You have the power to change your story.',
+            'You are capable of healing.',
+            'Your thoughts do not control you.',
+            'You can choose progress over perfection.',
+            'You are allowed to ask for help.',
+            'You matter more than you realize.',
+            'You bring light into the world.',
+            'You are becoming the person you need.',
+            'You deserve patience and understanding.',
+            'You are safe in this moment.',
+            'You can face today with courage.',
+            'Your struggles do not make you weak.',
+            'You are worthy of feeling proud of yourself.',
+            'You are allowed to grow at your own pace.',
+            'You have inner strength you haven’t fully discovered yet.',
+            'You are not alone in this journey.',
+            'You deserve a future full of hope.',
+            'You are capable of positive change.',
+            'You can learn from hard moments.',
+            'You deserve to feel calm and secure.',
+            'You are more than your fears.',
+            'You are building a better tomorrow.',
+            'You have control over your choices.',
+            'You are allowed to feel and still move forward.',
+            'You deserve to be treated with respect.',
+            'You are stronger than yesterday.',
+            'You are worthy of good things.',
+            'You are allowed to set boundaries.',
+            'You can trust yourself.',
+            'You are healing even when it feels slow.',
+            'You deserve to feel at peace with who you are.',
+            'You are brave for trying.',
+            'You are becoming more confident each day.',
+            'You are allowed to take up space.',
+            'You deserve a life filled with meaning.',
+            'You are enough, exactly as you are right now.',
+
+        ];
+        function showAffirmationModal() {
+            const affirmation = POSITIVE_AFFIRMATIONS[Math.floor(Math.random() * POSITIVE_AFFIRMATIONS.length)];
+            alert('Positive Affirmation:\n\n' + affirmation);
+            markDailyTaskComplete('affirmation');
+        }
+
+        async function markDailyTaskComplete(taskType) {
+            try {
+                const response = await fetch('/api/daily-tasks/complete', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({
+                        task_type: taskType,
+                        username: currentUser
+                    })
+                });
+
+                if (response.ok) {
+                    const data = await response.json();
+                    // Refresh home tab if on home tab
+                    if (document.getElementById('homeTab').classList.contains('active')) {
+                        loadHomeTabData();
+                    }
+
+                    if (data.bonus_awarded) {
+                        showDailyCompletionCelebration();
+                    }
+                }
+            } catch (error) {
+                console.error('Error marking task complete:', error);
+            }
+        }
+
+        function showDailyCompletionCelebration() {
+            // Show celebration for completing all daily tasks
+            const streakDisplay = document.getElementById('streakDisplay');
+            if (streakDisplay) {
+                streakDisplay.innerHTML = `
+                    <span class="streak-icon">🎉</span>
+                    All tasks complete! +50 coins, +100 XP
+                    <br><span style="font-size: 14px; margin-top: 5px; display: block;">
+                        🔥 <span class="streak-count" id="streakCount">0</span> day streak
+                    </span>
+                `;
+                streakDisplay.style.background = 'linear-gradient(135deg, #27ae60, #2ecc71)';
+
+                // Reload to get updated streak
+                setTimeout(() => loadHomeTabData(), 1000);
+            }
+        }
+
+        async function submitFeedback() {
+            const category = document.getElementById('feedbackCategory').value;
+            const message = document.getElementById('feedbackMessage').value.trim();
+            const statusEl = document.getElementById('feedbackStatus');
+
+            if (!message) {
+                if (statusEl) {
+                    statusEl.textContent = '⚠️ Please enter a message';
+                    statusEl.style.display = 'block';
+                    statusEl.style.color = 'var(--warning-color)';
+                }
+                return;
+            }
+
+            try {
+                const response = await fetch('/api/feedback', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({
+                        category,
+                        message,
+                        username: currentUser
+                    })
+                });
+
+                if (response.ok) {
+                    if (statusEl) {
+                        statusEl.textContent = '✅ Thank you for your feedback!';
+                        statusEl.style.display = 'block';
+                        statusEl.style.color = 'var(--success-color)';
+                    }
+                    document.getElementById('feedbackMessage').value = '';
+
+                    // Hide success message after 3 seconds
+                    setTimeout(() => {
+                        if (statusEl) statusEl.style.display = 'none';
+                    }, 3000);
+                } else {
+                    const data = await response.json();
+                    if (statusEl) {
+                        statusEl.textContent = '❌ ' + (data.error || 'Error submitting feedback');
+                        statusEl.style.display = 'block';
+                        statusEl.style.color = 'var(--danger-color)';
+                    }
+                }
+            } catch (error) {
+                console.error('Feedback error:', error);
+                if (statusEl) {
+                    statusEl.textContent = '❌ Connection error. Please try again.';
+                    statusEl.style.display = 'block';
+                    statusEl.style.color = 'var(--danger-color)';
+                }
+            }
+        }
+
+        function showQuickTips() {
+            const panel = document.getElementById('quickTipsPanel');
+            if (panel) {
+                panel.style.display = panel.style.display === 'none' ? 'block' : 'none';
+            }
+        }
+
+        // ========== END HOME TAB FUNCTIONS ==========
+
+        // ========== CHANGELOG - Add new updates at the TOP ==========
+        const APP_UPDATES = [
+            {
+                date: '2026-01-31',
+                version: '22.1',
+                title: 'fix: Critical save/load API endpoints and AI memory integration',
+                changes: [
+                    'fix: Critical save/load API endpoints and AI memory integration',
+                ]
+            },
+            {
+                date: '2026-01-31',
+                version: '22.0',
+                title: 'fix: Resolve duplicate tools and save/load issues',
+                changes: [
+                    'fix: Resolve duplicate tools and save/load issues',
+                ]
+            },
+            {
+                date: '2026-01-31',
+                version: '21.9',
+                title: 'feat: Phase 2 gamification - badges, mood tracking, and streaks',
+                changes: [
+                    'feat: Phase 2 gamification - badges, mood tracking, and streaks',
+                ]
+            },
+            {
+                date: '2026-01-31',
+                version: '21.8',
+                title: 'feat: Phase 1 - CBT Tools Gamification (Emoji Moods, Confetti, Pet Rewards)',
+                changes: [
+                    'feat: Phase 1 - CBT Tools Gamification (Emoji Moods, Confetti, Pet Rewards)',
+                ]
+            },
+            {
+                date: '2026-01-31',
+                version: '21.7',
+                title: 'version number update',
+                changes: [
+                    'version number update',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '21.6',
+                title: 'fix: Remove all remaining duplicate Flask route functions',
+                changes: [
+                    'fix: Remove all remaining duplicate Flask route functions',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '21.5',
+                title: 'fix: Remove duplicate function definitions causing Flask route conflicts',
+                changes: [
+                    'fix: Remove duplicate function definitions causing Flask route conflicts',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '21.4',
+                title: 'fix: CBT tools dashboard backend and AI memory integration',
+                changes: [
+                    'fix: CBT tools dashboard backend and AI memory integration',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '21.3',
+                title: 'Fix: syntax error in POSITIVE_AFFIRMATIONS array, CBT tools dashboard and per...',
+                changes: [
+                    'Fix: syntax error in POSITIVE_AFFIRMATIONS array, CBT tools dashboard and persistence, ensure AI listens to all tools',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '21.2',
+                title: 'New CBT tools added',
+                changes: [
+                    'New CBT tools added',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '21.1',
+                title: 'fix: Daily Tasks Errors',
+                changes: [
+                    'fix: Daily Tasks Errors',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '21.0',
+                title: 'Version History Update v1',
+                changes: [
+                    'Version History Update v1.1',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.9',
+                title: 'Version History Update',
+                changes: [
+                    'Version History Update',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.8',
+                title: 'Home Page Bug Fix 1',
+                changes: [
+                    'Home Page Bug Fix 1.0',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.7',
+                title: 'fix: add detailed error logging and improved error display for mood and grati...',
+                changes: [
+                    'fix: add detailed error logging and improved error display for mood and gratitude logging',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.6',
+                title: 'feat: Home tab, daily tasks, feedback, and polish for Healing Space UK',
+                changes: [
+                    'feat: Home tab, daily tasks, feedback, and polish for Healing Space UK',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.5',
+                title: 'Fix comprehensive dark mode for chat, safety, insights, appointments, and abo...',
+                changes: [
+                    'Fix comprehensive dark mode for chat, safety, insights, appointments, and about me tabs',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.4',
+                title: 'Fix dark mode backgrounds for all tabs and dashboard cards',
+                changes: [
+                    'Fix dark mode backgrounds for all tabs and dashboard cards',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.3',
+                title: 'Update app header branding to Healing Space UK in web UI',
+                changes: [
+                    'Update app header branding to Healing Space UK in web UI',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.2',
+                title: 'Update web UI branding to Healing Space UK',
+                changes: [
+                    'Update web UI branding to Healing Space UK',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.1',
+                title: 'Update all branding to Healing Space UK',
+                changes: [
+                    'Update all branding to Healing Space UK',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '20.0',
+                title: 'docs update',
+                changes: [
+                    'docs update',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.9',
+                title: 'Fix dark/light theme for all tabs and cards',
+                changes: [
+                    'Fix dark/light theme for all tabs and cards',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.8',
+                title: 'Crash bug fix FlaskApp location incorrect',
+                changes: [
+                    'Crash bug fix FlaskApp location incorrect',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.7',
+                title: 'UI FIX',
+                changes: [
+                    'UI FIX',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.6',
+                title: 'Add full CRUD endpoints, audit logging, and AI memory integration for all new...',
+                changes: [
+                    'Add full CRUD endpoints, audit logging, and AI memory integration for all new CBT tools (breathing, relaxation, sleep, core belief, exposure, problem-solving, coping cards, self-compassion, values, goals)',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.5',
+                title: 'feat: Add site-wide dark mode with toggle in Settings',
+                changes: [
+                    'feat: Add site-wide dark mode with toggle in Settings',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.4',
+                title: 'feat: Discord-style community with channels, threads, and pinned posts',
+                changes: [
+                    'feat: Discord-style community with channels, threads, and pinned posts',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.3',
+                title: 'version_history_update',
+                changes: [
+                    'version_history_update',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.2',
+                title: 'feat: Add category system, inline replies, and auto-refresh to community',
+                changes: [
+                    'feat: Add category system, inline replies, and auto-refresh to community',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.1',
+                title: 'feat: add reply deletion and multiple reaction emojis',
+                changes: [
+                    'feat: add reply deletion and multiple reaction emojis',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '19.0',
+                title: 'fix: add missing flagged/flag_reason to ContentModerator',
+                changes: [
+                    'fix: add missing flagged/flag_reason to ContentModerator',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '18.9',
+                title: 'fix: pet database persistence and content moderator',
+                changes: [
+                    'fix: pet database persistence and content moderator',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '18.8',
+                title: 'fix:PT3 ensure pet table exists before all pet DB access (robust pet features...',
+                changes: [
+                    'fix:PT3 ensure pet table exists before all pet DB access (robust pet features after Railway reset)',
+                ]
+            },
+            {
+                date: '2026-01-30',
+                version: '18.7',
+                title: 'fix:PT2 ensure pet table exists before all pet DB access (robust pet features...',
+                changes: [
+                    'fix:PT2 ensure pet table exists before all pet DB access (robust pet features after Railway reset)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '18.6',
+                title: 'fix: ensure pet table exists before all pet DB access (robust pet features af...',
+                changes: [
+                    'fix: ensure pet table exists before all pet DB access (robust pet features after Railway reset)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '18.5',
+                title: 'Update audit',
+                changes: [
+                    'Update audit.md - Phase 6 complete (88% resolution rate)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '18.4',
+                title: 'Phase 6: Fix Medium (P2) security and code quality issues',
+                changes: [
+                    'Phase 6: Fix Medium (P2) security and code quality issues',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '18.3',
+                title: 'Phase 6: Fix all Critical (P0) and High (P1) security issues',
+                changes: [
+                    'Phase 6: Fix all Critical (P0) and High (P1) security issues',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '18.2',
+                title: 'Phase 6: Fresh security audit - 16 new issues identified',
+                changes: [
+                    'Phase 6: Fresh security audit - 16 new issues identified',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '18.1',
+                title: 'Merge remote changes and resolve VERSION_HISTORY conflict',
+                changes: [
+                    'Merge remote changes and resolve VERSION_HISTORY conflict',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '18.0',
+                title: 'Fix: AI summary endpoint - remove non-existent created_at column from users q...',
+                changes: [
+                    'Fix: AI summary endpoint - remove non-existent created_at column from users query',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.9',
+                title: 'Phase 5: Web/Android audit - Fix pet endpoints, duplicate routes, exception l...',
+                changes: [
+                    'Phase 5: Web/Android audit - Fix pet endpoints, duplicate routes, exception leaks',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.8',
+                title: 'Phase 5: Web/Android audit - Fix pet endpoints, duplicate routes, exception l...',
+                changes: [
+                    'Phase 5: Web/Android audit - Fix pet endpoints, duplicate routes, exception leaks',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.7',
+                title: 'fix: Harden /api/professional/ai-summary endpoint (null checks, safe defaults...',
+                changes: [
+                    'fix: Harden /api/professional/ai-summary endpoint (null checks, safe defaults, debug logging, robust fallback)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.6',
+                title: 'Fix: Add None checks to AI summary prompt string slicing',
+                changes: [
+                    'Fix: Add None checks to AI summary prompt string slicing',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.5',
+                title: 'fix: Set Updates tab as default for changelog debug (shows changelog on load)',
+                changes: [
+                    'fix: Set Updates tab as default for changelog debug (shows changelog on load)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.4',
+                title: 'Add null safety and error logging to AI summary endpoint',
+                changes: [
+                    'Add null safety and error logging to AI summary endpoint',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.3',
+                title: 'Enhance AI clinical summary and fix patient charts',
+                changes: [
+                    'Enhance AI clinical summary and fix patient charts',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.2',
+                title: 'Fix: Add missing clinician parameter to patient detail endpoint',
+                changes: [
+                    'Fix: Add missing clinician parameter to patient detail endpoint',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.1',
+                title: 'Update VERSION_HISTORY',
+                changes: [
+                    'Update VERSION_HISTORY.txt with today\'s fixes',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '17.0',
+                title: 'Fix: Clinician dashboard patient data and AI insights',
+                changes: [
+                    'Fix: Clinician dashboard patient data and AI insights',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.9',
+                title: 'Update VERSION_HISTORY',
+                changes: [
+                    'Update VERSION_HISTORY.txt with recent commits',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.8',
+                title: 'Fix: loadInsights sends role=clinician for clinician users (enables clinician...',
+                changes: [
+                    'Fix: loadInsights sends role=clinician for clinician users (enables clinician data/AI insights)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.7',
+                title: 'Fix: /api/insights always returns avg_mood, avg_sleep, and trend (prevents fr...',
+                changes: [
+                    'Fix: /api/insights always returns avg_mood, avg_sleep, and trend (prevents frontend errors on empty data)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.6',
+                title: 'Fix: remove syntax error in /api/pet/status endpoint (no nested try)',
+                changes: [
+                    'Fix: remove syntax error in /api/pet/status endpoint (no nested try)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.5',
+                title: 'Chore: trigger Railway deploy (trivial comment change)',
+                changes: [
+                    'Chore: trigger Railway deploy (trivial comment change)',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.4',
+                title: 'Fix: Insights always sends prompt, pet endpoints handle missing user/pet, fro...',
+                changes: [
+                    'Fix: Insights always sends prompt, pet endpoints handle missing user/pet, frontend sends username for pet reward',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.3',
+                title: 'UI: Add show/hide toggle for PIN fields on all login forms',
+                changes: [
+                    'UI: Add show/hide toggle for PIN fields on all login forms',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.2',
+                title: 'Frontend: always use credentials: include in fetch for CSRF/session reliability',
+                changes: [
+                    'Frontend: always use credentials: include in fetch for CSRF/session reliability',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.1',
+                title: 'Fix CSRF token endpoint: resolve secrets shadowing, use stdlib secrets for to...',
+                changes: [
+                    'Fix CSRF token endpoint: resolve secrets shadowing, use stdlib secrets for token generation, ensure session cookie set',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '16.0',
+                title: 'Add Phase 4 UX enhancements: onboarding, accessibility, mobile',
+                changes: [
+                    'Add Phase 4 UX enhancements: onboarding, accessibility, mobile',
+                ]
+            },
+            {
+                date: '2026-01-29',
+                version: '15.9',
+                title: 'Set up venv, install all dependencies, playwright, and fixed test environment',
+                changes: [
+                    'Set up venv, install all dependencies, playwright, and fixed test environment. Ready for further dev and testing.',
+                ]
+            },
+            {
+                date: '2026-01-28',
+                version: '15.8',
+                title: 'Fix TherapistAI indentation error (production boot fix)',
+                changes: [
+                    'Fix TherapistAI indentation error (production boot fix)',
+                ]
+            },
+            {
+                date: '2026-01-28',
+                version: '15.7',
+                title: 'Add get_insight method to TherapistAI for insights endpoint compatibility',
+                changes: [
+                    'Add get_insight method to TherapistAI for insights endpoint compatibility',
+                ]
+            },
+            {
+                date: '2026-01-28',
+                version: '15.6',
+                title: 'Refactor insights endpoint: custom date range, AI prompt, clinician/patient n...',
+                changes: [
+                    'Refactor insights endpoint: custom date range, AI prompt, clinician/patient narrative',
+                ]
+            },
+            {
+                date: '2026-01-28',
+                version: '15.5',
+                title: 'Updated AUDIT',
+                changes: [
+                    'Updated AUDIT.md with dynamic audit results',
+                ]
+            },
+            {
+                date: '2026-01-28',
+                version: '15.4',
+                title: 'Rollback: restore project to v1',
+                changes: [
+                    'Rollback: restore project to v1.0.46 (2026-01-26) - Fix chat input layout for mobile',
+                ]
+            },
+            {
+                date: '2026-01-26',
+                version: '15.3',
+                title: 'Fix chat input layout for mobile - stack textarea above buttons',
+                changes: [
+                    'Fix chat input layout for mobile - stack textarea above buttons',
+                ]
+            },
+            {
+                date: '2026-01-26',
+                version: '15.2',
+                title: 'Add Updates tab, notification management, and chat improvements',
+                changes: [
+                    'Add Updates tab, notification management, and chat improvements',
+                ]
+            },
+            {
+                date: '2026-01-26',
+                version: '15.1',
+                title: 'Improve AI chat: voice input, thinking animation, natural responses',
+                changes: [
+                    'Improve AI chat: voice input, thinking animation, natural responses',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '15.0',
+                title: 'message bugs update',
+                changes: [
+                    'message bugs update',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '14.9',
+                title: 'API update',
+                changes: [
+                    'API update',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '14.8',
+                title: 'Remove package',
+                changes: [
+                    'Remove package.json to fix Railway Python deploy (prevent npm ci)',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '14.7',
+                title: 'Fix Railway deploy: allow pip install in Nixpacks immutable env',
+                changes: [
+                    'Fix Railway deploy: allow pip install in Nixpacks immutable env',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '14.6',
+                title: 'Add nixpacks',
+                changes: [
+                    'Add nixpacks.toml to force Python dependency install on Railway',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '14.5',
+                title: 'Add mobile app (Capacitor) and deployment documentation',
+                changes: [
+                    'Add mobile app (Capacitor) and deployment documentation',
+                ]
+            },
+            {
+                date: '2026-01-24',
+                version: '14.4',
+                title: 'Major update: Fix database concurrency, user deletion, and messaging system',
+                changes: [
+                    'Major update: Fix database concurrency, user deletion, and messaging system',
+                ]
+            },
+            {
+                date: '2026-01-24',
+                version: '14.3',
+                title: 'Add developer dashboard',
+                changes: [
+                    'Add developer dashboard',
+                ]
+            },
+            {
+                date: '2026-01-23',
+                version: '14.2',
+                title: 'Add developer dashboard',
+                changes: [
+                    'Add developer dashboard',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '14.1',
+                title: 'Add api',
+                changes: [
+                    'Add api.py deep-audit and update roadmap with endpoint mapping and migration plan',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '14.0',
+                title: 'Update ROADMAP',
+                changes: [
+                    'Update ROADMAP.md with detailed file-by-file audit and next steps (2026-01-25)',
+                ]
+            },
+            {
+                date: '2026-01-25',
+                version: '13.9',
+                title: 'Add roadmap and index for mobile app development',
+                changes: [
+                    'Add roadmap and index for mobile app development',
+                ]
+            },
+            {
+                date: '2026-01-24',
+                version: '13.8',
+                title: 'docs: add Additional Features & Roadmap under future updates and ideas (2026-...',
+                changes: [
+                    'docs: add Additional Features & Roadmap under future updates and ideas (2026-01-24)',
+                ]
+            },
+            {
+                date: '2026-01-24',
+                version: '13.7',
+                title: 'docs: update repository README and documentation index to reflect current fea...',
+                changes: [
+                    'docs: update repository README and documentation index to reflect current features and usage (2026-01-24)',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '13.6',
+                title: 'legal: add role-specific disclaimers with comprehensive UK legal protection',
+                changes: [
+                    'legal: add role-specific disclaimers with comprehensive UK legal protection',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '13.5',
+                title: 'docs: strengthen pitch—emphasize AI bridging gap between sessions and patient...',
+                changes: [
+                    'docs: strengthen pitch—emphasize AI bridging gap between sessions and patient continuity',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '13.4',
+                title: 'docs: make clinician/patient guides website-only (remove developer instructions)',
+                changes: [
+                    'docs: make clinician/patient guides website-only (remove developer instructions)',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '13.3',
+                title: 'docs: add non-technical web access guide and surface it in clinician/patient ...',
+                changes: [
+                    'docs: add non-technical web access guide and surface it in clinician/patient guides',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '13.2',
+                title: 'ci: stabilize workflow, disable pytest plugin autoload, set test env vars',
+                changes: [
+                    'ci: stabilize workflow, disable pytest plugin autoload, set test env vars',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '13.1',
+                title: 'chore: timezone-aware datetimes; optional browser smoke test + CI step',
+                changes: [
+                    'chore: timezone-aware datetimes; optional browser smoke test + CI step',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '13.0',
+                title: 'fix: robust FHIR export handling; add integration chat+FHIR tests; add CI wor...',
+                changes: [
+                    'fix: robust FHIR export handling; add integration chat+FHIR tests; add CI workflow',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '12.9',
+                title: 'chore: normalize timestamp queries, fix analytics; tests passing',
+                changes: [
+                    'chore: normalize timestamp queries, fix analytics; tests passing',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '12.8',
+                title: 'fix(clinician): show appointments in patient dashboard; add attendance controls',
+                changes: [
+                    'fix(clinician): show appointments in patient dashboard; add attendance controls',
+                ]
+            },
+            {
+                date: '2026-01-22',
+                version: '12.7',
+                title: 'feat: appointment attendance, notification fixes, deploy automation',
+                changes: [
+                    'feat: appointment attendance, notification fixes, deploy automation',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '12.6',
+                title: 'Expand pet game: mini-games, mood, journal, daily challenges, healthy habit r...',
+                changes: [
+                    'Expand pet game: mini-games, mood, journal, daily challenges, healthy habit rewards, and bugfixes. All tests passing.',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '12.5',
+                title: 'Fix patient analytics mood query: use entrestamp/mood_val instead of timestam...',
+                changes: [
+                    'Fix patient analytics mood query: use entrestamp/mood_val instead of timestamp/mood_score',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '12.4',
+                title: 'Remove Analytics tab, redesign Appointments with calendar views (month/week/d...',
+                changes: [
+                    'Remove Analytics tab, redesign Appointments with calendar views (month/week/day) for scalability',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '12.3',
+                title: 'Fix active patient tracking: update last_login on login, add clickable active...',
+                changes: [
+                    'Fix active patient tracking: update last_login on login, add clickable active count with details modal',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '12.2',
+                title: 'Fix clinical_scales column names (scale_name/score not scale_type/total_score)',
+                changes: [
+                    'Fix clinical_scales column names (scale_name/score not scale_type/total_score)',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '12.1',
+                title: 'Add analytics debug endpoint and refresh button',
+                changes: [
+                    'Add analytics debug endpoint and refresh button',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '12.0',
+                title: 'Add documentation for Railway database wipe',
+                changes: [
+                    'Add documentation for Railway database wipe',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.9',
+                title: 'Add admin database wipe endpoint and web interface for Railway',
+                changes: [
+                    'Add admin database wipe endpoint and web interface for Railway',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.8',
+                title: 'Add detailed logging to auth endpoints and update version to v2026',
+                changes: [
+                    'Add detailed logging to auth endpoints and update version to v2026.01.19.5',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.7',
+                title: 'Fix password reset email error handling - make SMTP failures graceful',
+                changes: [
+                    'Fix password reset email error handling - make SMTP failures graceful',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.6',
+                title: 'Add 2FA verification system for signup with email and SMS support',
+                changes: [
+                    'Add 2FA verification system for signup with email and SMS support',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.5',
+                title: 'database wipe 3',
+                changes: [
+                    'database wipe 3.3.5',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.4',
+                title: 'Fix alerts query to use status column and add DOM render delay for analytics ...',
+                changes: [
+                    'Fix alerts query to use status column and add DOM render delay for analytics load',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.3',
+                title: 'Add comprehensive logging for analytics dashboard and auto-load on clinician ...',
+                changes: [
+                    'Add comprehensive logging for analytics dashboard and auto-load on clinician login',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.2',
+                title: 'Add migration for chat_session_id column and improve chat session creation er...',
+                changes: [
+                    'Add migration for chat_session_id column and improve chat session creation error handling',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.1',
+                title: 'Add comprehensive error handling to AI chat endpoint - better debugging and c...',
+                changes: [
+                    'Add comprehensive error handling to AI chat endpoint - better debugging and clearer error messages',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '11.0',
+                title: 'Fix analytics display handling null values, add patient notification when app...',
+                changes: [
+                    'Fix analytics display handling null values, add patient notification when appointment cancelled, therapy notes already timestamped',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '10.9',
+                title: 'Restructure clinician dashboard: Overview shows only 3 stat cards, charts mov...',
+                changes: [
+                    'Restructure clinician dashboard: Overview shows only 3 stat cards, charts moved to Analytics tab',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '10.8',
+                title: 'Fix analytics dashboard patient counting queries',
+                changes: [
+                    'Fix analytics dashboard patient counting queries',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '10.7',
+                title: 'Add organized subtabs for patient detail view',
+                changes: [
+                    'Add organized subtabs for patient detail view',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '10.6',
+                title: 'Reorganize clinician dashboard with organized subtabs',
+                changes: [
+                    'Reorganize clinician dashboard with organized subtabs',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '10.5',
+                title: 'DB quick update',
+                changes: [
+                    'DB quick update',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '10.4',
+                title: 'Fix login error handling and appointment display issues',
+                changes: [
+                    'Fix login error handling and appointment display issues',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '10.3',
+                title: 'Add clinician analytics dashboard, report generator, and patient search features',
+                changes: [
+                    'Add clinician analytics dashboard, report generator, and patient search features',
+                ]
+            },
+            {
+                date: '2026-01-19',
+                version: '10.2',
+                title: 'docs: Add comprehensive Android app conversion guide',
+                changes: [
+                    'docs: Add comprehensive Android app conversion guide',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '10.1',
+                title: 'fix: Load appointments automatically when clinician logs in',
+                changes: [
+                    'fix: Load appointments automatically when clinician logs in',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '10.0',
+                title: 'fix: Force refresh of appointments list by disabling browser cache',
+                changes: [
+                    'fix: Force refresh of appointments list by disabling browser cache',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.9',
+                title: 'fix: Organize clinician appointments into clear sections',
+                changes: [
+                    'fix: Organize clinician appointments into clear sections',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.8',
+                title: 'fix: Add patient notifications for appointments and improve clinician respons...',
+                changes: [
+                    'fix: Add patient notifications for appointments and improve clinician response visibility',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.7',
+                title: 'feat: Auto-training on Railway + local dev setup',
+                changes: [
+                    'feat: Auto-training on Railway + local dev setup',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.6',
+                title: 'feat: Background AI training system for independent learning',
+                changes: [
+                    'feat: Background AI training system for independent learning',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.5',
+                title: 'feat: Multiple chat sessions with full clinician/ML access',
+                changes: [
+                    'feat: Multiple chat sessions with full clinician/ML access',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.4',
+                title: 'feat: Add chat search, timestamps, and export with date range',
+                changes: [
+                    'feat: Add chat search, timestamps, and export with date range',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.3',
+                title: 'docs: Add comprehensive web app validation report',
+                changes: [
+                    'docs: Add comprehensive web app validation report',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.2',
+                title: 'Add diagnostic page for testing JavaScript loading',
+                changes: [
+                    'Add diagnostic page for testing JavaScript loading',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.1',
+                title: 'CRITICAL FIX: Remove broken text breaking entire JavaScript execution',
+                changes: [
+                    'CRITICAL FIX: Remove broken text breaking entire JavaScript execution',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '9.0',
+                title: 'Fix: Remove duplicate checkPetReturn function causing syntax error',
+                changes: [
+                    'Fix: Remove duplicate checkPetReturn function causing syntax error',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '8.9',
+                title: 'Fix: Remove orphaned duplicate code causing login function to not load',
+                changes: [
+                    'Fix: Remove orphaned duplicate code causing login function to not load',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '8.8',
+                title: 'fix: update node version in Dockerfile',
+                changes: [
+                    'fix: update node version in Dockerfile',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '8.7',
+                title: 'login issues v1',
+                changes: [
+                    'login issues v1.8',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '8.6',
+                title: 'docs: update copilot instructions for web API',
+                changes: [
+                    'docs: update copilot instructions for web API',
+                ]
+            },
+            {
+                date: '2026-01-18',
+                version: '8.5',
+                title: 'landing page issue',
+                changes: [
+                    'landing page issue',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '8.4',
+                title: 'feat: Add model training script and fix auth flow',
+                changes: [
+                    'feat: Add model training script and fix auth flow',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '8.3',
+                title: '1',
+                changes: [
+                    '1.1',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '8.2',
+                title: 'login flow bug fix',
+                changes: [
+                    'login flow bug fix',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '8.1',
+                title: 'index missed fix',
+                changes: [
+                    'index missed fix',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '8.0',
+                title: 'Menu Bug Fix',
+                changes: [
+                    'Menu Bug Fix',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.9',
+                title: 'Fix: Remove duplicate walkCountdownInterval declarations causing syntax error',
+                changes: [
+                    'Fix: Remove duplicate walkCountdownInterval declarations causing syntax error',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.8',
+                title: 'Add version tracking and debug logs for auth functions',
+                changes: [
+                    'Add version tracking and debug logs for auth functions',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.7',
+                title: 'Add cache-busting meta tags to fix showClinicianAuth function not loading',
+                changes: [
+                    'Add cache-busting meta tags to fix showClinicianAuth function not loading',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.6',
+                title: 'Fix pet game: increase modal z-index, add 30min walk cooldown with countdown ...',
+                changes: [
+                    'Fix pet game: increase modal z-index, add 30min walk cooldown with countdown timer, show rewards',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.5',
+                title: 'Fix: Show appointments from last 30 days in clinician view (prevent disappear...',
+                changes: [
+                    'Fix: Show appointments from last 30 days in clinician view (prevent disappearing after patient response)',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.4',
+                title: 'Add bidirectional appointments system with patient acknowledgment and respons...',
+                changes: [
+                    'Add bidirectional appointments system with patient acknowledgment and response tracking',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.3',
+                title: 'Fix export errors and enhance signup forms',
+                changes: [
+                    'Fix export errors and enhance signup forms',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.2',
+                title: 'Documentation: Add sleep chart feature documentation',
+                changes: [
+                    'Documentation: Add sleep chart feature documentation',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.1',
+                title: 'Feature: Add sleep chart and custom date ranges to insights',
+                changes: [
+                    'Feature: Add sleep chart and custom date ranges to insights',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '7.0',
+                title: 'Fix: Insights API column name mismatch',
+                changes: [
+                    'Fix: Insights API column name mismatch',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.9',
+                title: 'Complete audit: All features verified and documented',
+                changes: [
+                    'Complete audit: All features verified and documented',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.8',
+                title: 'Add appointment calendar system to web interface',
+                changes: [
+                    'Add appointment calendar system to web interface',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.7',
+                title: 'Add show/hide password toggle to login screens',
+                changes: [
+                    'Add show/hide password toggle to login screens',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.6',
+                title: 'Fix: Separate desktop and web code, fix tkinter import errors',
+                changes: [
+                    'Fix: Separate desktop and web code, fix tkinter import errors',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.5',
+                title: 'Fix: Add About Me page, fix PDF/CSV exports with reportlab',
+                changes: [
+                    'Fix: Add About Me page, fix PDF/CSV exports with reportlab',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.4',
+                title: 'Add API endpoints for appointments and patient profile',
+                changes: [
+                    'Add API endpoints for appointments and patient profile',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.3',
+                title: 'Deploy to Railway - 2026-01-17 17:48:01',
+                changes: [
+                    'Deploy to Railway - 2026-01-17 17:48:01',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.2',
+                title: 'Add patient About Me page and personal PDF export',
+                changes: [
+                    'Add patient About Me page and personal PDF export',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.1',
+                title: 'Add completion summary for appointment system',
+                changes: [
+                    'Add completion summary for appointment system',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '6.0',
+                title: 'Add clinician appointment calendar with PDF reports and notifications',
+                changes: [
+                    'Add clinician appointment calendar with PDF reports and notifications',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '5.9',
+                title: 'Organize all documentation in documentation/ folder with comprehensive coverage',
+                changes: [
+                    'Organize all documentation in documentation/ folder with comprehensive coverage',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '5.8',
+                title: 'Add comprehensive user guide for patients and clinicians',
+                changes: [
+                    'Add comprehensive user guide for patients and clinicians',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '5.7',
+                title: 'Implement pet care features and assessment limits',
+                changes: [
+                    'Implement pet care features and assessment limits',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '5.6',
+                title: 'Fix missing time import in api',
+                changes: [
+                    'Fix missing time import in api.py',
+                ]
+            },
+            {
+                date: '2026-01-17',
+                version: '5.5',
+                title: 'Trigger Railway redeploy',
+                changes: [
+                    'Trigger Railway redeploy',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '5.4',
+                title: 'Add pet rewards for all self-care activities',
+                changes: [
+                    'Add pet rewards for all self-care activities',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '5.3',
+                title: 'Add session persistence and Remember Me functionality',
+                changes: [
+                    'Add session persistence and Remember Me functionality',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '5.2',
+                title: 'Complete AI memory integration and chat initialization system',
+                changes: [
+                    'Complete AI memory integration and chat initialization system',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '5.1',
+                title: 'Require full name, DOB, and medical conditions on patient signup',
+                changes: [
+                    'Require full name, DOB, and medical conditions on patient signup',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '5.0',
+                title: 'Fix chat history loading with correct function names and async flow',
+                changes: [
+                    'Fix chat history loading with correct function names and async flow',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.9',
+                title: 'Fix AI chat, add persistent chat history, make therapy default tab, include a...',
+                changes: [
+                    'Fix AI chat, add persistent chat history, make therapy default tab, include all patient data in clinician dashboard',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.8',
+                title: 'Add deployment checklist for Railway setup',
+                changes: [
+                    'Add deployment checklist for Railway setup',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.7',
+                title: 'Add Railway deployment support with GitHub Actions for 8pm mood reminders',
+                changes: [
+                    'Add Railway deployment support with GitHub Actions for 8pm mood reminders',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.6',
+                title: 'Complete 8pm mood reminder system with cron automation',
+                changes: [
+                    'Complete 8pm mood reminder system with cron automation',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.5',
+                title: 'Add cron job setup for 8pm mood reminders',
+                changes: [
+                    'Add cron job setup for 8pm mood reminders',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.4',
+                title: 'clin notes/ai tracking/dupe prevention implementattion',
+                changes: [
+                    'clin notes/ai tracking/dupe prevention implementattion',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.3',
+                title: 'overhall v1',
+                changes: [
+                    'overhall v1.45',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.2',
+                title: 'Add Railway volume support',
+                changes: [
+                    'Add Railway volume support',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.1',
+                title: 'Patient approval udate v1',
+                changes: [
+                    'Patient approval udate v1.1',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '4.0',
+                title: 'email/api update',
+                changes: [
+                    'email/api update',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.9',
+                title: 'clin dash update',
+                changes: [
+                    'clin dash update',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.8',
+                title: 'Add implementation summary for email/phone and password reset features',
+                changes: [
+                    'Add implementation summary for email/phone and password reset features',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.7',
+                title: 'Add email/phone to signup, forgot password/PIN functionality with email reset...',
+                changes: [
+                    'Add email/phone to signup, forgot password/PIN functionality with email reset, and PostgreSQL setup guide',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.6',
+                title: 'Fix pending approvals not showing - correct property name from approvals to p...',
+                changes: [
+                    'Fix pending approvals not showing - correct property name from approvals to pending_approvals',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.5',
+                title: 'Fix JavaScript syntax error - incorrect quote escaping in startAdventure func...',
+                changes: [
+                    'Fix JavaScript syntax error - incorrect quote escaping in startAdventure function',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.4',
+                title: 'Add explicit pointer-events: auto and console logging to debug landing page b...',
+                changes: [
+                    'Add explicit pointer-events: auto and console logging to debug landing page button clicks',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.3',
+                title: 'Fix landing page buttons - remove stacking context from app-container and add...',
+                changes: [
+                    'Fix landing page buttons - remove stacking context from app-container and add explicit z-index to buttons',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.2',
+                title: 'Move disclaimer to registration flow - shows after user selects patient/clini...',
+                changes: [
+                    'Move disclaimer to registration flow - shows after user selects patient/clinician during signup only',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.1',
+                title: 'Fix landing page button clicks - add z-index to auth-box',
+                changes: [
+                    'Fix landing page button clicks - add z-index to auth-box',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '3.0',
+                title: 'Fix login after disclaimer acceptance - use stored auth data instead of re-au...',
+                changes: [
+                    'Fix login after disclaimer acceptance - use stored auth data instead of re-authenticating',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '2.9',
+                title: 'Fix z-index issue on landing page - auth screen now properly overlays app',
+                changes: [
+                    'Fix z-index issue on landing page - auth screen now properly overlays app',
+                ]
+            },
+            {
+                date: '2026-01-16',
+                version: '2.8',
+                title: 'Complete pet game implementation with shop, declutter, adventure, time decay ...',
+                changes: [
+                    'Complete pet game implementation with shop, declutter, adventure, time decay + move menu to left sidebar',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '2.7',
+                title: 'database reset',
+                changes: [
+                    'database reset',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '2.6',
+                title: 'Add developer README PDF and database reset endpoint for testing',
+                changes: [
+                    'Add developer README PDF and database reset endpoint for testing',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '2.5',
+                title: 'Dev Files Update (v1',
+                changes: [
+                    'Dev Files Update (v1.0.1)',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '2.4',
+                title: 'Fix missing clinician_id column and add password special character requiremen...',
+                changes: [
+                    'Fix missing clinician_id column and add password special character requirement for both patient and clinician registration',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '2.3',
+                title: 'Add legal disclaimer, landing page for clinician/patient separation, and PIN ...',
+                changes: [
+                    'Add legal disclaimer, landing page for clinician/patient separation, and PIN requirement for clinician registration',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '2.2',
+                title: 'Add comprehensive documentation for new features',
+                changes: [
+                    'Add comprehensive documentation for new features',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '2.1',
+                title: 'Add 2FA PIN authentication, password strength validation, patient approval wo...',
+                changes: [
+                    'Add 2FA PIN authentication, password strength validation, patient approval workflow, and notification system',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '2.0',
+                title: 'Implement professional clinician system: clinician registration, patient-clin...',
+                changes: [
+                    'Implement professional clinician system: clinician registration, patient-clinician linking, role-based dashboard access, clinician filtering',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '1.9',
+                title: 'Add ALL missing features: Community Board, Safety Plan, Progress Insights wit...',
+                changes: [
+                    'Add ALL missing features: Community Board, Safety Plan, Progress Insights with charts, CSV/PDF export, Sleep Hygiene, Professional Dashboard - complete feature parity with desktop app',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '1.8',
+                title: 'Complete feature implementation: all original app functionality now in web ve...',
+                changes: [
+                    'Complete feature implementation: all original app functionality now in web version',
+                ]
+            },
+            {
+                date: '2026-01-14',
+                version: '1.7',
+                title: 'database update',
+                changes: [
+                    'database update',
+                ]
+            },
+            {
+                date: '2026-01-12',
+                version: '1.6',
+                title: 'Fix registration error: remove main',
+                changes: [
+                    'Fix registration error: remove main. prefix from hash functions',
+                ]
+            },
+            {
+                date: '2026-01-12',
+                version: '1.5',
+                title: 'push for web app',
+                changes: [
+                    'push for web app',
+                ]
+            },
+            {
+                date: '2026-01-12',
+                version: '1.4',
+                title: 'Fix syntax error in api',
+                changes: [
+                    'Fix syntax error in api.py hash_pin function',
+                ]
+            },
+            {
+                date: '2026-01-12',
+                version: '1.3',
+                title: 'Fix Railway deployment: Remove tkinter dependency from API',
+                changes: [
+                    'Fix Railway deployment: Remove tkinter dependency from API',
+                ]
+            },
+            {
+                date: '2026-01-12',
+                version: '1.2',
+                title: 'Add Railway deployment guide (with placeholders for secrets)',
+                changes: [
+                    'Add Railway deployment guide (with placeholders for secrets)',
+                ]
+            },
+            {
+                date: '2026-01-12',
+                version: '1.1',
+                title: 'Add Flask API for Railway deployment',
+                changes: [
+                    'Add Flask API for Railway deployment',
+                ]
+            },
+            {
+                date: '2026-01-12',
+                version: '1.0',
+                title: 'Initial commit: Mental health companion app with AI therapy',
+                changes: [
+                    'Initial commit: Mental health companion app with AI therapy',
+                ]
+            },
+        ];
+
+
+
+        function renderUpdatesLog() {
+            const container = document.getElementById('updatesContainer');
+            if (!container) return;
+
+            container.innerHTML = APP_UPDATES.map(update => `
+                <div class="card" style="margin-bottom: 15px;">
+                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+                        <h4 style="margin: 0; color: #667eea;">${update.title}</h4>
+                        <span style="color: #999; font-size: 13px;">v${update.version} • ${formatUpdateDate(update.date)}</span>
+                    </div>
+                    <ul style="margin: 0; padding-left: 20px; color: #555;">
+                        ${update.changes.map(change => `<li style="margin-bottom: 5px;">${change}</li>`).join('')}
+                    </ul>
+                </div>
+            `).join('');
+        }
+
+        function formatUpdateDate(dateStr) {
+            const date = new Date(dateStr);
+            return date.toLocaleDateString('en-GB', { day: 'numeric', month: 'short', year: 'numeric' });
+        }
+
+        function updateTherapyChatTitle() {
+            const titleEl = document.getElementById('therapyChatTitle');
+            if (!titleEl) return;
+
+            if (currentClinicianName) {
+                // Format clinician name nicely
+                let formattedName = currentClinicianName;
+                // Capitalize first letter
+                formattedName = formattedName.charAt(0).toUpperCase() + formattedName.slice(1);
+                // Add Dr. prefix if not already there
+                if (!formattedName.toLowerCase().startsWith('dr')) {
+                    formattedName = 'Dr. ' + formattedName;
+                }
+                titleEl.textContent = `${formattedName}'s Therapy Assistant`;
+            } else {
+                titleEl.textContent = 'Your Therapist';
+            }
+        }
+
+        const PHQ9_QUESTIONS = [
+            "Little interest or pleasure in doing things",
+            "Feeling down, depressed, or hopeless",
+            "Trouble falling/staying asleep, or sleeping too much",
+            "Feeling tired or having little energy",
+            "Poor appetite or overeating",
+            "Feeling bad about yourself or that you are a failure",
+            "Trouble concentrating on things",
+            "Moving or speaking slowly, or being fidgety/restless",
+            "Thoughts that you would be better off dead or hurting yourself"
+        ];
+        
+        const GAD7_QUESTIONS = [
+            "Feeling nervous, anxious or on edge",
+            "Not being able to stop or control worrying",
+            "Worrying too much about different things",
+            "Trouble relaxing",
+            "Being so restless that it is hard to sit still",
+            "Becoming easily annoyed or irritable",
+            "Feeling afraid as if something awful might happen"
+        ];
+        
+        // Auth Functions
+        // Auth Navigation Functions
+        function showLanding() {
+            hideAllAuthForms();
+            document.getElementById('landingPage').classList.remove('hidden');
+        }
+        
+        function showPatientAuth() {
+            hideAllAuthForms();
+            document.getElementById('patientLoginForm').classList.remove('hidden');
+        }
+        
+        function showClinicianAuth() {
+            hideAllAuthForms();
+            document.getElementById('clinicianLoginForm').classList.remove('hidden');
+        }
+
+        // Show dev login modal (does not hide other forms)
+        function showDevLogin() {
+            document.getElementById('devLoginForm').classList.remove('hidden');
+        }
+        // Hide dev login modal
+        function closeDevLogin() {
+            document.getElementById('devLoginForm').classList.add('hidden');
+        }
+        
+        console.log('Auth functions defined:', typeof showPatientAuth, typeof showClinicianAuth);
+        
+        function showPatientRegister() {
+            hideAllAuthForms();
+            document.getElementById('registerForm').classList.remove('hidden');
+            // Set max date to today for DOB field
+            document.getElementById('regDOB').max = new Date().toISOString().split('T')[0];
+            initClinicianToggle();
+            
+            // Auto-search clinicians when area is filled in
+            const areaInput = document.getElementById('regArea');
+            if (areaInput) {
+                areaInput.addEventListener('blur', function() {
+                    if (this.value.trim() && document.getElementById('regHasClinician').checked) {
+                        searchClinicians();
+                    }
+                });
+            }
+        }
+        
+        function showClinicianRegister() {
+            hideAllAuthForms();
+            document.getElementById('clinicianRegisterForm').classList.remove('hidden');
+        }
+        
+        function showForgotPassword(userType) {
+            hideAllAuthForms();
+            document.getElementById('forgotPasswordForm').classList.remove('hidden');
+        }
+        
+        async function requestPasswordReset() {
+            const username = document.getElementById('forgotUsername').value.trim();
+            const email = document.getElementById('forgotEmail').value.trim();
+            
+            if (!username || !email) {
+                showAuthMessage('Please enter your username and email', 'error');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/auth/forgot-password', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username, email })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    showAuthMessage('Password reset link sent to your email!', 'success');
+                    setTimeout(() => showLanding(), 3000);
+                } else {
+                    showAuthMessage(data.error || 'Failed to send reset link', 'error');
+                }
+            } catch (error) {
+                showAuthMessage('Connection error. Please try again.', 'error');
+                console.error('Password reset error:', error);
+            }
+        }
+        
+        function hideAllAuthForms() {
+            // Hide only the direct children forms, not the entire auth screen
+            const forms = document.querySelectorAll('#authScreen .auth-box > div');
+            forms.forEach(form => {
+                if (form.id) { // Only hide divs with an ID
+                    form.classList.add('hidden');
+                }
+            });
+            document.getElementById('authMessage').classList.add('hidden');
+        }
+        
+        async function login(userType) {
+            let username, password, pin, rememberMe;
+            document.getElementById('landingPage').classList.add('hidden');
+            document.getElementById('patientLoginForm').classList.add('hidden');
+            document.getElementById('clinicianLoginForm').classList.add('hidden');
+            document.getElementById('registerForm').classList.add('hidden');
+            document.getElementById('clinicianRegisterForm').classList.add('hidden');
+            document.getElementById('forgotPasswordForm').classList.add('hidden');
+            
+            if (userType === 'user') {
+                username = document.getElementById('loginUsername').value.trim();
+                password = document.getElementById('loginPassword').value;
+                pin = document.getElementById('loginPin').value;
+                rememberMe = document.getElementById('rememberMe').checked;
+            } else if (userType === 'developer') {
+                username = document.getElementById('devLoginUsername').value.trim();
+                password = document.getElementById('devLoginPassword').value;
+                pin = document.getElementById('devLoginPin').value;
+                rememberMe = false; // No remember me for developer
+                document.getElementById('devLoginForm').classList.add('hidden');
+            } else {
+                username = document.getElementById('clinicianLoginUsername').value.trim();
+                password = document.getElementById('clinicianLoginPassword').value;
+                pin = document.getElementById('clinicianLoginPin').value;
+                rememberMe = document.getElementById('clinicianRememberMe').checked;
+            }
+            
+            if (!username || !password) {
+                showAuthMessage('Please enter username and password', 'error');
+                return;
+            }
+            
+            if (!pin) {
+                showAuthMessage('Please enter your 4-digit PIN for 2FA', 'error');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/auth/login', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username, password, pin })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    currentUser = username;
+                    currentUserRole = data.role || 'user';
+                    
+                    // Save session data
+                    const sessionData = {
+                        username: username,
+                        role: data.role || 'user',
+                        approval_status: data.approval_status,
+                        clinician_id: data.clinician_id,
+                        disclaimer_accepted: data.disclaimer_accepted
+                    };
+                    
+                    if (rememberMe) {
+                        // Save to localStorage (persists across browser sessions)
+                        localStorage.setItem('healingSpaceSession', JSON.stringify(sessionData));
+                    } else {
+                        // Save to sessionStorage (clears when tab closes)
+                        sessionStorage.setItem('healingSpaceSession', JSON.stringify(sessionData));
+                    }
+                    
+                    // Proceed with login (disclaimer already accepted during registration)
+                    completeLogin(data);
+                } else {
+                    showAuthMessage(data.error || 'Login failed', 'error');
+                }
+            } catch (error) {
+                showAuthMessage('Connection error. Please try again.', 'error');
+                console.error('Login error:', error);
+            } finally {
+                // Restore form visibility if login failed
+                if (!currentUser) {
+                    if (userType === 'user') {
+                        document.getElementById('patientLoginForm').classList.remove('hidden');
+                    } else if (userType === 'developer') {
+                        document.getElementById('devLoginForm').classList.remove('hidden');
+                    } else {
+                        document.getElementById('clinicianLoginForm').classList.remove('hidden');
+                    }
+                }
+            }
+        }
+        
+        function showDisclaimerModal(userType) {
+            // Show role-specific disclaimer
+            if (userType === 'patient') {
+                document.getElementById('patientDisclaimerModal').style.display = 'flex';
+            } else if (userType === 'clinician') {
+                document.getElementById('clinicianDisclaimerModal').style.display = 'flex';
+            }
+        }
+
+        async function acceptDisclaimer() {
+            try {
+                // Close both modals (only one will be open)
+                document.getElementById('patientDisclaimerModal').style.display = 'none';
+                document.getElementById('clinicianDisclaimerModal').style.display = 'none';
+
+                // Complete the registration with stored data
+                if (tempLoginData) {
+                    if (tempLoginData.type === 'patient') {
+                        await completePatientRegistration(tempLoginData);
+                    } else if (tempLoginData.type === 'clinician') {
+                        await completeClinicianRegistration(tempLoginData);
+                    }
+                    tempLoginData = null; // Clear stored data
+                }
+            } catch (error) {
+                console.error('Error accepting disclaimer:', error);
+            }
+        }
+        
+        function completeLogin(data) {
+            document.getElementById('usernameDisplay').textContent = `Welcome, ${currentUser}!`;
+            document.getElementById('authScreen').style.display = 'none';
+            document.getElementById('appScreen').style.display = 'block';
+
+            // Initialize AI activity logger
+            try {
+                if (activityLogger) { activityLogger.destroy(); }
+                activityLogger = new ActivityLogger();
+            } catch(e) { console.warn('Activity logger init error:', e); }
+
+            // Store clinician name and update therapy chat title
+            currentClinicianName = data.clinician_name || null;
+            updateTherapyChatTitle();
+
+            // Show professional tab only for clinicians
+            if (currentUserRole === 'clinician') {
+                document.getElementById('professionalTabBtn').style.display = 'block';
+                document.getElementById('messagesTabBtn').style.display = 'inline-block';
+
+                // Hide all patient-facing tab buttons for clinicians (except messages)
+                document.querySelectorAll('.tab-btn').forEach(btn => {
+                    if (btn.id !== 'professionalTabBtn' && btn.id !== 'messagesTabBtn') {
+                        btn.style.display = 'none';
+                    }
+                });
+                
+                // Hide all patient-facing tab content for clinicians
+                const patientTabs = ['therapyTab', 'moodTab', 'gratitudeTab', 'cbtTab', 'petTab',
+                                     'clinicalTab', 'communityTab', 'insightsTab',
+                                     'historyTab'];
+                patientTabs.forEach(tabId => {
+                    const tab = document.getElementById(tabId);
+                    if (tab) {
+                        tab.style.display = 'none';
+                    }
+                });
+                
+                // Auto-switch to professional tab and show it
+                document.getElementById('professionalTab').style.display = 'block';
+                switchTab('professional', document.getElementById('professionalTabBtn'));
+                // Default to overview subtab and load analytics data (with delay for DOM to render)
+                setTimeout(() => {
+                    switchClinicalTab('overview', document.getElementById('overviewSubtabBtn'));
+                }, 100);
+            } else if (currentUserRole === 'developer') {
+                // DEVELOPER: Show only developer tab
+                document.getElementById('developerTabBtn').style.display = 'block';
+
+                // Hide patient and clinician tabs
+                document.querySelectorAll('.tab-btn').forEach(btn => {
+                    if (btn.id !== 'developerTabBtn') {
+                        btn.style.display = 'none';
+                    }
+                });
+
+                // Auto-switch to developer tab
+                setTimeout(() => {
+                    switchTab('developer', document.getElementById('developerTabBtn'));
+                    switchDevTab('terminal', document.getElementById('terminalSubtabBtn'));
+                }, 100);
+            } else {
+                // PATIENT: Hide professional tab, SHOW all patient tabs including messages
+                document.getElementById('professionalTabBtn').style.display = 'none';
+                document.getElementById('professionalTab').style.display = 'none';
+
+                // Ensure patient tab buttons are visible (including messages)
+                document.querySelectorAll('.tab-btn').forEach(btn => {
+                    if (btn.id !== 'professionalTabBtn' && btn.id !== 'developerTabBtn') {
+                        btn.style.display = 'inline-block';
+                    }
+                });
+
+                // Ensure patient tab content exists (will be shown/hidden by switchTab)
+                const patientTabs = ['therapyTab', 'moodTab', 'gratitudeTab', 'cbtTab', 'petTab',
+                                     'clinicalTab', 'communityTab', 'safetyTab', 'insightsTab',
+                                     'sleepTab', 'historyTab'];
+                patientTabs.forEach(tabId => {
+                    const tab = document.getElementById(tabId);
+                    if (tab) {
+                        // Don't force display here - let switchTab handle it
+                        tab.style.display = '';
+                    }
+                });
+            }
+            
+            // Check approval status for patients
+            if (data.approval_status === 'pending') {
+                alert('Your clinician has not yet approved your account. Some features may be limited until approval.');
+            }
+            
+            loadNotifications();
+
+            // Load messages for badge
+            if (currentUserRole !== 'developer') {
+                loadUserMessages();
+            }
+
+            // Only add system message for patients
+            if (currentUserRole !== 'clinician') {
+                // Load chat history first, then show greeting
+                initializePatientSession();
+
+                // Remove all active classes
+                document.querySelectorAll('.tab-btn').forEach(btn => btn.classList.remove('active'));
+                document.querySelectorAll('.tab-content').forEach(tab => tab.classList.remove('active'));
+
+                // Switch to HOME tab as default for patients and set active
+                const homeBtn = document.querySelector('[onclick*="home"]');
+                const homeTab = document.getElementById('homeTab');
+                if (homeBtn) homeBtn.classList.add('active');
+                if (homeTab) homeTab.classList.add('active');
+                loadHomeTabData();
+                // Check wellness ritual completion status on login
+                setTimeout(() => initializeWellnessRitual(), 500);
+                // Load Wins Board
+                setTimeout(() => loadWinsBoard(), 300);
+
+                loadPetStatus();
+                checkMoodStatus(); // Check if mood logged today
+                loadPatientAppointments(); // Load appointments for patient
+            }
+
+            // Refresh notifications and messages every 60 seconds
+            setInterval(() => {
+                loadNotifications();
+                if (currentUserRole !== 'developer') {
+                    loadUserMessages();
+                }
+            }, 60000);
+        }
+        
+        // Initialize patient session with chat history and greeting
+        async function initializePatientSession() {
+            try {
+                // Load chat sessions first
+                await loadChatSessions();
+                
+                // First, check if chat needs initialization (first-time user)
+                await initializeChatIfNeeded();
+                
+                // Load existing chat history
+                await loadChatHistory();
+                
+                // Then show personalized greeting (only if not first time)
+                const history = await fetch(`/api/therapy/history?username=${currentUser}&limit=2`).then(r => r.json());
+                if (history.history && history.history.length > 1) {
+                    // Has chat history beyond welcome message
+                    await showPersonalizedGreeting();
+                }
+            } catch (error) {
+                console.error('Error initializing session:', error);
+            }
+        }
+        
+        // Initialize chat for first-time users
+        async function initializeChatIfNeeded() {
+            try {
+                const response = await fetch('/api/therapy/initialize', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username: currentUser })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok && !data.already_exists) {
+                    // First-time user - chat initialized with welcome message
+                    console.log('Chat initialized for new user');
+                }
+            } catch (error) {
+                console.error('Error initializing chat:', error);
+            }
+        }
+        
+        // Load chat history from previous sessions
+        async function loadChatHistory() {
+            try {
+                const response = await fetch(`/api/therapy/history?username=${currentUser}`);
+                const data = await response.json();
+                
+                if (response.ok && data.history && data.history.length > 0) {
+                    // Clear existing messages
+                    document.getElementById('chatMessages').innerHTML = '';
+                    
+                    // Add history
+                    data.history.forEach(msg => {
+                        addMessage(msg.message, msg.sender);
+                    });
+                }
+            } catch (error) {
+                console.error('Error loading chat history:', error);
+            }
+        }
+        
+        // Show personalized greeting based on user context
+        async function showPersonalizedGreeting() {
+            try {
+                const response = await fetch('/api/therapy/greeting', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username: currentUser })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok && data.greeting) {
+                    addMessage(data.greeting, 'ai');
+                }
+            } catch (error) {
+                console.error('Error loading greeting:', error);
+                // Fallback to simple greeting
+                addMessage('Welcome back! How are you feeling today?', 'ai');
+            }
+        }
+        
+        // Check if user has logged mood today
+        async function checkMoodStatus() {
+            try {
+                const response = await fetch(`/api/mood/check-today?username=${currentUser}`);
+                const data = await response.json();
+                
+                if (response.ok && data.logged_today) {
+                    // Show status indicator that mood is already logged
+                    const moodTab = document.querySelector('[onclick*="mood"]');
+                    if (moodTab && !moodTab.textContent.includes('✓')) {
+                        moodTab.innerHTML = '✓ Mood & Habits';
+                    }
+                }
+            } catch (error) {
+                console.error('Error checking mood status:', error);
+            }
+        }
+        
+        function checkPasswordStrength(password) {
+            const strengthBar = document.getElementById('passwordStrengthFill');
+            const strengthText = document.getElementById('passwordStrengthText');
+            
+            let strength = 0;
+            let feedback = 'Weak';
+            let color = '#dc3545';
+            
+            if (password.length >= 8) strength += 25;
+            if (/[a-z]/.test(password) && /[A-Z]/.test(password)) strength += 25;
+            if (/[0-9]/.test(password)) strength += 25;
+            if (/[^a-zA-Z0-9]/.test(password)) strength += 25;
+            
+            if (strength <= 25) {
+                feedback = 'Weak';
+                color = '#dc3545';
+            } else if (strength <= 50) {
+                feedback = 'Fair';
+                color = '#ffc107';
+            } else if (strength <= 75) {
+                feedback = 'Good';
+                color = '#17a2b8';
+            } else {
+                feedback = 'Strong';
+                color = '#28a745';
+            }
+            
+            strengthBar.style.width = strength + '%';
+            strengthBar.style.background = color;
+            strengthText.textContent = `Password strength: ${feedback}`;
+            strengthText.style.color = color;
+        }
+        
+        async function register() {
+            const fullName = document.getElementById('regFullName').value.trim();
+            const preferredName = document.getElementById('regPreferredName').value.trim();
+            const dob = document.getElementById('regDOB').value;
+            const conditions = document.getElementById('regConditions').value.trim();
+            const area = document.getElementById('regArea').value.trim();
+            const postcode = document.getElementById('regPostcode').value.trim();
+            const nhs_number = document.getElementById('regNHS').value.trim();
+            const username = document.getElementById('regUsername').value.trim();
+            const password = document.getElementById('regPassword').value;
+            const confirmPassword = document.getElementById('regConfirmPassword').value;
+            const pin = document.getElementById('regPin').value;
+            const confirmPin = document.getElementById('regConfirmPin').value;
+            const email = document.getElementById('regEmail').value.trim();
+            const phone = document.getElementById('regPhone').value.trim();
+            const hasClinician = document.getElementById('regHasClinician').checked;
+            const clinician_id = hasClinician ? document.getElementById('regClinician').value : null;
+            
+            if (!fullName) {
+                showAuthMessage('Please enter your full name', 'error');
+                return;
+            }
+            
+            if (!preferredName) {
+                showAuthMessage('Please enter your preferred name (what we\'ll call you)', 'error');
+                return;
+            }
+            
+            if (!dob) {
+                showAuthMessage('Please enter your date of birth', 'error');
+                return;
+            }
+            
+            if (!conditions) {
+                showAuthMessage('Please describe your medical conditions or diagnosis', 'error');
+                return;
+            }
+            
+            if (!area) {
+                showAuthMessage('Please enter your UK area/region', 'error');
+                return;
+            }
+            
+            if (!username || !password || !pin || !email || !phone) {
+                showAuthMessage('Please fill in all required fields', 'error');
+                return;
+            }
+            
+            if (hasClinician && !clinician_id) {
+                showAuthMessage('Please select your clinician or uncheck the clinician option', 'error');
+                return;
+            }
+            
+            if (password !== confirmPassword) {
+                showAuthMessage('Passwords do not match', 'error');
+                return;
+            }
+            
+            if (pin !== confirmPin) {
+                showAuthMessage('PINs do not match', 'error');
+                return;
+            }
+            
+            if (password.length < 8) {
+                showAuthMessage('Password must be at least 8 characters', 'error');
+                return;
+            }
+            
+            // Validate password requirements
+            if (!/[a-z]/.test(password) || !/[A-Z]/.test(password)) {
+                showAuthMessage('Password must contain both lowercase and uppercase letters', 'error');
+                return;
+            }
+            
+            if (!/[0-9]/.test(password)) {
+                showAuthMessage('Password must contain at least one number', 'error');
+                return;
+            }
+            
+            if (!/[^a-zA-Z0-9]/.test(password)) {
+                showAuthMessage('Password must contain at least one special character (!@#$%^&* etc.)', 'error');
+                return;
+            }
+            
+            if (pin.length !== 4 || !/^\d+$/.test(pin)) {
+                showAuthMessage('PIN must be 4 digits', 'error');
+                return;
+            }
+            
+            // Store registration data and show disclaimer
+            currentUser = username;
+            tempLoginData = { 
+                type: 'patient',
+                username, 
+                password, 
+                pin,
+                email,
+                phone,
+                full_name: fullName,
+                preferred_name: preferredName,
+                dob: dob,
+                conditions: conditions,
+                clinician_id: clinician_id || undefined,
+                country: 'United Kingdom',
+                area,
+                postcode,
+                nhs_number
+            };
+            showDisclaimerModal('patient');
+        }
+        
+        async function completePatientRegistration(data) {
+            try {
+                const response = await fetch('/api/auth/register', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ 
+                        username: data.username, 
+                        password: data.password, 
+                        pin: data.pin,
+                        email: data.email,
+                        phone: data.phone,
+                        full_name: data.full_name,
+                        preferred_name: data.preferred_name,
+                        dob: data.dob,
+                        conditions: data.conditions,
+                        clinician_id: data.clinician_id,
+                        country: data.country,
+                        area: data.area,
+                        postcode: data.postcode,
+                        nhs_number: data.nhs_number,
+                        disclaimer_accepted: true
+                    })
+                });
+                
+                const result = await response.json();
+                
+                if (response.ok) {
+                    showAuthMessage('Account created! Awaiting clinician approval.', 'success');
+                    setTimeout(() => {
+                        showPatientAuth();
+                        document.getElementById('loginUsername').value = data.username;
+                    }, 3000);
+                } else {
+                    showAuthMessage(result.error || 'Registration failed', 'error');
+                }
+            } catch (error) {
+                showAuthMessage('Connection error. Please try again.', 'error');
+                console.error('Register error:', error);
+            }
+        }
+        
+        async function registerClinician() {
+            const username = document.getElementById('clinicianUsername').value.trim();
+            const password = document.getElementById('clinicianPassword').value;
+            const confirmPassword = document.getElementById('clinicianConfirmPassword').value;
+            const pin = document.getElementById('clinicianPin').value;
+            const confirmPin = document.getElementById('clinicianConfirmPin').value;
+            const full_name = document.getElementById('clinicianFullName').value.trim();
+            const email = document.getElementById('clinicianEmail').value.trim();
+            const phone = document.getElementById('clinicianPhone').value.trim();
+            const professional_id = document.getElementById('clinicianProfessionalId').value.trim();
+            const country = document.getElementById('clinicianCountry').value.trim();
+            const area = document.getElementById('clinicianArea').value.trim();
+            
+            if (!username || !password || !pin || !email || !phone || !full_name) {
+                showAuthMessage('Please fill in all required fields', 'error');
+                return;
+            }
+            
+            if (!professional_id) {
+                showAuthMessage('Please enter your professional ID number', 'error');
+                return;
+            }
+            
+            if (!country || !area) {
+                showAuthMessage('Please enter your country and area', 'error');
+                return;
+            }
+            
+            if (password !== confirmPassword) {
+                showAuthMessage('Passwords do not match', 'error');
+                return;
+            }
+            
+            if (pin !== confirmPin) {
+                showAuthMessage('PINs do not match', 'error');
+                return;
+            }
+            
+            if (password.length < 8) {
+                showAuthMessage('Password must be at least 8 characters', 'error');
+                return;
+            }
+            
+            if (pin.length !== 4 || !/^\d+$/.test(pin)) {
+                showAuthMessage('PIN must be exactly 4 digits', 'error');
+                return;
+            }
+            
+            // Store registration data and show disclaimer
+            currentUser = username;
+            tempLoginData = { 
+                type: 'clinician',
+                username, 
+                password, 
+                pin,
+                full_name,
+                email,
+                phone,
+                professional_id,
+                country,
+                area
+            };
+            showDisclaimerModal('clinician');
+        }
+        
+        async function completeClinicianRegistration(data) {
+            try {
+                const response = await fetch('/api/auth/clinician/register', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ 
+                        username: data.username, 
+                        password: data.password, 
+                        pin: data.pin, 
+                        full_name: data.full_name,
+                        email: data.email,
+                        phone: data.phone,
+                        professional_id: data.professional_id,
+                        country: data.country,
+                        area: data.area,
+                        disclaimer_accepted: true
+                    })
+                });
+                
+                const result = await response.json();
+                
+                if (response.ok) {
+                    showAuthMessage('Clinician account created successfully! Please login.', 'success');
+                    setTimeout(() => {
+                        showClinicianAuth();
+                        document.getElementById('clinicianLoginUsername').value = data.username;
+                    }, 2000);
+                } else {
+                    showAuthMessage(result.error || 'Registration failed', 'error');
+                }
+            } catch (error) {
+                showAuthMessage('Connection error. Please try again.', 'error');
+                console.error('Clinician register error:', error);
+            }
+        }
+        
+        async function searchClinicians() {
+            try {
+                const searchQuery = document.getElementById('regClinicianSearch')?.value.trim() || '';
+                const area = document.getElementById('regArea')?.value.trim() || '';
+                
+                if (!searchQuery && !area) {
+                    showAuthMessage('Please enter a clinician name/username or area', 'error');
+                    return;
+                }
+                
+                let url = '/api/clinicians/list';
+                const params = new URLSearchParams();
+                params.append('country', 'United Kingdom');
+                if (searchQuery) params.append('search', searchQuery);
+                if (area) params.append('area', area);
+                url += '?' + params.toString();
+                
+                const response = await fetch(url);
+                const data = await response.json();
+                
+                const select = document.getElementById('regClinician');
+                const placeholder = document.getElementById('clinicianDropdownPlaceholder');
+                
+                if (response.ok && data.clinicians && data.clinicians.length > 0) {
+                    select.innerHTML = '<option value="">-- Select your clinician --</option>' +
+                        data.clinicians.map(c => 
+                            `<option value="${escapeHtml(c.username)}">${escapeHtml(c.full_name || c.username)}${c.area ? ' (' + escapeHtml(c.area) + ')' : ''}</option>`
+                        ).join('');
+                    select.style.display = 'block';
+                    if (placeholder) placeholder.style.display = 'none';
+                    showAuthMessage(`✅ Found ${data.clinicians.length} clinician(s) - Select from dropdown`, 'success');
+                } else {
+                    select.innerHTML = '<option value="">-- No clinicians found --</option>';
+                    select.style.display = 'block';
+                    if (placeholder) placeholder.style.display = 'none';
+                    showAuthMessage('⚠️ No clinicians match your search. Try a different name or area.', 'error');
+                }
+            } catch (error) {
+                console.error('Error searching clinicians:', error);
+                const select = document.getElementById('regClinician');
+                select.innerHTML = '<option value="">Error loading clinicians</option>';
+                select.style.display = 'block';
+                const placeholder = document.getElementById('clinicianDropdownPlaceholder');
+                if (placeholder) placeholder.style.display = 'none';
+                showAuthMessage('Error searching for clinicians. Please try again.', 'error');
+            }
+        }
+        
+        // Toggle clinician section based on checkbox
+        function initClinicianToggle() {
+            const clinicianCheckbox = document.getElementById('regHasClinician');
+            const clinicianSection = document.getElementById('clinicianSection');
+            if (clinicianCheckbox) {
+                clinicianCheckbox.addEventListener('change', function() {
+                    if (clinicianSection) {
+                        clinicianSection.style.display = this.checked ? 'block' : 'none';
+                        const clinicianSelect = document.getElementById('regClinician');
+                        if (clinicianSelect) {
+                            clinicianSelect.required = this.checked;
+                        }
+                        const clinicianSearch = document.getElementById('regClinicianSearch');
+                        if (clinicianSearch) {
+                            clinicianSearch.required = this.checked;
+                        }
+                    }
+                });
+            }
+        }
+        
+        // Initialize when showing patient registration form
+        document.addEventListener('DOMContentLoaded', initClinicianToggle);
+        
+        function showAuthMessage(message, type) {
+            const msgDiv = document.getElementById('authMessage');
+            
+            // Clear previous content
+            msgDiv.innerHTML = '';
+            
+            // Create message text
+            const messageText = document.createElement('div');
+            messageText.textContent = message;
+            messageText.style.marginBottom = '15px';
+            msgDiv.appendChild(messageText);
+            
+            // Add back button for error messages
+            if (type === 'error') {
+                const backButton = document.createElement('button');
+                backButton.textContent = 'Try Again';
+                backButton.className = 'btn btn-secondary';
+                backButton.style.marginTop = '10px';
+                backButton.onclick = function() {
+                    msgDiv.classList.add('hidden');
+                    showLanding();
+                };
+                msgDiv.appendChild(backButton);
+            }
+            
+            msgDiv.className = `alert alert-${type}`;
+            msgDiv.classList.remove('hidden');
+        }
+        
+        // Notification Functions
+        async function loadNotifications() {
+            if (!currentUser) return;
+            
+            try {
+                const response = await fetch(`/api/notifications?username=${currentUser}`);
+                const data = await response.json();
+                
+                if (response.ok && data.notifications) {
+                    const unreadCount = data.notifications.filter(n => !n.read).length;
+                    const badge = document.getElementById('notificationBadge');
+                    
+                    if (unreadCount > 0) {
+                        badge.textContent = unreadCount;
+                        badge.style.display = 'inline';
+                    } else {
+                        badge.style.display = 'none';
+                    }
+                    
+                    const list = document.getElementById('notificationList');
+                    if (data.notifications.length === 0) {
+                        list.innerHTML = '<div class="notification-item">No notifications</div>';
+                    } else {
+                        // Add "Clear All Read" button if there are read notifications
+                        const hasReadNotifications = data.notifications.some(n => n.read);
+                        let headerHtml = '';
+                        if (hasReadNotifications) {
+                            headerHtml = `
+                                <div style="padding: 10px; border-bottom: 1px solid #eee; text-align: right;">
+                                    <button onclick="clearReadNotifications()" style="background: #f0f0f0; border: 1px solid #ddd; padding: 5px 10px; border-radius: 4px; cursor: pointer; font-size: 12px;">
+                                        🗑️ Clear Read
+                                    </button>
+                                </div>
+                            `;
+                        }
+
+                        list.innerHTML = headerHtml + data.notifications.map(n => {
+                            // Add emoji and action based on notification type
+                            let emoji = '📬';
+                            let onClick = `markNotificationRead(${n.id})`;
+
+                            if (n.notification_type === 'appointment_new') {
+                                emoji = '📅';
+                                onClick = `markNotificationRead(${n.id}); switchTab('appointments')`;
+                            } else if (n.notification_type === 'appointment_response') {
+                                emoji = '✓';
+                            } else if (n.notification_type === 'crisis_alert') {
+                                emoji = '🚨';
+                            } else if (n.notification_type === 'approval') {
+                                emoji = '✅';
+                            } else if (n.notification_type === 'dev_message') {
+                                emoji = '📨';
+                                onClick = `markNotificationRead(${n.id}); switchTab('${currentUserRole === 'clinician' ? 'professional' : currentUserRole === 'developer' ? 'developer' : 'home'}', null); setTimeout(() => switchMessageTab('inbox', null), 100)`;
+                            } else if (n.notification_type === 'message') {
+                                emoji = '💬';
+                                onClick = `markNotificationRead(${n.id}); switchTab('${currentUserRole === 'clinician' ? 'professional' : currentUserRole === 'developer' ? 'developer' : 'home'}', null); setTimeout(() => switchMessageTab('inbox', null), 100)`;
+                            }
+
+                            return `
+                                <div class="notification-item ${n.read ? '' : 'unread'}" style="position: relative;">
+                                    <div onclick="${onClick}" style="cursor: pointer;">
+                                        <strong>${emoji} ${n.notification_type}</strong>
+                                        <p>${sanitizeHTML(n.message)}</p>
+                                        <small>${new Date(n.created_at).toLocaleString()}</small>
+                                    </div>
+                                    <button onclick="event.stopPropagation(); deleteNotification(${n.id})"
+                                        style="position: absolute; top: 10px; right: 10px; background: none; border: none; cursor: pointer; opacity: 0.5; font-size: 14px;"
+                                        title="Delete notification">✕</button>
+                                </div>
+                            `;
+                        }).join('');
+                    }
+                }
+            } catch (error) {
+                console.error('Error loading notifications:', error);
+            }
+        }
+        
+        function showNotifications() {
+            const panel = document.getElementById('notificationPanel');
+            panel.style.display = panel.style.display === 'none' ? 'block' : 'none';
+        }
+        
+        function closeNotifications() {
+            document.getElementById('notificationPanel').style.display = 'none';
+        }
+        
+        async function markNotificationRead(id) {
+            try {
+                await fetch(`/api/notifications/${id}/read`, { method: 'POST' });
+                loadNotifications();
+            } catch (error) {
+                console.error('Error marking notification as read:', error);
+            }
+        }
+
+        async function deleteNotification(id) {
+            try {
+                const response = await fetch(`/api/notifications/${id}`, { method: 'DELETE' });
+                if (response.ok) {
+                    loadNotifications();
+                } else {
+                    console.error('Failed to delete notification');
+                }
+            } catch (error) {
+                console.error('Error deleting notification:', error);
+            }
+        }
+
+        async function clearReadNotifications() {
+            if (!currentUser) return;
+
+            try {
+                const response = await fetch('/api/notifications/clear-read', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username: currentUser })
+                });
+                if (response.ok) {
+                    loadNotifications();
+                } else {
+                    console.error('Failed to clear read notifications');
+                }
+            } catch (error) {
+                console.error('Error clearing read notifications:', error);
+            }
+        }
+
+        // Patient Approval Functions
+        async function loadPendingApprovals() {
+            if (currentUserRole !== 'clinician') return;
+            
+            try {
+                const response = await fetch(`/api/approvals/pending?clinician=${currentUser}`, {
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                
+                const container = document.getElementById('pendingApprovals');
+                if (response.ok && data.pending_approvals && data.pending_approvals.length > 0) {
+                    container.innerHTML = data.pending_approvals.map(approval => `
+                        <div class="approval-request">
+                            <div>
+                                <strong>${sanitizeHTML(approval.patient_username)}</strong>
+                                <p>Requested: ${new Date(approval.request_date).toLocaleString()}</p>
+                            </div>
+                            <div style="display: flex; gap: 10px;">
+                                <button class="btn btn-success" onclick="approvePatient(${approval.id})">
+                                    ✓ Approve
+                                </button>
+                                <button class="btn btn-danger" onclick="rejectPatient(${approval.id})">
+                                    ✗ Reject
+                                </button>
+                            </div>
+                        </div>
+                    `).join('');
+                } else {
+                    container.innerHTML = '<p style="color: #666;">No pending approval requests</p>';
+                }
+            } catch (error) {
+                console.error('Error loading pending approvals:', error);
+            }
+        }
+        
+        async function approvePatient(approvalId) {
+            if (!confirm('Approve this patient?')) return;
+            
+            try {
+                const response = await fetch(`/api/approvals/${approvalId}/approve`, {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ clinician_username: currentUser })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    alert('Patient approved successfully!');
+                    loadPendingApprovals();
+                    loadNotifications();
+                } else {
+                    alert(data.error || 'Failed to approve patient');
+                }
+            } catch (error) {
+                console.error('Error approving patient:', error);
+                alert('Error approving patient');
+            }
+        }
+        
+        async function rejectPatient(approvalId) {
+            if (!confirm('Reject this patient request?')) return;
+            
+            try {
+                const response = await fetch(`/api/approvals/${approvalId}/reject`, {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ clinician_username: currentUser })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    alert('Patient request rejected');
+                    loadPendingApprovals();
+                    loadNotifications();
+                } else {
+                    alert(data.error || 'Failed to reject patient');
+                }
+            } catch (error) {
+                console.error('Error rejecting patient:', error);
+                alert('Error rejecting patient');
+            }
+        }
+        
+        function logout() {
+            if (confirm('Are you sure you want to logout?')) {
+                // Log logout to activity logger
+                try {
+                    if (activityLogger) { activityLogger.destroy(); activityLogger = null; }
+                } catch(e) {}
+
+                // Clear all session data
+                localStorage.removeItem('healingSpaceSession');
+                sessionStorage.removeItem('healingSpaceSession');
+                
+                currentUser = null;
+                currentUserRole = 'user';
+                document.getElementById('professionalTabBtn').style.display = 'none';
+                document.getElementById('authScreen').style.display = 'flex';
+                document.getElementById('appScreen').style.display = 'none';
+                document.getElementById('chatMessages').innerHTML = '';
+                selectedMoodValue = null;
+                medications = [];
+                
+                // Clear login forms
+                document.getElementById('loginUsername').value = '';
+                document.getElementById('loginPassword').value = '';
+                document.getElementById('loginPin').value = '';
+                document.getElementById('clinicianLoginUsername').value = '';
+                document.getElementById('clinicianLoginPassword').value = '';
+                document.getElementById('clinicianLoginPin').value = '';
+                
+                // Return to landing page
+                showLanding();
+            }
+        }
+        
+        // Tab Navigation
+        function switchTab(tabName, buttonEl) {
+            document.querySelectorAll('.tab-content').forEach(tab => tab.classList.remove('active'));
+            document.querySelectorAll('.tab-btn').forEach(btn => btn.classList.remove('active'));
+
+            document.getElementById(tabName + 'Tab').classList.add('active');
+            if (buttonEl) buttonEl.classList.add('active');
+
+            // Log tab change to activity logger
+            try {
+                document.dispatchEvent(new CustomEvent('tabchange', { detail: { tabName: tabName } }));
+            } catch(e) {}
+
+            // Always reload Home tab data for patients
+            if (tabName === 'home' && currentUserRole !== 'clinician' && currentUserRole !== 'developer') {
+                loadHomeTabData();
+                // Check and initialize wellness ritual if not yet completed today
+                setTimeout(() => initializeWellnessRitual(), 500);
+                // Load Wins Board
+                setTimeout(() => loadWinsBoard(), 300);
+            }
+
+            // Load pet when switching to pet tab
+            if (tabName === 'pet') {
+                loadPetStatus();
+            }
+            
+            // Load profile when switching to About Me tab
+            if (tabName === 'aboutme') {
+                loadProfile();
+                // Sync dark mode toggle with current theme
+                const toggle = document.getElementById('darkModeToggle');
+                if (toggle) {
+                    toggle.checked = document.documentElement.getAttribute('data-theme') === 'dark';
+                }
+            }
+            
+            // Load appointments when switching to appointments tab
+            if (tabName === 'appointments' && currentUserRole !== 'clinician') {
+                loadPatientAppointments();
+            }
+
+            // Load messages when switching to messages tab
+            if (tabName === 'messages') {
+                checkAndLoadMessages();
+            }
+
+            // Load updates when switching to updates tab
+            if (tabName === 'updates') {
+                renderUpdatesLog();
+            }
+
+            // Load professional tab and default to overview
+            if (tabName === 'professional' && currentUserRole === 'clinician') {
+                // Default to overview subtab
+                switchClinicalTab('overview', document.getElementById('overviewSubtabBtn'));
+            }
+
+            // Load community channels and start auto-refresh when switching to community tab
+            if (tabName === 'community') {
+                initCommunity();
+                startCommunityAutoRefresh();
+            } else {
+                // Stop auto-refresh when leaving community tab
+                stopCommunityAutoRefresh();
+            }
+        }
+        
+        // Clinical Dashboard Subtab Switching
+        function switchClinicalTab(subtabName, buttonEl) {
+            // Hide all clinical subtabs
+            document.querySelectorAll('.clinical-subtab-content').forEach(tab => {
+                tab.style.display = 'none';
+            });
+            
+            // Reset all clinical subtab buttons
+            document.querySelectorAll('.clinical-subtab-btn').forEach(btn => {
+                btn.style.background = 'transparent';
+                btn.style.color = '#667eea';
+                btn.style.border = '2px solid #667eea';
+            });
+            
+            // Show selected subtab
+            document.getElementById('clinical' + subtabName.charAt(0).toUpperCase() + subtabName.slice(1) + 'Tab').style.display = 'block';
+            
+            // Highlight selected button
+            if (buttonEl) {
+                buttonEl.style.background = '#667eea';
+                buttonEl.style.color = 'white';
+                buttonEl.style.border = 'none';
+            }
+            
+            // Load data for specific subtabs
+            if (subtabName === 'overview') {
+                loadAnalyticsDashboard();
+            } else if (subtabName === 'patients') {
+                loadPatients();
+            } else if (subtabName === 'appointments') {
+                loadAppointments();
+            } else if (subtabName === 'approvals') {
+                loadPendingApprovals();
+            } else if (subtabName === 'riskmonitor') {
+                loadRiskDashboard();
+            }
+        }
+        
+        // ===== SAFETY CHECK / C-SSRS ASSESSMENT FUNCTIONS =====
+        
+        // C-SSRS Assessment Questions (Columbia-Suicide Severity Rating Scale)
+        const C_SSRS_QUESTIONS = [
+            {
+                id: 1,
+                question: "In the past week, have you wished you were dead or wished you could go to sleep and not wake up?",
+                category: "ideation",
+                options: [
+                    { text: "No", score: 0 },
+                    { text: "Several days", score: 1 },
+                    { text: "More than half the days", score: 2 },
+                    { text: "Nearly every day", score: 3 }
+                ]
+            },
+            {
+                id: 2,
+                question: "In the past week, have you actually had any thoughts of killing yourself?",
+                category: "ideation_active",
+                options: [
+                    { text: "No", score: 0 },
+                    { text: "Yes, but I don't think I would do it", score: 1 },
+                    { text: "Yes, I think about it regularly", score: 2 },
+                    { text: "Yes, and I plan to do it", score: 3 }
+                ]
+            },
+            {
+                id: 3,
+                question: "Have you ever tried to kill yourself, and if so, was it within the past week?",
+                category: "attempt",
+                options: [
+                    { text: "Never tried", score: 0 },
+                    { text: "Tried before, but not in past week", score: 1 },
+                    { text: "Tried within the past week", score: 2 },
+                    { text: "Currently planning an attempt", score: 3 }
+                ]
+            },
+            {
+                id: 4,
+                question: "In the past week, how have you been feeling about staying alive vs ending your life?",
+                category: "intent",
+                options: [
+                    { text: "I definitely want to live", score: 0 },
+                    { text: "I want to live, but it's unclear sometimes", score: 1 },
+                    { text: "The thoughts are equal - living vs dying", score: 2 },
+                    { text: "I strongly feel I should be dead", score: 3 }
+                ]
+            },
+            {
+                id: 5,
+                question: "In the past week, have you done anything to prepare for an attempt (stockpiling medication, planning method, saying goodbye)?",
+                category: "planning",
+                options: [
+                    { text: "No, nothing", score: 0 },
+                    { text: "I've thought about it but taken no action", score: 1 },
+                    { text: "I've started preparing (research, gathering items)", score: 2 },
+                    { text: "I've actively prepared (have means, have plan, given things away)", score: 3 }
+                ]
+            },
+            {
+                id: 6,
+                question: "Right now, how confident are you that you can keep yourself safe?",
+                category: "safety",
+                options: [
+                    { text: "Completely confident - I can keep myself safe", score: 0 },
+                    { text: "Fairly confident", score: 1 },
+                    { text: "Not very confident", score: 2 },
+                    { text: "Not confident at all", score: 3 }
+                ]
+            }
+        ];
+        
+        // Safety Assessment State
+        let safetyAssessmentState = {
+            active: false,
+            currentQuestion: 0,
+            responses: [],
+            score: 0,
+            timestamp: null,
+            riskLevel: null,
+            safetyPlan: {
+                warningSigns: '',
+                copingInternal: '',
+                distractions: '',
+                people: [],
+                environment: ''
+            }
+        };
+        
+        function startSafetyAssessment() {
+            safetyAssessmentState = {
+                active: true,
+                currentQuestion: 0,
+                responses: [],
+                score: 0,
+                timestamp: new Date().toISOString(),
+                riskLevel: null,
+                safetyPlan: {
+                    warningSigns: '',
+                    copingInternal: '',
+                    distractions: '',
+                    people: [],
+                    environment: ''
+                }
+            };
+            
+            // Hide start screen
+            document.getElementById('safetyStartScreen').style.display = 'none';
+            document.getElementById('safetyAssessmentContainer').style.display = 'block';
+            document.getElementById('safetyResultsContainer').style.display = 'none';
+            
+            // Load first question
+            displayAssessmentQuestion();
+        }
+        
+        function displayAssessmentQuestion() {
+            const question = C_SSRS_QUESTIONS[safetyAssessmentState.currentQuestion];
+            const progress = ((safetyAssessmentState.currentQuestion + 1) / C_SSRS_QUESTIONS.length) * 100;
+            
+            // Update progress bar
+            document.getElementById('assessmentProgressBar').style.width = progress + '%';
+            document.getElementById('assessmentProgressText').textContent = `Question ${safetyAssessmentState.currentQuestion + 1} of ${C_SSRS_QUESTIONS.length}`;
+            
+            // Update button visibility
+            document.getElementById('assessmentPrevBtn').style.display = safetyAssessmentState.currentQuestion === 0 ? 'none' : 'block';
+            document.getElementById('assessmentNextBtn').textContent = safetyAssessmentState.currentQuestion === C_SSRS_QUESTIONS.length - 1 ? '✓ Submit Assessment' : 'Next →';
+            
+            // Build question HTML
+            let optionsHtml = '<div class="assessment-options">';
+            question.options.forEach((option, idx) => {
+                const selectedClass = safetyAssessmentState.responses[safetyAssessmentState.currentQuestion]?.score === option.score ? 'selected' : '';
+                optionsHtml += `
+                    <div class="assessment-option ${selectedClass}" onclick="selectAssessmentOption(${idx}, ${option.score})">
+                        <span class="assessment-option-text">${option.text}</span>
+                    </div>
+                `;
+            });
+            optionsHtml += '</div>';
+            
+            const questionsHtml = `
+                <div class="assessment-question">
+                    <h4>${question.question}</h4>
+                    ${optionsHtml}
+                </div>
+            `;
+            
+            document.getElementById('assessmentQuestionsArea').innerHTML = questionsHtml;
+        }
+        
+        function selectAssessmentOption(optionIdx, score) {
+            const question = C_SSRS_QUESTIONS[safetyAssessmentState.currentQuestion];
+            safetyAssessmentState.responses[safetyAssessmentState.currentQuestion] = {
+                question: question.id,
+                option: question.options[optionIdx].text,
+                score: score,
+                category: question.category
+            };
+            
+            // Visual feedback
+            document.querySelectorAll('.assessment-option').forEach(el => el.classList.remove('selected'));
+            event.currentTarget.classList.add('selected');
+            
+            // Auto-advance to next after selection (subtle UX)
+            setTimeout(() => {
+                if (safetyAssessmentState.currentQuestion < C_SSRS_QUESTIONS.length - 1) {
+                    nextAssessmentQuestion();
+                }
+            }, 300);
+        }
+        
+        function nextAssessmentQuestion() {
+            if (safetyAssessmentState.responses[safetyAssessmentState.currentQuestion] === undefined) {
+                alert('Please select an answer before continuing.');
+                return;
+            }
+            
+            if (safetyAssessmentState.currentQuestion === C_SSRS_QUESTIONS.length - 1) {
+                // Submit assessment
+                submitSafetyAssessment();
+                return;
+            }
+            
+            safetyAssessmentState.currentQuestion++;
+            displayAssessmentQuestion();
+        }
+        
+        function previousAssessmentQuestion() {
+            if (safetyAssessmentState.currentQuestion > 0) {
+                safetyAssessmentState.currentQuestion--;
+                displayAssessmentQuestion();
+            }
+        }
+        
+        function skipAssessmentQuestion() {
+            safetyAssessmentState.responses[safetyAssessmentState.currentQuestion] = {
+                question: C_SSRS_QUESTIONS[safetyAssessmentState.currentQuestion].id,
+                option: "Skipped",
+                score: 0,
+                category: C_SSRS_QUESTIONS[safetyAssessmentState.currentQuestion].category
+            };
+            
+            if (safetyAssessmentState.currentQuestion === C_SSRS_QUESTIONS.length - 1) {
+                submitSafetyAssessment();
+            } else {
+                safetyAssessmentState.currentQuestion++;
+                displayAssessmentQuestion();
+            }
+        }
+        
+        function submitSafetyAssessment() {
+            // Calculate total score
+            safetyAssessmentState.score = safetyAssessmentState.responses.reduce((sum, resp) => sum + (resp?.score || 0), 0);
+            
+            // Determine risk level
+            // Score range: 0-18 (6 questions x 3 max)
+            if (safetyAssessmentState.score === 0) {
+                safetyAssessmentState.riskLevel = 'low';
+            } else if (safetyAssessmentState.score <= 6) {
+                safetyAssessmentState.riskLevel = 'moderate';
+            } else if (safetyAssessmentState.score <= 12) {
+                safetyAssessmentState.riskLevel = 'high';
+            } else {
+                safetyAssessmentState.riskLevel = 'critical';
+            }
+            
+            // Check for critical indicators
+            const hasSuicidalPlanning = safetyAssessmentState.responses.some(r => r?.category === 'planning' && r.score >= 2);
+            const hasSuicidalIntent = safetyAssessmentState.responses.some(r => r?.category === 'intent' && r.score >= 2);
+            const hasSuicidalIdeation = safetyAssessmentState.responses.some(r => r?.category === 'ideation_active' && r.score >= 2);
+            
+            if ((hasSuicidalPlanning || (hasSuicidalIdeation && hasSuicidalIntent))) {
+                safetyAssessmentState.riskLevel = 'critical';
+            }
+            
+            // Show results
+            displayAssessmentResults();
+            
+            // Submit to backend
+            submitSafetyAssessmentToBackend();
+        }
+        
+        function displayAssessmentResults() {
+            // Hide questions, show results
+            document.getElementById('safetyAssessmentContainer').style.display = 'none';
+            document.getElementById('safetyResultsContainer').style.display = 'block';
+            
+            // Update result display based on risk level
+            const resultIcons = { low: '🟢', moderate: '🟠', high: '🔴', critical: '🚨' };
+            const resultTitles = { 
+                low: 'You\'re Doing Well', 
+                moderate: 'Some Concern', 
+                high: 'We\'re Here to Help',
+                critical: 'Crisis Support Available Now'
+            };
+            
+            document.getElementById('resultsRiskIndicator').textContent = resultIcons[safetyAssessmentState.riskLevel];
+            document.getElementById('resultsRiskTitle').textContent = resultTitles[safetyAssessmentState.riskLevel];
+            
+            // Hide all result content, show appropriate one
+            document.getElementById('resultsLowRiskContent').style.display = 'none';
+            document.getElementById('resultsModerateRiskContent').style.display = 'none';
+            document.getElementById('resultsHighRiskContent').style.display = 'none';
+            document.getElementById('safetyPlanSection').style.display = 'none';
+            
+            if (safetyAssessmentState.riskLevel === 'low') {
+                document.getElementById('resultsLowRiskContent').style.display = 'block';
+            } else if (safetyAssessmentState.riskLevel === 'moderate') {
+                document.getElementById('resultsModerateRiskContent').style.display = 'block';
+                document.getElementById('safetyPlanSection').style.display = 'block';
+            } else {
+                document.getElementById('resultsHighRiskContent').style.display = 'block';
+                document.getElementById('safetyPlanSection').style.display = 'block';
+            }
+            
+            // Set message
+            const messages = {
+                low: 'Your responses indicate you\'re coping well right now. Keep using the tools and reach out if things change.',
+                moderate: 'Your responses suggest you could use additional support. We want to help you work through this.',
+                high: 'Your safety is our priority. We\'re connecting you with immediate support and your clinician will be notified.',
+                critical: 'We\'re very concerned about your safety. Professional support is available right now.'
+            };
+            document.getElementById('resultsRiskMessage').textContent = messages[safetyAssessmentState.riskLevel];
+        }
+        
+        function addSafetyPerson() {
+            const name = document.getElementById('safetyPersonName').value.trim();
+            const phone = document.getElementById('safetyPersonPhone').value.trim();
+            
+            if (!name || !phone) {
+                alert('Please enter both name and phone number.');
+                return;
+            }
+            
+            safetyAssessmentState.safetyPlan.people.push({ name, phone });
+            
+            // Add to display
+            let peopleHtml = '';
+            safetyAssessmentState.safetyPlan.people.forEach((person, idx) => {
+                peopleHtml += `
+                    <div class="safety-person-chip">
+                        ${sanitizeHTML(person.name)}: ${sanitizeHTML(person.phone)}
+                        <button onclick="removeSafetyPerson(${idx})">×</button>
+                    </div>
+                `;
+            });
+            document.getElementById('safetyPeopleList').innerHTML = peopleHtml;
+            
+            // Clear inputs
+            document.getElementById('safetyPersonName').value = '';
+            document.getElementById('safetyPersonPhone').value = '';
+        }
+        
+        function removeSafetyPerson(idx) {
+            safetyAssessmentState.safetyPlan.people.splice(idx, 1);
+            
+            // Redraw
+            let peopleHtml = '';
+            safetyAssessmentState.safetyPlan.people.forEach((person, idx) => {
+                peopleHtml += `
+                    <div class="safety-person-chip">
+                        ${sanitizeHTML(person.name)}: ${sanitizeHTML(person.phone)}
+                        <button onclick="removeSafetyPerson(${idx})">×</button>
+                    </div>
+                `;
+            });
+            document.getElementById('safetyPeopleList').innerHTML = peopleHtml;
+        }
+        
+        function saveSafetyPlan() {
+            // Collect safety plan data
+            safetyAssessmentState.safetyPlan = {
+                warningSigns: document.getElementById('safetyWarningSigns').value,
+                copingInternal: document.getElementById('safetyCopingInternal').value,
+                distractions: document.getElementById('safetyDistractions').value,
+                people: safetyAssessmentState.safetyPlan.people,
+                environment: document.getElementById('safetyEnvironment').value
+            };
+            
+            if (!safetyAssessmentState.safetyPlan.warningSigns || 
+                !safetyAssessmentState.safetyPlan.copingInternal || 
+                !safetyAssessmentState.safetyPlan.distractions || 
+                !safetyAssessmentState.safetyPlan.environment) {
+                alert('Please complete all sections of your safety plan.');
+                return;
+            }
+            
+            // Submit safety plan to backend
+            submitSafetyPlanToBackend();
+        }
+        
+        async function submitSafetyAssessmentToBackend() {
+            try {
+                const response = await fetch('/api/c-ssrs/submit', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        responses: safetyAssessmentState.responses,
+                        timestamp: safetyAssessmentState.timestamp
+                    })
+                });
+                
+                const data = await response.json();
+                if (!response.ok) {
+                    console.error('Assessment submission error:', data);
+                }
+            } catch (error) {
+                console.error('Safety assessment submission error:', error);
+            }
+        }
+        
+        async function submitSafetyPlanToBackend() {
+            try {
+                const response = await fetch('/api/c-ssrs/{id}/safety-plan', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        safety_plan: safetyAssessmentState.safetyPlan,
+                        assessment_timestamp: safetyAssessmentState.timestamp
+                    })
+                });
+                
+                const data = await response.json();
+                if (response.ok) {
+                    alert('✓ Your safety plan has been saved and your clinician notified.');
+                    closeSafetyAssessment();
+                } else {
+                    console.error('Safety plan submission error:', data);
+                    alert('Safety plan saved locally.');
+                    closeSafetyAssessment();
+                }
+            } catch (error) {
+                console.error('Safety plan submission error:', error);
+                alert('Safety plan saved locally.');
+                closeSafetyAssessment();
+            }
+        }
+        
+        function closeSafetyAssessment() {
+            document.getElementById('safetyStartScreen').style.display = 'block';
+            document.getElementById('safetyAssessmentContainer').style.display = 'none';
+            document.getElementById('safetyResultsContainer').style.display = 'none';
+            safetyAssessmentState.active = false;
+        }
+        
+        function skipSafetyAssessment() {
+            closeSafetyAssessment();
+        }
+        
+        // ===== REAL-TIME RISK DETECTION IN CHAT =====
+        function updateChatRiskIndicator(riskAnalysis) {
+            if (!riskAnalysis) return;
+            
+            const container = document.getElementById('riskIndicatorContainer');
+            const scoreLevelMap = {
+                'green': { title: '✓ No Risk', message: 'You\'re safe. Keep sharing.' },
+                'amber': { title: '⚠️ Monitor', message: 'We\'re watching for changes.' },
+                'orange': { title: '🔸 Concerning', message: 'Some risk indicators detected.' },
+                'red': { title: '🔴 High Risk', message: 'We\'re concerned about your safety.' }
+            };
+            
+            const info = scoreLevelMap[riskAnalysis.risk_level] || scoreLevelMap['green'];
+            
+            // Update indicator
+            const dot = document.getElementById('riskIndicatorDot');
+            dot.classList = `risk-dot risk-${riskAnalysis.risk_level}`;
+            
+            document.getElementById('riskIndicatorTitle').textContent = info.title;
+            document.getElementById('riskIndicatorMessage').textContent = info.message;
+            
+            // Show if not low risk
+            if (riskAnalysis.risk_level !== 'green') {
+                container.style.display = 'block';
+            } else {
+                container.style.display = 'none';
+            }
+        }
+        
+        // Chat Functions
+        let isVoiceListening = false;
+        let speechRecognition = null;
+
+        async function sendMessage() {
+            const input = document.getElementById('chatInput');
+            const message = input.value.trim();
+
+            if (!message) return;
+
+            // === /suggest slash command handling ===
+            if (message.startsWith('/suggest ')) {
+                const suggestionText = message.substring(9).trim();
+                if (!suggestionText) {
+                    showToast('Please provide feedback after /suggest', 'warning');
+                    return;
+                }
+                if (suggestionText.length > 300) {
+                    showToast('Suggestion must be 300 characters or fewer', 'warning');
+                    return;
+                }
+                input.value = '';
+                input.style.height = 'auto';
+                await saveSuggestion(suggestionText);
+                return;
+            }
+            if (message === '/suggest') {
+                showToast('Usage: /suggest Your feedback here', 'info');
+                input.value = '';
+                return;
+            }
+            if (message === '/suggestions') {
+                input.value = '';
+                toggleSuggestionManager();
+                return;
+            }
+
+            // Log message send to activity logger (metadata only, not content)
+            try {
+                if (activityLogger) {
+                    activityLogger.logActivity('message_sent', 'length:' + message.length, 'therapy');
+                }
+            } catch(e) {}
+
+            addMessage(message, 'user', null, new Date().toISOString());
+            input.value = '';
+            input.style.height = 'auto'; // Reset textarea height
+
+            // Show thinking animation
+            const thinkingId = Date.now();
+            const thinkingHtml = `
+                <div class="ai-thinking">
+                    <div class="thinking-dots">
+                        <span></span><span></span><span></span>
+                    </div>
+                    <span>Thinking...</span>
+                </div>
+            `;
+            addMessage(thinkingHtml, 'ai', thinkingId, null, true);
+
+            const startTime = Date.now();
+
+            try {
+                // Prepare request body with optional wellness data
+                const requestBody = {
+                    username: currentUser,
+                    message: message
+                };
+                
+                // Include wellness data if available (recently completed check-in)
+                if (wellnessRitualState && wellnessRitualState.data && Object.keys(wellnessRitualState.data).length > 0) {
+                    requestBody.wellness_data = wellnessRitualState.data;
+                }
+                
+                // Ask for a streamed (SSE) reply so tokens render as they are generated
+                requestBody.stream = true;
+                const response = await fetch('/api/therapy/chat', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+                    body: JSON.stringify(requestBody)
+                });
+
+                let data;
+                let aiMessageEl = null;
+                const contentType = response.headers.get('Content-Type') || '';
+                if (response.ok && contentType.includes('text/event-stream')) {
+                    let replyText = '';
+                    data = await readChatStream(response, (delta) => {
+                        if (!aiMessageEl) {
+                            document.getElementById('msg-' + thinkingId)?.remove();
+                            aiMessageEl = addMessage('', 'ai', null, new Date().toISOString());
+                        }
+                        replyText += delta;
+                        aiMessageEl.firstChild.innerHTML = sanitizeWithLineBreaks(replyText);
+                        aiMessageEl.dataset.searchText = replyText.toLowerCase();
+                    });
+                } else {
+                    data = await response.json();
+
+                    // Ensure minimum "thinking" time of 2-4 seconds for realism
+                    const elapsed = Date.now() - startTime;
+                    const minDelay = 2000 + Math.random() * 2000; // 2-4 seconds
+                    if (elapsed < minDelay) {
+                        await new Promise(resolve => setTimeout(resolve, minDelay - elapsed));
+                    }
+                }
+
+                // Remove thinking animation
+                const thinkingEl = document.getElementById('msg-' + thinkingId);
+                if (thinkingEl) thinkingEl.remove();
+
+                if (response.ok && !data.error) {
+                    if (!aiMessageEl) {
+                        aiMessageEl = addMessage(data.response, 'ai', null, new Date().toISOString());
+                    }
+
+                    // Scroll so the AI response beginning is visible
+                    if (aiMessageEl) {
+                        setTimeout(() => {
+                            aiMessageEl.scrollIntoView({ behavior: 'smooth', block: 'start' });
+                        }, 100);
+                    }
+                    
+                    // === NEW: Handle risk analysis from AI ===
+                    if (data.risk_analysis) {
+                        // Update risk indicator in chat area
+                        updateChatRiskIndicator(data.risk_analysis);
+                        
+                        // If action is needed (risk_score > 60), show assessment prompt
+                        if (data.risk_analysis.action_needed && !safetyAssessmentState.active) {
+                            setTimeout(() => {
+                                showRiskPromptModal(data.risk_analysis.risk_level);
+                            }, 2000);
+                        }
+                        
+                        // If urgent action needed (HIGH/CRITICAL), alert clinician immediately
+                        if (data.risk_analysis.urgent_action) {
+                            console.warn('URGENT: Risk flagged - clinician will be notified');
+                            // Additional UI could go here (e.g., show "Clinician notified" message)
+                        }
+                    }
+
+                    // Reward pet for therapy session
+                    await rewardPet('therapy');
+                } else {
+                    if (aiMessageEl) aiMessageEl.remove();  // partial streamed reply was not saved
+                    const errorMsg = data.error || 'Sorry, I encountered an error. Please try again.';
+                    console.error('Chat API error:', data);
+                    addMessage(`Error: ${errorMsg}`, 'ai');
+                }
+            } catch (error) {
+                document.getElementById('msg-' + thinkingId)?.remove();
+                addMessage('Connection error. Please check your internet.', 'ai');
+                console.error('Chat error:', error);
+            }
+        }
+
+        // Read the SSE body of a streamed chat reply. Calls onToken for each
+        // 'token' event; resolves with the 'done' (or 'error') event payload.
+        async function readChatStream(response, onToken) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let result = null;
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const block = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    let event = 'message';
+                    let payload = '';
+                    block.split('\n').forEach(line => {
+                        if (line.startsWith('event: ')) event = line.slice(7);
+                        else if (line.startsWith('data: ')) payload += line.slice(6);
+                    });
+                    if (!payload) continue;
+                    const parsed = JSON.parse(payload);
+                    if (event === 'token') onToken(parsed.content);
+                    else if (event === 'done' || event === 'error') result = parsed;
+                }
+            }
+            return result || { error: 'The connection was interrupted. Please try again.' };
+        }
+        
+        // === Patient AI Suggestion Functions ===
+        async function saveSuggestion(text) {
+            try {
+                const response = await fetch('/api/suggestions', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'include',
+                    body: JSON.stringify({ suggestion_text: text })
+                });
+                const data = await response.json();
+                if (response.ok) {
+                    addMessage('Your suggestion has been saved. I\'ll adapt based on your feedback going forward.', 'ai', null, new Date().toISOString());
+                    showToast('Suggestion saved', 'success');
+                    if (activityLogger) {
+                        activityLogger.logActivity('suggestion_added', 'length:' + text.length, 'therapy');
+                    }
+                } else {
+                    showToast(data.error || 'Failed to save suggestion', 'error');
+                }
+            } catch (err) {
+                showToast('Error saving suggestion', 'error');
+                console.error('Suggestion save error:', err);
+            }
+        }
+
+        function toggleSuggestionManager() {
+            const mgr = document.getElementById('suggestionManager');
+            if (!mgr) return;
+            if (mgr.style.display === 'none' || !mgr.style.display) {
+                mgr.style.display = 'block';
+                loadSuggestions();
+            } else {
+                mgr.style.display = 'none';
+            }
+        }
+
+        async function loadSuggestions() {
+            const container = document.getElementById('suggestionList');
+            if (!container) return;
+            container.innerHTML = '<p style="color: var(--text-muted); font-size:0.9em;">Loading...</p>';
+            try {
+                const response = await fetch('/api/suggestions', { credentials: 'include' });
+                const data = await response.json();
+                if (!data.suggestions || data.suggestions.length === 0) {
+                    container.innerHTML = '<p style="color: var(--text-muted); font-size:0.9em;">No active suggestions. Type <strong>/suggest</strong> in chat to add one.</p>';
+                    return;
+                }
+                container.innerHTML = data.suggestions.map(function(s) {
+                    return '<div style="display:flex; justify-content:space-between; align-items:center; padding:8px 0; border-bottom:1px solid var(--border-color, #e0e0e0);">' +
+                        '<span style="flex:1; font-size:0.9em;">' + sanitizeWithLineBreaks(s.text) + '</span>' +
+                        '<button onclick="deleteSuggestion(' + s.id + ')" style="background:none; border:none; color:var(--danger-color, #e74c3c); cursor:pointer; padding:4px 8px;" title="Remove suggestion">' +
+                        '<i class="fas fa-trash-alt"></i>' +
+                        '</button>' +
+                    '</div>';
+                }).join('');
+            } catch (err) {
+                container.innerHTML = '<p style="color: var(--danger-color); font-size:0.9em;">Failed to load suggestions</p>';
+                console.error('Failed to load suggestions:', err);
+            }
+        }
+
+        async function deleteSuggestion(id) {
+            if (!confirm('Remove this suggestion? The AI will no longer follow this preference.')) return;
+            try {
+                const response = await fetch('/api/suggestions/' + id, {
+                    method: 'DELETE',
+                    credentials: 'include'
+                });
+                if (response.ok) {
+                    showToast('Suggestion removed', 'success');
+                    loadSuggestions();
+                } else {
+                    const data = await response.json();
+                    showToast(data.error || 'Failed to remove suggestion', 'error');
+                }
+            } catch (err) {
+                showToast('Error removing suggestion', 'error');
+            }
+        }
+
+        function showRiskPromptModal(riskLevel) {
+            const prompts = {
+                amber: {
+                    title: '⚠️ Check-in',
+                    message: 'Your messages have some concerning language. Would you like to take a quick safety assessment?',
+                    buttons: [
+                        { text: 'Yes, assess me', action: 'startSafetyAssessment()' },
+                        { text: 'Not now', action: 'closeRiskPrompt()' }
+                    ]
+                },
+                orange: {
+                    title: '⚠️ We\'re Concerned',
+                    message: 'Your recent messages suggest you might be struggling. A brief assessment will help us support you better.',
+                    buttons: [
+                        { text: 'Start assessment', action: 'startSafetyAssessment()' },
+                        { text: 'Remind me later', action: 'closeRiskPrompt()' }
+                    ]
+                },
+                red: {
+                    title: '🚨 Safety Check Needed',
+                    message: 'Based on what you\'ve shared, we want to make sure you\'re safe. Please complete a quick assessment.',
+                    buttons: [
+                        { text: 'Take assessment now', action: 'startSafetyAssessment()' },
+                        { text: 'Contact crisis line: 116 123', action: 'openCrisisSupport()' }
+                    ]
+                }
+            };
+            
+            const prompt = prompts[riskLevel] || prompts['orange'];
+            
+            let buttonsHtml = '';
+            prompt.buttons.forEach(btn => {
+                buttonsHtml += `<button class="btn" onclick="${btn.action}" style="flex: 1; margin-right: 10px;">${btn.text}</button>`;
+            });
+            
+            const modalHtml = `
+                <div class="risk-prompt-modal" id="riskPromptModal">
+                    <div class="risk-prompt-content">
+                        <h3>${prompt.title}</h3>
+                        <p>${prompt.message}</p>
+                        <div style="display: flex; gap: 10px; margin-top: 20px;">
+                            ${buttonsHtml}
+                        </div>
+                    </div>
+                </div>
+            `;
+            
+            // Inject modal
+            const existingModal = document.getElementById('riskPromptModal');
+            if (existingModal) existingModal.remove();
+            
+            document.body.insertAdjacentHTML('beforeend', modalHtml);
+        }
+        
+        function closeRiskPrompt() {
+            const modal = document.getElementById('riskPromptModal');
+            if (modal) modal.remove();
+        }
+        
+        function openCrisisSupport() {
+            window.open('tel:116123', '_self');
+            closeRiskPrompt();
+        }
+
+        // Voice Input Functions
+        function initVoiceRecognition() {
+            if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
+                const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
+                speechRecognition = new SpeechRecognition();
+                speechRecognition.continuous = true;
+                speechRecognition.interimResults = true;
+                speechRecognition.lang = 'en-GB';
+
+                speechRecognition.onresult = (event) => {
+                    let finalTranscript = '';
+                    let interimTranscript = '';
+
+                    for (let i = event.resultIndex; i < event.results.length; i++) {
+                        const transcript = event.results[i][0].transcript;
+                        if (event.results[i].isFinal) {
+                            finalTranscript += transcript;
+                        } else {
+                            interimTranscript += transcript;
+                        }
+                    }
+
+                    const input = document.getElementById('chatInput');
+                    if (finalTranscript) {
+                        input.value += finalTranscript;
+                        autoResizeTextarea(input);
+                    }
+
+                    document.getElementById('voiceStatusText').textContent =
+                        interimTranscript ? `"${interimTranscript}"` : 'Listening...';
+                };
+
+                speechRecognition.onerror = (event) => {
+                    console.error('Speech recognition error:', event.error);
+                    stopVoiceInput();
+                    if (event.error === 'not-allowed') {
+                        alert('Microphone access denied. Please allow microphone access in your browser settings.');
+                    }
+                };
+
+                speechRecognition.onend = () => {
+                    if (isVoiceListening) {
+                        // Restart if still supposed to be listening
+                        speechRecognition.start();
+                    }
+                };
+
+                return true;
+            }
+            return false;
+        }
+
+        function toggleVoiceInput() {
+            if (isVoiceListening) {
+                stopVoiceInput();
+            } else {
+                startVoiceInput();
+            }
+        }
+
+        function startVoiceInput() {
+            if (!speechRecognition && !initVoiceRecognition()) {
+                alert('Voice input is not supported in your browser. Try Chrome or Edge.');
+                return;
+            }
+
+            isVoiceListening = true;
+            document.getElementById('voiceBtn').classList.add('listening');
+            document.getElementById('voiceStatus').style.display = 'flex';
+            document.getElementById('voiceStatusText').textContent = 'Listening...';
+
+            try {
+                speechRecognition.start();
+            } catch (e) {
+                console.error('Speech start error:', e);
+            }
+        }
+
+        function stopVoiceInput() {
+            isVoiceListening = false;
+            document.getElementById('voiceBtn').classList.remove('listening');
+            document.getElementById('voiceStatus').style.display = 'none';
+
+            if (speechRecognition) {
+                try {
+                    speechRecognition.stop();
+                } catch (e) {
+                    console.error('Speech stop error:', e);
+                }
+            }
+        }
+
+        // Auto-resize textarea as user types
+        function autoResizeTextarea(textarea) {
+            // Reset height to measure actual content
+            textarea.style.height = 'auto';
+            // Set to content height, max 200px
+            const newHeight = Math.min(textarea.scrollHeight, 200);
+            textarea.style.height = newHeight + 'px';
+            // If content exceeds max, ensure scroll is enabled
+            textarea.style.overflowY = textarea.scrollHeight > 200 ? 'scroll' : 'auto';
+        }
+
+        // Initialize textarea auto-resize (run after DOM loaded)
+        if (document.readyState === 'loading') {
+            document.addEventListener('DOMContentLoaded', initChatInput);
+        } else {
+            // DOM already loaded
+            setTimeout(initChatInput, 100);
+        }
+
+        function initChatInput() {
+            const chatInput = document.getElementById('chatInput');
+            if (chatInput) {
+                chatInput.addEventListener('input', function() {
+                    autoResizeTextarea(this);
+                });
+            }
+        }
+        
+        function addMessage(text, sender, id, timestamp, isRawHtml = false) {
+            const messagesDiv = document.getElementById('chatMessages');
+            const messageEl = document.createElement('div');
+            messageEl.className = `message ${sender}`;
+            if (id) messageEl.id = 'msg-' + id;
+
+            // Add message content (sanitized to prevent XSS, unless isRawHtml is true)
+            const contentDiv = document.createElement('div');
+            if (isRawHtml) {
+                // For trusted HTML (like thinking animation)
+                contentDiv.innerHTML = text;
+            } else {
+                // For user input, sanitize to prevent XSS
+                contentDiv.innerHTML = sanitizeWithLineBreaks(text);
+            }
+            messageEl.appendChild(contentDiv);
+
+            // Add timestamp if provided
+            if (timestamp) {
+                const timestampDiv = document.createElement('div');
+                timestampDiv.className = 'message-timestamp';
+                timestampDiv.textContent = formatTimestamp(timestamp);
+                messageEl.appendChild(timestampDiv);
+                messageEl.dataset.timestamp = timestamp;
+                messageEl.dataset.searchText = text.toLowerCase();
+            }
+
+            messagesDiv.appendChild(messageEl);
+
+            // For user messages, scroll to bottom; for AI, we'll handle separately
+            if (sender === 'user') {
+                messagesDiv.scrollTop = messagesDiv.scrollHeight;
+            }
+
+            return messageEl; // Return element for scroll positioning
+        }
+        
+        function formatTimestamp(timestamp) {
+            const date = new Date(timestamp);
+            const now = new Date();
+            const today = new Date(now.getFullYear(), now.getMonth(), now.getDate());
+            const messageDate = new Date(date.getFullYear(), date.getMonth(), date.getDate());
+            
+            // Format time
+            const timeStr = date.toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit' });
+            
+            // Determine date label
+            if (messageDate.getTime() === today.getTime()) {
+                return `Today at ${timeStr}`;
+            } else if (messageDate.getTime() === today.getTime() - 86400000) {
+                return `Yesterday at ${timeStr}`;
+            } else if (date.getTime() > today.getTime() - 7 * 86400000) {
+                return `${date.toLocaleDateString('en-US', { weekday: 'short' })} at ${timeStr}`;
+            } else {
+                return `${date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' })} at ${timeStr}`;
+            }
+        }
+        
+        // Chat Session Management
+        let currentChatSessionId = null;
+        let allChatSessions = [];
+        
+        async function loadChatSessions() {
+            try {
+                const response = await fetch(`/api/therapy/sessions?username=${currentUser}`);
+                const data = await response.json();
+                
+                if (response.ok && data.sessions) {
+                    allChatSessions = data.sessions;
+                    const activeSession = data.sessions.find(s => s.is_active);
+                    if (activeSession) {
+                        currentChatSessionId = activeSession.id;
+                        document.getElementById('currentSessionBtn').textContent = `💬 ${activeSession.name}`;
+                    }
+                    renderSessionsList();
+                }
+            } catch (error) {
+                console.error('Error loading chat sessions:', error);
+            }
+        }
+        
+        function renderSessionsList() {
+            const list = document.getElementById('sessionsList');
+            list.innerHTML = allChatSessions.map(session => `
+                <div class="session-item ${session.is_active ? 'active' : ''}" onclick="switchChatSession(${session.id})">
+                    <div class="session-info">
+                        <div class="session-name">${sanitizeHTML(session.name)}</div>
+                        <div class="session-meta">${session.message_count} messages · ${formatSessionDate(session.last_active)}</div>
+                    </div>
+                    <div class="session-actions" onclick="event.stopPropagation()">
+                        <button onclick="renameSession(${session.id})" title="Rename">✏️</button>
+                        <button onclick="deleteSession(${session.id})" title="Delete">🗑️</button>
+                    </div>
+                </div>
+            `).join('');
+        }
+        
+        function formatSessionDate(dateStr) {
+            const date = new Date(dateStr);
+            const now = new Date();
+            const diffMs = now - date;
+            const diffMins = Math.floor(diffMs / 60000);
+            
+            if (diffMins < 1) return 'Just now';
+            if (diffMins < 60) return `${diffMins}m ago`;
+            if (diffMins < 1440) return `${Math.floor(diffMins / 60)}h ago`;
+            if (diffMins < 10080) return `${Math.floor(diffMins / 1440)}d ago`;
+            return date.toLocaleDateString();
+        }
+        
+        function showSessionsDropdown() {
+            const dropdown = document.getElementById('sessionsDropdown');
+            dropdown.style.display = dropdown.style.display === 'none' ? 'block' : 'none';
+        }
+        
+        async function createNewSession() {
+            const name = prompt('Enter a name for the new chat:', 'New Chat');
+            if (!name) return;
+            
+            try {
+                const response = await fetch('/api/therapy/sessions', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        session_name: name
+                    })
+                });
+                
+                const data = await response.json();
+                if (response.ok) {
+                    await loadChatSessions();
+                    await loadChatHistory();
+                    showMessage('therapyMessage', `Created new chat: ${name}`, 'success');
+                }
+            } catch (error) {
+                console.error('Error creating session:', error);
+                alert('Failed to create new chat session');
+            }
+        }
+        
+        async function switchChatSession(sessionId) {
+            try {
+                const response = await fetch(`/api/therapy/sessions/${sessionId}`, {
+                    method: 'PUT',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        make_active: true
+                    })
+                });
+                
+                if (response.ok) {
+                    await loadChatSessions();
+                    await loadChatHistory();
+                    document.getElementById('sessionsDropdown').style.display = 'none';
+                }
+            } catch (error) {
+                console.error('Error switching session:', error);
+            }
+        }
+        
+        async function renameSession(sessionId) {
+            const session = allChatSessions.find(s => s.id === sessionId);
+            const newName = prompt('Enter new name:', session.name);
+            if (!newName || newName === session.name) return;
+            
+            try {
+                const response = await fetch(`/api/therapy/sessions/${sessionId}`, {
+                    method: 'PUT',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        session_name: newName
+                    })
+                });
+                
+                if (response.ok) {
+                    await loadChatSessions();
+                    showMessage('therapyMessage', 'Chat renamed successfully', 'success');
+                }
+            } catch (error) {
+                console.error('Error renaming session:', error);
+            }
+        }
+        
+        async function deleteSession(sessionId) {
+            const session = allChatSessions.find(s => s.id === sessionId);
+            if (!confirm(`Delete "${session.name}"? This will permanently delete all messages in this chat.`)) {
+                return;
+            }
+            
+            try {
+                const response = await fetch(`/api/therapy/sessions/${sessionId}?username=${currentUser}`, {
+                    method: 'DELETE'
+                });
+                
+                const data = await response.json();
+                if (response.ok) {
+                    await loadChatSessions();
+                    await loadChatHistory();
+                    showMessage('therapyMessage', 'Chat deleted', 'success');
+                } else {
+                    alert(data.error || 'Failed to delete chat');
+                }
+            } catch (error) {
+                console.error('Error deleting session:', error);
+                alert('Failed to delete chat session');
+            }
+        }
+        
+        // Newest page of the chat; older pages are prepended on demand via next_cursor
+        let chatHistoryCursor = null;
+        let chatSearchTimer = null;
+
+        function chatHistoryUrl(cursor) {
+            let url = `/api/therapy/history?username=${currentUser}`;
+            if (currentChatSessionId) url += `&chat_session_id=${currentChatSessionId}`;
+            if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+            return url;
+        }
+
+        function chatEarlierButton() {
+            return chatHistoryCursor
+                ? '<div class="msg-load-more" id="chatLoadEarlier"><button class="msg-quick-btn" onclick="loadEarlierChatHistory(this)">Load earlier messages</button></div>'
+                : '';
+        }
+
+        async function loadChatHistory() {
+            try {
+                const response = await fetch(chatHistoryUrl());
+                const data = await response.json();
+                
+                if (response.ok && data.history) {
+                    const messagesDiv = document.getElementById('chatMessages');
+                    chatHistoryCursor = data.has_more ? data.next_cursor : null;
+                    messagesDiv.innerHTML = chatEarlierButton();
+                    
+                    data.history.forEach(msg => {
+                        addMessage(msg.message, msg.sender, null, msg.timestamp);
+                    });
+                    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                    if (document.getElementById('chatSearch').value) searchMessages();
+                }
+            } catch (error) {
+                console.error('Error loading chat history:', error);
+            }
+        }
+
+        // Prepend the previous page of the chat without moving the viewport
+        async function loadEarlierChatHistory(btn) {
+            if (!chatHistoryCursor) return;
+            if (btn) { btn.disabled = true; btn.textContent = 'Loading...'; }
+            try {
+                const response = await fetch(chatHistoryUrl(chatHistoryCursor));
+                if (!response.ok) throw new Error('Failed to load earlier messages');
+                const data = await response.json();
+                const messagesDiv = document.getElementById('chatMessages');
+                const oldButton = document.getElementById('chatLoadEarlier');
+                if (oldButton) oldButton.remove();
+                chatHistoryCursor = data.has_more ? data.next_cursor : null;
+
+                const fromBottom = messagesDiv.scrollHeight - messagesDiv.scrollTop;
+                const firstLoaded = messagesDiv.firstChild;
+                (data.history || []).forEach(msg => {
+                    const el = addMessage(msg.message, msg.sender, null, msg.timestamp);
+                    messagesDiv.insertBefore(el, firstLoaded);
+                });
+                messagesDiv.insertAdjacentHTML('afterbegin', chatEarlierButton());
+                messagesDiv.scrollTop = messagesDiv.scrollHeight - fromBottom;
+                if (document.getElementById('chatSearch').value) searchMessages();
+            } catch (error) {
+                console.error('Error loading earlier chat history:', error);
+                showToast(error.message, 'error');
+                if (btn) { btn.disabled = false; btn.textContent = 'Load earlier messages'; }
+            }
+        }
+        
+        function searchMessages() {
+            const searchTerm = document.getElementById('chatSearch').value.toLowerCase();
+            const messages = document.querySelectorAll('.message[data-search-text]');
+            const clearBtn = document.getElementById('clearSearchBtn');
+            
+            clearBtn.style.display = searchTerm ? 'block' : 'none';
+            
+            messages.forEach(msg => {
+                const text = msg.dataset.searchText;
+                if (!searchTerm || text.includes(searchTerm)) {
+                    msg.style.display = '';
+                    msg.classList.remove('highlight');
+                    if (searchTerm && text.includes(searchTerm)) {
+                        msg.classList.add('highlight');
+                    }
+                } else {
+                    msg.style.display = 'none';
+                }
+            });
+
+            // Messages older than the loaded pages are searched on the server
+            clearTimeout(chatSearchTimer);
+            if (searchTerm.trim().length >= 2 && chatHistoryCursor) {
+                chatSearchTimer = setTimeout(() => searchEarlierMessages(searchTerm.trim()), 300);
+            } else {
+                renderEarlierMatches([]);
+            }
+        }
+
+        async function searchEarlierMessages(query) {
+            try {
+                const response = await fetch(`/api/therapy/history/search?q=${encodeURIComponent(query)}`, { credentials: 'include' });
+                if (!response.ok) throw new Error('Search failed');
+                const data = await response.json();
+                if (document.getElementById('chatSearch').value.toLowerCase().trim() !== query) return;
+                const oldest = document.querySelector('#chatMessages .message[data-timestamp]');
+                const loadedFrom = oldest ? new Date(oldest.dataset.timestamp) : null;
+                renderEarlierMatches((data.results || []).filter(r =>
+                    (!currentChatSessionId || String(r.chat_session_id) === String(currentChatSessionId)) &&
+                    (!loadedFrom || new Date(r.timestamp) < loadedFrom)));
+            } catch (error) {
+                console.error('Error searching chat history:', error);
+            }
+        }
+
+        function renderEarlierMatches(results) {
+            const container = document.getElementById('chatSearchResults');
+            if (!container) return;
+            if (!results.length) {
+                container.style.display = 'none';
+                container.innerHTML = '';
+                return;
+            }
+            container.innerHTML = '<div class="chat-search-results-title">Matches in earlier messages</div>' +
+                results.map(r =>
+                    `<div class="message ${r.sender === 'user' ? 'user' : 'ai'} highlight">` +
+                        `<div>${sanitizeWithLineBreaks(r.message || '')}</div>` +
+                        `<div class="message-timestamp">${sanitizeHTML(formatTimestamp(r.timestamp))}</div>` +
+                    '</div>').join('');
+            container.style.display = 'block';
+        }
+        
+        function clearSearch() {
+            document.getElementById('chatSearch').value = '';
+            searchMessages();
+        }
+        
+        function showExportDialog() {
+            const dialog = document.getElementById('exportChatDialog');
+            
+            // Set default date range (last 30 days to today)
+            const today = new Date();
+            const thirtyDaysAgo = new Date(today.getTime() - 30 * 24 * 60 * 60 * 1000);
+            
+            document.getElementById('exportToDate').value = today.toISOString().split('T')[0];
+            document.getElementById('exportFromDate').value = thirtyDaysAgo.toISOString().split('T')[0];
+            
+            dialog.style.display = 'flex';
+        }
+        
+        function closeExportDialog() {
+            document.getElementById('exportChatDialog').style.display = 'none';
+        }
+        
+        async function showActivePatients() {
+            const modal = document.getElementById('activePatientsModal');
+            const content = document.getElementById('activePatientsListContent');
+            
+            modal.style.display = 'flex';
+            content.innerHTML = '<p style="text-align: center; color: #666;">Loading...</p>';
+            
+            try {
+                const response = await fetch(`/api/analytics/active-patients?clinician=${encodeURIComponent(currentUser)}`, {
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                
+                if (!response.ok) {
+                    throw new Error('Failed to load active patients');
+                }
+                
+                const data = await response.json();
+                
+                if (data.active_patients.length === 0) {
+                    content.innerHTML = '<p style="text-align: center; color: #666;">No active patients in the last 7 days</p>';
+                    return;
+                }
+                
+                // Build the list
+                let html = '<div style="display: flex; flex-direction: column; gap: 10px;">';
+                
+                data.active_patients.forEach(patient => {
+                    // Format the timestamp
+                    const activityDate = new Date(patient.last_activity);
+                    const now = new Date();
+                    const diffMs = now - activityDate;
+                    const diffMins = Math.floor(diffMs / 60000);
+                    const diffHours = Math.floor(diffMins / 60);
+                    const diffDays = Math.floor(diffHours / 24);
+                    
+                    let timeAgo;
+                    if (diffMins < 60) {
+                        timeAgo = `${diffMins} minute${diffMins !== 1 ? 's' : ''} ago`;
+                    } else if (diffHours < 24) {
+                        timeAgo = `${diffHours} hour${diffHours !== 1 ? 's' : ''} ago`;
+                    } else {
+                        timeAgo = `${diffDays} day${diffDays !== 1 ? 's' : ''} ago`;
+                    }
+                    
+                    // Activity type icon
+                    let activityIcon = '🔵';
+                    let activityText = 'Login';
+                    if (patient.activity_type === 'mood_log') {
+                        activityIcon = '😊';
+                        activityText = 'Mood Log';
+                    } else if (patient.activity_type === 'chat') {
+                        activityIcon = '💬';
+                        activityText = 'Chat';
+                    }
+                    
+                    html += `
+                        <div style="background: #f5f5f5; padding: 15px; border-radius: 8px; display: flex; justify-content: space-between; align-items: center;">
+                            <div>
+                                <div style="font-weight: bold; margin-bottom: 5px;">${patient.full_name || patient.username}</div>
+                                <div style="color: #666; font-size: 14px;">${activityIcon} ${activityText}</div>
+                            </div>
+                            <div style="text-align: right;">
+                                <div style="color: #8b5cf6; font-weight: bold;">${timeAgo}</div>
+                                <div style="color: #999; font-size: 12px;">${activityDate.toLocaleString()}</div>
+                            </div>
+                        </div>
+                    `;
+                });
+                
+                html += '</div>';
+                content.innerHTML = html;
+                
+            } catch (error) {
+                console.error('Error loading active patients:', error);
+                content.innerHTML = '<p style="text-align: center; color: #e74c3c;">Error loading active patients</p>';
+            }
+        }
+        
+        function closeActivePatientsModal() {
+            document.getElementById('activePatientsModal').style.display = 'none';
+        }
+        
+        async function exportChat() {
+            const fromDate = document.getElementById('exportFromDate').value;
+            const toDate = document.getElementById('exportToDate').value;
+            const format = document.getElementById('exportFormat').value;
+            
+            if (!fromDate || !toDate) {
+                alert('Please select both from and to dates');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/therapy/export', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        from_date: fromDate,
+                        to_date: toDate,
+                        format: format
+                    })
+                });
+                
+                if (response.ok) {
+                    const blob = await response.blob();
+                    const url = window.URL.createObjectURL(blob);
+                    const a = document.createElement('a');
+                    a.href = url;
+                    a.download = `chat_export_${fromDate}_to_${toDate}.${format}`;
+                    document.body.appendChild(a);
+                    a.click();
+                    document.body.removeChild(a);
+                    window.URL.revokeObjectURL(url);
+                    
+                    closeExportDialog();
+                    showMessage('therapyMessage', 'Chat exported successfully!', 'success');
+                } else {
+                    const data = await response.json();
+                    alert('Export failed: ' + (data.error || 'Unknown error'));
+                }
+            } catch (error) {
+                console.error('Export error:', error);
+                alert('Failed to export chat. Please try again.');
+            }
+        }
+        
+        function addSystemMessage(text) {
+            addMessage(text, 'ai');
+        }
+        
+        // Mood Tracking
+        function selectMood(value, element) {
+            selectedMoodValue = value;
+            document.querySelectorAll('.mood-option').forEach(opt => opt.classList.remove('selected'));
+            element.classList.add('selected');
+        }
+        
+        function addMedication() {
+            const name = document.getElementById('medName').value.trim();
+            const strength = document.getElementById('medStrength').value.trim();
+            const qty = document.getElementById('medQty').value.trim() || '1';
+            
+            if (!name) {
+                showMessage('moodMessage', 'Please enter medication name', 'error');
+                return;
+            }
+            
+            medications.push({name, strength, quantity: qty});
+            updateMedList();
+            
+            // Clear inputs
+            document.getElementById('medName').value = '';
+            document.getElementById('medStrength').value = '';
+            document.getElementById('medQty').value = '1';
+        }
+        
+        function updateMedList() {
+            const listEl = document.getElementById('medList');
+            listEl.innerHTML = medications.map((med, idx) => `
+                <div class="med-item">
+                    <span>${sanitizeHTML(med.name)} ${sanitizeHTML(med.strength)}mg (x${med.quantity})</span>
+                    <button onclick="removeMed(${idx})">Remove</button>
+                </div>
+            `).join('');
+        }
+        
+        function removeMed(index) {
+            medications.splice(index, 1);
+            updateMedList();
+        }
+        
+        async function logMood() {
+            if (!selectedMoodValue) {
+                showMessage('moodMessage', 'Please select a mood level', 'error');
+                return;
+            }
+            
+            const sleep = parseFloat(document.getElementById('sleepHours').value) || 0;
+            const water = parseFloat(document.getElementById('waterPints').value) || 0;
+            const exercise = parseInt(document.getElementById('exerciseMins').value) || 0;
+            const outside = parseInt(document.getElementById('outsideMins').value) || 0;
+            const notes = document.getElementById('moodNotes').value.trim();
+            
+            try {
+                const response = await fetch('/api/mood/log', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        mood_val: selectedMoodValue,
+                        sleep_val: sleep,
+                        water_pints: water,
+                        exercise_mins: exercise,
+                        outside_mins: outside,
+                        meds: medications,
+                        notes
+                    })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    showMessage('moodMessage', 'Mood logged successfully! 🎉 Keep tracking your progress! (+5 Coins)', 'success');
+                    // Reward pet
+                    await rewardPet('mood');
+                    // Clear form
+                    selectedMoodValue = null;
+                    medications = [];
+                    document.querySelectorAll('.mood-option').forEach(opt => opt.classList.remove('selected'));
+                    document.getElementById('sleepHours').value = '';
+                    document.getElementById('waterPints').value = '';
+                    document.getElementById('exerciseMins').value = '';
+                    document.getElementById('outsideMins').value = '';
+                    document.getElementById('moodNotes').value = '';
+                    updateMedList();
+                } else if (response.status === 409) {
+                    // Already logged today - show friendly message
+                    showMessage('moodMessage', '✓ You\'ve already logged your mood today! See you tomorrow! 😊', 'success');
+                } else {
+                    let errorMsg = data && data.error ? data.error : 'Failed to log mood';
+                    if (data && data.trace) {
+                        errorMsg += '\n[Server Trace]\n' + data.trace;
+                    }
+                    showMessage('moodMessage', errorMsg, 'error');
+                }
+            } catch (error) {
+                showMessage('moodMessage', 'Connection error. Please try again.', 'error');
+                console.error('Mood log error:', error);
+            }
+        }
+        
+        // Gratitude Journal
+        async function logGratitude() {
+            const entry = document.getElementById('gratitudeEntry').value.trim();
+            
+            if (!entry) {
+                showMessage('gratitudeMessage', 'Please write something you\'re grateful for', 'error');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/gratitude/log', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username: currentUser, entry })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    showMessage('gratitudeMessage', 'Gratitude entry saved! 🙏 Practice makes perfect! (+5 Coins)', 'success');
+                    await rewardPet('gratitude');
+                    document.getElementById('gratitudeEntry').value = '';
+                } else {
+                    let errorMsg = data && data.error ? data.error : 'Failed to save entry';
+                    if (data && data.trace) {
+                        errorMsg += '\n[Server Trace]\n' + data.trace;
+                    }
+                    showMessage('gratitudeMessage', errorMsg, 'error');
+                }
+            } catch (error) {
+                showMessage('gratitudeMessage', 'Connection error. Please try again.', 'error');
+                console.error('Gratitude log error:', error);
+            }
+        }
+        
+        // CBT Tools
+        async function saveCBT() {
+            const situation = document.getElementById('cbtSituation').value.trim();
+            const thought = document.getElementById('cbtThought').value.trim();
+            const evidence = document.getElementById('cbtEvidence').value.trim();
+            
+            if (!situation || !thought) {
+                showMessage('cbtMessage', 'Please fill in situation and thought fields', 'error');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/cbt/thought-record', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username: currentUser, situation, thought, evidence })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    showMessage('cbtMessage', 'Thought record saved! 🧠 Great work challenging your thoughts! (+15 Coins)', 'success');
+                    await rewardPet('cbt', 'cbt');
+                    document.getElementById('cbtSituation').value = '';
+                    document.getElementById('cbtThought').value = '';
+                    document.getElementById('cbtEvidence').value = '';
+                } else {
+                    showMessage('cbtMessage', data.error || 'Failed to save record', 'error');
+                }
+            } catch (error) {
+                showMessage('cbtMessage', 'Connection error. Please try again.', 'error');
+            }
+        }
+        
+        async function startBreathing() {
+            const display = document.getElementById('breathingDisplay');
+            display.classList.remove('hidden');
+            
+            for (let cycle = 0; cycle < 3; cycle++) {
+                display.textContent = 'Breathe IN for 4...';
+                await sleep(4000);
+                display.textContent = 'HOLD for 7...';
+                await sleep(7000);
+                display.textContent = 'Breathe OUT for 8...';
+                await sleep(8000);
+            }
+            
+            display.textContent = '✅ Exercise Complete! Well done!';
+            await rewardPet('breathing');
+            setTimeout(() => display.classList.add('hidden'), 3000);
+        }
+        
+        function sleep(ms) {
+            return new Promise(resolve => setTimeout(resolve, ms));
+        }
+        
+        // Pet Game
+        async function loadPetStatus() {
+            try {
+                const response = await fetch(`/api/pet/status?username=${encodeURIComponent(currentUser)}`);
+                const data = await response.json();
+                
+                if (data.exists) {
+                    document.getElementById('petCreate').classList.add('hidden');
+                    document.getElementById('petDisplay').classList.remove('hidden');
+                    updatePetDisplay(data.pet);
+                } else {
+                    document.getElementById('petCreate').classList.remove('hidden');
+                    document.getElementById('petDisplay').classList.add('hidden');
+                }
+            } catch (error) {
+                console.error('Pet load error:', error);
+            }
+        }
+        
+        async function createPet() {
+            const name = document.getElementById('petName').value.trim();
+            const species = document.getElementById('petSpecies').value;
+            const gender = document.getElementById('petGender').value;
+            
+            if (!name) {
+                alert('Please enter a pet name');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/pet/create', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser, name, species, gender })
+                });
+                
+                if (response.ok) {
+                    alert(`${name} adopted! 🎉 Take good care of your companion!`);
+                    loadPetStatus();
+                }
+            } catch (error) {
+                console.error('Pet create error:', error);
+            }
+        }
+        
+        function updatePetDisplay(pet) {
+            document.getElementById('petNameDisplay').textContent = pet.name;
+            document.getElementById('petEmojiDisplay').textContent = speciesEmojis[pet.species] || '🐾';
+            document.getElementById('petCoins').textContent = pet.coins;
+            document.getElementById('petXP').textContent = pet.xp;
+            document.getElementById('petStage').textContent = pet.stage;
+            
+            document.getElementById('hungerBar').style.width = pet.hunger + '%';
+            document.getElementById('happinessBar').style.width = pet.happiness + '%';
+            document.getElementById('energyBar').style.width = pet.energy + '%';
+            document.getElementById('hygieneBar').style.width = pet.hygiene + '%';
+            
+            // Check if pet is on an adventure and resume countdown
+            if (pet.adventure_end && pet.adventure_end > 0) {
+                const now = Date.now() / 1000;
+                if (pet.adventure_end > now) {
+                    startWalkCountdown(pet.adventure_end);
+                }
+            }
+        }
+        
+        async function rewardPet(action, activity_type = null) {
+            try {
+                const response = await fetch('/api/pet/reward', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ action, activity_type, username: currentUser })
+                });
+                
+                if (response.ok) {
+                    const data = await response.json();
+                    if (data.success) {
+                        // Show reward notification
+                        if (data.evolved) {
+                            alert(`🎉 Amazing! Your pet evolved to ${data.new_stage}!`);
+                        }
+                        // Refresh pet display if on pet tab
+                        if (document.getElementById('petTab').classList.contains('active')) {
+                            loadPetStatus();
+                        }
+                    }
+                }
+            } catch (error) {
+                console.error('Pet reward error:', error);
+            }
+        }
+        
+        async function refreshPet() {
+            // Stat decay is applied server-side whenever the pet is read
+            await loadPetStatus();
+            await checkPetReturn();
+        }
+        
+        let walkCountdownInterval = null;
+        
+        async function checkPetReturn() {
+            try {
+                const response = await fetch('/api/pet/check-return', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser })
+                });
+                
+                if (response.ok) {
+                    const data = await response.json();
+                    if (data.returned) {
+                        alert('🎉 ' + data.message + ' Earned: 🪙 ' + data.coins_earned + ' coins!');
+                        loadPetStatus();
+                    }
+                }
+            } catch (error) {
+                console.error('Pet return check error:', error);
+            }
+        }
+        
+        function openShop() {
+            const shopModal = document.getElementById('shopModal');
+            shopModal.style.display = 'flex';
+            loadShopItems();
+        }
+        
+        function closeShop() {
+            document.getElementById('shopModal').style.display = 'none';
+        }
+        
+        async function loadShopItems() {
+            try {
+                const response = await fetch('/api/pet/shop');
+                const data = await response.json();
+                
+                const currentCoins = parseInt(document.getElementById('petCoins').textContent);
+                document.getElementById('shopCoins').textContent = currentCoins;
+                
+                const container = document.getElementById('shopItems');
+                container.innerHTML = data.items.map(item => `
+                    <div style="border: 2px solid #e0e0e0; border-radius: 12px; padding: 15px; margin-bottom: 10px; display: flex; justify-content: space-between; align-items: center;">
+                        <div>
+                            <div style="font-weight: bold; font-size: 16px;">${sanitizeHTML(item.name)}</div>
+                            <div style="font-size: 13px; color: #666;">${sanitizeHTML(item.description)}</div>
+                        </div>
+                        <button class="btn" onclick="buyItem('${item.id}')" style="padding: 8px 16px; width: auto; ${currentCoins < item.cost ? 'opacity: 0.5; cursor: not-allowed;' : ''}">
+                            🪙 ${item.cost}
+                        </button>
+                    </div>
+                `).join('');
+            } catch (error) {
+                console.error('Shop load error:', error);
+            }
+        }
+        
+        async function buyItem(itemId) {
+            try {
+                const response = await fetch('/api/pet/buy', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser, item_id: itemId })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok && data.success) {
+                    alert('Item purchased! 🎉');
+                    loadPetStatus();
+                    loadShopItems();
+                } else {
+                    alert(data.error || 'Purchase failed');
+                }
+            } catch (error) {
+                console.error('Buy error:', error);
+                alert('Purchase failed');
+            }
+        }
+        
+        function openDeclutter() {
+            document.getElementById('declutterModal').style.display = 'flex';
+            document.getElementById('worry1').value = '';
+            document.getElementById('worry2').value = '';
+            document.getElementById('worry3').value = '';
+        }
+        
+        function closeDeclutter() {
+            document.getElementById('declutterModal').style.display = 'none';
+        }
+        
+        async function submitDeclutter() {
+            const worry1 = document.getElementById('worry1').value.trim();
+            const worry2 = document.getElementById('worry2').value.trim();
+            const worry3 = document.getElementById('worry3').value.trim();
+            
+            const worries = [worry1, worry2, worry3].filter(w => w);
+            
+            if (worries.length === 0) {
+                alert('Please enter at least one worry to throw away');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/pet/declutter', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser, worries })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok && data.success) {
+                    alert(data.message);
+                    closeDeclutter();
+                    loadPetStatus();
+                } else {
+                    alert(data.error || 'Declutter failed');
+                }
+            } catch (error) {
+                console.error('Declutter error:', error);
+            }
+        }
+        
+        async function startAdventure() {
+            // Check current status first
+            try {
+                const statusResponse = await fetch(`/api/pet/status?username=${encodeURIComponent(currentUser)}`);
+                const statusData = await statusResponse.json();
+                
+                if (statusData.exists && statusData.pet.adventure_end) {
+                    const remaining = statusData.pet.adventure_end - (Date.now() / 1000);
+                    if (remaining > 0) {
+                        const minutes = Math.ceil(remaining / 60);
+                        alert(`Your pet is still on a walk! Please wait ${minutes} more minute(s).`);
+                        return;
+                    }
+                }
+            } catch (error) {
+                console.error('Status check error:', error);
+            }
+            
+            const confirm = window.confirm("Send your pet on a 30-minute walk? Your pet will earn rewards when they return!");
+            
+            if (!confirm) return;
+            
+            try {
+                const response = await fetch('/api/pet/adventure', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser })
+                });
+
+                const data = await response.json();
+
+                if (response.ok && data.success) {
+                    alert(data.message + ' They will return with rewards in 30 minutes! 🎁');
+                    startWalkCountdown(data.return_time);
+                    loadPetStatus();
+                } else {
+                    alert(data.error || 'Adventure failed');
+                }
+            } catch (error) {
+                console.error('Adventure error:', error);
+            }
+        }
+        
+        function startWalkCountdown(returnTime) {
+            const walkBtn = document.getElementById('walkBtn');
+            const countdownDiv = document.getElementById('walkCountdown');
+            
+            walkBtn.disabled = true;
+            walkBtn.style.opacity = '0.5';
+            walkBtn.style.cursor = 'not-allowed';
+            countdownDiv.style.display = 'block';
+            
+            if (walkCountdownInterval) clearInterval(walkCountdownInterval);
+            
+            walkCountdownInterval = setInterval(() => {
+                const now = Date.now() / 1000;
+                const remaining = returnTime - now;
+                
+                if (remaining <= 0) {
+                    clearInterval(walkCountdownInterval);
+                    walkBtn.disabled = false;
+                    walkBtn.style.opacity = '1';
+                    walkBtn.style.cursor = 'pointer';
+                    countdownDiv.style.display = 'none';
+                    checkPetReturn();
+                } else {
+                    const minutes = Math.floor(remaining / 60);
+                    const seconds = Math.floor(remaining % 60);
+                    countdownDiv.textContent = `🌲 Pet returns in: ${minutes}m ${seconds}s`;
+                }
+            }, 1000);
+        }
+        
+        // Auto-refresh pet when tab is active
+        setInterval(() => {
+            if (document.getElementById('petTab').classList.contains('active')) {
+                refreshPet();
+            }
+        }, 60000); // Every minute
+        
+        // Clinical Assessments
+        function startPHQ9() {
+            currentAssessment = 'PHQ-9';
+            assessmentScores = [];
+            showAssessmentModal('PHQ-9 Depression Screening', PHQ9_QUESTIONS);
+        }
+        
+        function startGAD7() {
+            currentAssessment = 'GAD-7';
+            assessmentScores = [];
+            showAssessmentModal('GAD-7 Anxiety Screening', GAD7_QUESTIONS);
+        }
+        
+        function showAssessmentModal(title, questions) {
+            document.getElementById('assessmentTitle').textContent = title;
+            const container = document.getElementById('assessmentQuestions');
+            container.innerHTML = questions.map((q, idx) => `
+                <div style="margin: 20px 0; padding: 15px; border: 2px solid #e0e0e0; border-radius: 8px;">
+                    <p style="margin-bottom: 10px; font-weight: 600;">${idx + 1}. ${sanitizeHTML(q)}</p>
+                    <div style="display: flex; gap: 10px; flex-wrap: wrap;">
+                        <label style="flex: 1; min-width: 120px;">
+                            <input type="radio" name="q${idx}" value="0" onchange="setScore(${idx}, 0)"> Not at all
+                        </label>
+                        <label style="flex: 1; min-width: 120px;">
+                            <input type="radio" name="q${idx}" value="1" onchange="setScore(${idx}, 1)"> Several days
+                        </label>
+                        <label style="flex: 1; min-width: 120px;">
+                            <input type="radio" name="q${idx}" value="2" onchange="setScore(${idx}, 2)"> More than half
+                        </label>
+                        <label style="flex: 1; min-width: 120px;">
+                            <input type="radio" name="q${idx}" value="3" onchange="setScore(${idx}, 3)"> Nearly every day
+                        </label>
+                    </div>
+                </div>
+            `).join('');
+            document.getElementById('assessmentModal').style.display = 'flex';
+        }
+        
+        function setScore(index, value) {
+            assessmentScores[index] = parseInt(value);
+        }
+        
+        async function submitAssessment() {
+            const expectedLength = currentAssessment === 'PHQ-9' ? 9 : 7;
+            
+            if (assessmentScores.length !== expectedLength || assessmentScores.includes(undefined)) {
+                alert('Please answer all questions');
+                return;
+            }
+            
+            try {
+                const endpoint = currentAssessment === 'PHQ-9' ? '/api/clinical/phq9' : '/api/clinical/gad7';
+                const response = await fetch(endpoint, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username: currentUser, scores: assessmentScores })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    alert(`Assessment Complete!\n\nScore: ${data.score}\nSeverity: ${data.severity}\n\n+20 Coins for completing assessment!\n\nConsult with a mental health professional for personalized care.`);
+                    await rewardPet('clinical', 'clinical');
+                    closeAssessment();
+                } else {
+                    alert('Error submitting assessment');
+                }
+            } catch (error) {
+                alert('Connection error');
+                console.error('Assessment error:', error);
+            }
+        }
+        
+        function closeAssessment() {
+            document.getElementById('assessmentModal').style.display = 'none';
+            assessmentScores = [];
+            currentAssessment = null;
+        }
+        
+        // History
+        async function loadHistory() {
+            const historyContent = document.getElementById('historyContent');
+            historyContent.innerHTML = '<div style="text-align: center; padding: 40px;"><div class="loading" style="margin: 0 auto;"></div><p style="margin-top: 20px;">Loading your history...</p></div>';
+            
+            try {
+                const response = await fetch(`/api/mood/history?username=${encodeURIComponent(currentUser)}&limit=30`);
+                const data = await response.json();
+                
+                if (response.ok && data.logs && data.logs.length > 0) {
+                    const moodEmojis = {1: '😢', 2: '😢', 3: '😔', 4: '😔', 5: '😐', 6: '😐', 7: '🙂', 8: '🙂', 9: '😄', 10: '😄'};
+                    const html = '<div class="history-grid">' + 
+                        data.logs.map(log => `
+                            <div class="history-card">
+                                <div class="date">${new Date(log.timestamp).toLocaleString()}</div>
+                                <div style="font-size: 24px; margin: 10px 0;">${moodEmojis[log.mood_val]} <strong>${log.mood_val}/10</strong></div>
+                                <div><strong>Sleep:</strong> ${log.sleep_val} hours</div>
+                                ${log.water_pints ? `<div><strong>Water:</strong> ${log.water_pints} pints</div>` : ''}
+                                ${log.exercise_mins ? `<div><strong>Exercise:</strong> ${log.exercise_mins} mins</div>` : ''}
+                                ${log.outside_mins ? `<div><strong>Outdoors:</strong> ${log.outside_mins} mins</div>` : ''}
+                                ${log.meds ? `<div><strong>Medications:</strong> ${sanitizeHTML(log.meds)}</div>` : ''}
+                                ${log.notes ? `<div style="margin-top: 10px;"><strong>Notes:</strong><br>${sanitizeWithLineBreaks(log.notes)}</div>` : ''}
+                            </div>
+                        `).join('') +
+                        '</div>';
+                    historyContent.innerHTML = html;
+                } else {
+                    historyContent.innerHTML = 
+                        '<p style="text-align: center; color: #999; padding: 40px;">No mood logs yet. Start tracking in the Mood & Habits tab! 📊</p>';
+                }
+            } catch (error) {
+                historyContent.innerHTML = 
+                    '<p style="text-align: center; color: #dc3545; padding: 40px;">Error loading history. Please try again.</p>';
+                console.error('History load error:', error);
+            }
+        }
+        
+        function showMessage(elementId, message, type) {
+            const el = document.getElementById(elementId);
+            el.textContent = message;
+            el.className = `alert alert-${type}`;
+            el.classList.remove('hidden');
+            setTimeout(() => el.classList.add('hidden'), 5000);
+        }
+        
+        // Community Functions - Discord-style
+        let communityRefreshInterval = null;
+        let currentChannel = null;
+        let currentThreadPostId = null;
+
+        const CHANNEL_INFO = {
+            'anxiety': { emoji: '😰', name: 'Anxiety', description: 'Discuss anxiety and coping strategies' },
+            'depression': { emoji: '😔', name: 'Depression', description: 'Support for depression' },
+            'relationships': { emoji: '💑', name: 'Relationships', description: 'Relationship advice and support' },
+            'intrusive-thoughts': { emoji: '🧠', name: 'Intrusive Thoughts', description: 'Managing unwanted thoughts' },
+            'grief': { emoji: '💔', name: 'Grief & Loss', description: 'Coping with loss' },
+            'work-stress': { emoji: '💼', name: 'Work Stress', description: 'Workplace mental health' },
+            'self-esteem': { emoji: '🪞', name: 'Self-Esteem', description: 'Building confidence' },
+            'trauma': { emoji: '🩹', name: 'Trauma', description: 'Trauma support and healing' },
+            'addiction': { emoji: '🔗', name: 'Addiction', description: 'Recovery support' },
+            'sleep': { emoji: '😴', name: 'Sleep Issues', description: 'Better sleep habits' },
+            'motivation': { emoji: '⚡', name: 'Motivation', description: 'Finding motivation' },
+            'general': { emoji: '💬', name: 'General', description: 'General discussion' },
+            'celebration': { emoji: '🎉', name: 'Celebrations', description: 'Share your wins!' },
+            'question': { emoji: '❓', name: 'Questions', description: 'Ask the community' }
+        };
+
+        async function loadChannels() {
+            try {
+                const response = await fetch(`/api/community/channels?username=${encodeURIComponent(currentUser)}`);
+                const data = await response.json();
+
+                if (response.ok && data.channels) {
+                    const channelList = document.getElementById('communityChannelList');
+                    channelList.innerHTML = data.channels.map(channel => `
+                        <div class="channel-item ${currentChannel === channel.id ? 'active' : ''}"
+                             onclick="selectChannel('${channel.id}')"
+                             id="channel-${channel.id}">
+                            <span class="channel-emoji">${channel.emoji}</span>
+                            <span class="channel-name">${sanitizeHTML(channel.name)}</span>
+                            ${channel.unread_count > 0 ? `<span class="unread-badge">${channel.unread_count}</span>` : ''}
+                        </div>
+                    `).join('');
+                }
+            } catch (error) {
+                console.error('Load channels error:', error);
+            }
+        }
+
+        async function selectChannel(channelId) {
+            currentChannel = channelId;
+            const info = CHANNEL_INFO[channelId] || { emoji: '💬', name: channelId, description: '' };
+
+            // Update channel header
+            document.getElementById('currentChannelName').textContent = info.name;
+            document.getElementById('currentChannelDesc').textContent = info.description;
+            document.querySelector('.community-channel-header .channel-icon').textContent = info.emoji;
+
+            // Show input area
+            document.getElementById('communityInputArea').style.display = 'flex';
+
+            // Update active state in sidebar
+            document.querySelectorAll('.channel-item').forEach(el => el.classList.remove('active'));
+            const activeChannel = document.getElementById(`channel-${channelId}`);
+            if (activeChannel) {
+                activeChannel.classList.add('active');
+                // Remove unread badge
+                const badge = activeChannel.querySelector('.unread-badge');
+                if (badge) badge.remove();
+            }
+
+            // Load posts for this channel
+            await loadChannelPosts(channelId);
+        }
+
+        async function loadChannelPosts(channelId, showLoading = true) {
+            const postsArea = document.getElementById('communityPostsArea');
+
+            if (showLoading) {
+                postsArea.innerHTML = '<div style="text-align: center; padding: 40px;"><div class="loading" style="margin: 0 auto;"></div></div>';
+            }
+
+            try {
+                console.log('🔍 Loading posts for channel:', channelId);
+                const response = await fetch(`/api/community/posts?username=${encodeURIComponent(currentUser)}&category=${encodeURIComponent(channelId)}`);
+                const data = await response.json();
+
+                console.log('📊 Response data:', data);
+
+                if (response.ok && data.posts && data.posts.length > 0) {
+                    console.log('✅ Found', data.posts.length, 'posts');
+                    postsArea.innerHTML = data.posts.map(post => renderDiscordPost(post)).join('');
+                    // Auto-scroll to bottom to show newest post
+                    setTimeout(() => {
+                        postsArea.scrollTop = postsArea.scrollHeight;
+                    }, 0);
+                } else {
+                    console.log('ℹ️ No posts found for channel:', channelId);
+                    const info = CHANNEL_INFO[channelId] || { name: channelId };
+                    postsArea.innerHTML = `
+                        <div class="welcome-message">
+                            <div class="welcome-icon">✨</div>
+                            <h2>Welcome to #${info.name}</h2>
+                            <p>This is the start of the ${info.name} channel. Be the first to share something!</p>
+                        </div>
+                    `;
+                }
+            } catch (error) {
+                console.error('❌ Load posts error:', error);
+                postsArea.innerHTML = '<div style="text-align: center; color: #ed4245; padding: 40px;">Error loading posts</div>';
+            }
+        }
+
+        function renderDiscordPost(post) {
+            const reactions = post.reactions || {};
+            const userReactions = post.user_reactions || [];
+            const replies = post.replies || [];
+            const initial = (post.username || 'U').charAt(0).toUpperCase();
+            const isClinician = currentUserRole === 'clinician';
+
+            return `
+                <div class="discord-post ${post.is_pinned ? 'pinned' : ''}" id="post-${post.id}">
+                    <div class="discord-post-avatar">${initial}</div>
+                    <div class="discord-post-content">
+                        <div class="discord-post-header">
+                            <span class="discord-post-username">${sanitizeHTML(post.username)}</span>
+                            <span class="discord-post-time">${formatRelativeTime(post.timestamp)}</span>
+                            ${post.is_pinned ? '<span class="discord-post-pinned-badge">PINNED</span>' : ''}
+                        </div>
+                        <div class="discord-post-message">${sanitizeWithLineBreaks(post.message)}</div>
+                        <div class="discord-post-actions">
+                            <button onclick="reactToPost(${post.id}, 'like')" class="discord-reaction-btn ${userReactions.includes('like') ? 'active' : ''}">
+                                👍 ${reactions.like || 0}
+                            </button>
+                            <button onclick="reactToPost(${post.id}, 'heart')" class="discord-reaction-btn ${userReactions.includes('heart') ? 'active' : ''}">
+                                ❤️ ${reactions.heart || 0}
+                            </button>
+                            <button onclick="reactToPost(${post.id}, 'hug')" class="discord-reaction-btn ${userReactions.includes('hug') ? 'active' : ''}">
+                                🤗 ${reactions.hug || 0}
+                            </button>
+                            <button onclick="reactToPost(${post.id}, 'support')" class="discord-reaction-btn ${userReactions.includes('support') ? 'active' : ''}">
+                                💪 ${reactions.support || 0}
+                            </button>
+                            <button onclick="openThread(${post.id})" class="discord-thread-btn">
+                                💬 ${post.reply_count ?? replies.length} ${(post.reply_count ?? replies.length) === 1 ? 'reply' : 'replies'}
+                            </button>
+                            <div class="discord-post-admin-actions">
+                                ${post.username === currentUser ? `<button onclick="deletePost(${post.id})" class="discord-admin-btn" title="Delete">🗑️</button>` : ''}
+                                ${isClinician ? `<button onclick="togglePin(${post.id}, ${!post.is_pinned})" class="discord-admin-btn pin-btn ${post.is_pinned ? 'pinned' : ''}" title="${post.is_pinned ? 'Unpin' : 'Pin'}">📌</button>` : ''}
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            `;
+        }
+
+        function formatRelativeTime(timestamp) {
+            const date = new Date(timestamp);
+            const now = new Date();
+            const diff = now - date;
+            const minutes = Math.floor(diff / 60000);
+            const hours = Math.floor(diff / 3600000);
+            const days = Math.floor(diff / 86400000);
+
+            if (minutes < 1) return 'Just now';
+            if (minutes < 60) return `${minutes}m ago`;
+            if (hours < 24) return `${hours}h ago`;
+            if (days < 7) return `${days}d ago`;
+            return date.toLocaleDateString();
+        }
+
+        async function openThread(postId) {
+            currentThreadPostId = postId;
+            const modal = document.getElementById('threadModal');
+            modal.style.display = 'flex';
+
+            // Load the post and its replies
+            try {
+                const response = await fetch(`/api/community/posts?username=${encodeURIComponent(currentUser)}&category=${encodeURIComponent(currentChannel)}`);
+                const data = await response.json();
+
+                if (response.ok && data.posts) {
+                    const post = data.posts.find(p => p.id === postId);
+                    if (post) {
+                        // Render original post
+                        const initial = (post.username || 'U').charAt(0).toUpperCase();
+                        document.getElementById('threadOriginalPost').innerHTML = `
+                            <div class="discord-post" style="padding: 0;">
+                                <div class="discord-post-avatar">${initial}</div>
+                                <div class="discord-post-content">
+                                    <div class="discord-post-header">
+                                        <span class="discord-post-username">${sanitizeHTML(post.username)}</span>
+                                        <span class="discord-post-time">${formatRelativeTime(post.timestamp)}</span>
+                                    </div>
+                                    <div class="discord-post-message">${sanitizeWithLineBreaks(post.message)}</div>
+                                </div>
+                            </div>
+                        `;
+
+                        // Render replies (feed only inlines the first few - fetch the full thread if capped)
+                        let replies = post.replies || [];
+                        if (post.has_more_replies) {
+                            const repliesResponse = await fetch(`/api/community/post/${postId}/replies`);
+                            if (repliesResponse.ok) {
+                                replies = (await repliesResponse.json()).replies || replies;
+                            }
+                        }
+                        if (replies.length > 0) {
+                            document.getElementById('threadReplies').innerHTML = replies.map(reply => {
+                                const replyInitial = (reply.username || 'U').charAt(0).toUpperCase();
+                                return `
+                                    <div class="thread-reply">
+                                        <div class="thread-reply-avatar">${replyInitial}</div>
+                                        <div class="thread-reply-content">
+                                            <div class="thread-reply-header">
+                                                <span class="thread-reply-username">${sanitizeHTML(reply.username)}</span>
+                                                <span class="thread-reply-time">${formatRelativeTime(reply.timestamp)}</span>
+                                                ${reply.username === currentUser ? `<button onclick="deleteReply(${reply.id}, ${postId})" class="discord-admin-btn" style="margin-left: auto;">🗑️</button>` : ''}
+                                            </div>
+                                            <div class="thread-reply-message">${sanitizeWithLineBreaks(reply.message)}</div>
+                                        </div>
+                                    </div>
+                                `;
+                            }).join('');
+                        } else {
+                            document.getElementById('threadReplies').innerHTML = '<div style="text-align: center; color: #72767d; padding: 20px;">No replies yet. Start the conversation!</div>';
+                        }
+                    }
+                }
+            } catch (error) {
+                console.error('Open thread error:', error);
+            }
+        }
+
+        function closeThreadModal() {
+            document.getElementById('threadModal').style.display = 'none';
+            currentThreadPostId = null;
+        }
+
+        async function postThreadReply() {
+            if (!currentThreadPostId) return;
+
+            const input = document.getElementById('threadReplyInput');
+            const message = input.value.trim();
+
+            if (!message) {
+                alert('Please write a reply');
+                return;
+            }
+
+            try {
+                const response = await fetch(`/api/community/post/${currentThreadPostId}/reply`, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser, message })
+                });
+
+                if (response.ok) {
+                    input.value = '';
+                    // Refresh thread view
+                    openThread(currentThreadPostId);
+                    // Refresh main posts area
+                    loadChannelPosts(currentChannel, false);
+                } else {
+                    const data = await response.json();
+                    alert(data.error || 'Error posting reply');
+                }
+            } catch (error) {
+                alert('Connection error');
+                console.error('Reply error:', error);
+            }
+        }
+
+        async function togglePin(postId, pin) {
+            try {
+                const response = await fetch(`/api/community/post/${postId}/pin`, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser, pin })
+                });
+
+                if (response.ok) {
+                    loadChannelPosts(currentChannel, false);
+                } else {
+                    const data = await response.json();
+                    alert(data.error || 'Error pinning post');
+                }
+            } catch (error) {
+                console.error('Pin error:', error);
+            }
+        }
+
+        async function postCommunity() {
+            if (!currentChannel) {
+                alert('Please select a channel first');
+                return;
+            }
+
+            const message = document.getElementById('communityMessage').value.trim();
+
+            if (!message) {
+                alert('Please write a message');
+                return;
+            }
+
+            try {
+                console.log('📤 Posting to community:', { username: currentUser, message, category: currentChannel });
+                const response = await fetch('/api/community/post', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'include',
+                    body: JSON.stringify({ username: currentUser, message, category: currentChannel })
+                });
+
+                console.log('📥 Response status:', response.status, response.ok);
+                
+                if (response.ok) {
+                    const responseData = await response.json();
+                    console.log('✅ Post successful:', responseData);
+                    document.getElementById('communityMessage').value = '';
+                    
+                    // Wait longer to ensure database write is complete
+                    await new Promise(resolve => setTimeout(resolve, 500));
+                    console.log('🔄 Reloading posts...');
+                    await loadChannelPosts(currentChannel, false);
+                    console.log('✅ Posts reloaded');
+                } else {
+                    const data = await response.json();
+                    console.error('❌ Post failed:', data);
+                    alert(data.error || 'Error posting message');
+                }
+            } catch (error) {
+                console.error('❌ Post error:', error);
+                alert('Connection error: ' + error.message);
+            }
+        }
+
+        async function reactToPost(postId, reactionType) {
+            try {
+                const response = await fetch(`/api/community/post/${postId}/react`, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser, reaction: reactionType })
+                });
+
+                if (response.ok) {
+                    loadChannelPosts(currentChannel, false);
+                }
+            } catch (error) {
+                console.error('Reaction error:', error);
+            }
+        }
+
+        async function deletePost(postId) {
+            if (!confirm('Are you sure you want to delete this post?')) {
+                return;
+            }
+
+            try {
+                const response = await fetch(`/api/community/post/${postId}`, {
+                    method: 'DELETE',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username: currentUser })
+                });
+
+                if (response.ok) {
+                    loadChannelPosts(currentChannel, false);
+                } else {
+                    alert('Error deleting post. You can only delete your own posts.');
+                }
+            } catch (error) {
+                console.error('Delete error:', error);
+            }
+        }
+
+        async function deleteReply(replyId, postId) {
+            if (!confirm('Are you sure you want to delete this reply?')) {
+                return;
+            }
+
+            try {
+                const response = await fetch(`/api/community/reply/${replyId}`, {
+                    method: 'DELETE',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({ username: currentUser })
+                });
+
+                if (response.ok) {
+                    // Refresh thread if open
+                    if (currentThreadPostId === postId) {
+                        openThread(postId);
+                    }
+                    loadChannelPosts(currentChannel, false);
+                } else {
+                    const data = await response.json();
+                    alert(data.error || 'Error deleting reply');
+                }
+            } catch (error) {
+                console.error('Delete reply error:', error);
+            }
+        }
+
+        function startCommunityAutoRefresh() {
+            if (communityRefreshInterval) {
+                clearInterval(communityRefreshInterval);
+            }
+            // Refresh channels and posts every 30 seconds
+            communityRefreshInterval = setInterval(() => {
+                loadChannels();
+                if (currentChannel) {
+                    loadChannelPosts(currentChannel, false);
+                }
+            }, 30000);
+        }
+
+        function stopCommunityAutoRefresh() {
+            if (communityRefreshInterval) {
+                clearInterval(communityRefreshInterval);
+                communityRefreshInterval = null;
+            }
+        }
+
+        // Initialize community when tab is opened
+        async function initCommunity() {
+            await loadChannels();
+            // Auto-select general channel if none selected
+            if (!currentChannel) {
+                selectChannel('general');
+            }
+        }
+        
+        // Safety Plan Builder is now in CBT Tools - no separate functions needed
+        
+        // Appointments Functions
+        async function loadPatientAppointments() {
+            try {
+                const response = await fetch(`/api/appointments?patient=${encodeURIComponent(currentUser)}`, {
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                
+                const listDiv = document.getElementById('appointmentsList');
+                
+                if (response.ok && data.appointments && data.appointments.length > 0) {
+                    // Count pending appointments that need response
+                    const pendingCount = data.appointments.filter(apt => 
+                        !apt.patient_acknowledged && new Date(apt.appointment_date) > new Date()
+                    ).length;
+                    
+                    // Update badge
+                    const badge = document.getElementById('appointmentBadge');
+                    if (badge) {
+                        if (pendingCount > 0) {
+                            badge.textContent = pendingCount;
+                            badge.style.display = 'inline';
+                        } else {
+                            badge.style.display = 'none';
+                        }
+                    }
+                    
+                    listDiv.innerHTML = data.appointments.map(apt => {
+                        const date = new Date(apt.appointment_date);
+                        const dateStr = date.toLocaleDateString('en-GB', {
+                            weekday: 'long', year: 'numeric', month: 'long', day: 'numeric'
+                        });
+                        const timeStr = date.toLocaleTimeString('en-GB', {
+                            hour: '2-digit', minute: '2-digit'
+                        });
+
+                        const isPast = date < new Date();
+                        const statusColor = apt.patient_response === 'accepted' ? 'var(--success-color)' :
+                                           apt.patient_response === 'declined' ? 'var(--danger-color)' : 'var(--warning-color)';
+                        const statusText = apt.patient_response === 'accepted' ? '✓ Accepted' :
+                                          apt.patient_response === 'declined' ? '✗ Declined' :
+                                          '⏳ Awaiting Response';
+
+                        return `
+                            <div class="card" style="margin-bottom: 20px; border-left: 4px solid ${statusColor};">
+                                <div style="display: flex; justify-content: space-between; align-items: start; margin-bottom: 15px;">
+                                    <div>
+                                        <h4 style="margin: 0 0 5px 0; color: var(--accent-color);">📅 ${apt.appointment_type || 'Consultation'}</h4>
+                                        <p style="margin: 0; color: var(--text-secondary); font-size: 14px;">With ${sanitizeHTML(apt.clinician_username)}</p>
+                                    </div>
+                                    <span style="background: ${statusColor}; color: white; padding: 5px 12px; border-radius: 20px; font-size: 12px; font-weight: bold;">
+                                        ${statusText}
+                                    </span>
+                                </div>
+
+                                <div class="appointment-details-box">
+                                    <p style="margin: 0 0 5px 0;"><strong>📆 Date:</strong> ${dateStr}</p>
+                                    <p style="margin: 0 0 5px 0;"><strong>🕐 Time:</strong> ${timeStr}</p>
+                                    ${apt.notes ? `<p style="margin: 10px 0 0 0; padding-top: 10px; border-top: 1px solid var(--border-color);"><strong>Notes:</strong> ${sanitizeWithLineBreaks(apt.notes)}</p>` : ''}
+                                </div>
+
+                                ${!apt.patient_acknowledged && !isPast ? `
+                                    <div class="appointment-warning-box">
+                                        <p style="margin: 0 0 10px 0;">
+                                            <strong>⚠️ Please acknowledge this appointment</strong>
+                                        </p>
+                                        <label style="display: flex; align-items: center; cursor: pointer; color: var(--text-primary);">
+                                            <input type="checkbox" id="ack-${apt.id}" style="width: 20px; height: 20px; margin-right: 10px;">
+                                            <span>I have read and understood this appointment</span>
+                                        </label>
+                                    </div>
+
+                                    <div style="display: flex; gap: 10px;">
+                                        <button class="btn" onclick="respondToAppointment(${apt.id}, 'accepted')" style="flex: 1; background: var(--success-color);">
+                                            ✓ Accept Appointment
+                                        </button>
+                                        <button class="btn" onclick="respondToAppointment(${apt.id}, 'declined')" style="flex: 1; background: var(--danger-color);">
+                                            ✗ Decline Appointment
+                                        </button>
+                                    </div>
+                                ` : apt.patient_response_date ? `
+                                    <p style="margin: 0; color: var(--text-secondary); font-size: 13px; text-align: center;">
+                                        Response sent: ${new Date(apt.patient_response_date).toLocaleString('en-GB')}
+                                    </p>
+                                ` : ''}
+                            </div>
+                        `;
+                    }).join('');
+                } else {
+                    // No appointments - hide badge
+                    const badge = document.getElementById('appointmentBadge');
+                    if (badge) {
+                        badge.style.display = 'none';
+                    }
+                    
+                    listDiv.innerHTML = `
+                        <div class="card" style="text-align: center; padding: 40px;">
+                            <p style="font-size: 48px; margin: 0 0 15px 0;">📅</p>
+                            <h4 style="margin: 0 0 10px 0;">No Appointments</h4>
+                            <p style="color: var(--text-secondary); margin: 0;">You don't have any upcoming appointments scheduled.</p>
+                            <p style="color: var(--text-muted); margin-top: 10px; font-size: 14px;">Your clinician will schedule appointments as needed.</p>
+                        </div>
+                    `;
+                }
+            } catch (error) {
+                console.error('Error loading appointments:', error);
+                document.getElementById('appointmentsList').innerHTML = `
+                    <div class="card" style="text-align: center; padding: 40px;">
+                        <p style="color: #dc3545;">Failed to load appointments. Please try again.</p>
+                    </div>
+                `;
+            }
+        }
+        
+        async function respondToAppointment(appointmentId, response) {
+            const checkbox = document.getElementById(`ack-${appointmentId}`);
+            
+            if (!checkbox || !checkbox.checked) {
+                alert('⚠️ You must tick the box to confirm you have read the appointment details before responding.');
+                return;
+            }
+            
+            const action = response === 'accepted' ? 'accept' : 'decline';
+            if (!confirm(`Are you sure you want to ${action} this appointment?`)) {
+                return;
+            }
+            
+            try {
+                const apiResponse = await fetch(`/api/appointments/${appointmentId}/respond`, {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        patient_username: currentUser,
+                        acknowledged: true,
+                        response: response
+                    })
+                });
+                
+                const data = await apiResponse.json();
+                
+                if (apiResponse.ok) {
+                    alert(`✓ Appointment ${response}! Your clinician has been notified.`);
+                    loadPatientAppointments(); // Reload to show updated status and update badge
+                    closeNotifications(); // Close notification panel if open
+                } else {
+                    alert('Error: ' + (data.error || 'Failed to respond to appointment'));
+                }
+            } catch (error) {
+                console.error('Error responding to appointment:', error);
+                alert('Failed to respond to appointment. Please try again.');
+            }
+        }
+        
+        // Insights Functions
+        function setInsightsRange(days) {
+            const toDate = new Date();
+            const fromDate = new Date();
+            fromDate.setDate(toDate.getDate() - days);
+            
+            document.getElementById('insightsToDate').valueAsDate = toDate;
+            document.getElementById('insightsFromDate').valueAsDate = fromDate;
+            loadInsights();
+        }
+        
+        async function loadInsights() {
+            try {
+                let url = `/api/insights?username=${encodeURIComponent(currentUser)}`;
+                // Always include a default prompt for insights
+                const defaultPrompt = encodeURIComponent('Generate a detailed, narrative, and empathetic summary of the user\'s recent mental health progress, including mood, sleep, therapy, and self-care activities. Highlight trends, strengths, and areas for growth.');
+                url += `&prompt=${defaultPrompt}`;
+                // Add role (default to patient)
+                url += `&role=patient`;
+                // Add date range if specified
+                const fromDate = document.getElementById('insightsFromDate')?.value;
+                const toDate = document.getElementById('insightsToDate')?.value;
+                if (fromDate) url += `&from_date=${fromDate}`;
+                if (toDate) url += `&to_date=${toDate}`;
+                const response = await fetch(url, {
+                    method: 'GET',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                
+                if (response.ok) {
+                    // Null-safe display of insights data
+                    const avgMood = typeof data.avg_mood === 'number' ? data.avg_mood : 0;
+                    const avgSleep = typeof data.avg_sleep === 'number' ? data.avg_sleep : 0;
+                    document.getElementById('avgMood').textContent = avgMood.toFixed(1);
+                    document.getElementById('avgSleep').textContent = avgSleep.toFixed(1) + 'h';
+                    document.getElementById('moodTrend').textContent = data.trend || 'No data';
+                    document.getElementById('aiInsight').innerHTML = `<p>${sanitizeWithLineBreaks(data.insight || 'No insights available yet. Log some moods to get started!')}</p>`;
+                    
+                    // Draw mood chart
+                    if (data.mood_data && data.mood_data.length > 0) {
+                        drawMoodChart(data.mood_data);
+                    }
+                    
+                    // Draw sleep chart
+                    if (data.sleep_data && data.sleep_data.length > 0) {
+                        drawSleepChart(data.sleep_data);
+                    }
+                } else {
+                    alert('Error loading insights');
+                }
+            } catch (error) {
+                alert('Connection error');
+                console.error('Insights load error:', error);
+            }
+        }
+        
+        function drawMoodChart(moodData) {
+            const canvas = document.getElementById('moodChart');
+            const ctx = canvas.getContext('2d');
+            const width = canvas.width;
+            const height = canvas.height;
+            const padding = 40;
+            
+            // Clear canvas
+            ctx.clearRect(0, 0, width, height);
+            
+            // Background
+            ctx.fillStyle = '#f5f5f5';
+            ctx.fillRect(0, 0, width, height);
+            
+            // Draw grid
+            ctx.strokeStyle = '#e0e0e0';
+            ctx.lineWidth = 1;
+            for (let i = 0; i <= 10; i++) {
+                const y = height - padding - (i * (height - 2 * padding) / 10);
+                ctx.beginPath();
+                ctx.moveTo(padding, y);
+                ctx.lineTo(width - padding, y);
+                ctx.stroke();
+                
+                // Y-axis labels
+                ctx.fillStyle = '#666';
+                ctx.font = '12px Arial';
+                ctx.textAlign = 'right';
+                ctx.fillText(i, padding - 10, y + 4);
+            }
+            
+            // Draw line
+            if (moodData.length > 1) {
+                const stepX = (width - 2 * padding) / (moodData.length - 1);
+                
+                ctx.strokeStyle = '#667eea';
+                ctx.lineWidth = 3;
+                ctx.beginPath();
+                
+                moodData.forEach((point, index) => {
+                    const x = padding + index * stepX;
+                    const y = height - padding - (point.value * (height - 2 * padding) / 10);
+                    
+                    if (index === 0) {
+                        ctx.moveTo(x, y);
+                    } else {
+                        ctx.lineTo(x, y);
+                    }
+                    
+                    // Draw points
+                    ctx.fillStyle = '#667eea';
+                    ctx.beginPath();
+                    ctx.arc(x, y, 5, 0, 2 * Math.PI);
+                    ctx.fill();
+                });
+                
+                ctx.stroke();
+            }
+            
+            // X-axis labels
+            ctx.fillStyle = '#666';
+            ctx.font = '10px Arial';
+            ctx.textAlign = 'center';
+            moodData.forEach((point, index) => {
+                const x = padding + index * ((width - 2 * padding) / (moodData.length - 1));
+                const date = new Date(point.timestamp);
+                const label = `${date.getMonth() + 1}/${date.getDate()}`;
+                ctx.fillText(label, x, height - padding + 20);
+            });
+        }
+        
+        function drawSleepChart(sleepData) {
+            const canvas = document.getElementById('sleepChart');
+            if (!canvas) return;
+            
+            const ctx = canvas.getContext('2d');
+            const width = canvas.width;
+            const height = canvas.height;
+            const padding = 40;
+            const maxHours = 12; // Maximum sleep hours for scale
+            
+            // Clear canvas
+            ctx.clearRect(0, 0, width, height);
+            
+            // Background
+            ctx.fillStyle = '#f5f5f5';
+            ctx.fillRect(0, 0, width, height);
+            
+            // Draw grid
+            ctx.strokeStyle = '#e0e0e0';
+            ctx.lineWidth = 1;
+            for (let i = 0; i <= maxHours; i++) {
+                const y = height - padding - (i * (height - 2 * padding) / maxHours);
+                ctx.beginPath();
+                ctx.moveTo(padding, y);
+                ctx.lineTo(width - padding, y);
+                ctx.stroke();
+                
+                // Y-axis labels
+                ctx.fillStyle = '#666';
+                ctx.font = '12px Arial';
+                ctx.textAlign = 'right';
+                ctx.fillText(i + 'h', padding - 10, y + 4);
+            }
+            
+            // Draw line
+            if (sleepData.length > 1) {
+                const stepX = (width - 2 * padding) / (sleepData.length - 1);
+                
+                ctx.strokeStyle = '#3498db';
+                ctx.lineWidth = 3;
+                ctx.beginPath();
+                
+                sleepData.forEach((point, index) => {
+                    const x = padding + index * stepX;
+                    const y = height - padding - (point.value * (height - 2 * padding) / maxHours);
+                    
+                    if (index === 0) {
+                        ctx.moveTo(x, y);
+                    } else {
+                        ctx.lineTo(x, y);
+                    }
+                    
+                    // Draw points
+                    ctx.fillStyle = '#3498db';
+                    ctx.beginPath();
+                    ctx.arc(x, y, 5, 0, 2 * Math.PI);
+                    ctx.fill();
+                });
+                
+                ctx.stroke();
+            }
+            
+            // X-axis labels
+            ctx.fillStyle = '#666';
+            ctx.font = '10px Arial';
+            ctx.textAlign = 'center';
+            sleepData.forEach((point, index) => {
+                const x = padding + index * ((width - 2 * padding) / (sleepData.length - 1));
+                const date = new Date(point.timestamp);
+                const label = `${date.getMonth() + 1}/${date.getDate()}`;
+                ctx.fillText(label, x, height - padding + 20);
+            });
+        }
+        
+        async function exportCSV() {
+            window.location.href = `/api/export/csv?username=${encodeURIComponent(currentUser)}`;
+        }
+        
+        async function exportPDF() {
+            window.location.href = `/api/export/pdf?username=${encodeURIComponent(currentUser)}`;
+        }
+        
+        // About Me Functions
+        async function loadProfile() {
+            try {
+                const response = await fetch(`/api/patient/profile?username=${encodeURIComponent(currentUser)}`);
+                const data = await response.json();
+                
+                if (response.ok) {
+                    // Fill in profile fields
+                    document.getElementById('profileFullName').value = data.profile.full_name || '';
+                    document.getElementById('profileDOB').value = data.profile.dob || '';
+                    document.getElementById('profileEmail').value = data.profile.email || '';
+                    document.getElementById('profilePhone').value = data.profile.phone || '';
+                    document.getElementById('profileConditions').value = data.profile.conditions || '';
+                    
+                    // Display clinician info
+                    const clinicianDiv = document.getElementById('clinicianInfo');
+                    if (data.profile.assigned_clinician) {
+                        clinicianDiv.innerHTML = `
+                            <p><strong>Assigned Clinician:</strong> ${sanitizeHTML(data.profile.assigned_clinician)}</p>
+                            <p><strong>Email:</strong> ${sanitizeHTML(data.profile.clinician_email || 'Not provided')}</p>
+                            <p style="margin-top: 10px; color: var(--text-secondary); font-size: 14px;">
+                                Your clinician can view your progress and provide professional support.
+                            </p>
+                        `;
+                    } else {
+                        clinicianDiv.innerHTML = '<p class="muted-text">No clinician assigned yet.</p>';
+                    }
+                    
+                    // Display activity stats
+                    document.getElementById('statMoodLogs').textContent = data.stats.mood_logs || 0;
+                    document.getElementById('statGratitude').textContent = data.stats.gratitude_entries || 0;
+                    document.getElementById('statCBT').textContent = data.stats.cbt_entries || 0;
+                    document.getElementById('statSessions').textContent = data.stats.therapy_sessions || 0;
+                } else {
+                    alert('Error loading profile: ' + (data.error || 'Unknown error'));
+                }
+            } catch (error) {
+                console.error('Error loading profile:', error);
+                alert('Failed to load profile');
+            }
+        }
+        
+        async function saveProfile() {
+            const profileData = {
+                username: currentUser,
+                full_name: document.getElementById('profileFullName').value,
+                dob: document.getElementById('profileDOB').value,
+                email: document.getElementById('profileEmail').value,
+                phone: document.getElementById('profilePhone').value,
+                conditions: document.getElementById('profileConditions').value
+            };
+            
+            try {
+                const response = await fetch('/api/patient/profile', {
+                    method: 'PUT',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(profileData)
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    alert('✅ Profile saved successfully!');
+                } else {
+                    alert('Error saving profile: ' + (data.error || 'Unknown error'));
+                }
+            } catch (error) {
+                console.error('Error saving profile:', error);
+                alert('Failed to save profile');
+            }
+        }
+        
+        // Sleep Hygiene Functions
+        function resetSleepChecklist() {
+            document.querySelectorAll('.sleep-check').forEach(checkbox => {
+                checkbox.checked = false;
+            });
+        }
+        
+        // Professional Dashboard Functions
+        let currentPatientData = null;
+        let currentPatientTab = 'profile';
+        
+        async function loadPatients() {
+            if (currentUserRole !== 'clinician') {
+                alert('Access denied. Professional dashboard is only for clinicians.');
+                return;
+            }
+            
+            const listDiv = document.getElementById('patientList');
+            listDiv.innerHTML = '<div style="text-align: center; padding: 40px;"><div class="loading" style="margin: 0 auto;"></div></div>';
+            
+            try {
+                const response = await fetch(`/api/professional/patients?clinician=${encodeURIComponent(currentUser)}`, {
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                
+                if (response.ok && data.patients && data.patients.length > 0) {
+                    const html = data.patients.map(patient => `
+                        <div class="patient-card" onclick="viewPatientDetail('${patient.username}')" style="cursor: pointer; border: 2px solid #e0e0e0; border-radius: 12px; padding: 20px; margin-bottom: 15px; transition: all 0.3s; hover: {border-color: #667eea;}">
+                            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px;">
+                                <div>
+                                    <strong style="font-size: 20px; color: #333;">${patient.username}</strong>
+                                    <p style="color: #666; margin: 5px 0 0 0; font-size: 14px;">Last active: ${new Date(patient.last_login || Date.now()).toLocaleDateString()}</p>
+                                </div>
+                                ${patient.alert_count_7d > 0 ? `<span style="background: #e74c3c; color: white; padding: 6px 14px; border-radius: 20px; font-size: 13px; font-weight: bold;">🚨 ${patient.alert_count_7d} alerts</span>` : `<span style="background: #28a745; color: white; padding: 6px 14px; border-radius: 20px; font-size: 13px;">✓ No alerts</span>`}
+                            </div>
+                            <div style="display: flex; gap: 20px; flex-wrap: wrap;">
+                                <div style="flex: 1; min-width: 100px;">
+                                    <div style="font-size: 28px; font-weight: bold; color: #667eea;">${patient.avg_mood_7d || 'N/A'}</div>
+                                    <div style="font-size: 12px; color: #999; text-transform: uppercase;">Avg Mood (7d)</div>
+                                </div>
+                                <div style="flex: 1; min-width: 100px;">
+                                    <div style="font-size: 28px; font-weight: bold; color: ${getSeverityColor(patient.latest_assessment?.severity)}">${patient.latest_assessment?.score || 'N/A'}</div>
+                                    <div style="font-size: 12px; color: #999; text-transform: uppercase;">${patient.latest_assessment ? patient.latest_assessment.name : 'No Assessment'}</div>
+                                </div>
+                                <div style="flex: 1; min-width: 100px;">
+                                    <div style="font-size: 20px; font-weight: bold; color: ${getSeverityColor(patient.latest_assessment?.severity)}">${patient.latest_assessment?.severity || '-'}</div>
+                                    <div style="font-size: 12px; color: #999; text-transform: uppercase;">Severity</div>
+                                </div>
+                            </div>
+                        </div>
+                    `).join('');
+                    listDiv.innerHTML = html;
+                } else {
+                    listDiv.innerHTML = '<p style="text-align: center; color: #999; padding: 40px;">No patients found. Patients will appear here after you approve their requests.</p>';
+                }
+            } catch (error) {
+                listDiv.innerHTML = '<p style="text-align: center; color: #dc3545;">Error loading patients</p>';
+                console.error('Patient load error:', error);
+            }
+        }
+        
+        async function viewPatientDetail(username) {
+            // Hide all clinical tabs when viewing individual patient
+            document.querySelectorAll('.clinical-subtab-content').forEach(tab => {
+                tab.style.display = 'none';
+            });
+            
+            document.getElementById('patientListSection').style.display = 'none';
+            document.getElementById('patientDetailSection').style.display = 'block';
+            document.getElementById('patientDetailName').textContent = username;
+            currentPatientTab = 'profile';
+            
+            // Initialize date range to last 30 days
+            const toDate = new Date();
+            const fromDate = new Date();
+            fromDate.setDate(toDate.getDate() - 30);
+            document.getElementById('patientChartToDate').valueAsDate = toDate;
+            document.getElementById('patientChartFromDate').valueAsDate = fromDate;
+            
+            // Default to summary tab
+            switchPatientTab('summary', document.getElementById('summaryPatientSubtabBtn'));
+            
+            try {
+                const response = await fetch(`/api/professional/patient/${encodeURIComponent(username)}?clinician=${encodeURIComponent(currentUser)}`, {
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                
+                if (response.ok) {
+                    currentPatientData = data;
+                    
+                    // Generate AI summary
+                    generateAISummary(username, data);
+                } else {
+                    document.getElementById('aiSummary').innerHTML = '<p style="color: #dc3545;">Error loading patient data</p>';
+                }
+            } catch (error) {
+                document.getElementById('aiSummary').innerHTML = '<p style="color: #dc3545;">Connection error</p>';
+                console.error('Patient detail error:', error);
+            }
+        }
+        
+        function setPatientChartRange(days) {
+            const toDate = new Date();
+            const fromDate = new Date();
+            fromDate.setDate(toDate.getDate() - days);
+            
+            document.getElementById('patientChartToDate').valueAsDate = toDate;
+            document.getElementById('patientChartFromDate').valueAsDate = fromDate;
+            loadPatientCharts();
+        }
+        
+        async function loadPatientCharts() {
+            if (!currentPatientData) return;
+
+            const fromDate = document.getElementById('patientChartFromDate')?.value;
+            const toDate = document.getElementById('patientChartToDate')?.value;
+
+            try {
+                // Build URL with required prompt parameter for clinician view
+                const chartPrompt = encodeURIComponent('Generate a clinical summary of mood and sleep patterns for charting purposes.');
+                let url = `/api/insights?username=${encodeURIComponent(currentPatientData.username)}&prompt=${chartPrompt}&role=clinician`;
+                if (fromDate) url += `&from_date=${fromDate}`;
+                if (toDate) url += `&to_date=${toDate}`;
+                
+                const response = await fetch(url, {
+                    method: 'GET',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                
+                if (response.ok) {
+                    // Draw mood chart
+                    if (data.mood_data && data.mood_data.length > 0) {
+                        drawPatientMoodChart(data.mood_data);
+                    }
+                    
+                    // Draw sleep chart
+                    if (data.sleep_data && data.sleep_data.length > 0) {
+                        drawPatientSleepChart(data.sleep_data);
+                    }
+                }
+            } catch (error) {
+                console.error('Chart loading error:', error);
+            }
+        }
+        
+        function drawPatientMoodChart(moods) {
+            const canvas = document.getElementById('moodChart');
+            if (!canvas) return;
+            
+            const ctx = canvas.getContext('2d');
+            const width = canvas.width;
+            const height = canvas.height;
+            const padding = 40;
+            
+            if (!moods || moods.length === 0) {
+                ctx.clearRect(0, 0, width, height);
+                ctx.font = '16px Arial';
+                ctx.fillStyle = '#999';
+                ctx.textAlign = 'center';
+                ctx.fillText('No mood data available', width / 2, height / 2);
+                return;
+            }
+            
+            // Clear canvas
+            ctx.clearRect(0, 0, width, height);
+            
+            // Background
+            ctx.fillStyle = '#f5f5f5';
+            ctx.fillRect(0, 0, width, height);
+            
+            // Draw grid
+            ctx.strokeStyle = '#e0e0e0';
+            ctx.lineWidth = 1;
+            for (let i = 0; i <= 10; i++) {
+                const y = height - padding - (i * (height - 2 * padding) / 10);
+                ctx.beginPath();
+                ctx.moveTo(padding, y);
+                ctx.lineTo(width - padding, y);
+                ctx.stroke();
+                
+                // Y-axis labels
+                ctx.fillStyle = '#666';
+                ctx.font = '12px Arial';
+                ctx.textAlign = 'right';
+                ctx.fillText(i, padding - 10, y + 4);
+            }
+            
+            // Draw line
+            if (moods.length > 1) {
+                const stepX = (width - 2 * padding) / (moods.length - 1);
+                
+                ctx.strokeStyle = '#667eea';
+                ctx.lineWidth = 3;
+                ctx.beginPath();
+                
+                moods.forEach((point, index) => {
+                    const moodValue = point.value !== undefined ? point.value : point.mood;
+                    const x = padding + index * stepX;
+                    const y = height - padding - (moodValue * (height - 2 * padding) / 10);
+                    
+                    if (index === 0) {
+                        ctx.moveTo(x, y);
+                    } else {
+                        ctx.lineTo(x, y);
+                    }
+                    
+                    // Draw points
+                    ctx.fillStyle = '#667eea';
+                    ctx.beginPath();
+                    ctx.arc(x, y, 5, 0, 2 * Math.PI);
+                    ctx.fill();
+                });
+                
+                ctx.stroke();
+            }
+            
+            // X-axis labels
+            ctx.fillStyle = '#666';
+            ctx.font = '10px Arial';
+            ctx.textAlign = 'center';
+            const labelStep = Math.max(1, Math.floor(moods.length / 10));
+            moods.forEach((point, index) => {
+                if (index % labelStep === 0 || index === moods.length - 1) {
+                    const x = padding + index * ((width - 2 * padding) / (moods.length - 1));
+                    const date = new Date(point.timestamp);
+                    const label = `${date.getMonth() + 1}/${date.getDate()}`;
+                    ctx.fillText(label, x, height - padding + 20);
+                }
+            });
+        }
+        
+        function drawPatientSleepChart(sleepData) {
+            const canvas = document.getElementById('sleepChart');
+            if (!canvas) return;
+            
+            const ctx = canvas.getContext('2d');
+            const width = canvas.width;
+            const height = canvas.height;
+            const padding = 40;
+            const maxHours = 12;
+            
+            if (!sleepData || sleepData.length === 0) {
+                ctx.clearRect(0, 0, width, height);
+                ctx.font = '16px Arial';
+                ctx.fillStyle = '#999';
+                ctx.textAlign = 'center';
+                ctx.fillText('No sleep data available', width / 2, height / 2);
+                return;
+            }
+            
+            // Clear canvas
+            ctx.clearRect(0, 0, width, height);
+            
+            // Background
+            ctx.fillStyle = '#f5f5f5';
+            ctx.fillRect(0, 0, width, height);
+            
+            // Draw grid
+            ctx.strokeStyle = '#e0e0e0';
+            ctx.lineWidth = 1;
+            for (let i = 0; i <= maxHours; i++) {
+                const y = height - padding - (i * (height - 2 * padding) / maxHours);
+                ctx.beginPath();
+                ctx.moveTo(padding, y);
+                ctx.lineTo(width - padding, y);
+                ctx.stroke();
+                
+                // Y-axis labels
+                ctx.fillStyle = '#666';
+                ctx.font = '12px Arial';
+                ctx.textAlign = 'right';
+                ctx.fillText(i + 'h', padding - 10, y + 4);
+            }
+            
+            // Draw line
+            if (sleepData.length > 1) {
+                const stepX = (width - 2 * padding) / (sleepData.length - 1);
+                
+                ctx.strokeStyle = '#3498db';
+                ctx.lineWidth = 3;
+                ctx.beginPath();
+                
+                sleepData.forEach((point, index) => {
+                    const sleepValue = point.value !== undefined ? point.value : point.sleep;
+                    const x = padding + index * stepX;
+                    const y = height - padding - (sleepValue * (height - 2 * padding) / maxHours);
+                    
+                    if (index === 0) {
+                        ctx.moveTo(x, y);
+                    } else {
+                        ctx.lineTo(x, y);
+                    }
+                    
+                    // Draw points
+                    ctx.fillStyle = '#3498db';
+                    ctx.beginPath();
+                    ctx.arc(x, y, 5, 0, 2 * Math.PI);
+                    ctx.fill();
+                });
+                
+                ctx.stroke();
+            }
+            
+            // X-axis labels
+            ctx.fillStyle = '#666';
+            ctx.font = '10px Arial';
+            ctx.textAlign = 'center';
+            const labelStep = Math.max(1, Math.floor(sleepData.length / 10));
+            sleepData.forEach((point, index) => {
+                if (index % labelStep === 0 || index === sleepData.length - 1) {
+                    const x = padding + index * ((width - 2 * padding) / (sleepData.length - 1));
+                    const date = new Date(point.timestamp);
+                    const label = `${date.getMonth() + 1}/${date.getDate()}`;
+                    ctx.fillText(label, x, height - padding + 20);
+                }
+            });
+        }
+        
+        async function generateAISummary(username, data) {
+            const summaryDiv = document.getElementById('aiSummary');
+
+            try {
+                // Call API to get AI summary (must include clinician_username for authorization)
+                const response = await fetch('/api/professional/ai-summary', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username, clinician_username: currentUser })
+                });
+                
+                const result = await response.json();
+                
+                if (response.ok && result.summary) {
+                    summaryDiv.innerHTML = `
+                        <div style="background: #f8f9fa; padding: 20px; border-radius: 8px; line-height: 1.8;">
+                            <p style="white-space: pre-wrap;">${result.summary}</p>
+                        </div>
+                    `;
+                } else {
+                    // Fallback to basic summary with null safety
+                    const recentMoods = data.recent_moods || [];
+                    const avgMood = recentMoods.length > 0
+                        ? recentMoods.reduce((acc, m) => acc + (m.mood || 0), 0) / recentMoods.length
+                        : 0;
+                    const latestAssessment = (data.clinical_scales || [])[0];
+                    const alertCount = (data.recent_alerts || []).length;
+                    
+                    summaryDiv.innerHTML = `
+                        <div style="background: #f8f9fa; padding: 20px; border-radius: 8px;">
+                            <p><strong>Clinical Overview:</strong></p>
+                            <ul style="line-height: 1.8; margin-top: 10px;">
+                                <li>Average mood over last 30 days: <strong>${avgMood.toFixed(1)}/10</strong></li>
+                                <li>Latest assessment: <strong>${latestAssessment ? `${latestAssessment.name} - ${latestAssessment.severity} (Score: ${latestAssessment.score})` : 'No assessments recorded'}</strong></li>
+                                <li>Recent alerts: <strong style="color: ${alertCount > 0 ? '#e74c3c' : '#28a745'}">${alertCount} ${alertCount === 1 ? 'alert' : 'alerts'}</strong></li>
+                                <li>Therapy sessions: <strong>${recentMoods.length} mood entries recorded</strong></li>
+                            </ul>
+                            ${alertCount > 0 ? '<p style="color: #e74c3c; margin-top: 15px; font-weight: bold;">⚠️ Requires immediate attention</p>' : '<p style="color: #28a745; margin-top: 15px;">✓ Patient appears stable</p>'}
+                        </div>
+                    `;
+                }
+            } catch (error) {
+                console.error('AI summary error:', error);
+                summaryDiv.innerHTML = '<p style="color: #999;">AI summary unavailable</p>';
+            }
+        }
+        
+        // Patient Detail Subtab Switching
+        function switchPatientTab(subtabName, buttonEl) {
+            // Hide all patient subtabs
+            document.querySelectorAll('.patient-subtab-content').forEach(tab => {
+                tab.style.display = 'none';
+            });
+            
+            // Reset all patient subtab buttons
+            document.querySelectorAll('.patient-subtab-btn').forEach(btn => {
+                btn.style.background = 'transparent';
+                btn.style.color = '#667eea';
+                btn.style.border = '2px solid #667eea';
+            });
+            
+            // Show selected subtab
+            const tabId = 'patient' + subtabName.charAt(0).toUpperCase() + subtabName.slice(1) + 'Tab';
+            document.getElementById(tabId).style.display = 'block';
+            
+            // Highlight selected button
+            if (buttonEl) {
+                buttonEl.style.background = '#667eea';
+                buttonEl.style.color = 'white';
+                buttonEl.style.border = 'none';
+            }
+            
+            // Load data for specific subtabs
+            if (subtabName === 'charts') {
+                loadPatientCharts();
+            } else if (subtabName === 'profile') {
+                showPatientTab('profile');
+            } else if (subtabName === 'moods') {
+                showPatientTab('moods');
+            } else if (subtabName === 'assessments') {
+                showPatientTab('assessments');
+            } else if (subtabName === 'therapy') {
+                showPatientTab('therapy');
+            } else if (subtabName === 'alerts') {
+                showPatientTab('alerts');
+            }
+        }
+        
+        function showPatientTab(tabName) {
+            currentPatientTab = tabName;
+            const data = currentPatientData;
+            
+            if (!data) {
+                return;
+            }
+            
+            // Determine which content div to use based on tab name
+            let contentDiv;
+            switch (tabName) {
+                case 'profile':
+                    contentDiv = document.getElementById('patientDetailContent');
+                    break;
+                case 'moods':
+                    contentDiv = document.getElementById('patientMoodsContent');
+                    break;
+                case 'assessments':
+                    contentDiv = document.getElementById('patientAssessmentsContent');
+                    break;
+                case 'therapy':
+                    contentDiv = document.getElementById('patientTherapyContent');
+                    break;
+                case 'alerts':
+                    contentDiv = document.getElementById('patientAlertsContent');
+                    break;
+                default:
+                    contentDiv = document.getElementById('patientDetailContent');
+            }
+            
+            if (!contentDiv) {
+                console.error('Content div not found for tab:', tabName);
+                return;
+            }
+            
+            let html = '';
+            
+            switch (tabName) {
+                case 'profile':
+                    html = `
+                        <div class="card">
+                            <h4>Patient Profile</h4>
+                            <table style="width: 100%; border-collapse: collapse;">
+                                <tr style="border-bottom: 1px solid #eee;">
+                                    <td style="padding: 12px 0; font-weight: bold; width: 30%;">Username</td>
+                                    <td style="padding: 12px 0;">${data.profile.username || 'N/A'}</td>
+                                </tr>
+                                <tr style="border-bottom: 1px solid #eee;">
+                                    <td style="padding: 12px 0; font-weight: bold;">Full Name</td>
+                                    <td style="padding: 12px 0;">${data.profile.name || 'Not provided'}</td>
+                                </tr>
+                                <tr style="border-bottom: 1px solid #eee;">
+                                    <td style="padding: 12px 0; font-weight: bold;">Email</td>
+                                    <td style="padding: 12px 0;">${data.profile.email || 'Not provided'}</td>
+                                </tr>
+                                <tr style="border-bottom: 1px solid #eee;">
+                                    <td style="padding: 12px 0; font-weight: bold;">Phone</td>
+                                    <td style="padding: 12px 0;">${data.profile.phone || 'Not provided'}</td>
+                                </tr>
+                                <tr style="border-bottom: 1px solid #eee;">
+                                    <td style="padding: 12px 0; font-weight: bold;">Date of Birth</td>
+                                    <td style="padding: 12px 0;">${data.profile.dob || 'Not provided'}</td>
+                                </tr>
+                                <tr>
+                                    <td style="padding: 12px 0; font-weight: bold; vertical-align: top;">Conditions</td>
+                                    <td style="padding: 12px 0;">${data.profile.conditions || 'Not provided'}</td>
+                                </tr>
+                            </table>
+                        </div>
+                    `;
+                    break;
+                    
+                case 'moods':
+                    html = `
+                        <div class="card">
+                            <h4>Mood Logs (Last 30 Days)</h4>
+                            ${data.recent_moods.length > 0 ? `
+                                <table style="width: 100%; border-collapse: collapse;">
+                                    <thead>
+                                        <tr style="background: #f8f9fa; border-bottom: 2px solid #dee2e6;">
+                                            <th style="padding: 12px; text-align: left;">Date</th>
+                                            <th style="padding: 12px; text-align: center;">Mood</th>
+                                            <th style="padding: 12px; text-align: center;">Sleep</th>
+                                            <th style="padding: 12px; text-align: center;">Exercise</th>
+                                            <th style="padding: 12px; text-align: left;">Notes</th>
+                                        </tr>
+                                    </thead>
+                                    <tbody>
+                                        ${data.recent_moods.map(m => `
+                                            <tr style="border-bottom: 1px solid #eee;">
+                                                <td style="padding: 12px;">${new Date(m.timestamp).toLocaleDateString()}</td>
+                                                <td style="padding: 12px; text-align: center; font-weight: bold; color: ${m.mood >= 7 ? '#28a745' : m.mood >= 4 ? '#ffc107' : '#dc3545'};">${m.mood}/10</td>
+                                                <td style="padding: 12px; text-align: center;">${m.sleep || 0}h</td>
+                                                <td style="padding: 12px; text-align: center;">${m.exercise || 0}min</td>
+                                                <td style="padding: 12px; max-width: 300px; overflow: hidden; text-overflow: ellipsis;">${m.notes || '-'}</td>
+                                            </tr>
+                                        `).join('')}
+                                    </tbody>
+                                </table>
+                            ` : '<p style="color: #999; padding: 20px; text-align: center;">No mood logs recorded yet</p>'}
+                        </div>
+                    `;
+                    break;
+                    
+                case 'assessments':
+                    html = `
+                        <div class="card">
+                            <h4>Clinical Assessments</h4>
+                            ${data.clinical_scales.length > 0 ? data.clinical_scales.map(s => `
+                                <div style="padding: 20px; border-bottom: 1px solid #eee; margin-bottom: 15px; background: #f8f9fa; border-radius: 8px;">
+                                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+                                        <strong style="font-size: 18px;">${s.name}</strong>
+                                        <span style="background: ${getSeverityColor(s.severity)}; color: white; padding: 6px 12px; border-radius: 20px; font-size: 13px;">${s.severity}</span>
+                                    </div>
+                                    <div style="display: flex; gap: 20px; margin-top: 10px;">
+                                        <div>
+                                            <div style="font-size: 32px; font-weight: bold; color: ${getSeverityColor(s.severity)};">${s.score}</div>
+                                            <div style="font-size: 12px; color: #666;">Score</div>
+                                        </div>
+                                        <div style="flex: 1;">
+                                            <div style="color: #666; font-size: 14px;">Completed: ${new Date(s.timestamp).toLocaleString()}</div>
+                                        </div>
+                                    </div>
+                                </div>
+                            `).join('') : '<p style="color: #999; padding: 20px; text-align: center;">No clinical assessments completed yet</p>'}
+                        </div>
+                    `;
+                    break;
+                    
+                case 'therapy':
+                    html = `
+                        <div class="card" style="margin-bottom: 20px;">
+                            <h4>📝 Add Therapy / Appointment Note</h4>
+                            <textarea id="newClinicianNote" placeholder="Enter therapy session notes, appointment summaries, or clinical observations..." style="width: 100%; padding: 12px; border: 2px solid #e0e0e0; border-radius: 8px; font-size: 16px; min-height: 120px; font-family: inherit; margin-bottom: 10px;"></textarea>
+                            <div style="display: flex; gap: 10px; align-items: center;">
+                                <label style="display: flex; align-items: center; gap: 5px; cursor: pointer;">
+                                    <input type="checkbox" id="highlightNote" style="cursor: pointer;">
+                                    <span>⭐ Highlight as important</span>
+                                </label>
+                                <button class="btn" onclick="saveClinicianNote()" style="margin-left: auto;">💾 Save Note</button>
+                            </div>
+                        </div>
+                        <div class="card">
+                            <h4>Previous Therapy Notes & Appointments</h4>
+                            <div id="clinicianNotesContainer">
+                                ${data.clinician_notes && data.clinician_notes.length > 0 ? 
+                                    data.clinician_notes.map(note => `
+                                        <div class="note-item" style="padding: 15px; border-left: 4px solid ${note.highlighted ? '#ffc107' : '#e0e0e0'}; background: ${note.highlighted ? '#fff3cd' : '#f8f9fa'}; border-radius: 8px; margin-bottom: 15px; position: relative;">
+                                            ${note.highlighted ? '<span style="position: absolute; top: 10px; right: 10px; font-size: 20px;">⭐</span>' : ''}
+                                            <div style="color: #666; font-size: 13px; margin-bottom: 8px;">📅 ${new Date(note.timestamp).toLocaleString()}</div>
+                                            <div style="white-space: pre-wrap; line-height: 1.6;">${note.note}</div>
+                                            <button class="btn btn-secondary" onclick="deleteNote(${note.id})" style="margin-top: 10px; padding: 6px 12px; font-size: 13px;">🗑️ Delete</button>
+                                        </div>
+                                    `).join('') 
+                                    : '<p style="color: #999; padding: 20px; text-align: center;">No therapy notes yet. Add your first note above.</p>'
+                                }
+                            </div>
+                        </div>
+                    `;
+                    break;
+                    
+                case 'alerts':
+                    html = `
+                        <div class="card">
+                            <h4>Safety Alerts & Warnings</h4>
+                            ${data.recent_alerts.length > 0 ? data.recent_alerts.map(a => `
+                                <div style="padding: 20px; margin-bottom: 15px; background: #ffebee; border-left: 4px solid #e74c3c; border-radius: 8px;">
+                                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+                                        <strong style="font-size: 16px; color: #c62828;">🚨 ${a.type}</strong>
+                                        <span style="font-size: 13px; color: #666;">${new Date(a.timestamp).toLocaleString()}</span>
+                                    </div>
+                                    <p style="margin: 0; color: #666;">${a.message}</p>
+                                </div>
+                            `).join('') : '<p style="color: #28a745; padding: 20px; text-align: center; font-weight: bold;">✓ No recent safety alerts - patient appears stable</p>'}
+                        </div>
+                    `;
+                    break;
+            }
+            
+            contentDiv.innerHTML = html;
+        }
+        
+        function closePatientDetail() {
+            document.getElementById('patientListSection').style.display = 'block';
+            document.getElementById('patientDetailSection').style.display = 'none';
+            currentPatientData = null;
+            
+            // Return to Patients tab
+            switchClinicalTab('patients', document.querySelector('[onclick*="switchClinicalTab(\'patients\'"]'));
+        }
+        
+        function getSeverityColor(severity) {
+            if (!severity) return '#999';
+            const colors = {
+                'Minimal': '#28a745',
+                'Mild': '#ffc107',
+                'Moderate': '#fd7e14',
+                'Moderately Severe': '#dc3545',
+                'Severe': '#dc3545'
+            };
+            return colors[severity] || '#999';
+        }
+        
+        async function saveClinicianNote() {
+            const noteText = document.getElementById('newClinicianNote').value.trim();
+            const isHighlighted = document.getElementById('highlightNote').checked;
+            
+            if (!noteText) {
+                alert('Please enter a note');
+                return;
+            }
+            
+            if (!currentPatientData || !currentPatientData.username) {
+                alert('No patient selected');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/professional/notes', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        clinician_username: currentUser,
+                        patient_username: currentPatientData.username,
+                        note_text: noteText,
+                        is_highlighted: isHighlighted ? 1 : 0
+                    })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    alert('✅ Note saved successfully! AI will reference this in patient conversations.');
+                    document.getElementById('newClinicianNote').value = '';
+                    document.getElementById('highlightNote').checked = false;
+                    // Reload patient data to show new note
+                    viewPatient(currentPatientData.username);
+                } else {
+                    alert('Error saving note: ' + (data.error || 'Unknown error'));
+                }
+            } catch (error) {
+                console.error('Error saving note:', error);
+                alert('Failed to save note');
+            }
+        }
+        
+        async function deleteNote(noteId) {
+            if (!confirm('Delete this note?')) return;
+            
+            try {
+                const response = await fetch(`/api/professional/notes/${noteId}`, {
+                    method: 'DELETE',
+                    credentials: 'include'
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    alert('Note deleted');
+                    viewPatient(currentPatientData.username);
+                } else {
+                    alert('Error deleting note: ' + (data.error || 'Unknown error'));
+                }
+            } catch (error) {
+                console.error('Error deleting note:', error);
+                alert('Failed to delete note');
+            }
+        }
+        
+        // Appointment Management Functions
+        // Calendar state
+        let currentCalendarDate = new Date();
+        let calendarView = 'month';  // 'month', 'week', or 'day'
+        let allAppointments = [];
+        
+        async function loadAppointments() {
+            if (currentUserRole !== 'clinician') {
+                return;
+            }
+            
+            try {
+                const response = await fetch(`/api/appointments?clinician=${encodeURIComponent(currentUser)}&_t=${Date.now()}`, {
+                    cache: 'no-store',
+                    credentials: 'include',
+                    headers: { 'Cache-Control': 'no-cache', 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                
+                if (response.ok && data.appointments) {
+                    allAppointments = data.appointments;
+                    renderCalendar();
+                }
+            } catch (error) {
+                console.error('Error loading appointments:', error);
+            }
+        }
+        
+        function setCalendarView(view) {
+            calendarView = view;
+            
+            // Update button styles
+            document.getElementById('monthViewBtn').className = view === 'month' ? 'btn' : 'btn btn-secondary';
+            document.getElementById('monthViewBtn').style.background = view === 'month' ? '#667eea' : '';
+            document.getElementById('weekViewBtn').className = view === 'week' ? 'btn' : 'btn btn-secondary';
+            document.getElementById('weekViewBtn').style.background = view === 'week' ? '#667eea' : '';
+            document.getElementById('dayViewBtn').className = view === 'day' ? 'btn' : 'btn btn-secondary';
+            document.getElementById('dayViewBtn').style.background = view === 'day' ? '#667eea' : '';
+            
+            // Show/hide views
+            document.getElementById('monthView').style.display = view === 'month' ? 'block' : 'none';
+            document.getElementById('weekView').style.display = view === 'week' ? 'block' : 'none';
+            document.getElementById('dayView').style.display = view === 'day' ? 'block' : 'none';
+            
+            renderCalendar();
+        }
+        
+        function previousMonth() {
+            if (calendarView === 'month') {
+                currentCalendarDate.setMonth(currentCalendarDate.getMonth() - 1);
+            } else if (calendarView === 'week') {
+                currentCalendarDate.setDate(currentCalendarDate.getDate() - 7);
+            } else {
+                currentCalendarDate.setDate(currentCalendarDate.getDate() - 1);
+            }
+            renderCalendar();
+        }
+        
+        function nextMonth() {
+            if (calendarView === 'month') {
+                currentCalendarDate.setMonth(currentCalendarDate.getMonth() + 1);
+            } else if (calendarView === 'week') {
+                currentCalendarDate.setDate(currentCalendarDate.getDate() + 7);
+            } else {
+                currentCalendarDate.setDate(currentCalendarDate.getDate() + 1);
+            }
+            renderCalendar();
+        }
+        
+        function goToToday() {
+            currentCalendarDate = new Date();
+            renderCalendar();
+        }
+        
+        function renderCalendar() {
+            const monthNames = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"];
+            
+            if (calendarView === 'month') {
+                document.getElementById('calendarMonth').textContent = `${monthNames[currentCalendarDate.getMonth()]} ${currentCalendarDate.getFullYear()}`;
+                renderMonthView();
+            } else if (calendarView === 'week') {
+                const weekStart = new Date(currentCalendarDate);
+                weekStart.setDate(currentCalendarDate.getDate() - currentCalendarDate.getDay());
+                const weekEnd = new Date(weekStart);
+                weekEnd.setDate(weekStart.getDate() + 6);
+                document.getElementById('calendarMonth').textContent = `${weekStart.toLocaleDateString()} - ${weekEnd.toLocaleDateString()}`;
+                renderWeekView();
+            } else {
+                document.getElementById('calendarMonth').textContent = currentCalendarDate.toLocaleDateString('en-US', { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' });
+                renderDayView();
+            }
+        }
+        
+        function renderMonthView() {
+            const grid = document.getElementById('calendarDaysGrid');
+            const year = currentCalendarDate.getFullYear();
+            const month = currentCalendarDate.getMonth();
+            
+            const firstDay = new Date(year, month, 1);
+            const lastDay = new Date(year, month + 1, 0);
+            const startingDayOfWeek = firstDay.getDay();
+            const monthLength = lastDay.getDate();
+            
+            let html = '';
+            const today = new Date();
+            today.setHours(0, 0, 0, 0);
+            
+            // Empty cells for days before month starts
+            for (let i = 0; i < startingDayOfWeek; i++) {
+                html += '<div style="background: #fafafa; min-height: 100px; border: 1px solid #e0e0e0; border-radius: 4px;"></div>';
+            }
+            
+            // Days of the month
+            for (let day = 1; day <= monthLength; day++) {
+                const date = new Date(year, month, day);
+                const dateStr = date.toISOString().split('T')[0];
+                const isToday = date.toDateString() === today.toDateString();
+                
+                // Get appointments for this day
+                const dayAppointments = allAppointments.filter(apt => {
+                    const aptDate = new Date(apt.appointment_date);
+                    return aptDate.toDateString() === date.toDateString();
+                });
+                
+                let aptHtml = '';
+                if (dayAppointments.length > 0) {
+                    // Show first 3 appointments
+                    const toShow = dayAppointments.slice(0, 3);
+                    toShow.forEach(apt => {
+                        const time = new Date(apt.appointment_date).toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'});
+                        const statusColor = apt.patient_response === 'accepted' ? '#28a745' : 
+                                          apt.patient_response === 'declined' ? '#dc3545' : '#ffc107';
+                        aptHtml += `<div style="background: ${statusColor}; color: white; padding: 2px 6px; font-size: 11px; border-radius: 3px; margin-top: 2px; cursor: pointer; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;" onclick="viewDayAppointments('${dateStr}')" title="${apt.patient_username} at ${time}">${time} ${apt.patient_username}</div>`;
+                    });
+                    if (dayAppointments.length > 3) {
+                        aptHtml += `<div style="color: #667eea; font-size: 11px; margin-top: 2px; cursor: pointer;" onclick="viewDayAppointments('${dateStr}')">+${dayAppointments.length - 3} more</div>`;
+                    }
+                }
+                
+                html += `
+                    <div onclick="viewDayAppointments('${dateStr}')" style="background: ${isToday ? '#e3f2fd' : 'white'}; min-height: 100px; border: ${isToday ? '2px solid #667eea' : '1px solid #e0e0e0'}; border-radius: 4px; padding: 8px; cursor: pointer; position: relative;">
+                        <div style="font-weight: ${isToday ? 'bold' : 'normal'}; color: ${isToday ? '#667eea' : '#333'}; margin-bottom: 5px;">${day}</div>
+                        ${dayAppointments.length > 0 ? `<div style="position: absolute; top: 5px; right: 5px; background: #667eea; color: white; border-radius: 50%; width: 22px; height: 22px; display: flex; align-items: center; justify-content: center; font-size: 11px; font-weight: bold;">${dayAppointments.length}</div>` : ''}
+                        ${aptHtml}
+                    </div>
+                `;
+            }
+            
+            grid.innerHTML = html;
+        }
+        
+        function renderWeekView() {
+            const content = document.getElementById('weekViewContent');
+            const weekStart = new Date(currentCalendarDate);
+            weekStart.setDate(currentCalendarDate.getDate() - currentCalendarDate.getDay());
+            
+            let html = '<div style="display: grid; grid-template-columns: 80px repeat(7, 1fr); gap: 5px;">';
+            
+            // Header row
+            html += '<div style="background: #f5f5f5; padding: 10px; font-weight: bold; text-align: center;">Time</div>';
+            for (let i = 0; i < 7; i++) {
+                const day = new Date(weekStart);
+                day.setDate(weekStart.getDate() + i);
+                const isToday = day.toDateString() === new Date().toDateString();
+                html += `<div style="background: ${isToday ? '#667eea' : '#f5f5f5'}; color: ${isToday ? 'white' : '#333'}; padding: 10px; font-weight: bold; text-align: center;">${day.toLocaleDateString('en-US', {weekday: 'short', month: 'short', day: 'numeric'})}</div>`;
+            }
+            
+            // Time slots (8 AM to 6 PM)
+            for (let hour = 8; hour < 18; hour++) {
+                html += `<div style="background: #fafafa; padding: 10px; text-align: right; font-size: 12px; color: #666;">${hour}:00</div>`;
+                
+                for (let i = 0; i < 7; i++) {
+                    const day = new Date(weekStart);
+                    day.setDate(weekStart.getDate() + i);
+                    const dateStr = day.toISOString().split('T')[0];
+                    
+                    // Find appointments in this hour slot
+                    const hourApts = allAppointments.filter(apt => {
+                        const aptDate = new Date(apt.appointment_date);
+                        return aptDate.toDateString() === day.toDateString() && aptDate.getHours() === hour;
+                    });
+                    
+                    let cellHtml = '';
+                    hourApts.forEach(apt => {
+                        const time = new Date(apt.appointment_date).toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'});
+                        const statusColor = apt.patient_response === 'accepted' ? '#28a745' : 
+                                          apt.patient_response === 'declined' ? '#dc3545' : '#ffc107';
+                        cellHtml += `<div style="background: ${statusColor}; color: white; padding: 5px; margin-bottom: 3px; font-size: 11px; border-radius: 4px; cursor: pointer;" onclick="viewAppointmentDetails(${apt.id})" title="${apt.patient_username} at ${time}">${time}<br>${apt.patient_username}</div>`;
+                    });
+                    
+                    html += `<div style="background: white; border: 1px solid #e0e0e0; min-height: 60px; padding: 5px;">${cellHtml}</div>`;
+                }
+            }
+            
+            html += '</div>';
+            content.innerHTML = html;
+        }
+        
+        function renderDayView() {
+            const content = document.getElementById('dayViewContent');
+            const dateStr = currentCalendarDate.toISOString().split('T')[0];
+            
+            const dayAppointments = allAppointments.filter(apt => {
+                const aptDate = new Date(apt.appointment_date);
+                return aptDate.toDateString() === currentCalendarDate.toDateString();
+            }).sort((a, b) => new Date(a.appointment_date) - new Date(b.appointment_date));
+            
+            if (dayAppointments.length === 0) {
+                content.innerHTML = '<p style="text-align: center; color: #999; padding: 40px;">No appointments scheduled for this day</p>';
+                return;
+            }
+            
+            let html = '';
+            const now = new Date();
+            
+            dayAppointments.forEach(apt => {
+                const aptDate = new Date(apt.appointment_date);
+                const time = aptDate.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'});
+                const isPast = aptDate < now;
+                const isUpcoming = !isPast && (aptDate - now) < 3600000; // Within 1 hour
+                
+                const statusColor = apt.patient_response === 'accepted' ? '#28a745' : 
+                                   apt.patient_response === 'declined' ? '#dc3545' : '#ffc107';
+                const statusIcon = apt.patient_response === 'accepted' ? '✓' : 
+                                  apt.patient_response === 'declined' ? '✗' : '⏳';
+                
+                html += `
+                    <div style="border: 2px solid ${isUpcoming ? '#ff9800' : isPast ? '#ccc' : statusColor}; border-radius: 8px; padding: 20px; background: ${isPast ? '#f5f5f5' : isUpcoming ? '#fff3e0' : 'white'};">
+                        <div style="display: flex; justify-content: space-between; align-items: start;">
+                            <div style="flex: 1;">
+                                <div style="font-size: 24px; font-weight: bold; color: #667eea; margin-bottom: 5px;">${time}</div>
+                                <div style="font-size: 20px; font-weight: bold; margin-bottom: 10px;">${apt.patient_username}</div>
+                                ${apt.notes ? `<div style="color: #666; margin-top: 10px; padding: 10px; background: #f9f9f9; border-radius: 6px;">${apt.notes}</div>` : ''}
+                                <div style="margin-top: 15px; display: flex; gap: 10px; flex-wrap: wrap; align-items: center;">
+                                    <span style="background: ${statusColor}; color: white; padding: 6px 14px; border-radius: 20px; font-size: 14px; font-weight: bold;">
+                                        ${statusIcon} ${apt.patient_response === 'accepted' ? 'Accepted' : apt.patient_response === 'declined' ? 'Declined' : 'Pending'}
+                                    </span>
+                                    ${isUpcoming ? '<span style="background: #ff9800; color: white; padding: 6px 14px; border-radius: 20px; font-size: 14px; font-weight: bold;">⚡ Upcoming Soon</span>' : ''}
+                                    ${isPast ? '<span style="background: #999; color: white; padding: 6px 14px; border-radius: 20px; font-size: 14px;">📍 Completed</span>' : ''}
+                                    ${apt.patient_acknowledged ? '<span style="background: #28a745; color: white; padding: 6px 14px; border-radius: 20px; font-size: 12px;">✓ Read</span>' : '<span style="background: #999; color: white; padding: 6px 14px; border-radius: 20px; font-size: 12px;">○ Unread</span>'}
+                                </div>
+                            </div>
+                            <div style="display: flex; flex-direction: column; gap: 10px;">
+                                <button onclick="viewPatientDetail('${apt.patient_username}')" style="background: #667eea; color: white; border: none; padding: 8px 16px; border-radius: 6px; cursor: pointer; white-space: nowrap;">View Patient</button>
+                                <button onclick="cancelAppointment(${apt.id})" style="background: #dc3545; color: white; border: none; padding: 8px 16px; border-radius: 6px; cursor: pointer; white-space: nowrap;">Cancel</button>
+                            </div>
+                        </div>
+                    </div>
+                `;
+            });
+            
+            content.innerHTML = html;
+        }
+        
+        function viewDayAppointments(dateStr) {
+            currentCalendarDate = new Date(dateStr + 'T12:00:00');
+            setCalendarView('day');
+        }
+        
+        function viewAppointmentDetails(aptId) {
+            const apt = allAppointments.find(a => a.id === aptId);
+            if (apt) {
+                const aptDate = new Date(apt.appointment_date);
+                currentCalendarDate = aptDate;
+                setCalendarView('day');
+            }
+        }
+        
+        function showNewAppointmentForm() {
+            document.getElementById('newAppointmentForm').style.display = 'block';
+            
+            // Populate patient dropdown
+            const select = document.getElementById('appointmentPatient');
+            const patientList = document.getElementById('patientList');
+            const patientCards = patientList.querySelectorAll('.patient-card');
+            
+            select.innerHTML = '<option value="">Select a patient...</option>';
+            patientCards.forEach(card => {
+                const username = card.querySelector('strong').textContent;
+                select.innerHTML += `<option value="${escapeHtml(username)}">${escapeHtml(username)}</option>`;
+            });
+            
+            // Set minimum date to today
+            const now = new Date();
+            now.setMinutes(now.getMinutes() - now.getTimezoneOffset());
+            document.getElementById('appointmentDateTime').min = now.toISOString().slice(0, 16);
+        }
+        
+        function cancelNewAppointment() {
+            document.getElementById('newAppointmentForm').style.display = 'none';
+            document.getElementById('appointmentPatient').value = '';
+            document.getElementById('appointmentDateTime').value = '';
+            document.getElementById('appointmentNotes').value = '';
+        }
+        
+        async function createAppointment() {
+            const patientUsername = document.getElementById('appointmentPatient').value;
+            const dateTime = document.getElementById('appointmentDateTime').value;
+            const notes = document.getElementById('appointmentNotes').value;
+            
+            if (!patientUsername || !dateTime) {
+                alert('Please select a patient and appointment date/time');
+                return;
+            }
+            
+            try {
+                const response = await fetch('/api/appointments', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        clinician_username: currentUser,
+                        patient_username: patientUsername,
+                        appointment_date: dateTime,
+                        notes: notes
+                    })
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    alert('✅ Appointment scheduled successfully!');
+                    cancelNewAppointment();
+                    loadAppointments();
+                } else {
+                    alert('Error: ' + (data.error || 'Failed to create appointment'));
+                }
+            } catch (error) {
+                console.error('Error creating appointment:', error);
+                alert('Connection error. Please try again.');
+            }
+        }
+        
+        async function cancelAppointment(appointmentId) {
+            if (!confirm('Are you sure you want to cancel this appointment?')) {
+                return;
+            }
+            
+            try {
+                const response = await fetch(`/api/appointments/${appointmentId}`, {
+                    method: 'DELETE',
+                    credentials: 'include'
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    alert('✅ Appointment cancelled');
+                    loadAppointments();
+                } else {
+                    alert('Error: ' + (data.error || 'Failed to cancel'));
+                }
+            } catch (error) {
+                console.error('Error cancelling appointment:', error);
+                alert('Connection error');
+            }
+        }
+        
+        // Restore session on page load
+        async function restoreSession() {
+            // Check localStorage first (Remember Me), then sessionStorage
+            let sessionData = localStorage.getItem('healingSpaceSession');
+            let storage = 'localStorage';
+            
+            if (!sessionData) {
+                sessionData = sessionStorage.getItem('healingSpaceSession');
+                storage = 'sessionStorage';
+            }
+            
+            if (sessionData) {
+                try {
+                    const data = JSON.parse(sessionData);
+                    
+                    // Validate session with server before restoring
+                    const response = await fetch('/api/validate-session', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ 
+                            username: data.username,
+                            role: data.role || 'user'
+                        })
+                    });
+                    
+                    if (response.ok) {
+                        currentUser = data.username;
+                        currentUserRole = data.role || 'user';
+                        
+                        console.log('Session restored from ' + storage + ' for user:', currentUser);
+                        
+                        // Restore the app state
+                        completeLogin(data);
+                        // If patient, switch to Home tab after login/session restore
+                        if ((data.role || 'user') === 'user') {
+                            setTimeout(() => {
+                                switchTab('home', document.querySelector('[onclick*="home"]'));
+                            }, 100);
+                        }
+                    } else {
+                        // Session invalid, clear it
+                        console.log('Session validation failed, clearing session data');
+                        localStorage.removeItem('healingSpaceSession');
+                        sessionStorage.removeItem('healingSpaceSession');
+                        showLanding();
+                    }
+                } catch (error) {
+                    console.error('Error restoring session:', error);
+                    // Clear corrupted session data
+                    localStorage.removeItem('healingSpaceSession');
+                    sessionStorage.removeItem('healingSpaceSession');
+                    showLanding();
+                }
+            } else {
+                // No session data, show landing page
+                showLanding();
+            }
+        }
+        
+        // Toggle password visibility
+        function togglePassword(inputId, button) {
+            const input = document.getElementById(inputId);
+            if (input.type === 'password') {
+                input.type = 'text';
+                button.textContent = '🙈';
+                button.title = 'Hide password';
+            } else {
+                input.type = 'password';
+                button.textContent = '👁️';
+                button.title = 'Show password';
+            }
+        }
+        
+        // Alias for registration form compatibility
+        function togglePasswordVisibility(inputId, buttonId) {
+            const button = document.getElementById(buttonId);
+            togglePassword(inputId, button);
+        }
+        
+        // Analytics Dashboard Functions
+        let moodChartInstance = null;
+        let phq9ChartInstance = null;
+        let gad7ChartInstance = null;
+        
+        async function loadAnalyticsDashboard() {
+            if (currentUserRole !== 'clinician' && currentUserRole !== 'professional') {
+                console.log('Not loading analytics - user role:', currentUserRole);
+                return;
+            }
+            
+            const errorDiv = document.getElementById('analyticsError');
+            errorDiv.style.display = 'none';
+            
+            console.log('Loading analytics for clinician:', currentUser);
+            
+            try {
+                const url = `/api/analytics/dashboard?clinician=${encodeURIComponent(currentUser)}&_t=${Date.now()}`;
+                console.log('Fetching analytics from:', url);
+                
+                const response = await fetch(url, {
+                    cache: 'no-store',
+                    credentials: 'include',
+                    headers: { 'Cache-Control': 'no-cache', 'Content-Type': 'application/json' }
+                });
+                
+                console.log('Analytics response status:', response.status);
+                
+                if (!response.ok) {
+                    const errorText = await response.text();
+                    console.error('Failed to load analytics:', response.status, errorText);
+                    
+                    if (errorDiv) {
+                        errorDiv.textContent = `Error loading analytics (${response.status}): ${errorText.substring(0, 100)}`;
+                        errorDiv.style.display = 'block';
+                    }
+                    return;
+                }
+                
+                const data = await response.json();
+                
+                console.log('Analytics data received:', data);
+                console.log('Total patients:', data.total_patients, 'Active:', data.active_patients, 'High risk:', data.high_risk_count);
+                
+                // Update stat cards - ensure numbers are shown, not dashes
+                const totalEl = document.getElementById('totalPatientsCount');
+                const activeEl = document.getElementById('activePatientsCount');
+                const highRiskEl = document.getElementById('highRiskCount');
+                
+                console.log('Elements found:', !!totalEl, !!activeEl, !!highRiskEl);
+                
+                if (totalEl) {
+                    totalEl.textContent = (data.total_patients !== undefined && data.total_patients !== null) ? data.total_patients : 0;
+                    console.log('Set totalPatientsCount to:', totalEl.textContent);
+                }
+                if (activeEl) {
+                    activeEl.textContent = (data.active_patients !== undefined && data.active_patients !== null) ? data.active_patients : 0;
+                    console.log('Set activePatientsCount to:', activeEl.textContent);
+                }
+                if (highRiskEl) {
+                    highRiskEl.textContent = (data.high_risk_count !== undefined && data.high_risk_count !== null) ? data.high_risk_count : 0;
+                    console.log('Set highRiskCount to:', highRiskEl.textContent);
+                }
+                
+                // Render charts
+                renderMoodTrendChart(data.mood_trends || []);
+                renderAssessmentCharts(data.assessment_summary || { phq9: {}, gad7: {} });
+                
+            } catch (error) {
+                console.error('Error loading analytics dashboard:', error);
+            }
+        }
+        
+        function renderMoodTrendChart(moodTrends) {
+            const canvas = document.getElementById('moodTrendChart');
+            if (!canvas) return;
+            
+            const ctx = canvas.getContext('2d');
+            
+            // Destroy existing chart
+            if (moodChartInstance) {
+                moodChartInstance.destroy();
+            }
+            
+            // Prepare data
+            const labels = moodTrends.map(item => item.date);
+            const avgMoods = moodTrends.map(item => item.avg_mood);
+            const counts = moodTrends.map(item => item.count);
+            
+            moodChartInstance = new Chart(ctx, {
+                type: 'line',
+                data: {
+                    labels: labels,
+                    datasets: [{
+                        label: 'Average Mood',
+                        data: avgMoods,
+                        borderColor: '#8b5cf6',
+                        backgroundColor: 'rgba(139, 92, 246, 0.1)',
+                        tension: 0.4,
+                        fill: true
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: {
+                            display: true,
+                            position: 'top'
+                        },
+                        tooltip: {
+                            callbacks: {
+                                afterLabel: function(context) {
+                                    const index = context.dataIndex;
+                                    return `Entries: ${counts[index]}`;
+                                }
+                            }
+                        }
+                    },
+                    scales: {
+                        y: {
+                            beginAtZero: true,
+                            max: 10,
+                            title: {
+                                display: true,
+                                text: 'Mood Score'
+                            }
+                        },
+                        x: {
+                            title: {
+                                display: true,
+                                text: 'Date'
+                            }
+                        }
+                    }
+                }
+            });
+        }
+        
+        function renderAssessmentCharts(assessmentSummary) {
+            // Render PHQ-9 Chart
+            const phq9Canvas = document.getElementById('phq9Chart');
+            if (phq9Canvas) {
+                const phq9Ctx = phq9Canvas.getContext('2d');
+                
+                if (phq9ChartInstance) {
+                    phq9ChartInstance.destroy();
+                }
+                
+                const phq9Data = assessmentSummary.phq9 || {};
+                phq9ChartInstance = new Chart(phq9Ctx, {
+                    type: 'pie',
+                    data: {
+                        labels: ['Severe', 'Moderate', 'Mild', 'Minimal'],
+                        datasets: [{
+                            data: [
+                                phq9Data.severe || 0,
+                                phq9Data.moderate || 0,
+                                phq9Data.mild || 0,
+                                phq9Data.minimal || 0
+                            ],
+                            backgroundColor: [
+                                '#ef4444',
+                                '#f97316',
+                                '#fbbf24',
+                                '#10b981'
+                            ]
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        plugins: {
+                            legend: {
+                                position: 'bottom'
+                            }
+                        }
+                    }
+                });
+            }
+            
+            // Render GAD-7 Chart
+            const gad7Canvas = document.getElementById('gad7Chart');
+            if (gad7Canvas) {
+                const gad7Ctx = gad7Canvas.getContext('2d');
+                
+                if (gad7ChartInstance) {
+                    gad7ChartInstance.destroy();
+                }
+                
+                const gad7Data = assessmentSummary.gad7 || {};
+                gad7ChartInstance = new Chart(gad7Ctx, {
+                    type: 'pie',
+                    data: {
+                        labels: ['Severe', 'Moderate', 'Mild', 'Minimal'],
+                        datasets: [{
+                            data: [
+                                gad7Data.severe || 0,
+                                gad7Data.moderate || 0,
+                                gad7Data.mild || 0,
+                                gad7Data.minimal || 0
+                            ],
+                            backgroundColor: [
+                                '#dc2626',
+                                '#ea580c',
+                                '#facc15',
+                                '#059669'
+                            ]
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        plugins: {
+                            legend: {
+                                position: 'bottom'
+                            }
+                        }
+                    }
+                });
+            }
+        }
+        
+        // Patient Search and Filter Functions
+        async function searchPatients() {
+            const searchInput = document.getElementById('patientSearchInput');
+            const filterSelect = document.getElementById('patientFilterSelect');
+            
+            if (!searchInput || !filterSelect) return;
+            
+            const query = searchInput.value.trim();
+            const filter = filterSelect.value;
+            
+            try {
+                const params = new URLSearchParams({
+                    clinician: currentUser,
+                    filter: filter
+                });
+                
+                if (query) {
+                    params.append('q', query);
+                }
+                
+                const response = await fetch(`/api/patients/search?${params.toString()}&_t=${Date.now()}`, {
+                    cache: 'no-store',
+                    headers: { 'Cache-Control': 'no-cache' }
+                });
+                
+                if (!response.ok) {
+                    console.error('Search failed:', response.status);
+                    return;
+                }
+                
+                const patients = await response.json();
+                displaySearchResults(patients);
+                
+            } catch (error) {
+                console.error('Error searching patients:', error);
+            }
+        }
+        
+        function displaySearchResults(patients) {
+            const patientList = document.getElementById('patientList');
+            if (!patientList) return;
+            
+            if (patients.length === 0) {
+                patientList.innerHTML = '<p style="color: #6b7280; text-align: center; padding: 20px;">No patients found matching your search.</p>';
+                return;
+            }
+            
+            patientList.innerHTML = patients.map(patient => {
+                const riskColor = patient.risk_level === 'high' ? '#ef4444' : 
+                                 patient.risk_level === 'moderate' ? '#f97316' : '#10b981';
+                
+                const lastActive = patient.last_active || 'Never';
+                const phq9Score = patient.phq9_score !== null ? patient.phq9_score : 'N/A';
+                
+                return `
+                    <div class="patient-card" style="background: white; padding: 15px; border-radius: 10px; margin-bottom: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+                        <div style="display: flex; justify-content: space-between; align-items: center;">
+                            <div>
+                                <h4 style="margin: 0 0 5px 0; color: #1f2937;">${sanitizeHTML(patient.full_name || patient.username)}</h4>
+                                <p style="margin: 0; font-size: 13px; color: #6b7280;">@${sanitizeHTML(patient.username)}</p>
+                                ${patient.email ? `<p style="margin: 3px 0 0 0; font-size: 13px; color: #6b7280;">${sanitizeHTML(patient.email)}</p>` : ''}
+                            </div>
+                            <div style="text-align: right;">
+                                <span style="display: inline-block; padding: 4px 12px; background: ${riskColor}; color: white; border-radius: 20px; font-size: 12px; font-weight: 600; margin-bottom: 5px;">
+                                    ${patient.risk_level.toUpperCase()}
+                                </span>
+                                <p style="margin: 5px 0 0 0; font-size: 12px; color: #6b7280;">PHQ-9: ${phq9Score}</p>
+                                <p style="margin: 3px 0 0 0; font-size: 12px; color: #6b7280;">Last Active: ${lastActive}</p>
+                            </div>
+                        </div>
+                        ${patient.alert_count > 0 ? `
+                        <div style="margin-top: 10px; padding: 8px; background: #fef2f2; border-left: 3px solid #ef4444; border-radius: 4px;">
+                            <p style="margin: 0; font-size: 13px; color: #991b1b; font-weight: 600;">⚠️ ${patient.alert_count} Active Alert${patient.alert_count > 1 ? 's' : ''}</p>
+                        </div>
+                        ` : ''}
+                        <div style="margin-top: 10px; display: flex; gap: 10px;">
+                            <button onclick="viewPatientDetails('${patient.username}')" style="flex: 1; padding: 8px; background: #8b5cf6; color: white; border: none; border-radius: 6px; cursor: pointer; font-size: 13px;">View Details</button>
+                            <button onclick="showReportGenerator('${patient.username}')" style="flex: 1; padding: 8px; background: #06b6d4; color: white; border: none; border-radius: 6px; cursor: pointer; font-size: 13px;">Generate Report</button>
+                        </div>
+                    </div>
+                `;
+            }).join('');
+        }
+        
+        // Clinical Report Generator Functions
+        function showReportGenerator(username) {
+            const reportType = prompt('Select report type:\n1. GP Referral\n2. Progress Notes\n3. Discharge Summary\n\nEnter 1, 2, or 3:');
+            
+            const types = {
+                '1': 'gp_referral',
+                '2': 'progress',
+                '3': 'discharge'
+            };
+            
+            if (types[reportType]) {
+                generateClinicalReport(username, types[reportType]);
+            }
+        }
+        
+        async function generateClinicalReport(username, reportType) {
+            try {
+                const response = await fetch('/api/reports/generate', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: username,
+                        report_type: reportType,
+                        clinician: currentUser
+                    })
+                });
+                
+                if (!response.ok) {
+                    const error = await response.json();
+                    alert('Error generating report: ' + (error.error || 'Unknown error'));
+                    return;
+                }
+                
+                const data = await response.json();
+                displayReport(data.report, reportType, username);
+                
+            } catch (error) {
+                console.error('Error generating report:', error);
+                alert('Failed to generate report. Please try again.');
+            }
+        }
+        
+        function displayReport(reportText, reportType, username) {
+            // Create modal for report display
+            const modal = document.createElement('div');
+            modal.style.cssText = 'position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: rgba(0,0,0,0.7); display: flex; justify-content: center; align-items: center; z-index: 10000;';
+            
+            const reportTypeNames = {
+                'gp_referral': 'GP Referral Letter',
+                'progress': 'Progress Notes',
+                'discharge': 'Discharge Summary'
+            };
+            
+            modal.innerHTML = `
+                <div style="background: white; padding: 30px; border-radius: 15px; max-width: 800px; max-height: 80vh; overflow-y: auto; box-shadow: 0 10px 40px rgba(0,0,0,0.3);">
+                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 20px;">
+                        <h2 style="margin: 0; color: #1f2937;">${reportTypeNames[reportType]}</h2>
+                        <button onclick="this.closest('[style*=fixed]').remove()" style="background: none; border: none; font-size: 24px; cursor: pointer; color: #6b7280;">×</button>
+                    </div>
+                    <div style="background: #f9fafb; padding: 20px; border-radius: 10px; white-space: pre-wrap; font-family: monospace; font-size: 13px; line-height: 1.6; color: #1f2937;">
+${reportText}
+                    </div>
+                    <div style="margin-top: 20px; display: flex; gap: 10px;">
+                        <button onclick="copyReportToClipboard(this)" style="flex: 1; padding: 12px; background: #8b5cf6; color: white; border: none; border-radius: 8px; cursor: pointer; font-weight: 600;">Copy to Clipboard</button>
+                        <button onclick="printReport()" style="flex: 1; padding: 12px; background: #06b6d4; color: white; border: none; border-radius: 8px; cursor: pointer; font-weight: 600;">Print</button>
+                        <button onclick="this.closest('[style*=fixed]').remove()" style="flex: 1; padding: 12px; background: #6b7280; color: white; border: none; border-radius: 8px; cursor: pointer; font-weight: 600;">Close</button>
+                    </div>
+                </div>
+            `;
+            
+            document.body.appendChild(modal);
+        }
+        
+        function copyReportToClipboard(button) {
+            const reportContent = button.closest('[style*="background: white"]').querySelector('[style*="white-space: pre-wrap"]').textContent;
+            navigator.clipboard.writeText(reportContent).then(() => {
+                const originalText = button.textContent;
+                button.textContent = '✓ Copied!';
+                button.style.background = '#10b981';
+                setTimeout(() => {
+                    button.textContent = originalText;
+                    button.style.background = '#8b5cf6';
+                }, 2000);
+            });
+        }
+        
+        function printReport() {
+            window.print();
+        }
+        
+        async function viewPatientDetails(username) {
+            try {
+                const response = await fetch(`/api/analytics/patient/${username}?_t=${Date.now()}`, {
+                    cache: 'no-store',
+                    credentials: 'include',
+                    headers: { 'Cache-Control': 'no-cache', 'Content-Type': 'application/json' }
+                });
+                
+                if (!response.ok) {
+                    alert('Failed to load patient details');
+                    return;
+                }
+                
+                const data = await response.json();
+                displayPatientDetailsModal(username, data);
+                
+            } catch (error) {
+                console.error('Error loading patient details:', error);
+                alert('Failed to load patient details');
+            }
+        }
+
+        async function confirmAttendance(appointmentId, status, patientUsername) {
+            if (!confirm(`Confirm marking appointment ${appointmentId} as ${status}?`)) return;
+            try {
+                const resp = await fetch(`/api/appointments/${appointmentId}/attendance`, {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({ clinician_username: currentUser, status })
+                });
+                const data = await resp.json();
+                if (!resp.ok) {
+                    showToast('Failed to update attendance: ' + (data.error || JSON.stringify(data)), 'error');
+                    return;
+                }
+
+                // Inline UI update: update status text and disable buttons for this appointment
+                const statusEl = document.getElementById(`apt-status-${appointmentId}`);
+                if (statusEl) statusEl.textContent = status;
+
+                // Disable buttons in this appointment card
+                const btns = Array.from(document.querySelectorAll(`[onclick*="confirmAttendance(${appointmentId},"]`));
+                btns.forEach(b => { b.disabled = true; b.style.opacity = 0.6; b.style.cursor = 'not-allowed'; });
+
+                showToast(data.message || 'Attendance updated', 'success');
+            } catch (err) {
+                console.error('Attendance update error', err);
+                showToast('Error updating attendance', 'error');
+            }
+        }
+
+        // Toast helper
+        function showToast(message, type='info', timeout=4000) {
+            try {
+                const containerId = 'hs-toast-container';
+                let container = document.getElementById(containerId);
+                if (!container) {
+                    container = document.createElement('div');
+                    container.id = containerId;
+                    container.style.cssText = 'position:fixed; right:20px; top:20px; z-index:20000; display:flex; flex-direction:column; gap:10px; max-width:320px;';
+                    document.body.appendChild(container);
+                }
+
+                const toast = document.createElement('div');
+                toast.style.cssText = 'padding:10px 14px; border-radius:8px; color:white; box-shadow:0 6px 18px rgba(0,0,0,0.12); font-weight:600;';
+                if (type === 'success') toast.style.background = '#10b981';
+                else if (type === 'error') toast.style.background = '#ef4444';
+                else toast.style.background = '#374151';
+                toast.textContent = message;
+                container.appendChild(toast);
+
+                setTimeout(() => {
+                    toast.style.transition = 'opacity 300ms';
+                    toast.style.opacity = '0';
+                    setTimeout(() => toast.remove(), 300);
+                }, timeout);
+            } catch (e) {
+                console.log('Toast error', e);
+            }
+        }
+        
+        function displayPatientDetailsModal(username, data) {
+            const modal = document.createElement('div');
+            modal.style.cssText = 'position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: rgba(0,0,0,0.7); display: flex; justify-content: center; align-items: center; z-index: 10000; overflow-y: auto;';
+            
+            const moodTrend = data.mood_trend || [];
+            const assessments = data.assessments || [];
+            const activity = data.activity || {};
+            const risk = data.risk || {};
+            
+            modal.innerHTML = `
+                <div style="background: white; padding: 30px; border-radius: 15px; max-width: 900px; width: 90%; margin: 20px; box-shadow: 0 10px 40px rgba(0,0,0,0.3);">
+                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 20px;">
+                        <h2 style="margin: 0; color: #1f2937;">Patient Details: ${username}</h2>
+                        <button onclick="this.closest('[style*=fixed]').remove()" style="background: none; border: none; font-size: 24px; cursor: pointer; color: #6b7280;">×</button>
+                    </div>
+                    
+                    <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin-bottom: 20px;">
+                        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 15px; border-radius: 10px; color: white;">
+                            <p style="margin: 0; font-size: 13px; opacity: 0.9;">Sessions</p>
+                            <h3 style="margin: 5px 0 0 0; font-size: 28px;">${activity.total_sessions || 0}</h3>
+                        </div>
+                        <div style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); padding: 15px; border-radius: 10px; color: white;">
+                            <p style="margin: 0; font-size: 13px; opacity: 0.9;">Mood Logs</p>
+                            <h3 style="margin: 5px 0 0 0; font-size: 28px;">${activity.mood_logs || 0}</h3>
+                        </div>
+                        <div style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%); padding: 15px; border-radius: 10px; color: white;">
+                            <p style="margin: 0; font-size: 13px; opacity: 0.9;">Last Active</p>
+                            <h3 style="margin: 5px 0 0 0; font-size: 16px;">${activity.last_active || 'Never'}</h3>
+                        </div>
+                    </div>
+                    
+                    ${risk.alert_count > 0 ? `
+                    <div style="background: #fef2f2; border-left: 4px solid #ef4444; padding: 15px; border-radius: 8px; margin-bottom: 20px;">
+                        <h4 style="margin: 0 0 10px 0; color: #991b1b;">⚠️ Active Alerts (${risk.alert_count})</h4>
+                        ${risk.alerts ? risk.alerts.map(alert => `
+                            <p style="margin: 5px 0; font-size: 13px; color: #7f1d1d;">• ${alert.message} - ${alert.created_at}</p>
+                        `).join('') : ''}
+                    </div>
+                    ` : ''}
+                    
+                    <div style="background: #f9fafb; padding: 20px; border-radius: 10px; margin-bottom: 20px;">
+                        <h3 style="margin: 0 0 15px 0; color: #1f2937;">Recent Assessment Scores</h3>
+                        <div style="max-height: 200px; overflow-y: auto;">
+                            ${assessments.length > 0 ? assessments.map(assessment => `
+                                <div style="background: white; padding: 10px; border-radius: 8px; margin-bottom: 10px; display: flex; justify-content: space-between; align-items: center;">
+                                    <div>
+                                        <strong style="color: #1f2937;">${assessment.scale_type}</strong>
+                                        <span style="margin-left: 10px; color: #6b7280; font-size: 12px;">${assessment.date}</span>
+                                    </div>
+                                    <span style="background: ${assessment.severity === 'severe' ? '#ef4444' : assessment.severity === 'moderate' ? '#f97316' : assessment.severity === 'mild' ? '#fbbf24' : '#10b981'}; color: white; padding: 4px 12px; border-radius: 20px; font-size: 12px; font-weight: 600;">
+                                        Score: ${assessment.score} (${assessment.severity})
+                                    </span>
+                                </div>
+                            `).join('') : '<p style="color: #6b7280; text-align: center;">No assessments recorded</p>'}
+                        </div>
+                    </div>
+                    
+                    <div style="background: #f9fafb; padding: 20px; border-radius: 10px;">
+                        <h3 style="margin: 0 0 15px 0; color: #1f2937;">Mood Trend (Last 90 Days)</h3>
+                        <canvas id="patientMoodChart" style="max-height: 250px;"></canvas>
+                    </div>
+                    
+                    <div style="margin-top: 20px; display: flex; gap: 10px;">
+                        <button onclick="showReportGenerator('${username}')" style="flex: 1; padding: 12px; background: #8b5cf6; color: white; border: none; border-radius: 8px; cursor: pointer; font-weight: 600;">Generate Report</button>
+                        <button onclick="this.closest('[style*=fixed]').remove()" style="flex: 1; padding: 12px; background: #6b7280; color: white; border: none; border-radius: 8px; cursor: pointer; font-weight: 600;">Close</button>
+                    </div>
+                    
+                    <!-- Appointments Section -->
+                    <div style="background: #ffffff; padding: 16px; border-radius: 8px; margin-top: 18px; border: 1px solid #e5e7eb;">
+                        <h3 style="margin: 0 0 10px 0; color: #1f2937;">Upcoming Appointments</h3>
+                        ${data.upcoming_appointments && data.upcoming_appointments.length > 0 ? `
+                            <div style="display: flex; flex-direction: column; gap: 10px;">
+                                ${data.upcoming_appointments.map(a => `
+                                    <div style="display:flex; justify-content:space-between; align-items:center; padding:8px; border-radius:6px; background:#f8fafc;">
+                                        <div>
+                                            <strong>${a.appointment_type}</strong>
+                                            <div style="font-size:13px; color:#6b7280;">${a.appointment_date} — Clinician: ${a.clinician_username}</div>
+                                            ${a.notes ? `<div style="font-size:13px; color:#374151; margin-top:6px;">${a.notes}</div>` : ''}
+                                        </div>
+                                        <div style="text-align:right">
+                                            <div style="font-weight:600; color:#374151">Status: ${a.attendance_status || 'scheduled'}</div>
+                                        </div>
+                                    </div>
+                                `).join('')}
+                            </div>
+                        ` : `<p style="color:#6b7280;">No upcoming appointments</p>`}
+                    </div>
+
+                    <div style="background: #ffffff; padding: 16px; border-radius: 8px; margin-top: 12px; border: 1px solid #e5e7eb;">
+                        <h3 style="margin: 0 0 10px 0; color: #1f2937;">Recent Appointments (past 7 days)</h3>
+                        ${data.recent_past_appointments && data.recent_past_appointments.length > 0 ? `
+                            <div style="display:flex; flex-direction:column; gap:10px;">
+                                ${data.recent_past_appointments.map(a => `
+                                    <div style="display:flex; justify-content:space-between; align-items:center; padding:8px; border-radius:6px; background:#f8fafc;">
+                                        <div>
+                                            <strong>${a.appointment_type}</strong>
+                                            <div style="font-size:13px; color:#6b7280;">${a.appointment_date} — Clinician: ${a.clinician_username}</div>
+                                            ${a.notes ? `<div style="font-size:13px; color:#374151; margin-top:6px;">${a.notes}</div>` : ''}
+                                        </div>
+                                        <div style="text-align:right">
+                                            <div style="font-weight:600; color:#374151">Status: <span id="apt-status-${a.id}">${a.attendance_status || 'scheduled'}</span></div>
+                                            ${currentUserRole === 'clinician' && currentUser === a.clinician_username ? `
+                                                <div style="margin-top:8px; display:flex; gap:6px; justify-content:flex-end;">
+                                                    <button onclick="confirmAttendance(${a.id}, 'attended', '${username}')" style="padding:6px 8px; background:#10b981; color:white; border:none; border-radius:6px; cursor:pointer;">Mark attended</button>
+                                                    <button onclick="confirmAttendance(${a.id}, 'no_show', '${username}')" style="padding:6px 8px; background:#ef4444; color:white; border:none; border-radius:6px; cursor:pointer;">Mark no-show</button>
+                                                    <button onclick="confirmAttendance(${a.id}, 'missed', '${username}')" style="padding:6px 8px; background:#f59e0b; color:white; border:none; border-radius:6px; cursor:pointer;">Mark missed</button>
+                                                </div>
+                                            ` : ''}
+                                        </div>
+                                    </div>
+                                `).join('')}
+                            </div>
+                        ` : `<p style="color:#6b7280;">No recent appointments</p>`}
+                    </div>
+                </div>
+            `;
+            
+            document.body.appendChild(modal);
+            
+            // Render mood trend chart in modal
+            setTimeout(() => {
+                const canvas = document.getElementById('patientMoodChart');
+                if (canvas && moodTrend.length > 0) {
+                    const ctx = canvas.getContext('2d');
+                    new Chart(ctx, {
+                        type: 'line',
+                        data: {
+                            labels: moodTrend.map(item => item.date),
+                            datasets: [{
+                                label: 'Mood Score',
+                                data: moodTrend.map(item => item.mood),
+                                borderColor: '#8b5cf6',
+                                backgroundColor: 'rgba(139, 92, 246, 0.1)',
+                                tension: 0.4,
+                                fill: true
+                            }]
+                        },
+                        options: {
+                            responsive: true,
+                            maintainAspectRatio: false,
+                            plugins: {
+                                legend: { display: false }
+                            },
+                            scales: {
+                                y: {
+                                    beginAtZero: true,
+                                    max: 10,
+                                    title: { display: true, text: 'Mood Score' }
+                                },
+                                x: {
+                                    title: { display: true, text: 'Date' }
+                                }
+                            }
+                        }
+                    });
+                }
+            }, 100);
+        }
+        
+        // Initialize and restore session on page load
+        window.addEventListener('DOMContentLoaded', async function() {
+            console.log('python-chat-bot Complete Edition initialized');
+            
+            // Initialize theme and set toggle state
+            initializeTheme();
+            
+            // Ensure authScreen is visible by default
+            document.getElementById('authScreen').style.display = 'flex';
+            document.getElementById('appScreen').style.display = 'none';
+            
+            // Try to restore session (will handle visibility if successful)
+            await await restoreSession();
+        });
+        
+        // Debug helper: Call this from browser console to clear all session data
+        window.clearAllSessions = function() {
+            localStorage.removeItem('healingSpaceSession');
+            sessionStorage.removeItem('healingSpaceSession');
+            console.log('All session data cleared. Reloading page...');
+            location.reload();
+        };
+
+        // ========== DEVELOPER DASHBOARD FUNCTIONS ==========
+
+        // Developer Tab Management
+        function switchDevTab(subtabName, buttonEl) {
+            document.querySelectorAll('.dev-subtab-content').forEach(tab => {
+                tab.style.display = 'none';
+            });
+
+            document.querySelectorAll('.dev-subtab-btn').forEach(btn => {
+                btn.classList.remove('active');
+            });
+
+            document.getElementById('dev' + subtabName.charAt(0).toUpperCase() + subtabName.slice(1) + 'Tab').style.display = 'block';
+
+            if (buttonEl) {
+                buttonEl.classList.add('active');
+            }
+
+            if (subtabName === 'messages') {
+                loadMessageRecipients();
+                loadMessageThread();
+            } else if (subtabName === 'feedback') {
+                loadFeedback();
+            } else if (subtabName === 'stats') {
+                loadSystemStats();
+            } else if (subtabName === 'users') {
+                loadUsersList();
+            } else if (subtabName === 'qa') {
+                // QA tab - no auto-load needed
+            }
+        }
+
+        // Terminal Functions
+        async function executeTerminalCommand() {
+            const inputField = document.getElementById('terminalCommand');
+            const command = inputField.value.trim();
+            if (!command) return;
+
+            const output = document.getElementById('terminalOutput');
+            const timestamp = new Date().toLocaleTimeString();
+
+            // Remove the input field temporarily
+            inputField.remove();
+
+            // Add command to output
+            output.innerHTML += `<span style="color: #00ff00;">[${timestamp}]</span> $ ${sanitizeHTML(command)}\n`;
+
+            try {
+                const response = await fetch('/api/developer/terminal/execute', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        command
+                    })
+                });
+
+                const data = await response.json();
+
+                if (response.ok) {
+                    output.innerHTML += `<span style="color: #ffffff;">${sanitizeHTML(data.output)}</span>\n`;
+                    output.innerHTML += `<span style="color: #888;">[Exit: ${data.exit_code}, Time: ${data.duration_ms}ms]</span>\n`;
+                } else {
+                    output.innerHTML += `<span style="color: #ff0000;">ERROR: ${sanitizeHTML(data.error)}</span>\n`;
+                }
+            } catch (error) {
+                output.innerHTML += `<span style="color: #ff0000;">NETWORK ERROR: ${sanitizeHTML(error.message)}</span>\n`;
+            }
+
+            // Recreate input field at the end
+            output.innerHTML += `$ <input type="text" id="terminalCommand" placeholder="type command here..."
+                style="background: transparent; border: none; outline: none; color: #00ff00; font-family: 'Courier New', monospace; font-size: 14px; width: calc(100% - 20px); caret-color: #00ff00;"
+                onkeypress="if(event.key==='Enter') executeTerminalCommand()"
+                autofocus>`;
+
+            output.scrollTop = output.scrollHeight;
+            document.getElementById('terminalCommand').focus();
+        }
+
+        function clearTerminal() {
+            document.getElementById('terminalOutput').innerHTML = `<span style="color: #00ff00;">╔═══════════════════════════════════════════════════════════════╗
+║   python-chat-bot Developer Terminal v1.0 - FULL ACCESS MODE   ║
+║   Type any command - no restrictions, no sandboxing          ║
+╚═══════════════════════════════════════════════════════════════╝</span>
+
+$ <input type="text" id="terminalCommand" placeholder="type command here..."
+    style="background: transparent; border: none; outline: none; color: #00ff00; font-family: 'Courier New', monospace; font-size: 14px; width: calc(100% - 20px); caret-color: #00ff00;"
+    onkeypress="if(event.key==='Enter') executeTerminalCommand()"
+    autofocus>`;
+            document.getElementById('terminalCommand').focus();
+        }
+
+        // ========== QA TEST RUNNER FUNCTIONS ==========
+        let qaRunning = false;
+
+        async function runQATests(scope) {
+            if (qaRunning) return;
+            qaRunning = true;
+
+            const btns = ['qa-btn-all', 'qa-btn-backend', 'qa-btn-e2e', 'qa-btn-security'];
+            btns.forEach(id => { const b = document.getElementById(id); if (b) b.disabled = true; });
+
+            const output = document.getElementById('qaTestOutput');
+            const cmdMap = {
+                'all': 'python -m pytest tests/ -v --tb=short',
+                'backend': 'python -m pytest tests/backend/ -v --tb=short',
+                'e2e': 'python -m pytest tests/e2e/ -v --tb=short',
+                'security': 'python -m pytest tests/backend/test_auth.py tests/backend/test_security.py tests/backend/test_safety.py -v --tb=short'
+            };
+
+            output.innerHTML = `<span style="color: #3498db;">Running ${scope} tests...</span>\n\n`;
+
+            try {
+                const resp = await fetch('/api/developer/terminal/execute', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'include',
+                    body: JSON.stringify({
+                        username: currentUser,
+                        command: cmdMap[scope] || cmdMap['all']
+                    })
+                });
+
+                const data = await resp.json();
+
+                if (data.error) {
+                    output.innerHTML += `<span style="color: #e74c3c;">Error: ${sanitizeHTML(data.error)}</span>`;
+                    qaRunning = false;
+                    btns.forEach(id => { const b = document.getElementById(id); if (b) b.disabled = false; });
+                    return;
+                }
+
+                const raw = data.output || '';
+                output.innerHTML = colorizeTestOutput(raw);
+                parseTestResults(raw);
+                document.getElementById('qaLastRun').textContent = 'Last run: ' + new Date().toLocaleTimeString();
+
+            } catch (err) {
+                output.innerHTML += `<span style="color: #e74c3c;">Network error: ${sanitizeHTML(err.message)}</span>`;
+            }
+
+            qaRunning = false;
+            btns.forEach(id => { const b = document.getElementById(id); if (b) b.disabled = false; });
+        }
+
+        // Store raw test output for filtering
+        let lastRawTestOutput = '';
+
+        function colorizeTestOutput(raw) {
+            lastRawTestOutput = raw;
+            return raw
+                .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
+                .replace(/(PASSED)/g, '<span style="color: #27ae60;">$1</span>')
+                .replace(/(FAILED)/g, '<span style="color: #e74c3c; font-weight: bold;">$1</span>')
+                .replace(/(SKIPPED)/g, '<span style="color: #f39c12;">$1</span>')
+                .replace(/(ERROR)/g, '<span style="color: #e74c3c; font-weight: bold;">$1</span>')
+                .replace(/(={3,}.*={3,})/g, '<span style="color: #3498db;">$1</span>')
+                .replace(/(_{3,}.*_{3,})/g, '<span style="color: #3498db;">$1</span>');
+        }
+
+        function filterQAOutput(type) {
+            if (!lastRawTestOutput) {
+                if (typeof showToast === 'function') showToast('No test results to filter', 'warning');
+                return;
+            }
+
+            const lines = lastRawTestOutput.split('\n');
+            let filtered = [];
+
+            if (type === 'FAILED') {
+                // Get all FAILED test lines and the error details sections
+                let inFailureSection = false;
+                for (const line of lines) {
+                    if (line.includes('FAILED')) {
+                        filtered.push(line);
+                    }
+                    // Capture the FAILURES section with tracebacks
+                    if (line.match(/^={3,}\s*FAILURES\s*={3,}/) || line.match(/^={3,}\s*ERRORS\s*={3,}/)) {
+                        inFailureSection = true;
+                    }
+                    if (inFailureSection) {
+                        filtered.push(line);
+                    }
+                    if (inFailureSection && line.match(/^={3,}\s*short test summary/i)) {
+                        inFailureSection = false;
+                    }
+                }
+            } else if (type === 'SKIPPED') {
+                for (const line of lines) {
+                    if (line.includes('SKIPPED') || line.includes('skipped')) {
+                        filtered.push(line);
+                    }
+                }
+            }
+
+            if (filtered.length === 0) {
+                if (typeof showToast === 'function') showToast('No ' + type.toLowerCase() + ' tests found', 'info');
+                return;
+            }
+
+            // Add a header and show button to restore full output
+            const header = `Showing ${filtered.length} ${type} lines (click "Show All" to restore full output)\n${'='.repeat(70)}\n`;
+            const output = document.getElementById('qaTestOutput');
+            output.innerHTML = '<span style="color: #3498db; cursor: pointer;" onclick="restoreFullQAOutput()">[ Show All Results ]</span>\n\n' + colorizeFilteredOutput(header + filtered.join('\n'));
+        }
+
+        function colorizeFilteredOutput(text) {
+            return text
+                .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
+                .replace(/(PASSED)/g, '<span style="color: #27ae60;">$1</span>')
+                .replace(/(FAILED)/g, '<span style="color: #e74c3c; font-weight: bold;">$1</span>')
+                .replace(/(SKIPPED)/g, '<span style="color: #f39c12;">$1</span>')
+                .replace(/(ERROR)/g, '<span style="color: #e74c3c; font-weight: bold;">$1</span>')
+                .replace(/(={3,}.*={3,})/g, '<span style="color: #3498db;">$1</span>')
+                .replace(/(_{3,}.*_{3,})/g, '<span style="color: #3498db;">$1</span>');
+        }
+
+        function restoreFullQAOutput() {
+            if (lastRawTestOutput) {
+                document.getElementById('qaTestOutput').innerHTML = colorizeTestOutput(lastRawTestOutput);
+            }
+        }
+
+        function parseTestResults(raw) {
+            // Parse pytest summary line like "X passed, Y failed, Z skipped in Ns"
+            const summaryMatch = raw.match(/(\d+)\s+passed/);
+            const failMatch = raw.match(/(\d+)\s+failed/);
+            const skipMatch = raw.match(/(\d+)\s+skipped/);
+            const durationMatch = raw.match(/in\s+([\d.]+)s/);
+
+            const passed = summaryMatch ? parseInt(summaryMatch[1]) : 0;
+            const failed = failMatch ? parseInt(failMatch[1]) : 0;
+            const skipped = skipMatch ? parseInt(skipMatch[1]) : 0;
+            const total = passed + failed + skipped;
+            const duration = durationMatch ? durationMatch[1] + 's' : '-';
+
+            document.getElementById('qaTotalTests').textContent = total || '-';
+            document.getElementById('qaPassed').textContent = passed || '-';
+            document.getElementById('qaFailed').textContent = failed || '-';
+            document.getElementById('qaSkipped').textContent = skipped || '-';
+            document.getElementById('qaDuration').textContent = duration;
+
+            const pct = total > 0 ? ((passed / total) * 100).toFixed(1) : 0;
+            document.getElementById('qaPassRate').textContent = `Pass rate: ${pct}%`;
+
+            const bar = document.getElementById('qaProgressBar');
+            bar.style.width = pct + '%';
+            bar.style.background = pct >= 90 ? 'linear-gradient(90deg, #27ae60, #2ecc71)'
+                                 : pct >= 70 ? 'linear-gradient(90deg, #f39c12, #e67e22)'
+                                 : 'linear-gradient(90deg, #e74c3c, #c0392b)';
+        }
+
+        function copyQAOutput() {
+            const output = document.getElementById('qaTestOutput').innerText;
+            navigator.clipboard.writeText(output).then(() => {
+                if (typeof showToast === 'function') {
+                    showToast('Test output copied to clipboard', 'success');
+                }
+            }).catch(() => {
+                // Fallback for older browsers
+                const textarea = document.createElement('textarea');
+                textarea.value = output;
+                document.body.appendChild(textarea);
+                textarea.select();
+                document.execCommand('copy');
+                document.body.removeChild(textarea);
+                if (typeof showToast === 'function') {
+                    showToast('Test output copied to clipboard', 'success');
+                }
+            });
+        }
+
+        async function saveQAResults() {
+            const output = document.getElementById('qaTestOutput').innerText;
+            if (!output || output.includes('Ready to run tests')) {
+                if (typeof showToast === 'function') showToast('No test results to save', 'warning');
+                return;
+            }
+
+            const passed = parseInt(document.getElementById('qaPassed').textContent) || 0;
+            const failed = parseInt(document.getElementById('qaFailed').textContent) || 0;
+            const errors = (output.match(/ERROR/g) || []).length;
+            const btn = document.getElementById('qaSaveBtn');
+            btn.disabled = true;
+            btn.textContent = 'Saving...';
+
+            try {
+                const resp = await fetch('/api/developer/tests/save', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'include',
+                    body: JSON.stringify({
+                        username: currentUser,
+                        test_output: output,
+                        passed_count: passed,
+                        failed_count: failed,
+                        error_count: errors,
+                        exit_code: failed > 0 ? 1 : 0
+                    })
+                });
+                const data = await resp.json();
+                if (resp.ok) {
+                    if (typeof showToast === 'function') showToast('Test results saved! Use AI Assistant to analyze.', 'success');
+                } else {
+                    if (typeof showToast === 'function') showToast('Save failed: ' + (data.error || 'Unknown error'), 'error');
+                }
+            } catch (err) {
+                if (typeof showToast === 'function') showToast('Save failed: ' + err.message, 'error');
+            }
+
+            btn.disabled = false;
+            btn.textContent = 'Save for AI';
+        }
+
+        function clearQAOutput() {
+            document.getElementById('qaTestOutput').innerHTML = 'Ready to run tests. Click a button above to start.';
+            document.getElementById('qaTotalTests').textContent = '-';
+            document.getElementById('qaPassed').textContent = '-';
+            document.getElementById('qaFailed').textContent = '-';
+            document.getElementById('qaSkipped').textContent = '-';
+            document.getElementById('qaDuration').textContent = '-';
+            document.getElementById('qaPassRate').textContent = 'Pass rate: -';
+            document.getElementById('qaProgressBar').style.width = '0%';
+        }
+
+        // AI Assistant Functions
+        function formatDevAIResponse(text) {
+            // Escape HTML first for XSS safety, then apply markdown formatting
+            let html = escapeHtml(text);
+            // Code blocks (triple backtick with optional language)
+            html = html.replace(/```(\w*)\n?([\s\S]*?)```/g, '<pre><code>$2</code></pre>');
+            // Inline code
+            html = html.replace(/`([^`]+)`/g, '<code>$1</code>');
+            // Bold
+            html = html.replace(/\*\*(.+?)\*\*/g, '<strong>$1</strong>');
+            // Headers (###, ##, #)
+            html = html.replace(/^### (.+)$/gm, '<strong style="font-size:1em;">$1</strong>');
+            html = html.replace(/^## (.+)$/gm, '<strong style="font-size:1.1em;">$1</strong>');
+            html = html.replace(/^# (.+)$/gm, '<strong style="font-size:1.2em;">$1</strong>');
+            // Bullet points
+            html = html.replace(/^- (.+)$/gm, '&bull; $1');
+            // Numbered lists
+            html = html.replace(/^(\d+)\. (.+)$/gm, '$1. $2');
+            // Line breaks (but not inside pre blocks)
+            html = html.replace(/\n/g, '<br>');
+            // Clean up extra <br> inside pre blocks
+            html = html.replace(/<pre><code>([\s\S]*?)<\/code><\/pre>/g, function(match, code) {
+                return '<pre><code>' + code.replace(/<br>/g, '\n') + '</code></pre>';
+            });
+            return html;
+        }
+
+        function sendDevAIQuickAction(command, message) {
+            const input = document.getElementById('devAIInput');
+            input.value = message;
+            sendDevAIMessage(command);
+        }
+
+        async function sendDevAIMessage(command = null) {
+            const input = document.getElementById('devAIInput');
+            const message = input.value.trim();
+            if (!message && !command) return;
+
+            const container = document.getElementById('devAIChatMessages');
+            const sendBtn = document.getElementById('devAISendBtn');
+
+            // Clear welcome screen on first message
+            const welcome = container.querySelector('.dev-ai-welcome');
+            if (welcome) welcome.remove();
+
+            // Show user message bubble
+            const userMsg = message || '(Quick action)';
+            const now = new Date();
+            const msgDiv = document.createElement('div');
+            msgDiv.className = 'dev-ai-msg user';
+            msgDiv.innerHTML = escapeHtml(userMsg) + '<div class="msg-timestamp">' + formatTimestamp(now.toISOString()) + '</div>';
+            container.appendChild(msgDiv);
+
+            input.value = '';
+            sendBtn.disabled = true;
+            container.scrollTop = container.scrollHeight;
+
+            // Show thinking animation
+            const thinkingId = 'dev-thinking-' + Date.now();
+            const thinkingDiv = document.createElement('div');
+            thinkingDiv.className = 'dev-ai-msg assistant';
+            thinkingDiv.id = thinkingId;
+            thinkingDiv.innerHTML = '<div class="ai-thinking"><div class="thinking-dots"><span></span><span></span><span></span></div><span>Thinking...</span></div>';
+            container.appendChild(thinkingDiv);
+            container.scrollTop = container.scrollHeight;
+
+            try {
+                const body = { username: currentUser, message: userMsg };
+                if (command) body.command = command;
+
+                const response = await fetch('/api/developer/ai/chat', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'include',
+                    body: JSON.stringify(body)
+                });
+
+                const data = await response.json();
+
+                // Remove thinking bubble
+                const thinkingEl = document.getElementById(thinkingId);
+                if (thinkingEl) thinkingEl.remove();
+
+                if (response.ok) {
+                    const formatted = formatDevAIResponse(data.response);
+                    const aiDiv = document.createElement('div');
+                    aiDiv.className = 'dev-ai-msg assistant';
+                    aiDiv.innerHTML = formatted + '<div class="msg-timestamp">' + formatTimestamp(new Date().toISOString()) + '</div>';
+                    container.appendChild(aiDiv);
+                } else {
+                    const errDiv = document.createElement('div');
+                    errDiv.className = 'dev-ai-msg assistant';
+                    errDiv.style.borderColor = '#e53935';
+                    errDiv.innerHTML = '<strong>Error:</strong> ' + escapeHtml(data.error || 'Unknown error');
+                    container.appendChild(errDiv);
+                }
+            } catch (error) {
+                const thinkingEl = document.getElementById(thinkingId);
+                if (thinkingEl) thinkingEl.remove();
+                const errDiv = document.createElement('div');
+                errDiv.className = 'dev-ai-msg assistant';
+                errDiv.style.borderColor = '#e53935';
+                errDiv.innerHTML = '<strong>Network Error:</strong> ' + escapeHtml(error.message);
+                container.appendChild(errDiv);
+            }
+
+            sendBtn.disabled = false;
+            container.scrollTop = container.scrollHeight;
+        }
+
+        function clearDevAIChat() {
+            document.getElementById('devAIChatMessages').innerHTML = `
+                <div class="dev-ai-welcome">
+                    <div style="font-size: 48px;">&#129302;</div>
+                    <div class="dev-ai-welcome-title">Developer AI Assistant</div>
+                    <div class="dev-ai-welcome-subtitle">Ask about the codebase, debug issues, analyze tests, or get architecture advice.</div>
+                </div>
+            `;
+        }
+
+        // Messaging Functions
+        async function loadMessageRecipients() {
+            try {
+                const select = document.getElementById('messageRecipient');
+                if (!select) {
+                    console.error('messageRecipient select element not found');
+                    return;
+                }
+
+                const response = await fetch(`/api/developer/users/list?username=${currentUser}&role=all`);
+                if (!response.ok) {
+                    console.error('Failed to fetch users:', response.statusText);
+                    return;
+                }
+
+                const data = await response.json();
+
+                // Clear and rebuild options
+                select.innerHTML = `
+                    <option value="ALL">🔔 Broadcast to All Users</option>
+                    <option disabled>──────────</option>
+                `;
+
+                // Add individual users
+                if (data.users && Array.isArray(data.users)) {
+                    data.users.forEach(user => {
+                        if (user.role !== 'developer') {
+                            const option = document.createElement('option');
+                            option.value = user.username;
+                            option.textContent = `${user.username} (${user.role})`;
+                            select.appendChild(option);
+                        }
+                    });
+                }
+            } catch (error) {
+                console.error('Failed to load recipients:', error);
+            }
+        }
+
+        async function sendDevMessage() {
+            const recipient = document.getElementById('messageRecipient').value;
+            const type = document.getElementById('messageType').value;
+            const content = document.getElementById('messageContent').value.trim();
+
+            // Validate recipient
+            if (!recipient || recipient === '') {
+                alert('Please select a recipient');
+                return;
+            }
+
+            // Validate content
+            if (!content) {
+                alert('Please enter a message');
+                return;
+            }
+
+            try {
+                const response = await fetch('/api/developer/messages/send', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        from_username: currentUser,
+                        to_username: recipient,
+                        message: content,
+                        message_type: type
+                    })
+                });
+
+                const data = await response.json();
+
+                if (response.ok) {
+                    alert(`Message sent to ${recipient === 'ALL' ? 'all users' : recipient}!`);
+                    document.getElementById('messageContent').value = '';
+                    loadMessageThread();
+                } else {
+                    alert('Error: ' + data.error);
+                }
+            } catch (error) {
+                alert('Network error: ' + error.message);
+            }
+        }
+
+        async function loadMessageThread() {
+            try {
+                const response = await fetch(`/api/developer/messages/list?username=${currentUser}`);
+                const data = await response.json();
+
+                const thread = document.getElementById('messageThread');
+
+                if (data.messages.length === 0) {
+                    thread.innerHTML = '<p style="color: #999; text-align: center; padding: 40px;">No messages yet</p>';
+                    return;
+                }
+
+                thread.innerHTML = data.messages.map(msg => {
+                    const isFromDev = msg.from_username === currentUser;
+                    const icon = msg.message_type === 'warning' ? '⚠️' :
+                                msg.message_type === 'alert' ? '🚨' :
+                                msg.message_type === 'system' ? '⚙️' : 'ℹ️';
+
+                    return `
+                        <div style="background: ${isFromDev ? '#e8f4fd' : '#f8f9fa'}; padding: 15px; border-radius: 8px; margin-bottom: 10px; border-left: 4px solid ${isFromDev ? '#2196F3' : '#667eea'};">
+                            <div style="display: flex; justify-content: space-between; margin-bottom: 8px;">
+                                <strong>${icon} ${sanitizeHTML(msg.from_username)} → ${sanitizeHTML(msg.to_username)}</strong>
+                                <span style="color: #999; font-size: 12px;">${new Date(msg.created_at).toLocaleString()}</span>
+                            </div>
+                            <div>${sanitizeWithLineBreaks(msg.message)}</div>
+                            ${!isFromDev ? `<button onclick="replyToMessage(${msg.id})" style="margin-top: 8px; padding: 5px 12px; background: #667eea; color: white; border: none; border-radius: 4px; cursor: pointer; font-size: 12px;">Reply</button>` : ''}
+                        </div>
+                    `;
+                }).join('');
+
+            } catch (error) {
+                console.error('Failed to load messages:', error);
+            }
+        }
+
+        function replyToMessage(messageId) {
+            const reply = prompt('Enter your reply:');
+            if (!reply) return;
+
+            fetch('/api/developer/messages/reply', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    from_username: currentUser,
+                    parent_message_id: messageId,
+                    message: reply
+                })
+            }).then(response => {
+                if (response.ok) {
+                    alert('Reply sent!');
+                    loadMessageThread();
+                } else {
+                    alert('Failed to send reply');
+                }
+            });
+        }
+
+        // System Stats Functions
+        async function loadSystemStats() {
+            try {
+                const response = await fetch(`/api/developer/stats?username=${currentUser}`);
+                const data = await response.json();
+
+                if (response.ok) {
+                    document.getElementById('statTotalUsers').textContent = data.total_users;
+                    document.getElementById('statTotalPatients').textContent = data.total_patients;
+                    document.getElementById('statTotalClinicians').textContent = data.total_clinicians;
+                    document.getElementById('statTotalChats').textContent = data.total_chats;
+                    document.getElementById('statTotalMoodLogs').textContent = data.total_mood_logs;
+                    document.getElementById('statDbSize').textContent = data.database_size_mb + ' MB';
+                }
+            } catch (error) {
+                console.error('Failed to load stats:', error);
+            }
+        }
+
+        // User Management Functions
+        async function loadUsersList() {
+            searchUsers();
+        }
+
+        async function searchUsers() {
+            const search = document.getElementById('userSearchInput').value;
+            const role = document.getElementById('userRoleFilter').value;
+
+            try {
+                const response = await fetch(`/api/developer/users/list?username=${currentUser}&role=${role}&search=${search}`);
+                const data = await response.json();
+
+                const list = document.getElementById('usersList');
+
+                if (data.users.length === 0) {
+                    list.innerHTML = '<p style="color: #999; padding: 20px; text-align: center;">No users found</p>';
+                    return;
+                }
+
+                list.innerHTML = `
+                    <table style="width: 100%; border-collapse: collapse;">
+                        <thead>
+                            <tr style="background: #f8f9fa; border-bottom: 2px solid #e0e0e0;">
+                                <th style="padding: 12px; text-align: left;">Username</th>
+                                <th style="padding: 12px; text-align: left;">Role</th>
+                                <th style="padding: 12px; text-align: left;">Last Login</th>
+                                <th style="padding: 12px; text-align: center;">Actions</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            ${data.users.map(user => `
+                                <tr style="border-bottom: 1px solid #e0e0e0;">
+                                    <td style="padding: 12px;">${user.username}</td>
+                                    <td style="padding: 12px;">
+                                        <span style="background: ${user.role === 'clinician' ? '#e8f4fd' : '#f0f4ff'}; padding: 4px 8px; border-radius: 4px; font-size: 12px;">
+                                            ${user.role}
+                                        </span>
+                                    </td>
+                                    <td style="padding: 12px; color: #666; font-size: 13px;">${user.last_login ? new Date(user.last_login).toLocaleString() : 'Never'}</td>
+                                    <td style="padding: 12px; text-align: center;">
+                                        ${user.role !== 'developer' ?
+                                            `<button onclick="deleteUserAccount('${user.username}')"
+                                                style="background: #e74c3c; color: white; border: none; padding: 6px 12px; border-radius: 4px; cursor: pointer; font-size: 12px;">
+                                                🗑️ Delete
+                                            </button>`
+                                            : '<span style="color: #999; font-size: 12px;">Protected</span>'}
+                                    </td>
+                                </tr>
+                            `).join('')}
+                        </tbody>
+                    </table>
+                `;
+
+            } catch (error) {
+                console.error('Failed to load users:', error);
+                document.getElementById('usersList').innerHTML = '<p style="color: #e74c3c; padding: 20px;">Error loading users</p>';
+            }
+        }
+
+        async function deleteUserAccount(username) {
+            if (!confirm(`Are you sure you want to delete user "${username}"?\n\nThis will permanently delete:\n• User account\n• All chats and mood logs\n• All assessments and exercises\n• All personal data\n\nThis action CANNOT be undone!`)) {
+                return;
+            }
+
+            try {
+                const response = await fetch('/api/developer/users/delete', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        username: currentUser,
+                        target_username: username
+                    })
+                });
+
+                const data = await response.json();
+
+                if (response.ok) {
+                    alert(`✅ User "${username}" has been deleted successfully.`);
+                    searchUsers(); // Refresh the list
+                } else {
+                    alert(`❌ Error: ${data.error}`);
+                }
+            } catch (error) {
+                console.error('Failed to delete user:', error);
+                alert('❌ Failed to delete user. Please try again.');
+            }
+        }
+
+        // Feedback Functions
+        async function loadFeedback() {
+            try {
+                const container = document.getElementById('feedbackContainer');
+                container.innerHTML = '<p style="color: #999; text-align: center; padding: 40px;">Loading feedback...</p>';
+
+                const response = await fetch('/api/feedback/all', {
+                    method: 'GET',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+
+                if (response.status === 403) {
+                    container.innerHTML = '<p style="color: #e74c3c; padding: 20px;">❌ You do not have permission to view feedback.</p>';
+                    return;
+                }
+
+                if (!response.ok) {
+                    throw new Error('Failed to load feedback');
+                }
+
+                const data = await response.json();
+
+                if (!data.feedback || data.feedback.length === 0) {
+                    container.innerHTML = '<p style="color: #999; text-align: center; padding: 40px;">📭 No feedback submissions yet</p>';
+                    return;
+                }
+
+                // Organize feedback by category and status
+                const organized = {};
+                const categoryOrder = ['bug', 'feature', 'improvement', 'other'];
+                const statusOrder = ['pending', 'in_progress', 'resolved', 'wont_fix', 'duplicate'];
+
+                categoryOrder.forEach(cat => {
+                    organized[cat] = {};
+                    statusOrder.forEach(stat => {
+                        organized[cat][stat] = [];
+                    });
+                });
+
+                // Sort feedback into organized structure
+                data.feedback.forEach(item => {
+                    const cat = item.category.toLowerCase();
+                    const stat = (item.status || 'pending').toLowerCase();
+                    if (organized[cat] && organized[cat][stat] !== undefined) {
+                        organized[cat][stat].push(item);
+                    }
+                });
+
+                // Build HTML with organized feedback
+                let html = '';
+                categoryOrder.forEach(category => {
+                    const items = organized[category];
+                    const totalInCategory = Object.values(items).reduce((sum, arr) => sum + arr.length, 0);
+                    
+                    if (totalInCategory === 0) return;
+
+                    html += `<div style="margin-bottom: 30px;">
+                        <h4 style="color: #333; margin-bottom: 15px; padding-bottom: 10px; border-bottom: 2px solid ${getCategoryColor(category)};">
+                            ${getCategoryEmoji(category)} ${category.toUpperCase()} (${totalInCategory} total)
+                        </h4>`;
+
+                    statusOrder.forEach(status => {
+                        const statusItems = items[status];
+                        if (statusItems.length === 0) return;
+
+                        html += `<div style="margin-left: 20px; margin-bottom: 20px;">
+                            <div style="color: #666; font-size: 12px; font-weight: bold; margin-bottom: 10px;">
+                                ${getStatusEmoji(status)} ${status.replace(/_/g, ' ').toUpperCase()} (${statusItems.length})
+                            </div>`;
+
+                        statusItems.forEach(item => {
+                            html += `
+                                <div style="border-left: 4px solid ${getCategoryColor(item.category)}; padding: 12px; margin-bottom: 8px; background: white; border-radius: 8px; border: 1px solid #e0e0e0; cursor: pointer; transition: all 0.2s;" 
+                                     onmouseover="this.style.boxShadow='0 4px 12px rgba(0,0,0,0.1)'; this.style.transform='translateX(4px)'" 
+                                     onmouseout="this.style.boxShadow=''; this.style.transform='translateX(0)'"
+                                     onclick="viewFeedbackDetail(${item.id}, '${item.category}', '${item.status}', \`${item.message.replace(/`/g, '\\`')}\`, '${item.username}', '${item.user_role}', '${new Date(item.created_at).toLocaleString()}')">
+                                    <div style="display: flex; justify-content: space-between; align-items: start; margin-bottom: 6px;">
+                                        <strong style="color: #333; font-size: 14px;">${item.category}</strong>
+                                        <span style="background: ${getStatusColor(item.status)}; color: white; padding: 3px 10px; border-radius: 12px; font-size: 11px; font-weight: bold;">
+                                            ${item.status}
+                                        </span>
+                                    </div>
+                                    <div style="color: #666; font-size: 11px; margin-bottom: 6px;">
+                                        👤 ${item.username} (${item.user_role}) • ${new Date(item.created_at).toLocaleString()}
+                                    </div>
+                                    <div style="color: #555; font-size: 13px; line-height: 1.5;">
+                                        ${item.message.substring(0, 100)}${item.message.length > 100 ? '...' : ''}
+                                    </div>
+                                    <div style="color: #999; font-size: 11px; margin-top: 6px;">
+                                        Click to update status
+                                    </div>
+                                </div>
+                            `;
+                        });
+
+                        html += `</div>`;
+                    });
+
+                    html += `</div>`;
+                });
+
+                container.innerHTML = html;
+
+            } catch (error) {
+                console.error('Error loading feedback:', error);
+                document.getElementById('feedbackContainer').innerHTML = `<p style="color: #e74c3c; padding: 20px;">❌ Error: ${sanitizeHTML(error.message)}</p>`;
+            }
+        }
+
+        function viewFeedbackDetail(id, category, status, message, username, role, createdAt) {
+            // Create modal
+            const modal = document.createElement('div');
+            modal.id = 'feedbackDetailModal';
+            modal.style.cssText = `
+                position: fixed; top: 0; left: 0; right: 0; bottom: 0; 
+                background: rgba(0,0,0,0.6); display: flex; align-items: center; 
+                justify-content: center; z-index: 10000;
+            `;
+
+            const validStatuses = ['pending', 'in_progress', 'resolved', 'wont_fix', 'duplicate'];
+
+            modal.innerHTML = `
+                <div style="background: white; padding: 30px; border-radius: 12px; max-width: 600px; width: 90%; max-height: 80vh; overflow-y: auto;">
+                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 20px;">
+                        <h3 style="margin: 0; color: #333;">Feedback Details</h3>
+                        <button onclick="document.getElementById('feedbackDetailModal').remove()" style="background: none; border: none; font-size: 24px; cursor: pointer; color: #999;">×</button>
+                    </div>
+
+                    <div style="background: #f9f9f9; padding: 15px; border-radius: 8px; margin-bottom: 20px;">
+                        <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin-bottom: 15px;">
+                            <div>
+                                <div style="color: #999; font-size: 12px; font-weight: bold; margin-bottom: 4px;">CATEGORY</div>
+                                <div style="color: #333; font-size: 14px;">${getCategoryEmoji(category)} ${category.toUpperCase()}</div>
+                            </div>
+                            <div>
+                                <div style="color: #999; font-size: 12px; font-weight: bold; margin-bottom: 4px;">STATUS</div>
+                                <div style="color: #333; font-size: 14px;">${getStatusEmoji(status)} ${status.replace(/_/g, ' ').toUpperCase()}</div>
+                            </div>
+                        </div>
+                        <div>
+                            <div style="color: #999; font-size: 12px; font-weight: bold; margin-bottom: 4px;">SUBMITTED BY</div>
+                            <div style="color: #333; font-size: 14px;">👤 ${username} (${role}) • ${createdAt}</div>
+                        </div>
+                    </div>
+
+                    <div style="background: white; padding: 15px; border: 1px solid #e0e0e0; border-radius: 8px; margin-bottom: 20px;">
+                        <div style="color: #999; font-size: 12px; font-weight: bold; margin-bottom: 8px;">MESSAGE</div>
+                        <div style="color: #555; font-size: 14px; line-height: 1.6;">${message}</div>
+                    </div>
+
+                    <div style="margin-bottom: 20px;">
+                        <label style="display: block; color: #999; font-size: 12px; font-weight: bold; margin-bottom: 8px;">UPDATE STATUS</label>
+                        <select id="feedbackStatusSelect" style="width: 100%; padding: 10px; border: 2px solid #e0e0e0; border-radius: 8px; font-size: 14px;">
+                            ${validStatuses.map(s => `<option value="${s}" ${s === status ? 'selected' : ''}>${getStatusEmoji(s)} ${s.replace(/_/g, ' ').toUpperCase()}</option>`).join('')}
+                        </select>
+                    </div>
+
+                    <div style="margin-bottom: 20px;">
+                        <label style="display: block; color: #999; font-size: 12px; font-weight: bold; margin-bottom: 8px;">ADMIN NOTES (optional)</label>
+                        <textarea id="feedbackNotesTextarea" placeholder="Add notes about this feedback..." style="width: 100%; padding: 10px; border: 2px solid #e0e0e0; border-radius: 8px; font-size: 14px; font-family: inherit; resize: vertical; min-height: 80px;"></textarea>
+                    </div>
+
+                    <div style="display: flex; gap: 10px; justify-content: flex-end;">
+                        <button onclick="document.getElementById('feedbackDetailModal').remove()" style="padding: 10px 20px; background: #e0e0e0; color: #333; border: none; border-radius: 6px; cursor: pointer; font-size: 14px; font-weight: bold;">Cancel</button>
+                        <button onclick="submitFeedbackUpdate(${id})" style="padding: 10px 20px; background: #667eea; color: white; border: none; border-radius: 6px; cursor: pointer; font-size: 14px; font-weight: bold;">✅ Update Feedback</button>
+                    </div>
+                </div>
+            `;
+
+            document.body.appendChild(modal);
+        }
+
+        async function submitFeedbackUpdate(feedbackId) {
+            const newStatus = document.getElementById('feedbackStatusSelect').value;
+            const adminNotes = document.getElementById('feedbackNotesTextarea').value.trim();
+
+            try {
+                const response = await fetch(`/api/feedback/${feedbackId}/status`, {
+                    method: 'PUT',
+                    credentials: 'include',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({
+                        status: newStatus,
+                        admin_notes: adminNotes
+                    })
+                });
+
+                const data = await response.json();
+
+                if (response.ok) {
+                    alert(`✅ Feedback updated to ${newStatus.replace(/_/g, ' ').toUpperCase()}`);
+                    document.getElementById('feedbackDetailModal').remove();
+                    loadFeedback(); // Reload the list
+                } else {
+                    alert(`❌ Error: ${data.error}`);
+                }
+            } catch (error) {
+                alert(`❌ Network error: ${error.message}`);
+            }
+        }
+
+        function filterFeedback() {
+            const categoryFilter = document.getElementById('feedbackCategoryFilter').value;
+            const statusFilter = document.getElementById('feedbackStatusFilter').value;
+
+            const feedbackItems = document.querySelectorAll('#feedbackContainer > div');
+            feedbackItems.forEach(item => {
+                const category = item.innerText.split('\n')[0].toLowerCase();
+                const status = item.innerText.split('\n')[1].toLowerCase();
+
+                const categoryMatch = !categoryFilter || category.includes(categoryFilter);
+                const statusMatch = !statusFilter || status.includes(statusFilter);
+
+                item.style.display = (categoryMatch && statusMatch) ? 'block' : 'none';
+            });
+        }
+
+        function getCategoryColor(category) {
+            const colors = {
+                'bug': '#e74c3c',
+                'feature': '#3498db',
+                'improvement': '#f39c12',
+                'ui': '#9b59b6',
+                'performance': '#e67e22',
+                'other': '#95a5a6'
+            };
+            return colors[category] || '#95a5a6';
+        }
+
+        function getCategoryEmoji(category) {
+            const emojis = {
+                'bug': '🐛',
+                'feature': '✨',
+                'improvement': '📈',
+                'ui': '🎨',
+                'performance': '⚡',
+                'other': '📝'
+            };
+            return emojis[category] || '📝';
+        }
+
+        function getStatusColor(status) {
+            const colors = {
+                'new': '#3498db',
+                'reviewed': '#f39c12',
+                'in_progress': '#e67e22',
+                'resolved': '#27ae60',
+                'wontfix': '#e74c3c'
+            };
+            return colors[status] || '#95a5a6';
+        }
+
+        function getStatusEmoji(status) {
+            const emojis = {
+                'new': '🆕',
+                'reviewed': '👀',
+                'in_progress': '⚙️',
+                'resolved': '✅',
+                'wontfix': '❌'
+            };
+            return emojis[status] || '📝';
+        }
+
+        // ========== END DEVELOPER DASHBOARD FUNCTIONS ==========
+
+        // ========== MESSAGING SYSTEM (Complete Overhaul) ==========
+        const messageTabCache = {
+            inbox: null,
+            sent: null,
+            lastLoadTime: {}
+        };
+
+        // --- Helper: Get avatar class from role ---
+        function getMsgAvatarClass(role) {
+            if (!role) return 'default';
+            const r = role.toLowerCase();
+            if (r === 'patient' || r === 'user') return 'patient';
+            if (r === 'clinician' || r === 'therapist') return 'clinician';
+            if (r === 'developer' || r === 'admin') return 'developer';
+            return 'default';
+        }
+        function getMsgInitial(username) {
+            return username ? username.charAt(0).toUpperCase() : '?';
+        }
+        function formatMsgTime(timestamp) {
+            if (!timestamp) return '';
+            const d = new Date(timestamp);
+            const now = new Date();
+            const diffMs = now - d;
+            if (diffMs < 60000) return 'Just now';
+            if (diffMs < 3600000) return Math.floor(diffMs/60000) + 'm ago';
+            if (diffMs < 86400000) return Math.floor(diffMs/3600000) + 'h ago';
+            if (diffMs < 604800000) return d.toLocaleDateString(undefined, {weekday:'short'});
+            return d.toLocaleDateString(undefined, {month:'short', day:'numeric'});
+        }
+
+        // --- Render Inbox ---
+        function renderInbox(data) {
+            const container = document.getElementById('messagesInboxContainer');
+            if (!container) return;
+            if (!data || !data.conversations || data.conversations.length === 0) {
+                container.innerHTML = '<div class="msg-empty"><div class="msg-empty-icon">📭</div><p>No messages yet</p><p style="font-size:13px;margin-top:8px;">Click <strong>Compose</strong> to start a conversation</p></div>';
+                return;
+            }
+            container.innerHTML = data.conversations.map(function(conv) {
+                const avatarClass = getMsgAvatarClass(conv.with_role);
+                const initial = getMsgInitial(conv.with_user);
+                const escapedUser = sanitizeHTML(conv.with_user || 'Unknown');
+                return '<div class="msg-card' + (conv.unread_count > 0 ? ' unread' : '') + '" onclick="openConversation(\'' + escapedUser + '\')">' +
+                    '<div class="msg-avatar ' + avatarClass + '">' + initial + '</div>' +
+                    '<div class="msg-content">' +
+                        '<div class="msg-header">' +
+                            '<span class="msg-sender">' + escapedUser + '</span>' +
+                            '<span class="msg-time">' + formatMsgTime(conv.last_message_time) + '</span>' +
+                        '</div>' +
+                        '<div class="msg-preview">' +
+                            (conv.last_message ? sanitizeHTML(conv.last_message.substring(0, 100)) : 'No messages') +
+                            (conv.unread_count > 0 ? '<span class="msg-unread-badge">' + conv.unread_count + '</span>' : '') +
+                        '</div>' +
+                    '</div>' +
+                '</div>';
+            }).join('') +
+            (data.has_more && data.next_cursor
+                ? '<div class="msg-load-more"><button class="msg-quick-btn" onclick="loadMoreInbox(this)">Load more conversations</button></div>'
+                : '');
+            updateUnreadBadge(data);
+        }
+
+        // --- Render Sent ---
+        function renderSent(data) {
+            const container = document.getElementById('messagesSentContainer');
+            if (!container) return;
+            if (!data || !data.messages || data.messages.length === 0) {
+                container.innerHTML = '<div class="msg-empty"><div class="msg-empty-icon">📤</div><p>No sent messages</p></div>';
+                return;
+            }
+            container.innerHTML = data.messages.map(function(msg) {
+                const initial = getMsgInitial(msg.recipient);
+                return '<div class="msg-card" onclick="openConversation(\'' + sanitizeHTML(msg.recipient) + '\')">' +
+                    '<div class="msg-avatar default">' + initial + '</div>' +
+                    '<div class="msg-content">' +
+                        '<div class="msg-header">' +
+                            '<span class="msg-sender">To: ' + sanitizeHTML(msg.recipient) + '</span>' +
+                            '<span class="msg-time">' + formatMsgTime(msg.sent_at) + '</span>' +
+                        '</div>' +
+                        (msg.subject ? '<div style="font-size:12px;font-weight:600;color:var(--text-secondary,#555);margin-bottom:2px;">' + sanitizeHTML(msg.subject) + '</div>' : '') +
+                        '<div class="msg-preview">' + sanitizeHTML((msg.content || '').substring(0, 120)) + '</div>' +
+                        '<div class="msg-status ' + (msg.is_read ? 'read' : 'sent') + '">' + (msg.is_read ? '✓✓ Read' : '✓ Sent') + '</div>' +
+                    '</div>' +
+                '</div>';
+            }).join('');
+        }
+
+        // --- Tab Switching ---
+        function switchMessageTab(tabName, buttonEl) {
+            try {
+                document.querySelectorAll('.message-subtab-content').forEach(function(t) { t.style.display = 'none'; });
+                document.querySelectorAll('.msg-tab-btn').forEach(function(b) { b.classList.remove('active'); });
+
+                var capitalizedTab = tabName === 'newmessage' ? 'New' : tabName.charAt(0).toUpperCase() + tabName.slice(1);
+                var tab = document.getElementById('messages' + capitalizedTab + 'TabPatient') || document.getElementById('messages' + capitalizedTab + 'Tab');
+                if (tab) {
+                    tab.style.display = 'block';
+                    if (buttonEl) buttonEl.classList.add('active');
+
+                    var now = Date.now();
+                    var age = messageTabCache.lastLoadTime[tabName] ? now - messageTabCache.lastLoadTime[tabName] : Infinity;
+                    var CACHE_TTL = 30000;
+
+                    if (tabName === 'inbox') {
+                        if (!messageTabCache.inbox || age > CACHE_TTL) { loadMessagesInbox(); } else { renderInbox(messageTabCache.inbox); }
+                    } else if (tabName === 'sent') {
+                        if (!messageTabCache.sent || age > CACHE_TTL) { loadMessagesSent(); } else { renderSent(messageTabCache.sent); }
+                    }
+                }
+            } catch (e) { console.error('[switchMessageTab]', e); }
+        }
+
+        // --- Load Inbox ---
+        async function loadMessagesInbox() {
+            var container = document.getElementById('messagesInboxContainer');
+            if (!container) return;
+            container.innerHTML = '<div class="msg-empty"><div class="msg-empty-icon">⏳</div><p>Loading messages...</p></div>';
+            try {
+                var response = await fetch('/api/messages/inbox', { method: 'GET', credentials: 'include' });
+                if (response.status === 401) { container.innerHTML = '<div class="msg-empty"><p>Session expired. Please log in again.</p></div>'; return; }
+                if (!response.ok) throw new Error('Failed to load inbox');
+                var data = await response.json();
+                messageTabCache.inbox = data;
+                messageTabCache.lastLoadTime.inbox = Date.now();
+                renderInbox(data);
+            } catch (e) {
+                console.error('[loadMessagesInbox]', e);
+                container.innerHTML = '<div class="msg-empty"><div class="msg-empty-icon">⚠️</div><p>Error loading messages: ' + sanitizeHTML(e.message) + '</p></div>';
+            }
+        }
+
+        // --- Load the next inbox page (follows next_cursor) ---
+        async function loadMoreInbox(btn) {
+            var data = messageTabCache.inbox;
+            if (!data || !data.next_cursor) return;
+            if (btn) { btn.disabled = true; btn.textContent = 'Loading...'; }
+            try {
+                var response = await fetch('/api/messages/inbox?cursor=' + encodeURIComponent(data.next_cursor), { credentials: 'include' });
+                if (!response.ok) throw new Error('Failed to load more conversations');
+                var page = await response.json();
+                data.conversations = data.conversations.concat(page.conversations || []);
+                data.has_more = page.has_more;
+                data.next_cursor = page.next_cursor;
+                renderInbox(data);
+            } catch (e) {
+                console.error('[loadMoreInbox]', e);
+                showToast(e.message, 'error');
+                if (btn) { btn.disabled = false; btn.textContent = 'Load more conversations'; }
+            }
+        }
+
+        // --- Load Sent ---
+        async function loadMessagesSent() {
+            var container = document.getElementById('messagesSentContainer');
+            if (!container) return;
+            container.innerHTML = '<div class="msg-empty"><div class="msg-empty-icon">⏳</div><p>Loading sent messages...</p></div>';
+            try {
+                var response = await fetch('/api/messages/sent', { method: 'GET', credentials: 'include' });
+                if (response.status === 401) { container.innerHTML = '<div class="msg-empty"><p>Session expired.</p></div>'; return; }
+                if (!response.ok) throw new Error('Failed to load sent messages');
+                var data = await response.json();
+                messageTabCache.sent = data;
+                messageTabCache.lastLoadTime.sent = Date.now();
+                renderSent(data);
+            } catch (e) {
+                console.error('[loadMessagesSent]', e);
+                container.innerHTML = '<div class="msg-empty"><div class="msg-empty-icon">⚠️</div><p>Error: ' + sanitizeHTML(e.message) + '</p></div>';
+            }
+        }
+
+        // --- Message Search (debounced) ---
+        let _msgSearchTimer = null;
+        function debounceMessageSearch(query) {
+            clearTimeout(_msgSearchTimer);
+            _msgSearchTimer = setTimeout(function() { performMessageSearch(query); }, 400);
+        }
+        async function performMessageSearch(query) {
+            if (!query || query.length < 2) { renderInbox(messageTabCache.inbox); return; }
+            try {
+                var response = await fetch('/api/messages/search?q=' + encodeURIComponent(query), { credentials: 'include' });
+                if (!response.ok) return;
+                var data = await response.json();
+                var container = document.getElementById('messagesInboxContainer');
+                if (!data.results || data.results.length === 0) {
+                    container.innerHTML = '<div class="msg-empty"><p>No results for "' + sanitizeHTML(query) + '"</p></div>';
+                    return;
+                }
+                container.innerHTML = data.results.map(function(msg) {
+                    var isOwn = msg.sender === currentUser;
+                    var otherUser = isOwn ? msg.recipient : msg.sender;
+                    return '<div class="msg-card" onclick="openConversation(\'' + sanitizeHTML(otherUser) + '\')">' +
+                        '<div class="msg-avatar default">' + getMsgInitial(otherUser) + '</div>' +
+                        '<div class="msg-content">' +
+                            '<div class="msg-header"><span class="msg-sender">' + sanitizeHTML(otherUser) + '</span><span class="msg-time">' + formatMsgTime(msg.sent_at) + '</span></div>' +
+                            '<div class="msg-preview">' + sanitizeHTML((msg.content || '').substring(0, 120)) + '</div>' +
+                        '</div></div>';
+                }).join('');
+            } catch (e) { console.error('[search]', e); }
+        }
+
+        // --- Recipient Autocomplete ---
+        let _recipientTimer = null;
+        async function searchRecipients(query) {
+            var dropdown = document.getElementById('recipientDropdown');
+            if (!dropdown) return;
+            if (!query || query.length < 2) { dropdown.style.display = 'none'; return; }
+            clearTimeout(_recipientTimer);
+            _recipientTimer = setTimeout(async function() {
+                try {
+                    var response = await fetch('/api/messages/recipients/search?q=' + encodeURIComponent(query), { credentials: 'include' });
+                    if (!response.ok) { dropdown.style.display = 'none'; return; }
+                    var data = await response.json();
+                    var users = data.users || data.results || [];
+                    if (users.length === 0) { dropdown.style.display = 'none'; return; }
+                    dropdown.innerHTML = users.map(function(u) {
+                        var uname = u.username || u;
+                        var role = u.role || '';
+                        var avatarClass = getMsgAvatarClass(role);
+                        return '<div class="msg-recipient-item" onclick="selectRecipient(\'' + sanitizeHTML(uname) + '\')">' +
+                            '<div class="msg-avatar ' + avatarClass + '" style="width:30px;height:30px;font-size:13px;">' + getMsgInitial(uname) + '</div>' +
+                            '<span>' + sanitizeHTML(uname) + '</span>' +
+                            (role ? '<span class="msg-role-badge ' + avatarClass + '">' + sanitizeHTML(role) + '</span>' : '') +
+                        '</div>';
+                    }).join('');
+                    dropdown.style.display = 'block';
+                } catch (e) { dropdown.style.display = 'none'; }
+            }, 300);
+        }
+        function selectRecipient(username) {
+            document.getElementById('messageRecipientPatient').value = username;
+            var dropdown = document.getElementById('recipientDropdown');
+            if (dropdown) dropdown.style.display = 'none';
+        }
+        // Close dropdown when clicking outside
+        document.addEventListener('click', function(e) {
+            if (!e.target.closest('#messageRecipientPatient') && !e.target.closest('#recipientDropdown')) {
+                var dd = document.getElementById('recipientDropdown');
+                if (dd) dd.style.display = 'none';
+            }
+        });
+
+        // --- Compose Character Counter ---
+        function updateComposeCharCount() {
+            var el = document.getElementById('composeCharCount');
+            var textarea = document.getElementById('messageContentPatient');
+            if (!el || !textarea) return;
+            var len = textarea.value.length;
+            el.textContent = len.toLocaleString() + ' / 10,000';
+            el.className = 'msg-char-count' + (len > 9500 ? ' danger' : len > 8000 ? ' warning' : '');
+        }
+
+        // --- Quick Action Templates ---
+        function prefillMessageTemplate(type) {
+            switchMessageTab('newmessage', document.querySelectorAll('.msg-tab-btn')[2]);
+            var recipientEl = document.getElementById('messageRecipientPatient');
+            var subjectEl = document.getElementById('messageSubjectPatient');
+            var contentEl = document.getElementById('messageContentPatient');
+            var templates = {
+                appointment: { recipient: '', subject: 'Appointment Request', content: 'Hi,\n\nI would like to request an appointment. Please could you let me know your available times?\n\nPreferred days: \nPreferred time: \n\nThank you.' },
+                checkin: { recipient: '', subject: 'Check-in', content: 'Hi,\n\nJust checking in to let you know how I\'ve been doing.\n\n' },
+                enquiry: { recipient: '', subject: 'General Enquiry', content: 'Hi,\n\nI have a question about: \n\n' },
+                dev: { recipient: 'dev', subject: 'Feedback / Issue Report', content: 'Hi Development Team,\n\nI wanted to report the following:\n\nType: [Bug / Feature Request / Feedback]\nDetails: \n\nThank you.' }
+            };
+            var t = templates[type];
+            if (t) {
+                if (t.recipient) recipientEl.value = t.recipient;
+                subjectEl.value = t.subject;
+                contentEl.value = t.content;
+                updateComposeCharCount();
+                recipientEl.focus();
+            }
+        }
+
+        // --- Send New Message ---
+        async function sendNewMessage() {
+            var recipientEl = document.getElementById('messageRecipientPatient') || document.getElementById('messageRecipient');
+            var subjectEl = document.getElementById('messageSubjectPatient') || document.getElementById('messageSubject');
+            var contentEl = document.getElementById('messageContentPatient') || document.getElementById('messageContent');
+            var statusEl = document.getElementById('messageSendStatusPatient') || document.getElementById('messageSendStatus');
+            var sendBtn = document.getElementById('composeSendBtn');
+
+            var recipient = recipientEl.value.trim();
+            var subject = subjectEl.value.trim();
+            var content = contentEl.value.trim();
+
+            if (!recipient) { showMsgStatus(statusEl, 'Please enter a recipient', 'warning'); return; }
+            if (!content) { showMsgStatus(statusEl, 'Please enter a message', 'warning'); return; }
+            if (content.length > 10000) { showMsgStatus(statusEl, 'Message exceeds 10,000 characters', 'warning'); return; }
+
+            try {
+                showMsgStatus(statusEl, 'Sending...', 'info');
+                if (sendBtn) { sendBtn.disabled = true; sendBtn.textContent = 'Sending...'; }
+
+                var response = await fetch('/api/messages/send', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ recipient: recipient, subject: subject, content: content })
+                });
+
+                if (sendBtn) { sendBtn.disabled = false; sendBtn.textContent = 'Send Message'; }
+                if (!response.ok) {
+                    var errorData = await response.json().catch(function() { return {}; });
+                    throw new Error(errorData.error || 'Failed to send message');
+                }
+                showMsgStatus(statusEl, 'Message sent!', 'success');
+                recipientEl.value = '';
+                subjectEl.value = '';
+                contentEl.value = '';
+                updateComposeCharCount();
+                messageTabCache.inbox = null;
+                messageTabCache.sent = null;
+                showToast('Message sent successfully', 'success');
+                setTimeout(function() { statusEl.style.display = 'none'; }, 3000);
+            } catch (e) {
+                if (sendBtn) { sendBtn.disabled = false; sendBtn.textContent = 'Send Message'; }
+                showMsgStatus(statusEl, e.message, 'error');
+                console.error('[sendNewMessage]', e);
+            }
+        }
+        function showMsgStatus(el, msg, type) {
+            if (!el) return;
+            el.textContent = msg;
+            el.style.color = type === 'success' ? '#27ae60' : type === 'warning' ? '#e67e22' : type === 'info' ? '#667eea' : '#e74c3c';
+            el.style.display = 'block';
+        }
+
+        // --- Open Conversation Modal ---
+        async function openConversation(withUser) {
+            try {
+                document.getElementById('conversationWith').textContent = withUser;
+                document.getElementById('convAvatar').textContent = getMsgInitial(withUser);
+                document.getElementById('replyContent').value = '';
+                document.getElementById('conversationModal').style.display = 'block';
+                var messagesEl = document.getElementById('conversationMessages');
+                messagesEl.innerHTML = '<div class="msg-empty"><div class="msg-empty-icon">⏳</div><p>Loading...</p></div>';
+
+                var response = await fetch('/api/messages/conversation/' + encodeURIComponent(withUser), { method: 'GET', credentials: 'include' });
+                if (!response.ok) throw new Error('Failed to load conversation');
+                var data = await response.json();
+                var messages = data.messages || [];
+
+                if (messages.length === 0) {
+                    messagesEl.innerHTML = '<div class="msg-empty"><div class="msg-empty-icon">💬</div><p>No messages yet. Send the first one!</p></div>';
+                    return;
+                }
+
+                // Mark unread messages as read
+                for (var i = 0; i < messages.length; i++) {
+                    var msg = messages[i];
+                    if (!msg.is_read && msg.recipient_username === currentUser) {
+                        fetch('/api/messages/' + msg.id + '/read', { method: 'PATCH', credentials: 'include' }).catch(function(){});
+                    }
+                }
+
+                // Render conversation bubbles (newest page; older pages on demand)
+                conversationCursor = data.has_more ? data.next_cursor : null;
+                messagesEl.innerHTML = conversationEarlierButton() + renderConversationBubbles(messages);
+                messagesEl.scrollTop = messagesEl.scrollHeight;
+
+                // Invalidate inbox cache to refresh unread counts
+                messageTabCache.inbox = null;
+                updateUnreadBadge(null);
+            } catch (e) {
+                console.error('[openConversation]', e);
+                document.getElementById('conversationMessages').innerHTML = '<div class="msg-empty"><p>Error: ' + sanitizeHTML(e.message) + '</p></div>';
+            }
+        }
+
+        var conversationCursor = null;
+
+        function renderConversationBubbles(messages) {
+            var html = '';
+            messages.forEach(function(msg) {
+                var isOwn = msg.sender === currentUser || msg.sender_username === currentUser;
+                var senderName = msg.sender || msg.sender_username || 'Unknown';
+                var timeStr = msg.sent_at ? new Date(msg.sent_at).toLocaleString() : '';
+                html += '<div class="conv-bubble ' + (isOwn ? 'own' : 'other') + '">' +
+                    '<div class="conv-bubble-inner">' + sanitizeWithLineBreaks(msg.content || '') + '</div>' +
+                    '<div class="conv-bubble-meta">' + sanitizeHTML(senderName) + ' &middot; ' + timeStr +
+                        (isOwn && msg.is_read ? ' &middot; <span class="msg-status read">Read</span>' : '') +
+                    '</div>' +
+                '</div>';
+            });
+            return html;
+        }
+
+        function conversationEarlierButton() {
+            return conversationCursor
+                ? '<div class="msg-load-more" id="convLoadEarlier"><button class="msg-quick-btn" onclick="loadEarlierConversation(this)">Load earlier messages</button></div>'
+                : '';
+        }
+
+        // --- Prepend the previous page of the open conversation (follows next_cursor) ---
+        async function loadEarlierConversation(btn) {
+            var withUser = document.getElementById('conversationWith').textContent;
+            var messagesEl = document.getElementById('conversationMessages');
+            if (!conversationCursor) return;
+            if (btn) { btn.disabled = true; btn.textContent = 'Loading...'; }
+            try {
+                var response = await fetch('/api/messages/conversation/' + encodeURIComponent(withUser) +
+                    '?cursor=' + encodeURIComponent(conversationCursor), { credentials: 'include' });
+                if (!response.ok) throw new Error('Failed to load earlier messages');
+                var data = await response.json();
+                conversationCursor = data.has_more ? data.next_cursor : null;
+                var oldButton = document.getElementById('convLoadEarlier');
+                if (oldButton) oldButton.remove();
+                // Keep the viewport on the message the user was reading
+                var fromBottom = messagesEl.scrollHeight - messagesEl.scrollTop;
+                messagesEl.insertAdjacentHTML('afterbegin', conversationEarlierButton() + renderConversationBubbles(data.messages || []));
+                messagesEl.scrollTop = messagesEl.scrollHeight - fromBottom;
+            } catch (e) {
+                console.error('[loadEarlierConversation]', e);
+                showToast(e.message, 'error');
+                if (btn) { btn.disabled = false; btn.textContent = 'Load earlier messages'; }
+            }
+        }
+
+        function closeConversationModal() {
+            document.getElementById('conversationModal').style.display = 'none';
+            // Refresh inbox to update unread counts
+            if (!messageTabCache.inbox) loadMessagesInbox();
+        }
+
+        // --- Send Reply in Conversation ---
+        async function sendReply() {
+            var withUser = document.getElementById('conversationWith').textContent;
+            var contentEl = document.getElementById('replyContent');
+            var content = contentEl.value.trim();
+            var sendBtn = document.getElementById('replySendBtn');
+            if (!content) return;
+
+            try {
+                if (sendBtn) { sendBtn.disabled = true; sendBtn.textContent = 'Sending...'; }
+                var response = await fetch('/api/messages/send', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ recipient: withUser, content: content })
+                });
+                if (!response.ok) {
+                    var errorData = await response.json().catch(function() { return {}; });
+                    throw new Error(errorData.error || 'Failed to send');
+                }
+                contentEl.value = '';
+                contentEl.style.height = 'auto';
+                messageTabCache.inbox = null;
+                messageTabCache.sent = null;
+                await openConversation(withUser);
+            } catch (e) {
+                showToast('Failed to send: ' + e.message, 'error');
+                console.error('[sendReply]', e);
+            } finally {
+                if (sendBtn) { sendBtn.disabled = false; sendBtn.textContent = 'Send'; }
+            }
+        }
+
+        // --- Delete Conversation ---
+        async function deleteConversation() {
+            var withUser = document.getElementById('conversationWith').textContent;
+            if (!confirm('Delete this conversation with ' + withUser + '?')) return;
+            // Get all messages in conversation and delete them
+            try {
+                var cursor = null;
+                do {
+                    var url = '/api/messages/conversation/' + encodeURIComponent(withUser) + '?limit=200' +
+                        (cursor ? '&cursor=' + encodeURIComponent(cursor) : '');
+                    var response = await fetch(url, { credentials: 'include' });
+                    if (!response.ok) throw new Error('Failed to load conversation');
+                    var data = await response.json();
+                    var messages = data.messages || [];
+                    for (var i = 0; i < messages.length; i++) {
+                        await fetch('/api/messages/' + messages[i].id, { method: 'DELETE', credentials: 'include' });
+                    }
+                    cursor = data.has_more ? data.next_cursor : null;
+                } while (cursor);
+                showToast('Conversation deleted', 'success');
+                closeConversationModal();
+                messageTabCache.inbox = null;
+                loadMessagesInbox();
+            } catch (e) {
+                showToast('Error deleting conversation', 'error');
+            }
+        }
+
+        // --- Unread Badge ---
+        function updateUnreadBadge(data) {
+            var badge = document.getElementById('inboxUnreadBadge');
+            var navBadge = document.getElementById('messagesBadge');
+            var total = 0;
+            if (data && data.conversations) {
+                data.conversations.forEach(function(c) { total += (c.unread_count || 0); });
+            }
+            if (badge) {
+                if (total > 0) { badge.textContent = total; badge.style.display = 'inline'; }
+                else { badge.style.display = 'none'; }
+            }
+            if (navBadge) {
+                if (total > 0) { navBadge.textContent = total; navBadge.style.display = 'inline'; }
+                else { navBadge.style.display = 'none'; }
+            }
+        }
+
+        // --- Periodic unread check (every 60s) ---
+        setInterval(function() {
+            if (document.visibilityState === 'visible' && currentUser) {
+                fetch('/api/messages/inbox', { credentials: 'include' })
+                    .then(function(r) { return r.ok ? r.json() : null; })
+                    .then(function(data) { if (data) updateUnreadBadge(data); })
+                    .catch(function(){});
+            }
+        }, 60000);
+
+        // --- Load messages when switching to messages tab ---
+        function checkAndLoadMessages() {
+            loadMessagesInbox();
+        }
+        function loadUserMessages() { loadMessagesInbox(); }
+
+        // Legacy function stubs for compatibility
+        function renderInboxFromCache() { renderInbox(messageTabCache.inbox); }
+        function renderSentFromCache() { renderSent(messageTabCache.sent); }
+        // (legacy autocomplete removed - now using searchRecipients above)
+        
+        async function sendClinicianMessage() {
+            const recipient = document.getElementById('clinMessageRecipient').value.trim();
+            const subject = document.getElementById('clinMessageSubject').value.trim();
+            const content = document.getElementById('clinMessageContent').value.trim();
+            const statusEl = document.getElementById('messageSendStatus');
+
+            if (!recipient) {
+                statusEl.textContent = '⚠️ Please enter a patient username';
+                statusEl.style.color = '#ff9800';
+                statusEl.style.display = 'block';
+                return;
+            }
+
+            if (!content) {
+                statusEl.textContent = '⚠️ Please enter a message';
+                statusEl.style.color = '#ff9800';
+                statusEl.style.display = 'block';
+                return;
+            }
+
+            try {
+                statusEl.textContent = '📤 Sending message...';
+                statusEl.style.color = '#667eea';
+                statusEl.style.display = 'block';
+
+                // Use the correct endpoint with correct field names
+                const response = await fetch('/api/messages/send', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRF-Token': csrfToken
+                    },
+                    body: JSON.stringify({
+                        recipient: recipient,
+                        subject: subject,
+                        content: content
+                    })
+                });
+
+                if (response.status === 403) {
+                    statusEl.textContent = '❌ You cannot send messages to this person';
+                    statusEl.style.color = '#e74c3c';
+                    statusEl.style.display = 'block';
+                    return;
+                }
+
+                if (!response.ok) {
+                    const errorData = await response.json().catch(() => ({}));
+                    throw new Error(errorData.error || 'Failed to send message');
+                }
+
+                statusEl.textContent = '✅ Message sent successfully!';
+                statusEl.style.color = '#4caf50';
+                statusEl.style.display = 'block';
+
+                // Clear form
+                document.getElementById('clinMessageRecipient').value = '';
+                document.getElementById('clinMessageSubject').value = '';
+                document.getElementById('clinMessageContent').value = '';
+                
+                // Hide autocomplete dropdown if visible
+                const dropdown = document.getElementById('recipientAutocompleteDropdown');
+                if (dropdown) {
+                    dropdown.style.display = 'none';
+                }
+
+                // Hide success message after 3 seconds
+                setTimeout(() => {
+                    statusEl.style.display = 'none';
+                }, 3000);
+
+                // Reload messages
+
+                loadUserMessages();
+
+            } catch (error) {
+                console.error('Error sending message:', error);
+                statusEl.textContent = `❌ ${error.message}`;
+                statusEl.style.color = '#e74c3c';
+                statusEl.style.display = 'block';
+            }
+        }
+
+        // ========== DAILY WELLNESS RITUAL FUNCTIONS ==========
+        
+        let wellnessRitualState = {
+            currentStep: 0,
+            data: {},
+            timeOfDay: '',
+            startTime: Date.now(),
+            skipped: [],
+            conversationHistory: [], // Track AI/user messages for context
+            steps: [
+                { id: 'mood', title: 'How are you feeling today?', emoji: '😊', type: 'text' },
+                { id: 'sleep', title: 'How did you sleep last night?', emoji: '😴', type: 'options' },
+                { id: 'hydration', title: 'How\'s your hydration today?', emoji: '💧', type: 'number' },
+                { id: 'exercise', title: 'Any movement or exercise today?', emoji: '🏃', type: 'options' },
+                { id: 'social', title: 'How\'s your social connection today?', emoji: '👥', type: 'options' },
+                { id: 'medication', title: 'Have you taken your medication?', emoji: '💊', type: 'options' },
+                { id: 'energy', title: 'What\'s your energy level right now?', emoji: '⚡', type: 'options' },
+                { id: 'homework', title: 'Any progress on your CBT homework?', emoji: '📝', type: 'options' },
+                { id: 'wrap_up', title: 'Session complete!', emoji: '✨', type: 'summary' }
+            ]
+        };
+
+        function getTimeOfDay() {
+            const hour = new Date().getHours();
+            if (hour < 12) return 'morning';
+            if (hour < 17) return 'afternoon';
+            return 'evening';
+        }
+
+        function updateWellnessTimeOfDay() {
+            const hour = new Date().getHours();
+            if (hour >= 6 && hour < 12) {
+                wellnessRitualState.timeOfDay = 'morning';
+                return 'Good morning! 🌅';
+            } else if (hour >= 12 && hour < 17) {
+                wellnessRitualState.timeOfDay = 'afternoon';
+                return 'Good afternoon! ☀️';
+            } else {
+                wellnessRitualState.timeOfDay = 'evening';
+                return 'Good evening! 🌙';
+            }
+        }
+
+        async function initializeWellnessRitual() {
+            try {
+                // Fetch user's preferred name from profile
+                const preferredNameResponse = await fetch('/api/user/preferred-name', {
+                    method: 'GET',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                
+                if (preferredNameResponse.ok) {
+                    const preferredNameData = await preferredNameResponse.json();
+                    wellnessRitualState.data.preferred_name = preferredNameData.preferred_name;
+                }
+                
+                // Check if already logged today
+                const todayResponse = await fetch('/api/wellness/today', {
+                    method: 'GET',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                
+                if (!todayResponse.ok) throw new Error('Failed to check wellness status');
+                
+                const todayData = await todayResponse.json();
+                
+                if (todayData.exists) {
+                    // Already logged today
+                    document.getElementById('wellnessConversation').style.display = 'none';
+                    document.getElementById('wellnessAlreadyLogged').style.display = 'block';
+                    document.querySelector('.wellness-input-area').style.display = 'none';
+                    document.querySelector('.wellness-chat-header').style.display = 'flex';
+                    return;
+                }
+
+                // Show all wellness components
+                const header = document.querySelector('.wellness-chat-header');
+                if (header) header.style.display = 'flex';
+                
+                document.getElementById('wellnessAlreadyLogged').style.display = 'none';
+                document.getElementById('wellnessConversation').style.display = 'flex';
+                document.querySelector('.wellness-input-area').style.display = 'flex';
+                
+                // Clear conversation and initialize
+                const conversationDiv = document.getElementById('wellnessConversation');
+                conversationDiv.innerHTML = '';
+                
+                wellnessRitualState.currentStep = 0;
+                // data already has preferred_name, keep it
+                wellnessRitualState.skipped = [];
+                wellnessRitualState.startTime = Date.now();
+                wellnessRitualState.conversationHistory = [];
+
+                // Ensure div is in DOM and visible before rendering
+                setTimeout(() => {
+                    showWellnessStep();
+                }, 100);
+                
+            } catch (error) {
+                console.error('Error initializing wellness ritual:', error);
+            }
+        }
+
+        function addWellnessMessage(text, isUser = false) {
+            const messagesDiv = document.getElementById('wellnessConversation');
+            const message = document.createElement('div');
+            message.className = `wellness-message ${isUser ? 'user' : 'ai'}`;
+            
+            const bubble = document.createElement('div');
+            bubble.className = 'wellness-bubble';
+            bubble.textContent = text;
+            
+            message.appendChild(bubble);
+            messagesDiv.appendChild(message);
+            
+            // Track for AI context
+            wellnessRitualState.conversationHistory.push({
+                speaker: isUser ? 'user' : 'ai',
+                text: text,
+                timestamp: new Date().toISOString()
+            });
+            
+            // Auto scroll to bottom
+            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        }
+
+        function addWellnessOptions(optionsArray, callback) {
+            const messagesDiv = document.getElementById('wellnessConversation');
+            const optionsDiv = document.createElement('div');
+            optionsDiv.className = 'wellness-options';
+            
+            optionsArray.forEach(option => {
+                const btn = document.createElement('button');
+                btn.className = 'wellness-option-btn';
+                btn.textContent = option.label;
+                btn.onclick = () => {
+                    addWellnessMessage(option.label, true);
+                    callback(option.value || option.label);
+                };
+                optionsDiv.appendChild(btn);
+            });
+            messagesDiv.appendChild(optionsDiv);
+            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        }
+
+        function addWellnessTextInput(placeholder, callback) {
+            const messagesDiv = document.getElementById('wellnessConversation');
+            const inputDiv = document.createElement('div');
+            inputDiv.style.display = 'flex';
+            inputDiv.style.gap = '8px';
+            
+            const input = document.createElement('input');
+            input.type = 'text';
+            input.placeholder = placeholder;
+            input.className = 'wellness-text-input';
+            
+            const btn = document.createElement('button');
+            btn.className = 'btn btn-primary';
+            btn.textContent = '→';
+            btn.onclick = () => {
+                if (input.value.trim()) {
+                    addWellnessMessage(input.value, true);
+                    callback(input.value);
+                }
+            };
+            
+            input.onkeypress = (e) => {
+                if (e.key === 'Enter') btn.onclick();
+            };
+            
+            inputDiv.appendChild(input);
+            inputDiv.appendChild(btn);
+            messagesDiv.appendChild(inputDiv);
+            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+            
+            input.focus();
+        }
+
+        function addWellnessScaleInput(placeholder, callback) {
+            const messagesDiv = document.getElementById('wellnessConversation');
+            const container = document.createElement('div');
+            container.style.display = 'flex';
+            container.style.flexDirection = 'column';
+            container.style.gap = '12px';
+            
+            // Scale section
+            const scaleDiv = document.createElement('div');
+            scaleDiv.style.display = 'flex';
+            scaleDiv.style.gap = '4px';
+            scaleDiv.style.justifyContent = 'center';
+            for (let i = 1; i <= 10; i++) {
+                const btn = document.createElement('button');
+                btn.className = 'wellness-option-btn';
+                btn.textContent = i;
+                btn.style.flex = '1';
+                btn.style.padding = '6px 2px';
+                btn.style.fontSize = '0.85em';
+                btn.onclick = function() {
+                    selectedScale = i;
+                    // Highlight selected
+                    Array.from(scaleDiv.querySelectorAll('button')).forEach(b => b.style.opacity = '0.5');
+                    btn.style.opacity = '1';
+                };
+                scaleDiv.appendChild(btn);
+            }
+            
+            // Text input
+            const inputDiv = document.createElement('div');
+            inputDiv.style.display = 'flex';
+            inputDiv.style.gap = '8px';
+            
+            const input = document.createElement('input');
+            input.type = 'text';
+            input.placeholder = placeholder;
+            input.className = 'wellness-text-input';
+            
+            let selectedScale = null;
+            
+            const btn = document.createElement('button');
+            btn.className = 'btn btn-primary';
+            btn.textContent = '→';
+            btn.onclick = () => {
+                const text = input.value.trim();
+                if (selectedScale || text) {
+                    const response = `${selectedScale ? 'Mood: ' + selectedScale + '/10' : ''} ${text}`;
+                    addWellnessMessage(response, true);
+                    callback({ scale: selectedScale, narrative: text });
+                }
+            };
+            
+            input.onkeypress = (e) => {
+                if (e.key === 'Enter') btn.onclick();
+            };
+            
+            inputDiv.appendChild(input);
+            inputDiv.appendChild(btn);
+            
+            container.appendChild(scaleDiv);
+            container.appendChild(inputDiv);
+            messagesDiv.appendChild(container);
+            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+            
+            input.focus();
+        }
+
+        function addWellnessNumberInput(placeholder, callback) {
+            const messagesDiv = document.getElementById('wellnessConversation');
+            const inputDiv = document.createElement('div');
+            inputDiv.style.display = 'flex';
+            inputDiv.style.gap = '8px';
+            
+            const input = document.createElement('input');
+            input.type = 'number';
+            input.placeholder = placeholder;
+            input.className = 'wellness-text-input';
+            input.min = '0';
+            input.step = '0.5';
+            
+            const btn = document.createElement('button');
+            btn.className = 'btn btn-primary';
+            btn.textContent = '→';
+            btn.onclick = () => {
+                const value = input.value.trim();
+                if (value) {
+                    addWellnessMessage(value, true);
+                    callback(parseFloat(value));
+                }
+            };
+            
+            input.onkeypress = (e) => {
+                if (e.key === 'Enter') btn.onclick();
+            };
+            
+            inputDiv.appendChild(input);
+            inputDiv.appendChild(btn);
+            messagesDiv.appendChild(inputDiv);
+            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+            
+            input.focus();
+        }
+
+        function addWellnessOptionWithText(optionsArray, textPlaceholder, callback) {
+            const messagesDiv = document.getElementById('wellnessConversation');
+            const container = document.createElement('div');
+            container.style.display = 'flex';
+            container.style.flexDirection = 'column';
+            container.style.gap = '12px';
+            
+            const optionsDiv = document.createElement('div');
+            optionsDiv.className = 'wellness-options';
+            
+            let selectedOption = null;
+            
+            optionsArray.forEach(option => {
+                const btn = document.createElement('button');
+                btn.className = 'wellness-option-btn';
+                btn.textContent = option.label;
+                btn.onclick = () => {
+                    selectedOption = option.value;
+                    // Show text input if option is selected
+                    inputDiv.style.display = 'flex';
+                    input.focus();
+                };
+                optionsDiv.appendChild(btn);
+            });
+            
+            // Text input (hidden initially)
+            const inputDiv = document.createElement('div');
+            inputDiv.style.display = 'none';
+            inputDiv.style.gap = '8px';
+            
+            const input = document.createElement('input');
+            input.type = 'text';
+            input.placeholder = textPlaceholder;
+            input.className = 'wellness-text-input';
+            
+            const btn = document.createElement('button');
+            btn.className = 'btn btn-primary';
+            btn.textContent = '→';
+            btn.onclick = () => {
+                const text = input.value.trim();
+                if (selectedOption !== null && (selectedOption === false || text || selectedOption !== null)) {
+                    const response = text ? `${optionsArray.find(o => o.value === selectedOption)?.label || ''} - ${text}` : optionsArray.find(o => o.value === selectedOption)?.label;
+                    addWellnessMessage(response, true);
+                    callback({ option: selectedOption, text: text });
+                }
+            };
+            
+            input.onkeypress = (e) => {
+                if (e.key === 'Enter') btn.onclick();
+            };
+            
+            inputDiv.appendChild(input);
+            inputDiv.appendChild(btn);
+            
+            container.appendChild(optionsDiv);
+            container.appendChild(inputDiv);
+            messagesDiv.appendChild(container);
+            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        }
+
+        function toggleWellnessChat() {
+            const messagesDiv = document.getElementById('wellnessConversation');
+            const inputArea = document.querySelector('.wellness-input-area');
+            const alreadyLogged = document.getElementById('wellnessAlreadyLogged');
+            const progressHeader = document.querySelector('.wellness-chat-header');
+            
+            // Check if already logged is showing
+            if (alreadyLogged.style.display === 'block') {
+                // Collapse - hide everything except progress header
+                alreadyLogged.style.display = 'none';
+                messagesDiv.style.display = 'none';
+                inputArea.style.display = 'none';
+                progressHeader.style.display = 'none';
+            } else if (alreadyLogged.style.display === 'none' && messagesDiv.style.display === 'none') {
+                // Expand - show already logged message
+                alreadyLogged.style.display = 'block';
+                progressHeader.style.display = 'flex';
+            } else {
+                // Toggle between showing/hiding messages
+                if (messagesDiv.style.display === 'none') {
+                    messagesDiv.style.display = 'flex';
+                    inputArea.style.display = 'flex';
+                } else {
+                    messagesDiv.style.display = 'none';
+                    inputArea.style.display = 'none';
+                }
+            }
+        }
+
+        function showWellnessStep() {
+            const step = wellnessRitualState.steps[wellnessRitualState.currentStep];
+            if (!step) return;
+
+            const messagesDiv = document.getElementById('wellnessConversation');
+            
+            // Fade out current content if not first step
+            if (wellnessRitualState.currentStep > 0) {
+                messagesDiv.style.opacity = '0';
+                messagesDiv.style.transition = 'opacity 0.2s ease-out';
+                
+                setTimeout(() => {
+                    // Clear and reset
+                    messagesDiv.innerHTML = '';
+                    messagesDiv.style.opacity = '1';
+                    messagesDiv.style.transition = 'opacity 0.3s ease-in';
+                    
+                    // Show new content
+                    const question = `${step.emoji} ${step.title}`;
+                    addWellnessMessage(question, false);
+                    updateWellnessProgress();
+                    renderWellnessStepContent(step.id);
+                }, 200);
+            } else {
+                // First step - just render
+                messagesDiv.innerHTML = '';
+                const question = `${step.emoji} ${step.title}`;
+                addWellnessMessage(question, false);
+                updateWellnessProgress();
+                renderWellnessStepContent(step.id);
+            }
+            
+            // Show/hide buttons
+            const prevBtn = document.getElementById('wellnessPrevBtn');
+            const nextBtn = document.getElementById('wellnessNextBtn');
+            const submitBtn = document.getElementById('wellnessSubmitBtn');
+            
+            prevBtn.style.display = wellnessRitualState.currentStep > 0 ? 'inline-block' : 'none';
+            submitBtn.style.display = 'none';
+            nextBtn.style.display = 'none';
+        }
+
+        function renderWellnessStepContent(stepId) {
+            switch(stepId) {
+                case 'mood':
+                    addWellnessScaleInput('Tell me more about how you\'re feeling...', (response) => {
+                        wellnessRitualState.data.mood = response.scale;
+                        wellnessRitualState.data.mood_narrative = response.narrative;
+                        setTimeout(() => nextWellnessStep(), 600);
+                    });
+                    break;
+                case 'sleep':
+                    const sleepContainer = document.getElementById('wellnessConversation');
+                    const sleepDiv = document.createElement('div');
+                    sleepDiv.style.display = 'flex';
+                    sleepDiv.style.flexDirection = 'column';
+                    sleepDiv.style.gap = '12px';
+                    
+                    const sleepQualityDiv = document.createElement('div');
+                    sleepQualityDiv.innerHTML = '<strong>Sleep Quality:</strong>';
+                    const sleepOptionsDiv = document.createElement('div');
+                    sleepOptionsDiv.className = 'wellness-options';
+                    
+                    let selectedSleepQuality = null;
+                    const sleepOptions = [
+                        { label: '😴 Excellent sleep', value: 9 },
+                        { label: '🙂 Good sleep', value: 7 },
+                        { label: '😐 OK sleep', value: 5 },
+                        { label: '😟 Poor sleep', value: 3 },
+                        { label: '😢 Very poor/no sleep', value: 1 }
+                    ];
+                    
+                    sleepOptions.forEach(option => {
+                        const btn = document.createElement('button');
+                        btn.className = 'wellness-option-btn';
+                        btn.textContent = option.label;
+                        btn.onclick = () => {
+                            selectedSleepQuality = option.value;
+                            addWellnessMessage(option.label, true);
+                            // Show hours input
+                            hoursInputDiv.style.display = 'flex';
+                            hoursInput.focus();
+                        };
+                        sleepOptionsDiv.appendChild(btn);
+                    });
+                    
+                    // Hours input
+                    const hoursInputDiv = document.createElement('div');
+                    hoursInputDiv.style.display = 'none';
+                    hoursInputDiv.style.gap = '8px';
+                    hoursInputDiv.style.marginTop = '8px';
+                    
+                    const hoursInput = document.createElement('input');
+                    hoursInput.type = 'number';
+                    hoursInput.placeholder = 'How many hours of sleep? (e.g. 6.5)';
+                    hoursInput.className = 'wellness-text-input';
+                    hoursInput.min = '0';
+                    hoursInput.step = '0.5';
+                    hoursInput.max = '24';
+                    
+                    const submitSleepBtn = document.createElement('button');
+                    submitSleepBtn.className = 'btn btn-primary';
+                    submitSleepBtn.textContent = '→';
+                    submitSleepBtn.onclick = () => {
+                        if (hoursInput.value) {
+                            addWellnessMessage(hoursInput.value + ' hours', true);
+                            wellnessRitualState.data.sleep_quality = selectedSleepQuality;
+                            wellnessRitualState.data.sleep_hours = parseFloat(hoursInput.value);
+                            setTimeout(() => nextWellnessStep(), 600);
+                        }
+                    };
+                    
+                    hoursInput.onkeypress = (e) => {
+                        if (e.key === 'Enter') submitSleepBtn.onclick();
+                    };
+                    
+                    hoursInputDiv.appendChild(hoursInput);
+                    hoursInputDiv.appendChild(submitSleepBtn);
+                    
+                    sleepDiv.appendChild(sleepQualityDiv);
+                    sleepDiv.appendChild(sleepOptionsDiv);
+                    sleepDiv.appendChild(hoursInputDiv);
+                    sleepContainer.appendChild(sleepDiv);
+                    break;
+                case 'hydration':
+                    addWellnessNumberInput('How many pints of water have you drank today?', (value) => {
+                        wellnessRitualState.data.hydration_pints = value;
+                        setTimeout(() => nextWellnessStep(), 600);
+                    });
+                    break;
+                case 'exercise':
+                    addWellnessOptions([
+                        { label: '🏃 Vigorous exercise (45+ min)', value: 'vigorous' },
+                        { label: '🚶 Moderate exercise (20-45 min)', value: 'moderate' },
+                        { label: '🚶‍♂️ Light movement (walk, stretch)', value: 'light' },
+                        { label: '😴 No movement yet', value: 'none' }
+                    ], (value) => {
+                        wellnessRitualState.data.exercise_type = value;
+                        setTimeout(() => nextWellnessStep(), 600);
+                    });
+                    break;
+                case 'social':
+                    addWellnessOptionWithText([
+                        { label: '👥 Strong connection (in-person time)', value: 'strong' },
+                        { label: '💬 Good contact (calls, texts)', value: 'good' },
+                        { label: '📱 Some interaction', value: 'some' },
+                        { label: '😔 Minimal or no contact', value: 'minimal' }
+                    ], 'Tell me more about your connections today...', (response) => {
+                        wellnessRitualState.data.social_contact = response.option;
+                        wellnessRitualState.data.social_notes = response.text;
+                        setTimeout(() => nextWellnessStep(), 600);
+                    });
+                    break;
+                case 'medication':
+                    const medContainer = document.getElementById('wellnessConversation');
+                    const medDiv = document.createElement('div');
+                    medDiv.style.display = 'flex';
+                    medDiv.style.flexDirection = 'column';
+                    medDiv.style.gap = '12px';
+                    
+                    const medOptionsDiv = document.createElement('div');
+                    medOptionsDiv.className = 'wellness-options';
+                    
+                    let medicationTaken = null;
+                    
+                    const yesBtn = document.createElement('button');
+                    yesBtn.className = 'wellness-option-btn';
+                    yesBtn.textContent = '✅ Yes, took my medication';
+                    yesBtn.onclick = () => {
+                        medicationTaken = true;
+                        addWellnessMessage('✅ Yes, took my medication', true);
+                        // Show medication name input
+                        medNameDiv.style.display = 'flex';
+                        medNameInput.focus();
+                    };
+                    
+                    const noBtn = document.createElement('button');
+                    noBtn.className = 'wellness-option-btn';
+                    noBtn.textContent = '⏳ Missed it';
+                    noBtn.onclick = () => {
+                        medicationTaken = false;
+                        addWellnessMessage('⏳ Missed it', true);
+                        wellnessRitualState.data.medication_taken = false;
+                        wellnessRitualState.data.medication_name = '';
+                        setTimeout(() => nextWellnessStep(), 600);
+                    };
+                    
+                    medOptionsDiv.appendChild(yesBtn);
+                    medOptionsDiv.appendChild(noBtn);
+                    
+                    // Medication name input (hidden initially)
+                    const medNameDiv = document.createElement('div');
+                    medNameDiv.style.display = 'none';
+                    medNameDiv.style.gap = '8px';
+                    
+                    const medNameInput = document.createElement('input');
+                    medNameInput.type = 'text';
+                    medNameInput.placeholder = 'What medication? (e.g. Sertraline 50mg)';
+                    medNameInput.className = 'wellness-text-input';
+                    
+                    const submitMedBtn = document.createElement('button');
+                    submitMedBtn.className = 'btn btn-primary';
+                    submitMedBtn.textContent = '→';
+                    submitMedBtn.onclick = () => {
+                        if (medNameInput.value) {
+                            addWellnessMessage(medNameInput.value, true);
+                            wellnessRitualState.data.medication_taken = true;
+                            wellnessRitualState.data.medication_name = medNameInput.value;
+                            setTimeout(() => nextWellnessStep(), 600);
+                        }
+                    };
+                    
+                    medNameInput.onkeypress = (e) => {
+                        if (e.key === 'Enter') submitMedBtn.onclick();
+                    };
+                    
+                    medNameDiv.appendChild(medNameInput);
+                    medNameDiv.appendChild(submitMedBtn);
+                    
+                    medDiv.appendChild(medOptionsDiv);
+                    medDiv.appendChild(medNameDiv);
+                    medContainer.appendChild(medDiv);
+                    break;
+                case 'energy':
+                    const energyContainer = document.getElementById('wellnessConversation');
+                    const energyDiv = document.createElement('div');
+                    energyDiv.style.display = 'flex';
+                    energyDiv.style.flexDirection = 'column';
+                    energyDiv.style.gap = '12px';
+                    
+                    const energyOptionsDiv = document.createElement('div');
+                    energyOptionsDiv.className = 'wellness-options';
+                    
+                    let selectedEnergy = null;
+                    const energyOptions = [
+                        { label: '⚡ Energized & capable', value: 9 },
+                        { label: '🙂 Good energy', value: 7 },
+                        { label: '😐 OK', value: 5 },
+                        { label: '😟 Low energy', value: 3 },
+                        { label: '😴 Exhausted', value: 1 }
+                    ];
+                    
+                    energyOptions.forEach(option => {
+                        const btn = document.createElement('button');
+                        btn.className = 'wellness-option-btn';
+                        btn.textContent = option.label;
+                        btn.onclick = () => {
+                            selectedEnergy = option.value;
+                            addWellnessMessage(option.label, true);
+                            // Show notes input
+                            energyNotesDiv.style.display = 'flex';
+                            energyNotesInput.focus();
+                        };
+                        energyOptionsDiv.appendChild(btn);
+                    });
+                    
+                    // Notes input
+                    const energyNotesDiv = document.createElement('div');
+                    energyNotesDiv.style.display = 'none';
+                    energyNotesDiv.style.gap = '8px';
+                    
+                    const energyNotesInput = document.createElement('input');
+                    energyNotesInput.type = 'text';
+                    energyNotesInput.placeholder = 'Any notes? (what\'s affecting your energy?)';
+                    energyNotesInput.className = 'wellness-text-input';
+                    
+                    const submitEnergyBtn = document.createElement('button');
+                    submitEnergyBtn.className = 'btn btn-primary';
+                    submitEnergyBtn.textContent = '→';
+                    submitEnergyBtn.onclick = () => {
+                        wellnessRitualState.data.energy_level = selectedEnergy;
+                        wellnessRitualState.data.energy_notes = energyNotesInput.value || '';
+                        if (energyNotesInput.value) {
+                            addWellnessMessage(energyNotesInput.value, true);
+                        }
+                        setTimeout(() => nextWellnessStep(), 600);
+                    };
+                    
+                    energyNotesInput.onkeypress = (e) => {
+                        if (e.key === 'Enter') submitEnergyBtn.onclick();
+                    };
+                    
+                    energyNotesDiv.appendChild(energyNotesInput);
+                    energyNotesDiv.appendChild(submitEnergyBtn);
+                    
+                    energyDiv.appendChild(energyOptionsDiv);
+                    energyDiv.appendChild(energyNotesDiv);
+                    energyContainer.appendChild(energyDiv);
+                    break;
+                case 'homework':
+                    addWellnessOptions([
+                        { label: '✅ Completed my homework', value: true },
+                        { label: '⏳ Still working on it', value: false },
+                        { label: '🤔 Don\'t have homework this week', value: null }
+                    ], (value) => {
+                        wellnessRitualState.data.homework_completed = value;
+                        setTimeout(() => nextWellnessStep(), 600);
+                    });
+                    break;
+                case 'wrap_up':
+                    showWellnessWrapUp();
+                    break;
+            }
+        }
+
+        function updateWellnessProgress() {
+            const total = wellnessRitualState.steps.length;
+            const current = wellnessRitualState.currentStep + 1;
+            const progress = Math.min(100, (current / total) * 100);
+            
+            document.getElementById('wellnessProgressBar').style.width = progress + '%';
+            document.getElementById('wellnessProgressText').textContent = `Step ${current} of ${total}`;
+        }
+
+        function nextWellnessStep() {
+            wellnessRitualState.currentStep++;
+            if (wellnessRitualState.currentStep >= wellnessRitualState.steps.length) {
+                showWellnessWrapUp();
+            } else {
+                showWellnessStep();
+            }
+        }
+
+        function previousWellnessStep() {
+            if (wellnessRitualState.currentStep > 0) {
+                wellnessRitualState.currentStep--;
+                // Clear and re-render
+                document.getElementById('wellnessConversation').innerHTML = '';
+                showWellnessStep();
+            }
+        }
+
+        function skipWellnessStep() {
+            nextWellnessStep();
+        }
+
+        function showWellnessWrapUp() {
+            // Session complete
+            wellnessRitualState.data.session_duration_seconds = Math.floor((Date.now() - wellnessRitualState.startTime) / 1000);
+            
+            document.getElementById('wellnessProgressText').textContent = 'Complete! ✨';
+            document.getElementById('wellnessProgressBar').style.width = '100%';
+            
+            const messagesDiv = document.getElementById('wellnessConversation');
+            const preferredName = wellnessRitualState.data.preferred_name || 'friend';
+            
+            // Get personalized thank you message
+            const gratitudeMessages = [
+                `That was wonderful, ${preferredName}. Thank you for being so honest with me today. 💙`,
+                `Thank you for checking in, ${preferredName}. I can see you're really taking care of yourself. 💙`,
+                `I appreciate you taking the time today, ${preferredName}. This helps me understand you better. 💙`,
+                `That's really insightful, ${preferredName}. Thank you for sharing. 💙`
+            ];
+            
+            const message = gratitudeMessages[Math.floor(Math.random() * gratitudeMessages.length)];
+            addWellnessMessage(message, false);
+            
+            // Add action items or encouragement
+            let encouragement = '';
+            if (wellnessRitualState.data.sleep_quality && wellnessRitualState.data.sleep_quality < 5) {
+                encouragement += 'Let\'s focus on sleep tonight—even 10 minutes earlier can help. ';
+            }
+            if (wellnessRitualState.data.total_hydration_cups && wellnessRitualState.data.total_hydration_cups < 3) {
+                encouragement += 'Don\'t forget to drink more water today! ';
+            }
+            if (wellnessRitualState.data.exercise_type === 'none') {
+                encouragement += 'Even a 5-minute walk would help boost your mood. ';
+            }
+            
+            if (encouragement) {
+                setTimeout(() => addWellnessMessage(encouragement, false), 1200);
+            }
+            
+            // Final wrap-up
+            setTimeout(() => {
+                addWellnessMessage('Come back tomorrow to check in again. I\'ll be here. 🌟', false);
+            }, encouragement ? 2400 : 1200);
+            
+            // Show submit button
+            const submitBtn = document.getElementById('wellnessSubmitBtn');
+            submitBtn.style.display = 'inline-block';
+        }
+
+        async function submitWellnessRitual() {
+            try {
+                // Prepare payload - map all captured data
+                const payload = {
+                    mood: wellnessRitualState.data.mood || null,
+                    mood_descriptor: wellnessRitualState.data.mood_narrative || '',
+                    mood_context: wellnessRitualState.data.mood_narrative || '',
+                    sleep_quality: wellnessRitualState.data.sleep_quality || null,
+                    sleep_hours: wellnessRitualState.data.sleep_hours || null,
+                    sleep_notes: '',
+                    hydration_level: 'measured',
+                    hydration_pints: wellnessRitualState.data.hydration_pints || 0,
+                    total_hydration_cups: 0,
+                    exercise_type: wellnessRitualState.data.exercise_type || '',
+                    exercise_duration: 0,
+                    outdoor_time_minutes: 0,
+                    social_contact: wellnessRitualState.data.social_contact || '',
+                    social_notes: wellnessRitualState.data.social_notes || '',
+                    medication_taken: wellnessRitualState.data.medication_taken === true,
+                    medication_name: wellnessRitualState.data.medication_name || '',
+                    medication_reason_if_missed: '',
+                    caffeine_intake_time: '',
+                    energy_level: wellnessRitualState.data.energy_level || null,
+                    energy_notes: wellnessRitualState.data.energy_notes || '',
+                    capacity_index: wellnessRitualState.data.energy_level || null,
+                    weekly_goal_progress: 0,
+                    homework_completed: wellnessRitualState.data.homework_completed === true,
+                    homework_blockers: '',
+                    emotional_narrative: wellnessRitualState.data.mood_narrative || '',
+                    preferred_name: wellnessRitualState.data.preferred_name || '',
+                    time_of_day_category: getTimeOfDay(),
+                    session_duration_seconds: wellnessRitualState.data.session_duration_seconds || 0,
+                    conversation_history: wellnessRitualState.conversationHistory
+                };
+
+                console.log('Submitting wellness data:', payload);
+
+                const response = await fetch('/api/wellness/log', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(payload)
+                });
+
+                if (!response.ok) {
+                    const errorText = await response.text();
+                    console.error('Server error response:', errorText);
+                    try {
+                        const errorData = JSON.parse(errorText);
+                        throw new Error(errorData.error || 'Failed to save wellness ritual');
+                    } catch (e) {
+                        throw new Error(`Server error (${response.status}): ${errorText.substring(0, 100)}`);
+                    }
+                }
+
+                const result = await response.json();
+                console.log('Wellness saved successfully:', result);
+
+                // Log wellness completion to activity logger
+                try {
+                    if (activityLogger) {
+                        activityLogger.logActivity('wellness_saved', 'mood:' + (wellnessRitualState.data.mood || '?'), 'wellness');
+                    }
+                } catch(e) {}
+
+                // Show success message
+                await new Promise(r => setTimeout(r, 1000));
+                addWellnessMessage('✅ All saved! See you tomorrow, ' + (wellnessRitualState.data.preferred_name || 'friend') + '.', false);
+                
+                // Collapse wellness card after a short delay
+                setTimeout(() => {
+                    document.getElementById('wellnessConversation').style.display = 'none';
+                    document.querySelector('.wellness-input-area').style.display = 'none';
+                    document.getElementById('wellnessAlreadyLogged').style.display = 'block';
+                    document.getElementById('wellnessProgressBar').style.width = '100%';
+                    document.getElementById('wellnessProgressText').textContent = 'Completed! ✨';
+                }, 2000);
+                
+            } catch (error) {
+                console.error('Error submitting wellness ritual:', error);
+                addWellnessMessage('❌ Error saving: ' + error.message + '. Please try again.', false);
+            }
+        }
+
+        // ==================== WINS BOARD ====================
+
+        const WIN_PRESETS = [
+            { type: 'had_a_laugh', emoji: '\u{1F604}', label: 'Had a laugh' },
+            { type: 'self_care', emoji: '\u{1F486}', label: 'Kind to myself' },
+            { type: 'kept_promise', emoji: '\u{1F91D}', label: 'Kept a promise' },
+            { type: 'tried_new', emoji: '\u{1F31F}', label: 'Tried something new' },
+            { type: 'stood_up', emoji: '\u{1F4AA}', label: 'Stood up for myself' },
+            { type: 'got_outside', emoji: '\u{1F333}', label: 'Got outside' },
+            { type: 'helped_someone', emoji: '\u{2764}\u{FE0F}', label: 'Helped someone' }
+        ];
+
+        function renderWinPresets() {
+            var presetsDiv = document.getElementById('winsPresets');
+            if (!presetsDiv) return;
+            presetsDiv.innerHTML = WIN_PRESETS.map(function(p) {
+                return '<button class="win-preset-btn" onclick="logPresetWin(\'' + p.type + '\', \'' + p.label + '\')">' + p.emoji + ' ' + p.label + '</button>';
+            }).join('');
+        }
+
+        async function loadWinsBoard() {
+            try {
+                renderWinPresets();
+                var response = await fetch('/api/wins/recent?limit=10', {
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                if (!response.ok) return;
+                var data = await response.json();
+                var countEl = document.getElementById('winsWeekCount');
+                if (countEl) countEl.textContent = data.this_week_count + ' this week';
+                renderRecentWins(data.wins || []);
+            } catch (e) {
+                console.warn('Wins board load error:', e);
+            }
+        }
+
+        async function logPresetWin(winType, defaultText) {
+            var detail = prompt('Add a detail (optional):', '');
+            var winText = detail !== null && detail.trim() !== '' ? detail.trim() : defaultText;
+            await submitWin(winType, winText);
+        }
+
+        async function logCustomWin() {
+            var input = document.getElementById('customWinInput');
+            var text = input.value.trim();
+            if (!text) return;
+            await submitWin('custom', text);
+            input.value = '';
+        }
+
+        async function submitWin(winType, winText) {
+            try {
+                var response = await fetch('/api/wins/log', {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ win_type: winType, win_text: winText })
+                });
+                if (!response.ok) {
+                    var err = await response.json();
+                    alert(err.error || 'Failed to log win');
+                    return;
+                }
+                try {
+                    if (activityLogger) activityLogger.logActivity('win_logged', winType, 'home');
+                } catch(e) {}
+                showWinCelebration(winText);
+                loadWinsBoard();
+            } catch (e) {
+                console.error('Error logging win:', e);
+            }
+        }
+
+        function renderRecentWins(wins) {
+            var listDiv = document.getElementById('recentWinsList');
+            if (!listDiv) return;
+            if (!wins || wins.length === 0) {
+                listDiv.innerHTML = '<p style="color: var(--text-secondary); text-align: center; padding: 15px;">No wins yet. Celebrate something today!</p>';
+                return;
+            }
+            var emojiMap = {};
+            WIN_PRESETS.forEach(function(p) { emojiMap[p.type] = p.emoji; });
+            listDiv.innerHTML = wins.map(function(w) {
+                var emoji = emojiMap[w.win_type] || '\u{1F3C6}';
+                var timeAgo = getTimeAgo(w.created_at);
+                return '<div class="win-entry">' +
+                    '<span>' + emoji + '</span>' +
+                    '<span>' + escapeHtml(w.win_text) + '</span>' +
+                    '<span class="win-time">' + timeAgo + '</span>' +
+                    '</div>';
+            }).join('');
+        }
+
+        function showWinCelebration(winText) {
+            var listDiv = document.getElementById('recentWinsList');
+            if (!listDiv) return;
+            var celebDiv = document.createElement('div');
+            celebDiv.className = 'win-entry win-celebration';
+            celebDiv.style.background = 'rgba(99, 179, 237, 0.1)';
+            celebDiv.style.borderRadius = '8px';
+            celebDiv.style.padding = '12px';
+            celebDiv.innerHTML = '<span>\u{1F389}</span><span><strong>Win logged!</strong> ' + escapeHtml(winText) + '</span>';
+            listDiv.insertBefore(celebDiv, listDiv.firstChild);
+            setTimeout(function() { celebDiv.remove(); }, 3000);
+        }
+
+        function getTimeAgo(dateStr) {
+            if (!dateStr) return '';
+            var date = new Date(dateStr);
+            var now = new Date();
+            var diffMs = now - date;
+            var diffMins = Math.floor(diffMs / 60000);
+            if (diffMins < 1) return 'Just now';
+            if (diffMins < 60) return diffMins + 'm ago';
+            var diffHrs = Math.floor(diffMins / 60);
+            if (diffHrs < 24) return diffHrs + 'h ago';
+            var diffDays = Math.floor(diffHrs / 24);
+            if (diffDays === 1) return 'Yesterday';
+            if (diffDays < 7) return diffDays + 'd ago';
+            return date.toLocaleDateString();
+        }
+
+        function escapeHtml(str) {
+            var div = document.createElement('div');
+            div.textContent = str || '';
+            return div.innerHTML;
+        }
+
+        // === RISK DASHBOARD FUNCTIONS ===
+        let allRiskPatients = [];
+
+        async function loadRiskDashboard() {
+            try {
+                const response = await fetch('/api/risk/dashboard', {
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                if (!response.ok) throw new Error(data.error || 'Failed to load risk dashboard');
+
+                document.getElementById('riskCriticalCount').textContent = data.summary.critical || 0;
+                document.getElementById('riskHighCount').textContent = data.summary.high || 0;
+                document.getElementById('riskModerateCount').textContent = data.summary.moderate || 0;
+                document.getElementById('riskLowCount').textContent = data.summary.low || 0;
+                document.getElementById('riskUnreviewedCount').textContent = data.unreviewed_alerts || 0;
+
+                allRiskPatients = data.patients || [];
+                renderRiskPatients(allRiskPatients);
+                renderRiskAlerts(data.recent_alerts || []);
+            } catch (err) {
+                console.error('Risk dashboard error:', err);
+                document.getElementById('riskPatientsList').innerHTML = '<p style="text-align:center; color:#e74c3c; padding:20px;">Error loading risk data: ' + err.message + '</p>';
+            }
+        }
+
+        function renderRiskAlerts(alerts) {
+            const container = document.getElementById('riskActiveAlertsList');
+            if (!alerts || !alerts.length) {
+                container.innerHTML = '<p style="text-align:center; color:#999; padding:20px;">No active alerts - all patients stable</p>';
+                return;
+            }
+            const severityColors = { critical: '#ff4444', high: '#ff8800', moderate: '#ffcc00', low: '#44ff44' };
+            container.innerHTML = alerts.map(function(a) {
+                return '<div style="border-left: 4px solid ' + (severityColors[a.severity] || '#999') + '; padding: 12px; margin-bottom: 10px; background: ' + (a.acknowledged ? 'var(--bg-card)' : '#fff5f5') + '; border-radius: 0 8px 8px 0;">' +
+                    '<div style="display: flex; justify-content: space-between; align-items: start; flex-wrap: wrap; gap: 8px;">' +
+                        '<div>' +
+                            '<strong>' + (a.severity === 'critical' ? '🔴' : a.severity === 'high' ? '🟠' : a.severity === 'moderate' ? '🟡' : '🟢') + ' ' + escapeHtml(a.title || 'Alert') + '</strong>' +
+                            '<div style="color: var(--text-secondary); font-size: 0.85em;">Patient: ' + escapeHtml(a.patient_name || a.patient_username) + ' | ' + new Date(a.created_at).toLocaleString() + '</div>' +
+                        '</div>' +
+                        '<div style="display: flex; gap: 5px;">' +
+                            (!a.acknowledged ? '<button onclick="acknowledgeRiskAlert(' + a.id + ')" class="btn btn-secondary" style="padding:4px 10px; font-size:0.8em; width:auto;">Acknowledge</button>' : '') +
+                            '<button onclick="resolveRiskAlertPrompt(' + a.id + ')" class="btn" style="padding:4px 10px; font-size:0.8em; background:#2ecc71; width:auto;">Resolve</button>' +
+                        '</div>' +
+                    '</div>' +
+                '</div>';
+            }).join('');
+        }
+
+        function renderRiskPatients(patients) {
+            const container = document.getElementById('riskPatientsList');
+            if (!patients || !patients.length) {
+                container.innerHTML = '<p style="text-align:center; color:#999; padding:20px;">No patients found</p>';
+                return;
+            }
+            const levelColors = { critical: '#ff4444', high: '#ff8800', moderate: '#ccaa00', low: '#2ecc71' };
+            container.innerHTML = patients.map(function(p) {
+                return '<div onclick="openRiskDetail(\'' + escapeHtml(p.username) + '\')" style="display: flex; justify-content: space-between; align-items: center; padding: 12px; border-bottom: 1px solid var(--shadow-color); cursor: pointer; transition: background 0.2s;" onmouseover="this.style.background=\'rgba(102,126,234,0.05)\'" onmouseout="this.style.background=\'transparent\'">' +
+                    '<div>' +
+                        '<strong>' + escapeHtml(p.full_name || p.username) + '</strong>' +
+                        '<div style="font-size: 0.85em; color: var(--text-secondary);">' + (p.last_assessed ? 'Last assessed: ' + new Date(p.last_assessed).toLocaleDateString() : 'Not yet assessed') + '</div>' +
+                    '</div>' +
+                    '<span style="background: ' + (levelColors[p.risk_level] || '#ccc') + '; color: white; padding: 4px 12px; border-radius: 12px; font-weight: bold; font-size: 0.85em;">' + (p.risk_level || 'low').toUpperCase() + '</span>' +
+                '</div>';
+            }).join('');
+        }
+
+        function filterRiskPatients(level) {
+            if (level === 'all') {
+                renderRiskPatients(allRiskPatients);
+            } else {
+                renderRiskPatients(allRiskPatients.filter(function(p) { return p.risk_level === level; }));
+            }
+        }
+
+        async function acknowledgeRiskAlert(alertId) {
+            try {
+                const response = await fetch('/api/risk/alert/' + alertId + '/acknowledge', {
+                    method: 'PATCH',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+                if (data.success) loadRiskDashboard();
+                else alert(data.error || 'Failed to acknowledge alert');
+            } catch (err) { alert('Error: ' + err.message); }
+        }
+
+        function resolveRiskAlertPrompt(alertId) {
+            const action = prompt('What action was taken to resolve this alert?');
+            if (!action) return;
+            resolveRiskAlert(alertId, action);
+        }
+
+        async function resolveRiskAlert(alertId, actionTaken) {
+            try {
+                const response = await fetch('/api/risk/alert/' + alertId + '/resolve', {
+                    method: 'PATCH',
+                    credentials: 'include',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ action_taken: actionTaken })
+                });
+                const data = await response.json();
+                if (data.success) loadRiskDashboard();
+                else alert(data.error || 'Failed to resolve alert');
+            } catch (err) { alert('Error: ' + err.message); }
+        }
+
+        async function openRiskDetail(patientUsername) {
+            const modal = document.getElementById('riskDetailModal');
+            const content = document.getElementById('riskDetailContent');
+            modal.style.display = 'flex';
+            content.innerHTML = '<p style="text-align:center; padding:40px;">Loading risk details...</p>';
+            try {
+                const scoreRes = await fetch('/api/risk/score/' + encodeURIComponent(patientUsername), { credentials: 'include' });
+                const scoreData = await scoreRes.json();
+
+                const histRes = await fetch('/api/risk/history/' + encodeURIComponent(patientUsername) + '?days=30', { credentials: 'include' });
+                const histData = await histRes.json();
+
+                const levelColors = { critical: '#ff4444', high: '#ff8800', moderate: '#ccaa00', low: '#2ecc71' };
+                const level = scoreData.risk_level || 'low';
+                const factors = scoreData.contributing_factors || [];
+
+                content.innerHTML =
+                    '<h3 style="margin-top:0;">' + escapeHtml(patientUsername) + ' - Risk Assessment</h3>' +
+                    '<div style="text-align: center; margin: 20px 0;">' +
+                        '<div style="display: inline-block; background: ' + (levelColors[level] || '#ccc') + '; color: white; padding: 15px 30px; border-radius: 12px; font-size: 1.5em; font-weight: bold;">' +
+                            level.toUpperCase() + ' RISK (Score: ' + (scoreData.risk_score || 0) + '/100)' +
+                        '</div>' +
+                    '</div>' +
+                    '<h4>Score Breakdown</h4>' +
+                    '<div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 10px; margin-bottom: 20px;">' +
+                        '<div style="background: var(--bg-card); padding: 15px; border-radius: 8px; text-align: center; border: 1px solid var(--shadow-color);">' +
+                            '<div style="font-size: 1.5em; font-weight: bold;">' + (scoreData.clinical_score || 0) + '/40</div>' +
+                            '<div style="color: var(--text-secondary); font-size: 0.85em;">Clinical</div>' +
+                        '</div>' +
+                        '<div style="background: var(--bg-card); padding: 15px; border-radius: 8px; text-align: center; border: 1px solid var(--shadow-color);">' +
+                            '<div style="font-size: 1.5em; font-weight: bold;">' + (scoreData.behavioral_score || 0) + '/30</div>' +
+                            '<div style="color: var(--text-secondary); font-size: 0.85em;">Behavioral</div>' +
+                        '</div>' +
+                        '<div style="background: var(--bg-card); padding: 15px; border-radius: 8px; text-align: center; border: 1px solid var(--shadow-color);">' +
+                            '<div style="font-size: 1.5em; font-weight: bold;">' + (scoreData.conversational_score || 0) + '/30</div>' +
+                            '<div style="color: var(--text-secondary); font-size: 0.85em;">Conversational</div>' +
+                        '</div>' +
+                    '</div>' +
+                    '<h4>Contributing Factors</h4>' +
+                    '<ul style="margin-bottom: 20px;">' +
+                        (factors.length > 0 ? factors.map(function(f) { return '<li>' + escapeHtml(f) + '</li>'; }).join('') : '<li style="color: var(--text-secondary);">No contributing factors identified</li>') +
+                    '</ul>' +
+                    '<h4>Risk History (30 days)</h4>' +
+                    '<div style="max-height: 200px; margin-bottom: 20px;"><canvas id="riskHistoryChart"></canvas></div>' +
+                    '<div style="display: flex; gap: 10px; margin-top: 20px; flex-wrap: wrap;">' +
+                        '<button onclick="triggerRiskRecalc(\'' + escapeHtml(patientUsername) + '\')" class="btn" style="background: #667eea; width: auto;">Recalculate Risk</button>' +
+                        '<button onclick="closeRiskDetailModal()" class="btn btn-secondary" style="width: auto;">Close</button>' +
+                    '</div>';
+
+                // Render Chart.js timeline
+                var history = histData.history || [];
+                if (history.length > 0) {
+                    history.reverse();
+                    var ctx = document.getElementById('riskHistoryChart').getContext('2d');
+                    new Chart(ctx, {
+                        type: 'line',
+                        data: {
+                            labels: history.map(function(h) { return new Date(h.assessed_at).toLocaleDateString(); }),
+                            datasets: [{
+                                label: 'Risk Score',
+                                data: history.map(function(h) { return h.risk_score; }),
+                                borderColor: '#ff4444',
+                                backgroundColor: 'rgba(255, 68, 68, 0.1)',
+                                fill: true,
+                                tension: 0.3
+                            }]
+                        },
+                        options: {
+                            responsive: true,
+                            maintainAspectRatio: false,
+                            scales: { y: { min: 0, max: 100, title: { display: true, text: 'Risk Score' } } },
+                            plugins: { legend: { display: false } }
+                        }
+                    });
+                }
+            } catch (err) {
+                content.innerHTML = '<p style="color: #e74c3c; padding: 20px;">Error loading risk details: ' + err.message + '</p>';
+            }
+        }
+
+        function closeRiskDetailModal() {
+            document.getElementById('riskDetailModal').style.display = 'none';
+        }
+
+        async function triggerRiskRecalc(username) {
+            try {
+                const res = await fetch('/api/risk/score/' + encodeURIComponent(username), { credentials: 'include' });
+                if (res.ok) {
+                    openRiskDetail(username);
+                    loadRiskDashboard();
+                }
+            } catch (err) { alert('Error: ' + err.message); }
+        }
+
+        // === CRISIS SUPPORT FUNCTIONS ===
+        function openCrisisSupport() {
+            document.getElementById('crisisSupportModal').style.display = 'flex';
+            try {
+                if (typeof activityLogger !== 'undefined' && activityLogger) {
+                    activityLogger.logActivity('crisis_resources_viewed', '', 'safety');
+                }
+            } catch(e) {}
+        }
+
+        function closeCrisisSupport() {
+            document.getElementById('crisisSupportModal').style.display = 'none';
+        }
+
@@ -0,0 +1,200 @@
+"""
+Static Assets
+=============
+
+Serves the single-page shell (templates/index.html) and the stylesheets and
+scripts it loads without re-rendering, re-reading or re-compressing anything
+per request.
+
+- ``asset_url('js/app.js')`` in a template resolves to a content-hashed URL
+  (``/static/dist/js/app.<hash>.js``). Those URLs never change meaning, so
+  they are served with ``Cache-Control: public, max-age=31536000, immutable``;
+  editing a file changes its hash and therefore every page that links it.
+  A URL whose hash is not the current file's (a shell from the previous
+  build, e.g. during a rolling deploy) still gets the current file, but only
+  with short caching so it is never pinned under the old name.
+- The shell is rendered once per process (warm() at startup) and served with
+  ``Cache-Control: no-cache``: browsers revalidate on every load and normally
+  get a 304 back.
+- Every body is compressed once, when it is loaded: gzip always and brotli
+  when the optional ``brotli`` package is installed. Responses pick an
+  encoding from Accept-Encoding, send ``Vary: Accept-Encoding`` and a strong
+  ETag per encoding, and answer a matching If-None-Match with 304.
+- STATIC_ASSETS_RELOAD=1 (the default under DEBUG) re-renders and re-hashes
+  whenever a template or asset file changes on disk.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, current_app, render_template, request
+from werkzeug.exceptions import NotFound
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_ASSETS_RELOAD = os.getenv('STATIC_ASSETS_RELOAD', '').lower() in ('1', 'true', 'yes')
+STATIC_GZIP_LEVEL = int(os.getenv('STATIC_GZIP_LEVEL', '9'))
+STATIC_BROTLI_QUALITY = int(os.getenv('STATIC_BROTLI_QUALITY', '11'))
+
+DIST_PREFIX = '/static/dist/'
+HASH_LENGTH = 12
+SHELL_CACHE_CONTROL = 'no-cache'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+STALE_HASH_CACHE_CONTROL = 'public, max-age=60'
+# Preferred first when the client accepts both
+ENCODINGS = ['br', 'gzip']
+
+_HASHED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$' % HASH_LENGTH)
+
+
+class Asset:
+    """One response body with its precompressed variants and their ETags."""
+
+    def __init__(self, body, mimetype, sources=()):
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()
+        # (path, mtime) pairs the body was built from; checked in reload mode
+        self.sources = tuple(sources)
+        self.variants = {'identity': body}
+        compressed = {'gzip': gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=STATIC_BROTLI_QUALITY)
+        for encoding, data in compressed.items():
+            # Tiny bodies can grow when compressed; those are only sent as-is
+            if len(data) < len(body):
+                self.variants[encoding] = data
+        self.etags = {encoding: self.digest[:32] if encoding == 'identity' else f"{self.digest[:32]}-{encoding}"
+                      for encoding in self.variants}
+
+    def negotiate(self, accept_encodings):
+        for encoding in ENCODINGS:
+            if encoding in self.variants and accept_encodings.quality(encoding) > 0:
+                return encoding
+        return 'identity'
+
+    def is_stale(self):
+        try:
+            return any(os.path.getmtime(path) != mtime for path, mtime in self.sources)
+        except OSError:
+            return True
+
+
+_assets = {}
+_shells = {}
+_lock = threading.RLock()
+_rendering = threading.local()
+
+
+def configure(reload=None):
+    """Turn on reload mode (api.py passes DEBUG)."""
+    global STATIC_ASSETS_RELOAD
+    if reload:
+        STATIC_ASSETS_RELOAD = True
+
+
+def _source(path):
+    return path, os.path.getmtime(path)
+
+
+def _load_asset(name):
+    """The Asset for static/<name>, loading it on first use. Raises NotFound."""
+    asset = _assets.get(name)
+    if asset is not None and not (STATIC_ASSETS_RELOAD and asset.is_stale()):
+        return asset
+    path = safe_join(current_app.static_folder, name)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    with _lock:
+        asset = _assets.get(name)
+        if asset is None or asset.is_stale():
+            source = _source(path)
+            with open(path, 'rb') as f:
+                body = f.read()
+            asset = Asset(body, mimetypes.guess_type(name)[0] or 'application/octet-stream', [source])
+            _assets[name] = asset
+    return asset
+
+
+def hashed_name(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def asset_url(name):
+    """Template global: the immutable, content-hashed URL of static/<name>."""
+    asset = _load_asset(name)
+    linked = getattr(_rendering, 'linked', None)
+    if linked is not None:
+        linked.append(asset)
+    return DIST_PREFIX + hashed_name(name, asset.digest)
+
+
+def _render_shell(template):
+    # Records the assets the template links so reload mode notices their edits too
+    _rendering.linked = []
+    try:
+        html = render_template(template).encode('utf-8')
+        linked = _rendering.linked
+    finally:
+        _rendering.linked = None
+    template_path = os.path.join(current_app.root_path, current_app.template_folder, template)
+    sources = [_source(template_path)] + [source for asset in linked for source in asset.sources]
+    return Asset(html, 'text/html', sources)
+
+
+def warm(template):
+    """Render and compress ``template`` now (needs an app context)."""
+    with _lock:
+        _shells[template] = _render_shell(template)
+    return _shells[template]
+
+
+def _shell(template):
+    shell = _shells.get(template)
+    if shell is None or (STATIC_ASSETS_RELOAD and shell.is_stale()):
+        # Assets may have changed too; they reload themselves as the template links them
+        shell = warm(template)
+    return shell
+
+
+def _respond(asset, cache_control):
+    encoding = asset.negotiate(request.accept_encodings)
+    etag = asset.etags[encoding]
+    # Every variant is the same content, so any of our tags validates the cached copy
+    matched = next((tag for tag in asset.etags.values() if request.if_none_match.contains_weak(tag)), None)
+    if matched is not None or request.if_none_match.star_tag:
+        response = Response(status=304)
+        response.set_etag(matched or etag)
+    else:
+        response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+        response.set_etag(etag)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def serve_template(template):
+    """Response for a pre-rendered page such as index.html."""
+    return _respond(_shell(template), SHELL_CACHE_CONTROL)
+
+
+def serve_hashed(filename):
+    """Response for /static/dist/<filename>: the current file, cached for good
+    only when the hash matches it."""
+    match = _HASHED_NAME.match(filename)
+    if not match:
+        raise NotFound()
+    asset = _load_asset(match.group('stem') + match.group('ext'))
+    if not asset.digest.startswith(match.group('hash')):
+        return _respond(asset, STALE_HASH_CACHE_CONTROL)
+    return _respond(asset, IMMUTABLE_CACHE_CONTROL)
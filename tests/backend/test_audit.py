@@ -0,0 +1,171 @@
+"""
+Tests for the batched audit log writer (audit.py).
+
+Covers: background batching, synchronous must-persist events,
+bounded-queue back-pressure, shutdown flush and request-path latency.
+"""
+
+import queue
+import threading
+import time
+import pytest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import audit
+
+
+class RecordingFactory:
+    """Connection factory that records each batch passed to execute_values."""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def __call__(self):
+        yield MagicMock()
+
+    def execute_values(self, cur, sql, rows, page_size=None):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.batches.append(list(rows))
+
+    @property
+    def rows(self):
+        return [r for b in self.batches for r in b]
+
+
+@pytest.fixture
+def writer_factory():
+    """Yield a function building isolated writers with execute_values recorded."""
+    created = []
+    factory = RecordingFactory()
+
+    def build(**kwargs):
+        f = kwargs.pop('factory', factory)
+        w = audit.AuditLogWriter(connection_factory=f, **kwargs)
+        created.append(w)
+        return w, f
+
+    with patch.object(audit, 'execute_values', side_effect=lambda *a, **k: factory.execute_values(*a, **k)):
+        yield build, factory
+    for w in created:
+        w.shutdown()
+
+
+class TestAuditLogWriter:
+
+    def test_events_are_batched_in_background(self, writer_factory):
+        build, factory = writer_factory
+        writer, _ = build(flush_interval=0.05, batch_size=100)
+        for i in range(50):
+            writer.enqueue(('user', 'api', f'action_{i}', '', None))
+        writer.shutdown()
+        assert len(factory.rows) == 50
+        # Far fewer INSERT statements than events
+        assert len(factory.batches) < 50
+
+    def test_batch_size_is_respected(self, writer_factory):
+        build, factory = writer_factory
+        writer, _ = build(flush_interval=0.05, batch_size=10)
+        for i in range(35):
+            writer.enqueue(('user', 'api', 'a', '', None))
+        writer.shutdown()
+        assert len(factory.rows) == 35
+        assert max(len(b) for b in factory.batches) <= 10
+
+    def test_full_queue_falls_back_to_sync_write(self, writer_factory):
+        build, factory = writer_factory
+        writer, _ = build(max_queue=1, flush_interval=0.05)
+        # No drain thread: the queue stays full after one event
+        writer._queue = queue.Queue(maxsize=1)
+        writer._queue.put_nowait(('x', 'x', 'x', '', None))
+        with patch.object(writer, '_ensure_worker'):
+            writer.enqueue(('user', 'api', 'overflow', '', None))
+        assert ('user', 'api', 'overflow', '', None) in factory.rows
+        assert writer.stats['sync_writes'] == 1
+
+    def test_shutdown_flushes_pending(self, writer_factory):
+        build, factory = writer_factory
+        writer, _ = build(flush_interval=10)
+        for _ in range(5):
+            writer.enqueue(('user', 'api', 'a', '', None))
+        writer.shutdown()
+        assert len(factory.rows) == 5
+
+    def test_flush_waits_for_the_batch_being_written(self, writer_factory):
+        build, _ = writer_factory
+        slow = RecordingFactory(delay=0.2)
+        with patch.object(audit, 'execute_values', side_effect=slow.execute_values):
+            writer, _ = build(factory=slow, flush_interval=0.01)
+            for _ in range(3):
+                writer.enqueue(('user', 'api', 'a', '', None))
+            # Let the drain thread take the batch off the queue before flushing
+            deadline = time.time() + 1
+            while writer.pending() and time.time() < deadline:
+                time.sleep(0.005)
+            assert writer.flush(timeout=2) is True
+            assert len(slow.rows) == 3
+
+    def test_flush_times_out_on_a_stuck_write(self, writer_factory):
+        build, _ = writer_factory
+        slow = RecordingFactory(delay=0.3)
+        with patch.object(audit, 'execute_values', side_effect=slow.execute_values):
+            writer, _ = build(factory=slow, flush_interval=0.01)
+            writer.enqueue(('user', 'api', 'a', '', None))
+            assert writer.flush(timeout=0.05) is False
+            assert writer.flush(timeout=2) is True
+
+    def test_failed_batch_is_retried_then_counted(self, writer_factory):
+        build, _ = writer_factory
+
+        @contextmanager
+        def broken():
+            raise RuntimeError('db down')
+            yield
+
+        writer, _ = build(factory=broken, flush_interval=0.01)
+        writer._write_batch([('u', 'a', 'b', '', None)], attempts=2)
+        assert writer.stats['failed'] == 1
+
+
+class TestLogEvent:
+
+    def test_routine_event_is_queued(self):
+        with patch.object(audit, '_writer') as w, patch.object(audit, 'AUDIT_ASYNC', True):
+            audit.log_event('alice', 'api', 'user_login', 'ok')
+        w.enqueue.assert_called_once()
+        w.write_sync.assert_not_called()
+
+    def test_security_critical_event_is_synchronous(self):
+        with patch.object(audit, '_writer') as w, patch.object(audit, 'AUDIT_ASYNC', True):
+            audit.log_event('dev', 'api', 'user_deleted', 'Deleted user: bob')
+        w.write_sync.assert_called_once()
+        w.enqueue.assert_not_called()
+
+    def test_must_persist_flag_is_synchronous(self):
+        with patch.object(audit, '_writer') as w, patch.object(audit, 'AUDIT_ASYNC', True):
+            audit.log_event('alice', 'api', 'anything', must_persist=True)
+        w.write_sync.assert_called_once()
+
+    def test_never_raises(self):
+        with patch.object(audit, '_writer') as w:
+            w.enqueue.side_effect = RuntimeError('boom')
+            w.write_sync.side_effect = RuntimeError('boom')
+            audit.log_event('alice', 'api', 'user_login')
+
+    def test_enqueue_latency_independent_of_db_latency(self, writer_factory):
+        build, _ = writer_factory
+        slow = RecordingFactory(delay=0.2)
+        with patch.object(audit, 'execute_values', side_effect=slow.execute_values):
+            writer, _ = build(factory=slow, flush_interval=0.01)
+            start = time.perf_counter()
+            for _ in range(100):
+                writer.enqueue(('user', 'api', 'a', '', None))
+            elapsed = time.perf_counter() - start
+            writer.shutdown()
+        assert elapsed < 0.2
+        assert len(slow.rows) == 100
@@ -650,6 +650,84 @@ class TestSessionManagement:
             assert result is None
 
 
+class TestSessionValidationCache:
+    """The users lookup is memoised per request and cached briefly across requests."""
+
+    def _call(self, client, username='test_patient', role='user', times=1):
+        results = []
+        with client.application.test_request_context():
+            from flask import session as flask_session
+            flask_session["username"] = username
+            flask_session["role"] = role
+            for _ in range(times):
+                results.append(api.get_authenticated_username())
+        return results
+
+    def test_repeated_calls_in_one_request_hit_db_once(self, client):
+        mock_get_db, mock_get_cursor, conn, cursor = make_mock_db([("user",)])
+        with patch.object(api, 'get_db_connection', side_effect=mock_get_db) as get_db, \
+             patch.object(api, 'get_wrapped_cursor', side_effect=mock_get_cursor):
+            assert self._call(client, times=3) == ['test_patient'] * 3
+        assert get_db.call_count == 1
+
+    def test_valid_session_cached_across_requests(self, client):
+        mock_get_db, mock_get_cursor, conn, cursor = make_mock_db([("user",)])
+        with patch.object(api, 'get_db_connection', side_effect=mock_get_db) as get_db, \
+             patch.object(api, 'get_wrapped_cursor', side_effect=mock_get_cursor):
+            self._call(client)
+            self._call(client)
+        assert get_db.call_count == 1
+
+    def test_cache_expires_after_ttl(self, client):
+        mock_get_db, mock_get_cursor, conn, cursor = make_mock_db([("user",), ("user",)])
+        with patch.object(api, 'get_db_connection', side_effect=mock_get_db) as get_db, \
+             patch.object(api, 'get_wrapped_cursor', side_effect=mock_get_cursor), \
+             patch.object(api.session_validation_cache, 'ttl', 0.01):
+            self._call(client)
+            import time
+            time.sleep(0.02)
+            self._call(client)
+        assert get_db.call_count == 2
+
+    def test_role_mismatch_not_served_from_cache(self, client):
+        api.session_validation_cache.remember('test_patient', 'user')
+        mock_get_db, mock_get_cursor, conn, cursor = make_mock_db([])
+        with patch.object(api, 'get_db_connection', side_effect=mock_get_db), \
+             patch.object(api, 'get_wrapped_cursor', side_effect=mock_get_cursor):
+            assert self._call(client, role='clinician') == [None]
+
+    def test_invalidate_user_forces_db_check(self, client):
+        api.session_validation_cache.remember('test_patient', 'user')
+        api.session_validation_cache.remember('other', 'user')
+        api.invalidate_session_validation('test_patient')
+        mock_get_db, mock_get_cursor, conn, cursor = make_mock_db([])
+        with patch.object(api, 'get_db_connection', side_effect=mock_get_db), \
+             patch.object(api, 'get_wrapped_cursor', side_effect=mock_get_cursor):
+            assert self._call(client) == [None]
+        assert api.session_validation_cache.is_valid('other', 'user')
+
+    def test_invalidate_all(self):
+        api.session_validation_cache.remember('a', 'user')
+        api.session_validation_cache.remember('b', 'clinician')
+        api.invalidate_session_validation()
+        assert not api.session_validation_cache.is_valid('a', 'user')
+        assert not api.session_validation_cache.is_valid('b', 'clinician')
+
+    def test_delete_user_invalidates_cache(self, auth_developer):
+        client, _ = auth_developer
+        api.session_validation_cache.remember('victim', 'user')
+        # developer role check, then target role check
+        mock_get_db, mock_get_cursor, conn, cursor = make_mock_db([("developer",), ("user",)])
+        with patch.object(api, 'get_db_connection', side_effect=mock_get_db), \
+             patch.object(api, 'get_wrapped_cursor', side_effect=mock_get_cursor), \
+             patch.object(api.app, '_tier0_initialized', True, create=True), \
+             patch.object(api, 'log_event'):
+            resp = client.post('/api/developer/users/delete',
+                               json={'username': 'test_developer', 'target_username': 'victim'})
+        assert resp.status_code == 200
+        assert not api.session_validation_cache.is_valid('victim', 'user')
+
+
 # ==================== X-USERNAME BYPASS LOGGING ====================
 
 class TestXUsernameBypassLogging:
@@ -0,0 +1,170 @@
+"""
+Tests for the consolidated chat context loader (chat_context.py) and its use
+by /api/therapy/chat.
+
+Covers: the single context query, the per-user cache and its invalidation,
+session creation, queries-per-turn accounting and the event-driven ai_memory
+refresh.
+"""
+
+import json
+import pytest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import api
+import chat_context
+import job_queue
+
+
+class RecordingCursor:
+    """Cursor answering the context query with a fixed row."""
+
+    def __init__(self, row, new_session_id=99):
+        self.row = row
+        self.new_session_id = new_session_id
+        self.queries = []
+        self._result = None
+
+    def execute(self, sql, params=()):
+        self.queries.append(sql)
+        if 'INSERT INTO chat_sessions' in sql:
+            self._result = (self.new_session_id,)
+        else:
+            self._result = self.row
+        return self
+
+    def fetchone(self):
+        return self._result
+
+
+ROW = (7, json.dumps([['ai', 'hello'], ['user', 'hi']]), 'Recent mood average: 6.0/10',
+       {'conversation_count': 3}, ['Be more direct'])
+
+
+@pytest.fixture
+def loader():
+    return chat_context.ChatContextLoader(ttl=60)
+
+
+class TestChatContextLoader:
+
+    def test_single_query_loads_everything(self, loader):
+        cur = RecordingCursor(ROW)
+        ctx = loader.load(cur, 'alice')
+        assert len(cur.queries) == 1
+        assert 'ai_memory_core' in cur.queries[0] and 'patient_suggestions' in cur.queries[0]
+        assert ctx.session_id == 7 and not ctx.created_session
+        assert ctx.history == [('ai', 'hello'), ('user', 'hi')]
+        assert ctx.memory_summary == 'Recent mood average: 6.0/10'
+        assert ctx.memory_core == {'conversation_count': 3}
+        assert ctx.suggestions == ['Be more direct']
+        assert not ctx.from_cache
+
+    def test_cache_hit_reads_only_session_and_history(self, loader):
+        loader.load(RecordingCursor(ROW), 'alice')
+        cur = RecordingCursor((7, [['user', 'again']]))
+        ctx = loader.load(cur, 'alice')
+        assert ctx.from_cache
+        assert 'ai_memory' not in cur.queries[0]
+        assert ctx.history == [('user', 'again')]
+        assert ctx.suggestions == ['Be more direct']
+        assert loader.stats['cache_hits'] == 1 and loader.stats['cache_misses'] == 1
+
+    def test_invalidate_forces_reload(self, loader):
+        loader.load(RecordingCursor(ROW), 'alice')
+        loader.invalidate('alice')
+        cur = RecordingCursor(ROW[:4] + ([],))
+        ctx = loader.load(cur, 'alice')
+        assert not ctx.from_cache and ctx.suggestions == []
+        assert loader.stats['invalidations'] == 1
+
+    def test_update_cached_writes_through(self, loader):
+        loader.load(RecordingCursor(ROW), 'alice')
+        loader.update_cached('alice', memory_core={'conversation_count': 4})
+        ctx = loader.load(RecordingCursor((7, [])), 'alice')
+        assert ctx.from_cache and ctx.memory_core == {'conversation_count': 4}
+        # Nothing cached for bob, so nothing to update
+        loader.update_cached('bob', memory_core={})
+        assert loader._cached('bob') is None
+
+    def test_expired_entry_is_reloaded(self, loader):
+        loader.ttl = 0
+        loader.load(RecordingCursor(ROW), 'alice')
+        assert not loader.load(RecordingCursor(ROW), 'alice').from_cache
+
+    def test_creates_session_when_none_active(self, loader):
+        cur = RecordingCursor((None, None, None, None, None))
+        ctx = loader.load(cur, 'alice')
+        assert ctx.created_session and ctx.session_id == 99
+        assert ctx.history == [] and ctx.memory_core == {} and ctx.suggestions == []
+        assert len(cur.queries) == 2
+
+
+class TestQueriesPerTurn:
+
+    def test_counting_cursor(self):
+        cur = chat_context.CountingCursor(RecordingCursor((1,)))
+        assert cur.execute('SELECT 1').fetchone() == (1,)
+        cur.execute('SELECT 2')
+        assert cur.queries == 2
+
+    def test_chat_turn_records_query_count(self, client, mock_db):
+        mock_db({
+            'WITH active_chat_session': [(1, [], None, {}, [])],
+            'SELECT keyword, category, severity_weight FROM risk_keywords': [],
+        })
+        mock_ai = MagicMock()
+        mock_ai.get_response.return_value = 'I hear you.'
+        before = dict(chat_context.turn_stats)
+        with patch.object(api, 'TherapistAI', return_value=mock_ai), \
+             patch.object(api, 'log_therapy_interaction_to_memory'), \
+             patch.object(api, 'update_ai_memory') as update_memory, \
+             patch.object(api, 'log_event'), \
+             patch.object(job_queue, 'wake'):
+            resp = client.post('/api/therapy/chat', json={'username': 'test_patient', 'message': 'Hello there'})
+        assert resp.status_code == 200
+        update_memory.assert_not_called()  # no per-message summary rebuild
+        assert chat_context.turn_stats['turns'] == before['turns'] + 1
+        # context + keywords before the reply; 2 inserts + queued jobs after it
+        assert chat_context.turn_stats['last_turn_queries'] <= 8
+        assert chat_context.snapshot()['context_cache']['loads'] >= 1
+
+
+class TestAIMemoryRefresh:
+
+    @staticmethod
+    def pooled(cursor):
+        @contextmanager
+        def connection():
+            conn = MagicMock()
+            conn.cursor.return_value = cursor
+            yield conn
+        return connection
+
+    def test_refresh_is_queued_with_per_user_dedupe(self):
+        with patch.object(api, 'get_db_connection_pooled', self.pooled(MagicMock())), \
+             patch.object(job_queue, 'enqueue') as enqueue, \
+             patch.object(job_queue, 'wake') as wake, \
+             patch.object(api, 'update_ai_memory') as update_memory:
+            api.refresh_ai_memory('alice')
+        assert enqueue.call_args[0][1] == [('ai_memory_refresh', {'username': 'alice'}, 'ai_memory:alice'),
+                                           ('llm_cache_invalidate', {'username': 'alice'}, 'llm_cache:alice')]
+        wake.assert_called_once()
+        update_memory.assert_not_called()
+
+    def test_refresh_runs_inline_without_queue(self):
+        def broken():
+            raise RuntimeError('no database')
+        with patch.object(api, 'get_db_connection_pooled', side_effect=broken), \
+             patch.object(api, 'update_ai_memory') as update_memory:
+            api.refresh_ai_memory('alice')
+        update_memory.assert_called_once_with('alice')
+
+    def test_suggestion_write_invalidates_context(self, auth_patient, mock_db):
+        client, _ = auth_patient
+        mock_db({'SELECT COUNT(*) FROM patient_suggestions': [(0,)], 'RETURNING id': [(5,)]})
+        chat_context.loader.load(RecordingCursor(ROW), 'test_patient')
+        resp = client.post('/api/suggestions', json={'suggestion_text': 'Please be more direct with me'})
+        assert resp.status_code == 201
+        assert chat_context.loader._cached('test_patient') is None
@@ -330,6 +330,21 @@ class TestAnalyticsDashboard:
         assert 'total_patients' in data
         assert 'assessment_summary' in data
 
+    def test_dashboard_assessment_summary_single_query(self, auth_clinician, mock_db):
+        client, user = auth_clinician
+        conn, cursor = mock_db({
+            'SELECT u.username FROM users': [('p1',), ('p2',), ('p3',)],
+            'SELECT COUNT(DISTINCT username)': (1,),
+            'SELECT DATE(entrestamp)': [],
+            'DISTINCT ON (username, scale_name)': [('GAD-7', 16), ('PHQ-9', 21), ('PHQ-9', 4)],
+            'SELECT username': [],
+        })
+        resp = client.get('/api/analytics/dashboard?clinician=test_clinician')
+        assert resp.status_code == 200
+        summary = resp.get_json()['assessment_summary']
+        assert summary['phq9'] == {'severe': 1, 'moderate': 0, 'mild': 0, 'minimal': 1}
+        assert summary['gad7'] == {'severe': 1, 'moderate': 0, 'mild': 0, 'minimal': 0}
+
 
 # ==================== ACTIVE PATIENTS ====================
 
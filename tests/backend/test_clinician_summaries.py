@@ -0,0 +1,244 @@
+"""
+Tests for the batch clinician summary generator (clinician_summaries.py) and
+the endpoints that queue it.
+
+Covers: summary contents, set-based aggregate queries per batch,
+execute_values upserts, the process pool, progress reporting, resuming a
+failed run, the single-run lock and the enqueue-only endpoint.
+"""
+
+import json
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch
+
+import api
+import clinician_summaries
+import job_queue
+from tests.conftest import FakeTables
+
+MONTH = date(2026, 2, 1)
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def execute(self, sql, params=()):
+        db = self.db
+        sql = ' '.join(sql.split())
+        db.queries.append(sql)
+        self._rows = []
+        if sql.startswith('SELECT pg_try_advisory_lock'):
+            self._rows = [(not db.locked,)]
+            db.locked = True
+        elif sql.startswith('SELECT pg_advisory_unlock'):
+            db.locked = False
+        elif sql.startswith('SELECT COUNT(*) FROM ( SELECT DISTINCT'):
+            self._rows = [(len(set(db.approvals)),)]
+        elif sql.startswith('SELECT DISTINCT patient_username'):
+            db.pair_queries.append(params)
+            after, limit = (params[0], params[1]), params[2]
+            self._rows = sorted(p for p in set(db.approvals) if p > after)[:limit]
+        elif 'FROM wellness_logs' in sql:
+            self._rows = [(u,) + db.wellness[u] for u in params[0] if u in db.wellness]
+        elif 'FROM chat_history' in sql:
+            self._rows = [(s, db.therapy[s]) for s in params[0] if s in db.therapy]
+        elif 'FROM mood_logs' in sql:
+            self._rows = [(u,) + db.mood[u] for u in params[0] if u in db.mood]
+        elif 'FROM ai_memory_flags' in sql:
+            self._rows = [f for f in db.flags if f[0] in params[0]]
+        elif sql.startswith('SELECT id, month_start_date'):
+            runs = [r for r in db.runs if r['month_start_date'] == params[0]]
+            if runs:
+                self._rows = [tuple(runs[-1][c] for c in clinician_summaries.RUN_COLUMNS)]
+        elif sql.startswith('INSERT INTO clinician_summary_runs'):
+            db.runs.append({'id': len(db.runs) + 1, 'month_start_date': params[0], 'status': 'running',
+                            'total': params[1], 'processed': 0, 'last_patient': None,
+                            'last_clinician': None, 'last_error': None,
+                            'started_at': datetime(2026, 2, 3), 'updated_at': None, 'finished_at': None})
+            self._rows = [(len(db.runs),)]
+        elif sql.startswith('UPDATE clinician_summary_runs SET processed'):
+            self.connection.pending.append(('run', params[3], {'processed_add': params[0],
+                                                               'last_patient': params[1],
+                                                               'last_clinician': params[2]}))
+        elif sql.startswith("UPDATE clinician_summary_runs SET status = 'running'"):
+            self.connection.pending.append(('run', params[1], {'status': 'running', 'total': params[0],
+                                                               'last_error': None}))
+        elif sql.startswith('UPDATE clinician_summary_runs SET status = %s'):
+            self.connection.pending.append(('run', params[2], {'status': params[0], 'last_error': params[1]}))
+        else:
+            raise AssertionError(f'unexpected query: {sql}')
+        return self
+
+
+class FakeSummaryDB(FakeTables):
+    """In-memory tables answering the summary generator's statements."""
+
+    cursor_class = FakeCursor
+
+    def __init__(self, patients=5):
+        self.approvals = [(f'p{i:02d}', 'dr_a') for i in range(patients)] + [('p00', 'dr_b')]
+        self.wellness = {'p00': (6.5, 4, 7.0, 3)}
+        self.therapy = {'p00_session': 20, 'p01_session': 9}
+        self.mood = {'p00': (5.0, 2)}
+        self.flags = [('p01', 'engagement_drop', 2, 3)]
+        self.summaries = {}
+        self.runs = []
+        self.queries = []
+        self.pair_queries = []
+        self.locked = False
+        self.fail_on_write = None
+        self.writes = 0
+
+    def execute_values(self, cur, sql, rows, page_size=None):
+        self.writes += 1
+        if self.writes == self.fail_on_write:
+            raise RuntimeError('connection reset')
+        cur.connection.pending.extend(('summary', row) for row in rows)
+
+    def on_commit(self, conn):
+        for kind, *change in conn.pending:
+            if kind == 'summary':
+                row, = change
+                self.summaries[row[:3]] = json.loads(row[4])
+                continue
+            run_id, fields = change
+            run = self.runs[run_id - 1]
+            run.update(fields)
+            if 'processed_add' in fields:
+                run['processed'] += run.pop('processed_add')
+
+
+@pytest.fixture
+def db():
+    db = FakeSummaryDB()
+    with patch.object(clinician_summaries, 'execute_values', side_effect=db.execute_values):
+        yield db
+
+
+def run(db, **kwargs):
+    kwargs.setdefault('workers', 0)
+    return clinician_summaries.run(db.connection, MONTH, **kwargs)
+
+
+class TestBuildSummary:
+
+    def test_summary_contents(self):
+        summary = clinician_summaries.build_summary((6.5, 4, 7.0, 14), 20, (5.0, 2),
+                                                    [('crisis_pattern', 3, 1)], 28)
+        assert summary['wellness_metrics'] == {'average_mood': 6.5, 'total_entries': 4, 'average_sleep': 7.0,
+                                               'days_logged': 14, 'completion_rate': 50.0}
+        assert summary['mood_logs'] == {'average_mood': 5.0, 'total_entries': 2}
+        assert summary['therapy_activity'] == {'total_messages': 20, 'average_per_week': 5.0,
+                                               'engagement_level': 'high'}
+        assert summary['active_concerns'] == [{'flag': 'crisis_pattern', 'severity': 3, 'occurrences': 1}]
+
+    def test_patient_without_data(self):
+        summary = clinician_summaries.build_summary(None, 0, None, [], 30)
+        assert summary['wellness_metrics']['total_entries'] == 0
+        assert summary['wellness_metrics']['average_mood'] is None
+        assert summary['therapy_activity']['engagement_level'] == 'low'
+
+    def test_month_bounds(self):
+        assert clinician_summaries.month_bounds(date(2026, 12, 15)) == (date(2026, 12, 1), date(2026, 12, 31))
+        assert clinician_summaries.month_bounds(date(2028, 2, 2)) == (date(2028, 2, 1), date(2028, 2, 29))
+
+
+class TestSummaryBatch:
+
+    def test_generates_every_pair_with_set_based_queries(self, db):
+        status = run(db, batch_size=4)
+        assert status['status'] == 'done' and status['processed'] == 6 and status['total'] == 6
+        assert len(db.summaries) == 6
+        assert db.summaries[('p00', 'dr_a', MONTH)]['therapy_activity']['total_messages'] == 20
+        assert db.summaries[('p01', 'dr_a', MONTH)]['active_concerns'][0]['flag'] == 'engagement_drop'
+        assert db.summaries[('p00', 'dr_b', MONTH)] == db.summaries[('p00', 'dr_a', MONTH)]
+        # Two batches: one write each, four aggregate queries each
+        assert db.writes == 2
+        assert sum('FROM wellness_logs' in q for q in db.queries) == 2
+        assert sum('FROM ai_memory_flags' in q for q in db.queries) == 2
+
+    def test_progress_is_reported_per_batch(self, db):
+        seen = []
+        run(db, batch_size=2, progress=lambda s: seen.append(s['processed']))
+        assert seen == [2, 4, 6]
+
+    def test_failed_run_resumes_after_last_committed_batch(self, db):
+        db.fail_on_write = 2
+        with pytest.raises(RuntimeError):
+            run(db, batch_size=2)
+        assert db.runs[0]['status'] == 'failed' and db.runs[0]['processed'] == 2
+        assert not db.locked
+
+        db.pair_queries.clear()
+        status = run(db, batch_size=2)
+        assert status['id'] == 1 and status['status'] == 'done' and status['processed'] == 6
+        assert db.pair_queries[0][:2] == ('p00', 'dr_b')  # continues after the committed batch
+        assert len(db.summaries) == 6
+
+    def test_restart_ignores_unfinished_run(self, db):
+        db.fail_on_write = 1
+        with pytest.raises(RuntimeError):
+            run(db)
+        status = run(db, resume=False)
+        assert status['id'] == 2 and status['processed'] == 6
+
+    def test_second_run_is_refused_while_one_holds_the_lock(self, db):
+        db.locked = True
+        with pytest.raises(clinician_summaries.RunInProgress):
+            run(db)
+        assert db.runs == []
+
+    def test_process_pool_matches_in_process(self, db):
+        run(db, batch_size=2, workers=2)
+        pooled = dict(db.summaries)
+        db.summaries.clear()
+        run(db, batch_size=2, workers=0)
+        assert pooled == db.summaries and len(pooled) == 6
+        assert db.runs[0]['processed'] == 6
+
+
+class TestSummaryEndpoints:
+
+    def test_generate_only_enqueues(self, client, mock_db):
+        mock_db({'FROM clinician_summary_runs': []})
+        with patch.object(job_queue, 'enqueue') as enqueue, \
+             patch.object(job_queue, 'wake') as wake, \
+             patch.object(clinician_summaries, 'run') as generate:
+            resp = client.post('/api/clinician/summaries/generate')
+        assert resp.status_code == 202
+        month_start = date.today().replace(day=1).isoformat()
+        assert enqueue.call_args[0][1] == [('clinician_summaries', {'month_start': month_start},
+                                            f'clinician_summaries:{month_start}')]
+        wake.assert_called_once()
+        generate.assert_not_called()
+        assert resp.get_json()['run'] is None
+
+    def test_generate_reports_503_when_queue_unavailable(self, client, mock_db):
+        mock_db({'FROM clinician_summary_runs': []})
+        with patch.object(job_queue, 'enqueue', side_effect=RuntimeError('no table')), \
+             patch.object(clinician_summaries, 'run') as generate:
+            resp = client.post('/api/clinician/summaries/generate')
+        assert resp.status_code == 503
+        generate.assert_not_called()
+
+    def test_status_reports_latest_run(self, client, mock_db):
+        row = (3, date.today().replace(day=1), 'running', 120, 40, 'p40', 'dr_a', None,
+               datetime(2026, 2, 3, 2, 0), datetime(2026, 2, 3, 2, 1), None)
+        mock_db({'FROM clinician_summary_runs': [row]})
+        resp = client.get('/api/clinician/summaries/generate')
+        run = resp.get_json()['run']
+        assert resp.status_code == 200
+        assert run['status'] == 'running' and run['processed'] == 40 and run['total'] == 120
+
+    def test_job_skips_when_another_run_holds_the_lock(self):
+        with patch.object(clinician_summaries, 'run', side_effect=clinician_summaries.RunInProgress('busy')):
+            api._job_clinician_summaries('2026-02-01')
@@ -45,22 +45,97 @@ class TestGetCommunityPosts:
         p1, p2, mock_conn, mock_cursor = _mock_db()
 
         now = datetime.now().isoformat()
-        # First fetchall returns posts
+        # First fetchall returns posts, then the batched reactions and replies
         mock_cursor.fetchall.side_effect = [
             [(1, 'user1', 'Hello world', 5, now, 'general', 0)],  # posts
-            [('like', 3), ('heart', 2)],  # reactions for post 1
-            [],   # user_reactions
-            [(10, 'user2', 'Nice post!', now)],  # replies for post 1
+            [(1, 'like', 3, True), (1, 'heart', 2, False)],  # reactions for the page
+            [(10, 1, 'user2', 'Nice post!', now, 1)],  # replies for the page
         ]
         mock_cursor.fetchone.return_value = None
 
         with p1, p2:
-            resp = client.get('/api/community/posts')
+            resp = client.get('/api/community/posts?username=user3')
 
         assert resp.status_code == 200
         data = resp.get_json()
         assert 'posts' in data
         assert 'categories' in data
+        post = data['posts'][0]
+        assert post['reactions'] == {'like': 3, 'heart': 2}
+        assert post['user_reactions'] == ['like']
+        assert post['liked_by_user'] is True
+        assert post['reply_count'] == 1
+        assert post['replies'][0]['message'] == 'Nice post!'
+        assert data['has_more'] is False
+        assert data['next_cursor'] is None
+
+    def test_get_posts_caps_inline_replies(self, client):
+        """reply_count reports the full total even when inline replies are capped."""
+        p1, p2, mock_conn, mock_cursor = _mock_db()
+
+        now = datetime.now().isoformat()
+        mock_cursor.fetchall.side_effect = [
+            [(1, 'user1', 'Hello world', 0, now, 'general', 0)],
+            [],
+            [(10, 1, 'user2', 'First', now, 7), (11, 1, 'user3', 'Second', now, 7)],
+        ]
+
+        with p1, p2:
+            resp = client.get('/api/community/posts?reply_limit=2')
+
+        post = resp.get_json()['posts'][0]
+        assert len(post['replies']) == 2
+        assert post['reply_count'] == 7
+        assert post['has_more_replies'] is True
+
+    def test_get_posts_returns_cursor_when_more_pages(self, client):
+        """Should fetch limit+1 rows and hand back an opaque cursor for the next page."""
+        p1, p2, mock_conn, mock_cursor = _mock_db()
+
+        now = datetime(2026, 1, 2, 3, 4, 5)
+        mock_cursor.fetchall.side_effect = [
+            [(3, 'u', 'c', 0, now, 'general', 0),
+             (2, 'u', 'b', 0, now, 'general', 0),
+             (1, 'u', 'a', 0, now, 'general', 0)],
+            [],
+            [],
+        ]
+
+        with p1, p2:
+            resp = client.get('/api/community/posts?limit=2')
+
+        data = resp.get_json()
+        assert [p['id'] for p in data['posts']] == [3, 2]
+        assert data['has_more'] is True
+        assert api.decode_page_cursor(data['next_cursor'], 'int', 'timestamp', 'int') == [0, now.isoformat(), 2]
+
+    def test_get_posts_with_cursor_uses_keyset_condition(self, client):
+        """A cursor should resume strictly after the last row of the previous page."""
+        p1, p2, mock_conn, mock_cursor = _mock_db()
+        mock_cursor.fetchall.return_value = []
+
+        token = api.encode_page_cursor(0, datetime(2026, 1, 2), 42)
+        with p1, p2:
+            resp = client.get(f'/api/community/posts?cursor={token}')
+
+        assert resp.status_code == 200
+        query, params = mock_cursor.execute.call_args_list[0][0]
+        assert '(COALESCE(is_pinned, 0), entry_timestamp, id) <' in query
+        assert params[:3] == (0, '2026-01-02T00:00:00', 42)
+
+    @pytest.mark.parametrize('values', [('x', 'y', 'z'), (0, 'not a date', 42), (0, '2026-01-02', '42'),
+                                        (True, '2026-01-02', 42), (0, '2026-01-02')])
+    def test_malformed_cursor_starts_from_the_first_page(self, client, values):
+        """Cursor values of the wrong type never reach the keyset condition."""
+        p1, p2, mock_conn, mock_cursor = _mock_db()
+        mock_cursor.fetchall.return_value = []
+
+        with p1, p2:
+            resp = client.get(f'/api/community/posts?cursor={api.encode_page_cursor(*values)}')
+
+        assert resp.status_code == 200
+        query = mock_cursor.execute.call_args_list[0][0][0]
+        assert 'entry_timestamp, id) <' not in query
 
     def test_get_posts_with_category_filter(self, client):
         """Should filter posts by category when provided."""
@@ -90,6 +165,29 @@ class TestGetCommunityPosts:
         assert data['posts'] == []
 
 
+@pytest.mark.slow
+class TestCommunityFeedQueryCount:
+    """Benchmark: feed query count must not grow with page size (no N+1)."""
+
+    @pytest.mark.parametrize('page_size', [1, 10, 100])
+    def test_query_count_constant_as_page_grows(self, client, page_size):
+        p1, p2, mock_conn, mock_cursor = _mock_db()
+
+        now = datetime.now().isoformat()
+        posts = [(i, f'user{i}', 'msg', 0, now, 'general', 0) for i in range(page_size, 0, -1)]
+        reactions = [(i, 'like', 1, i % 2 == 0) for i in range(1, page_size + 1)]
+        replies = [(1000 + i, i, 'replier', 'r', now, 1) for i in range(1, page_size + 1)]
+        mock_cursor.fetchall.side_effect = [posts, reactions, replies]
+
+        with p1, p2:
+            resp = client.get(f'/api/community/posts?username=viewer&limit={page_size}')
+
+        assert resp.status_code == 200
+        assert len(resp.get_json()['posts']) == page_size
+        # posts + reactions (incl. viewer's own) + replies
+        assert mock_cursor.execute.call_count == 3
+
+
 # ==================== GET /api/community/channels ====================
 
 class TestGetCommunityChannels:
@@ -7,6 +7,7 @@ Covers:
 
 import json
 import pytest
+from contextlib import contextmanager
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 
@@ -14,6 +15,18 @@ import api
 from tests.conftest import make_mock_db
 
 
+@contextmanager
+def _request_connection():
+    yield api.get_db_connection()
+
+
+@pytest.fixture(autouse=True)
+def _exports_use_mock_db():
+    """Streamed exports read on a pooled connection; hand them the mock_db connection."""
+    with patch.object(api, 'get_db_connection_pooled', _request_connection):
+        yield
+
+
 # ==================== CHAT EXPORT (POST /api/therapy/export) ====================
 
 class TestChatExport:
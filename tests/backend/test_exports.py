@@ -0,0 +1,256 @@
+"""
+Tests for the streaming data exports (exports.py) and their endpoints.
+
+Covers: server-side cursor fetching, chunked CSV/JSON/txt output matching the
+old in-memory formats, PDF rendering to a spooled file, background exports
+(queue, render into chunks, status, download) and a memory benchmark.
+"""
+
+import csv
+import io
+import itertools
+import json
+import tracemalloc
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import api
+import exports
+import job_queue
+from tests.conftest import FakeTables
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = iter(())
+
+    def execute(self, sql, params=()):
+        db = self.db
+        sql = ' '.join(sql.split())
+        self._rows = iter(())
+        if sql.startswith('INSERT INTO data_exports'):
+            export_id, username, kind, params_json, filename, content_type, _ = params
+            db.exports[export_id] = [export_id, username, kind, params_json, filename, content_type,
+                                     'queued', 0, None, datetime(2026, 3, 1), None,
+                                     datetime(2026, 3, 2)]
+        elif sql.startswith('SELECT id, username, kind'):
+            row = db.exports.get(params[0])
+            self._rows = iter([tuple(row)] if row else [])
+        elif sql.startswith("UPDATE data_exports SET status = 'running'"):
+            db.exports[params[0]][6] = 'running'
+        elif sql.startswith('DELETE FROM data_export_chunks'):
+            db.chunks[params[0]] = []
+        elif sql.startswith('INSERT INTO data_export_chunks'):
+            db.chunks[params[0]].append(bytes(params[2].adapted))
+        elif sql.startswith('UPDATE data_exports SET status = %s'):
+            db.exports[params[3]][6:9] = [params[0], params[1], params[2]]
+        elif sql.startswith('DELETE FROM data_exports'):
+            pass
+        elif sql.startswith('SELECT data FROM data_export_chunks'):
+            self._rows = iter([(memoryview(c),) for c in db.chunks.get(params[0], [])])
+        else:
+            for key, rows in db.rows.items():
+                if key in sql:
+                    self._rows = iter(rows() if callable(rows) else rows)
+                    break
+        return self
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size):
+        self.db.fetches.append(size)
+        return list(itertools.islice(self._rows, size))
+
+    def close(self):
+        pass
+
+
+class FakeExportDB(FakeTables):
+    """Tables for the export queries; rows are produced lazily per query."""
+
+    cursor_class = FakeCursor
+
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.exports = {}
+        self.chunks = {}
+        self.named_cursors = []
+        self.fetches = []
+
+    def cursor(self, conn, name=None):
+        if name:
+            self.named_cursors.append(name)
+        return super().cursor(conn, name)
+
+
+def mood_rows(n):
+    start = datetime(2026, 1, 1)
+    return lambda: ((start + timedelta(minutes=i), 5, 7, 'none', f'note {i}', 0.1, 20, 30, 3) for i in range(n))
+
+
+def read(pieces):
+    return b''.join(exports.buffered(pieces)).decode()
+
+
+class TestStreamingRenderers:
+
+    def test_server_side_rows_fetch_in_batches(self):
+        db = FakeExportDB({'FROM mood_logs': mood_rows(25)})
+        with db.connection() as conn:
+            rows = list(exports.server_side_rows(conn, 'SELECT * FROM mood_logs', (), fetch_size=10))
+        assert len(rows) == 25
+        assert db.named_cursors and db.fetches == [10, 10, 10, 10]
+
+    def test_patient_csv_sections(self):
+        db = FakeExportDB({
+            'FROM users': [('Alice A', '1990-01-01', 'anxiety')],
+            'FROM mood_logs': mood_rows(3),
+            'FROM gratitude_logs': [(datetime(2026, 1, 2), 'sunshine')],
+        })
+        with db.connection() as conn:
+            rows = list(csv.reader(io.StringIO(read(exports.patient_csv(conn, 'alice')))))
+        assert rows[:5] == [['USER PROFILE'], ['username', 'alice'], ['full_name', 'Alice A'],
+                            ['dob', '1990-01-01'], ['conditions', 'anxiety']]
+        titles = [r[0] for r in rows if len(r) == 1]
+        assert titles == ['USER PROFILE', 'MOOD_LOGS', 'GRATITUDE_LOGS', 'CBT_RECORDS', 'CLINICAL_SCALES']
+        assert rows[rows.index(['MOOD_LOGS']) + 2][4] == 'note 0'
+        assert ['2026-01-02 00:00:00', 'sunshine'] in rows
+
+    def test_chunks_are_bounded(self):
+        db = FakeExportDB({'FROM mood_logs': mood_rows(2000)})
+        with db.connection() as conn:
+            chunks = list(exports.buffered(exports.patient_csv(conn, 'alice'), size=4096))
+        assert len(chunks) > 10
+        assert max(len(c) for c in chunks[:-1]) < 4096 + 512
+
+    def test_chat_json_matches_in_memory_format(self):
+        history = [('user', 'Hello', '2026-01-05T10:00:00'), ('ai', 'Hi "there"', '2026-01-05T10:01:00')]
+        db = FakeExportDB({'FROM chat_history': history})
+        with db.connection() as conn:
+            out = read(exports.chat_history(conn, 'alice', '2026-01-01', '2026-01-31', 'json'))
+        expected = json.dumps([{'sender': s, 'message': m, 'timestamp': t} for s, m, t in history], indent=2)
+        assert out == expected
+
+    def test_chat_json_empty(self):
+        with FakeExportDB().connection() as conn:
+            assert read(exports.chat_history(conn, 'alice', '2026-01-01', '2026-01-31', 'json')) == '[]'
+
+    def test_chat_txt_counts_messages(self):
+        db = FakeExportDB({'FROM chat_history': [('user', 'Hello', datetime(2026, 1, 5, 14, 30))]})
+        with db.connection() as conn:
+            out = read(exports.chat_history(conn, 'alice', '2026-01-01', '2026-01-31'))
+        assert '[2026-01-05 02:30 PM] USER:\nHello' in out
+        assert out.endswith('Total messages: 1\n')
+
+    def test_pdf_renders_to_spooled_file(self):
+        pytest.importorskip('reportlab')
+        db = FakeExportDB({
+            'FROM mood_logs': lambda: ((datetime(2026, 1, 1), 6, 7, 'none', 20) for _ in range(15)),
+            'FROM gratitude_logs': [(datetime(2026, 1, 2), 'sunshine')],
+        })
+        with db.connection() as conn:
+            pdf = b''.join(exports.iter_file(exports.patient_pdf(conn, 'alice')))
+        assert pdf.startswith(b'%PDF') and len(pdf) > 1000
+
+
+class TestExportEndpoints:
+
+    @pytest.fixture
+    def db(self):
+        db = FakeExportDB({'FROM users': [('Alice A', None, None)], 'FROM mood_logs': mood_rows(500)})
+        with patch.object(api, 'get_db_connection_pooled', db.connection):
+            yield db
+
+    def test_csv_is_streamed_from_a_named_cursor(self, client, db):
+        resp = client.get('/api/export/csv?username=alice')
+        assert resp.status_code == 200 and resp.is_streamed
+        assert resp.headers['Content-Disposition'] == 'attachment; filename=alice_data.csv'
+        assert resp.get_data(as_text=True).count('note ') == 500
+        assert db.named_cursors
+
+    def test_background_export_round_trip(self, client, mock_db, db):
+        mock_db({})
+        with patch.object(api, 'get_wrapped_cursor', side_effect=lambda conn: FakeCursor(db)), \
+             patch.object(api, 'get_authenticated_username', return_value='alice'), \
+             patch.object(job_queue, 'enqueue') as enqueue, \
+             patch.object(job_queue, 'wake') as wake:
+            resp = client.get('/api/export/csv?username=alice&background=1')
+            assert resp.status_code == 202
+            export_id = resp.get_json()['export_id']
+            assert enqueue.call_args[0][1] == [('data_export', {'export_id': export_id})]
+            wake.assert_called_once()
+
+            assert client.get(f'/api/export/jobs/{export_id}/download').status_code == 409
+            api._job_data_export(export_id)
+
+            status = client.get(f'/api/export/jobs/{export_id}').get_json()
+            assert status['status'] == 'done' and status['download_url'].endswith('/download')
+            resp = client.get(f'/api/export/jobs/{export_id}/download')
+        assert resp.status_code == 200
+        assert resp.headers['Content-Disposition'] == 'attachment; filename=alice_data.csv'
+        body = resp.get_data(as_text=True)
+        assert body.startswith('USER PROFILE') and body.count('note ') == 500
+        assert int(resp.headers['Content-Length']) == len(resp.get_data()) == status['size_bytes']
+
+    def test_background_export_requires_its_owner(self, client, mock_db, db):
+        mock_db({})
+        with patch.object(api, 'get_wrapped_cursor', side_effect=lambda conn: FakeCursor(db)), \
+             patch.object(job_queue, 'enqueue'), patch.object(job_queue, 'wake'):
+            assert client.get('/api/export/csv?username=alice&background=1').status_code == 401
+            with patch.object(api, 'get_authenticated_username', return_value='mallory'):
+                assert client.get('/api/export/pdf?username=alice&background=1').status_code == 403
+            assert not db.exports
+            with patch.object(api, 'get_authenticated_username', return_value='alice'):
+                export_id = client.get('/api/export/csv?username=alice&background=1').get_json()['export_id']
+            api._job_data_export(export_id)
+            assert client.get(f'/api/export/jobs/{export_id}').status_code == 401
+            with patch.object(api, 'get_authenticated_username', return_value='mallory'):
+                assert client.get(f'/api/export/jobs/{export_id}').status_code == 403
+                assert client.get(f'/api/export/jobs/{export_id}/download').status_code == 403
+
+    def test_unknown_export_is_404(self, client, mock_db, db):
+        mock_db({})
+        with patch.object(api, 'get_wrapped_cursor', side_effect=lambda conn: FakeCursor(db)):
+            assert client.get('/api/export/jobs/nope').status_code == 404
+
+    def test_failed_render_marks_export_failed(self, db):
+        with db.connection() as conn:
+            export_id = exports.create_export(conn.cursor(), 'alice', 'chat',
+                                              {'from_date': 'bad', 'to_date': '2026-01-31'})
+        with pytest.raises(ValueError):
+            exports.run_export(db.connection, export_id)
+        assert db.exports[export_id][6] == 'failed' and 'bad' in db.exports[export_id][8]
+
+
+@pytest.mark.slow
+class TestExportMemoryBenchmark:
+
+    @staticmethod
+    def peak(fn):
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    def test_streaming_memory_is_flat_in_row_count(self):
+        def streamed(n):
+            db = FakeExportDB({'FROM mood_logs': mood_rows(n)})
+            with db.connection() as conn:
+                for _ in exports.buffered(exports.patient_csv(conn, 'alice')):
+                    pass
+
+        def in_memory(n):
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerows(list(mood_rows(n)()))
+            out.getvalue()
+
+        results = {n: (self.peak(lambda: streamed(n)), self.peak(lambda: in_memory(n))) for n in (10_000, 100_000)}
+        for n, (s, m) in results.items():
+            print(f"\n[benchmark] {n} mood rows: streamed peak {s / 1024:.0f} KiB, in-memory peak {m / 1024:.0f} KiB")
+        assert results[100_000][0] < 2 * results[10_000][0]
+        assert results[100_000][0] < results[100_000][1] / 10
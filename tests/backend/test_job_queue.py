@@ -0,0 +1,354 @@
+"""
+Tests for the Postgres-backed background job queue (job_queue.py) and the
+therapy chat jobs queued from api.py.
+
+Covers: enqueue/claim/complete, retries with backoff, exhausted jobs,
+per-type concurrency limits, dedupe keys, requeueing abandoned jobs, periodic
+jobs and the inline fallback when the queue is unavailable.
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import api
+import job_queue
+from tests.conftest import FakeTables
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+        self.rowcount = 0
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def execute(self, sql, params=()):
+        db = self.db
+        sql = ' '.join(sql.split())
+        self._rows = []
+        if 'pg_try_advisory_xact_lock' in sql:
+            self._rows = [(params[0].split(':', 1)[1] not in db.locked_types,)]
+        elif 'SELECT %s, \'{}\', %s, %s, NOW()' in sql:  # SCHEDULE_PERIODIC_SQL
+            job_type, max_attempts, dedupe_key, _ = params
+            if not any(j['job_type'] == job_type and j['status'] in ('queued', 'running') for j in db.jobs.values()):
+                db.jobs[db.next_id] = {
+                    'id': db.next_id, 'job_type': job_type, 'payload': {}, 'status': 'queued', 'attempts': 0,
+                    'max_attempts': max_attempts, 'dedupe_key': dedupe_key, 'run_at': db.now,
+                    'locked_at': None, 'last_error': None,
+                }
+                db.next_id += 1
+        elif 'INSERT INTO background_jobs' in sql:
+            for i in range(0, len(params), 4):
+                job_type, payload, max_attempts, dedupe_key = params[i:i + 4]
+                if dedupe_key and any(j['dedupe_key'] == dedupe_key for j in db.by_status('queued')):
+                    continue
+                db.jobs[db.next_id] = {
+                    'id': db.next_id, 'job_type': job_type, 'payload': json.loads(payload),
+                    'status': 'queued', 'attempts': 0, 'max_attempts': max_attempts,
+                    'dedupe_key': dedupe_key, 'run_at': db.now, 'locked_at': None, 'last_error': None,
+                }
+                db.next_id += 1
+        elif 'SELECT COUNT(*) FROM background_jobs' in sql:
+            self._rows = [(sum(1 for j in db.by_status('running') if j['job_type'] == params[0]),)]
+        elif "SET status = 'running'" in sql:
+            ready = sorted((j for j in db.by_status('queued')
+                            if j['job_type'] == params[1] and j['run_at'] <= db.now),
+                           key=lambda j: (j['run_at'], j['id']))
+            if ready:
+                job = ready[0]
+                job.update(status='running', attempts=job['attempts'] + 1, locked_at=db.now)
+                self._rows = [(job['id'], job['job_type'], job['payload'], job['attempts'], job['max_attempts'])]
+        elif "SET status = 'queued', attempts = 0" in sql:  # RESCHEDULE_SQL
+            interval, error, job_id = params
+            job = db.jobs[job_id]
+            waiting = any(j['dedupe_key'] == job['dedupe_key'] for j in db.by_status('queued'))
+            if not waiting:
+                job.update(status='queued', attempts=0, run_at=db.now + timedelta(seconds=interval),
+                           locked_at=None, last_error=error)
+            self.rowcount = 0 if waiting else 1
+        elif "SET status = 'done'" in sql:
+            db.jobs[params[0]].update(status='done', locked_at=None)
+        elif 'make_interval(secs => %s), locked_at = NULL' in sql:  # FAIL_SQL
+            delay, error, job_id, _ = params
+            job = db.jobs[job_id]
+            job.update(status=db.retry_status(job), run_at=db.now + timedelta(seconds=delay),
+                       locked_at=None, last_error=error)
+        elif "WHERE job.status = 'running' AND job.locked_at <" in sql:  # REQUEUE_STALE_SQL
+            cutoff = db.now - timedelta(seconds=params[0])
+            stale = sorted((j for j in db.by_status('running') if j['locked_at'] < cutoff), key=lambda j: j['id'])
+            for job in stale:
+                job.update(status=db.retry_status(job), run_at=db.now, locked_at=None)
+            self.rowcount = len(stale)
+        elif 'DELETE FROM background_jobs' in sql:
+            pass
+        else:
+            raise AssertionError(f'unexpected query: {sql}')
+        return self
+
+
+class FakeJobDB(FakeTables):
+    """In-memory background_jobs table answering the queue's statements."""
+
+    cursor_class = FakeCursor
+
+    def __init__(self):
+        self.jobs = {}
+        self.next_id = 1
+        self.now = datetime(2026, 1, 1, 12, 0, 0)
+        self.locked_types = set()
+
+    def by_status(self, status):
+        return [j for j in self.jobs.values() if j['status'] == status]
+
+    def retry_status(self, job):
+        """Status a failed or abandoned run moves to (FAIL_SQL / REQUEUE_STALE_SQL)."""
+        if job['attempts'] >= job['max_attempts']:
+            return 'failed'
+        if job['dedupe_key'] and any(j['dedupe_key'] == job['dedupe_key'] for j in self.by_status('queued')):
+            return 'done'
+        return 'queued'
+
+    def on_commit(self, conn):
+        # idx_background_jobs_dedupe: one queued row per dedupe_key
+        keys = [j['dedupe_key'] for j in self.by_status('queued') if j['dedupe_key']]
+        if len(keys) != len(set(keys)):
+            raise RuntimeError('duplicate key value violates unique constraint "idx_background_jobs_dedupe"')
+
+
+@pytest.fixture
+def db():
+    return FakeJobDB()
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Register test job types; returns the list of handler invocations."""
+    calls = []
+    failures = {'flaky': 1}
+
+    def echo(**payload):
+        calls.append(('echo', payload))
+
+    def flaky(n):
+        calls.append(('flaky', n))
+        if failures['flaky']:
+            failures['flaky'] -= 1
+            raise RuntimeError('transient')
+
+    def broken():
+        raise RuntimeError('always fails')
+
+    monkeypatch.setattr(job_queue, '_registry', {
+        'echo': job_queue.JobType('echo', echo, 1, 3),
+        'flaky': job_queue.JobType('flaky', flaky, 2, 3),
+        'broken': job_queue.JobType('broken', broken, 1, 2),
+    })
+    return calls
+
+
+def enqueue(db, jobs):
+    with db.connection() as conn:
+        job_queue.enqueue(conn.cursor(), jobs)
+
+
+def worker(db):
+    w = job_queue.Worker(db.connection, threads=1, name='test-worker')
+    w._last_reap = float('inf')  # reap only when a test asks for it
+    return w
+
+
+class TestQueueLifecycle:
+
+    def test_enqueue_claim_complete(self, db, calls):
+        enqueue(db, [('echo', {'username': 'alice', 'n': 1})])
+        w = worker(db)
+        assert w.run_once()
+        assert calls == [('echo', {'username': 'alice', 'n': 1})]
+        assert db.jobs[1]['status'] == 'done'
+        assert not w.run_once()
+        assert w.stats['succeeded'] == 1
+
+    def test_failed_job_is_retried_after_backoff(self, db, calls):
+        enqueue(db, [('flaky', {'n': 7})])
+        w = worker(db)
+        assert w.run_once()
+        job = db.jobs[1]
+        assert job['status'] == 'queued' and job['attempts'] == 1
+        assert job['run_at'] > db.now and job['last_error'] == 'transient'
+        assert not w.run_once()  # not due yet
+
+        db.now = job['run_at']
+        assert w.run_once()
+        assert job['status'] == 'done' and job['attempts'] == 2
+        assert w.stats == {'claimed': 2, 'succeeded': 1, 'retried': 1, 'failed': 0, 'requeued': 0}
+
+    def test_exhausted_job_is_failed(self, db, calls):
+        enqueue(db, [('broken', {})])
+        w = worker(db)
+        for _ in range(2):
+            w.run_once()
+            db.now += timedelta(hours=1)
+        assert db.jobs[1]['status'] == 'failed'
+        assert db.jobs[1]['last_error'] == 'always fails'
+        assert not w.run_once()
+
+    def test_unknown_job_type_rejected_at_enqueue(self, db, calls):
+        with pytest.raises(KeyError):
+            enqueue(db, [('nope', {})])
+
+
+class TestClaiming:
+
+    def test_concurrency_limit_per_type(self, db, calls):
+        enqueue(db, [('echo', {'n': 1}), ('echo', {'n': 2}), ('flaky', {'n': 3})])
+        db.jobs[1]['status'] = 'running'  # echo allows one at a time
+        db.jobs[1]['locked_at'] = db.now
+        w = worker(db)
+        with db.connection() as conn:
+            assert w.claim(conn.cursor(), job_queue.get_job_type('echo')) is None
+            assert w.claim(conn.cursor(), job_queue.get_job_type('flaky')).id == 3
+
+    def test_type_being_claimed_elsewhere_is_skipped(self, db, calls):
+        enqueue(db, [('echo', {'n': 1})])
+        db.locked_types.add('echo')
+        assert not worker(db).run_once()
+        db.locked_types.clear()
+        assert worker(db).run_once()
+
+    def test_dedupe_key_skips_waiting_duplicate(self, db, calls):
+        enqueue(db, [('echo', {'n': 1}, 'echo:alice'), ('echo', {'n': 2}, 'echo:alice'),
+                     ('echo', {'n': 3}, 'echo:bob')])
+        assert len(db.jobs) == 2
+        worker(db).run_once()
+        enqueue(db, [('echo', {'n': 4}, 'echo:alice')])  # first one is no longer waiting
+        assert len(db.jobs) == 3
+
+    def test_retry_is_dropped_when_duplicate_is_queued(self, db, calls):
+        enqueue(db, [('flaky', {'n': 1}, 'flaky:alice')])
+        w = worker(db)
+        job = w._next_job()
+        enqueue(db, [('flaky', {'n': 2}, 'flaky:alice')])  # queued while the first one runs
+        assert not w.execute(job)
+        assert db.jobs[1]['status'] == 'done' and db.jobs[1]['last_error'] == 'transient'
+        assert db.jobs[2]['status'] == 'queued'
+        assert w.run_once() and db.jobs[2]['status'] == 'done'
+
+    def test_reap_with_duplicate_queued(self, db, calls):
+        enqueue(db, [('echo', {'n': 1}, 'echo:alice'), ('echo', {'n': 2}, 'echo:bob')])
+        db.jobs[1].update(status='running', attempts=1, locked_at=db.now)
+        db.jobs[2].update(status='running', attempts=1, locked_at=db.now)
+        enqueue(db, [('echo', {'n': 3}, 'echo:alice'), ('echo', {'n': 4}, 'echo:bob')])
+        db.jobs[4].update(status='running', attempts=1, locked_at=db.now)
+        db.now += timedelta(seconds=job_queue.JOB_VISIBILITY_TIMEOUT + 1)
+        w = worker(db)
+        w.reap()
+        # alice's duplicate is waiting; of bob's two stale runs only the first is requeued
+        assert [db.jobs[i]['status'] for i in (1, 2, 3, 4)] == ['done', 'queued', 'queued', 'done']
+        w.reap()  # later reaps keep working
+        assert w.stats['requeued'] == 3
+
+    def test_abandoned_running_job_is_requeued(self, db, calls):
+        enqueue(db, [('echo', {'n': 1})])
+        db.jobs[1].update(status='running', attempts=1, locked_at=db.now)
+        db.now += timedelta(seconds=job_queue.JOB_VISIBILITY_TIMEOUT + 1)
+        w = worker(db)
+        w.reap()
+        assert db.jobs[1]['status'] == 'queued' and w.stats['requeued'] == 1
+        assert w.run_once() and db.jobs[1]['status'] == 'done'
+
+
+class TestPeriodicJobs:
+
+    @pytest.fixture(autouse=True)
+    def periodic(self, calls, monkeypatch):
+        broken = job_queue.get_job_type('broken').handler
+        monkeypatch.setitem(job_queue._registry, 'tick',
+                            job_queue.JobType('tick', lambda: calls.append(('tick', None)), 1, 3, interval=15))
+        monkeypatch.setitem(job_queue._registry, 'broken_tick',
+                            job_queue.JobType('broken_tick', broken, 1, 3, interval=15))
+
+    def test_reap_seeds_one_run_per_type(self, db, calls):
+        w = worker(db)
+        w.reap()
+        w.reap()
+        assert sorted(j['dedupe_key'] for j in db.jobs.values()) == ['broken_tick', 'tick']
+
+    def test_each_run_requeues_the_same_row(self, db, calls):
+        w = worker(db)
+        w.reap()
+        tick = next(j for j in db.jobs.values() if j['job_type'] == 'tick')
+        for _ in range(2):
+            w.run_once()
+        assert tick['status'] == 'queued' and tick['run_at'] == db.now + timedelta(seconds=15)
+        assert not w.run_once()  # neither is due yet
+        db.now = tick['run_at']
+        w.run_once()
+        w.run_once()
+        assert len(db.jobs) == 2 and calls == [('tick', None), ('tick', None)]
+
+    def test_failed_run_is_still_rescheduled(self, db, calls):
+        w = worker(db)
+        w.reap()
+        broken = next(j for j in db.jobs.values() if j['job_type'] == 'broken_tick')
+        for _ in range(4):
+            while w.run_once():
+                pass
+            db.now += timedelta(seconds=15)
+        assert broken['status'] == 'queued' and broken['attempts'] == 0
+        assert broken['last_error'] == 'always fails' and w.stats['failed'] == 0
+
+    def test_run_already_waiting_is_not_duplicated(self, db, calls):
+        enqueue(db, [('tick', {}, 'tick')])
+        w = worker(db)
+        job = w._next_job()
+        enqueue(db, [('tick', {}, 'tick')])  # seeded elsewhere while this run was going
+        w.execute(job)
+        assert db.jobs[1]['status'] == 'done' and db.jobs[2]['status'] == 'queued'
+
+
+class TestTherapyChatJobs:
+    """_complete_therapy_chat queues its side effects instead of running them."""
+
+    def _complete(self, mock_db, **kwargs):
+        conn, cursor = mock_db({'SELECT id FROM chat_sessions': [(1,)]})
+        with patch.object(api, 'log_therapy_interaction_to_memory'), \
+             patch.object(api, 'log_event'), \
+             patch.object(api, 'record_risk_event') as record, \
+             patch.object(api, 'mark_daily_task_complete') as mark_task, \
+             patch.object(job_queue, 'wake') as wake, \
+             patch.object(job_queue, 'run_inline') as run_inline:
+            result = api._complete_therapy_chat('alice', 'I feel low', 'I hear you', 'high',
+                                                [('user', 'hi'), ('ai', 'hello')], **kwargs)
+        return result, record, mark_task, wake, run_inline
+
+    def test_side_effects_are_queued(self, mock_db):
+        with patch.object(job_queue, 'enqueue') as enqueue_mock:
+            result, record, mark_task, wake, run_inline = self._complete(mock_db)
+        jobs = enqueue_mock.call_args[0][1]
+        assert [j[0] for j in jobs] == ['chat_risk_signals', 'training_collect', 'daily_task',
+                                        'llm_cache_invalidate', 'risk_recalc']
+        assert jobs[-1][2] == 'risk_recalc:alice'
+        wake.assert_called_once()
+        run_inline.assert_not_called()
+        record.assert_not_called()
+        mark_task.assert_not_called()
+        assert result['success'] and result['response'] == 'I hear you'
+
+    def test_jobs_run_inline_when_queue_unavailable(self, mock_db):
+        with patch.object(job_queue, 'enqueue', side_effect=RuntimeError('no table')):
+            result, record, mark_task, wake, run_inline = self._complete(mock_db)
+        wake.assert_not_called()
+        assert [j[0] for j in run_inline.call_args[0][0]][0] == 'chat_risk_signals'
+        assert result['success']
+
+    def test_chat_job_handlers(self):
+        with patch.object(api, 'record_risk_event') as record:
+            api._job_chat_risk_signals('alice', [['user', 'a'], ['ai', 'b']], at='2026-01-01T00:00:00')
+        assert [c.kwargs['sender'] for c in record.call_args_list] == ['user', 'ai']
+        with patch.object(api, 'mark_daily_task_complete', return_value=False):
+            with pytest.raises(RuntimeError):
+                api._job_daily_task('alice', 'therapy_session', '2026-01-01')
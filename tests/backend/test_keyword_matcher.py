@@ -0,0 +1,113 @@
+"""
+Tests for the risk keyword automaton (keyword_matcher.py).
+
+Covers: equivalence with substring matching, positions, overlapping and
+nested keywords, compile cache and a 1k/10k/100k keyword benchmark.
+"""
+
+import random
+import string
+import time
+import pytest
+
+import keyword_matcher
+from keyword_matcher import KeywordMatcher, compile_keywords
+
+
+KEYWORDS = [
+    ('kill myself', 'suicide', 10),
+    ('end it all', 'suicide', 9),
+    ('cut', 'self_harm', 6),
+    ('cut myself', 'self_harm', 8),
+    ('hopeless', 'crisis', 6),
+    ('drunk', 'substance', 3),
+]
+
+
+class TestKeywordMatcher:
+
+    def test_matches_same_keywords_as_substring_scan(self):
+        matcher = KeywordMatcher(KEYWORDS)
+        text = 'I feel HOPELESS and I want to Cut Myself, maybe end it all'
+        expected = [k for k, _, _ in KEYWORDS if k.lower() in text.lower()]
+        assert matcher.matched_keywords(text) == expected
+
+    def test_positions_cover_each_occurrence(self):
+        matcher = KeywordMatcher(KEYWORDS)
+        text = 'cut, cut myself'
+        found = [(m.start, m.end, m.keyword) for m in matcher.find(text)]
+        assert (0, 3, 'cut') in found
+        assert (5, 8, 'cut') in found
+        assert (5, 15, 'cut myself') in found
+        for start, end, keyword in found:
+            assert text.lower()[start:end] == keyword
+
+    def test_scan_groups_by_category(self):
+        hits = KeywordMatcher(KEYWORDS).scan('drunk and hopeless, want to kill myself')
+        assert set(hits) == {'substance', 'crisis', 'suicide'}
+        assert hits['suicide'][0].weight == 10
+
+    def test_overlapping_suffix_patterns(self):
+        matcher = KeywordMatcher([('he', 'a', 1), ('she', 'a', 1), ('his', 'a', 1), ('hers', 'a', 1)])
+        assert sorted(m.keyword for m in matcher.find('ushers')) == ['he', 'hers', 'she']
+
+    def test_empty_inputs(self):
+        assert KeywordMatcher([]).find('anything') == []
+        assert KeywordMatcher(KEYWORDS).find('') == []
+        assert KeywordMatcher(KEYWORDS).matched_keywords(None) == []
+
+    def test_rows_for_preserves_table_order(self):
+        matcher = KeywordMatcher(KEYWORDS)
+        assert [r[0] for r in matcher.rows_for({'drunk', 'kill myself'})] == ['kill myself', 'drunk']
+
+    def test_compile_reuses_automaton_until_rows_change(self):
+        keyword_matcher._compiled = None
+        first = compile_keywords(KEYWORDS)
+        assert compile_keywords(list(KEYWORDS)) is first
+        changed = compile_keywords(KEYWORDS + [('worthless', 'crisis', 5)])
+        assert changed is not first
+        assert changed.matched_keywords('I feel worthless') == ['worthless']
+
+    def test_randomised_equivalence(self):
+        rng = random.Random(7)
+        alphabet = 'abcde '
+        keywords = [(''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))), 'c', 1)
+                    for _ in range(200)]
+        matcher = KeywordMatcher(keywords)
+        for _ in range(50):
+            text = ''.join(rng.choice(alphabet) for _ in range(200))
+            expected = list(dict.fromkeys(k for k, _, _ in keywords if k in text))
+            assert matcher.matched_keywords(text) == expected
+
+
+@pytest.mark.slow
+class TestKeywordMatcherBenchmark:
+    """Automaton scan vs per-keyword substring checks."""
+
+    @pytest.mark.parametrize('n_keywords', [1000, 10000, 100000])
+    def test_scan_cost_independent_of_keyword_count(self, n_keywords):
+        rng = random.Random(n_keywords)
+        keywords = [(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14))),
+                     'crisis', 5) for _ in range(n_keywords)]
+        keywords.append(('kill myself', 'suicide', 10))
+        text = ' '.join(['i have been feeling low and want to kill myself tonight'] * 20)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(20):
+            hits = matcher.matched_keywords(text)
+        automaton = (time.perf_counter() - start) / 20
+
+        start = time.perf_counter()
+        lowered = text.lower()
+        naive_hits = [k for k, _, _ in keywords if k.lower() in lowered]
+        naive = time.perf_counter() - start
+
+        print(f"\n[benchmark] {n_keywords} keywords: build {build * 1000:.0f} ms, "
+              f"scan {automaton * 1000:.2f} ms vs substring loop {naive * 1000:.2f} ms")
+        assert hits == naive_hits
+        if n_keywords >= 10000:
+            assert automaton < naive
@@ -0,0 +1,180 @@
+"""
+Tests for the content-addressed LLM response cache (llm_cache.py) and the
+endpoints that use it.
+
+Covers: key derivation, hit/miss with saved-token accounting, TTL expiry,
+per-patient invalidation, LRU trimming, falling back to generation when the
+cache is unavailable, and the therapy greeting served from cache.
+"""
+
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import api
+import llm_cache
+import llm_client
+from tests.conftest import FakeTables
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._row = None
+
+    def fetchone(self):
+        return self._row
+
+    def execute(self, sql, params=()):
+        db = self.db
+        sql = ' '.join(sql.split())
+        db.tick += 1
+        self._row = None
+        if sql.startswith('UPDATE llm_response_cache'):
+            row = db.rows.get(params[0])
+            if row and row['expires_at'] > db.now:
+                row['hit_count'] += 1
+                row['last_hit_at'] = db.tick
+                self._row = (row['response'], row['prompt_tokens'], row['completion_tokens'])
+        elif sql.startswith('INSERT INTO llm_response_cache'):
+            key, username, feature, model, response, prompt_tokens, completion_tokens, ttl = params
+            db.rows[key] = {'username': username, 'feature': feature, 'response': response,
+                            'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                            'hit_count': 0, 'last_hit_at': db.tick,
+                            'expires_at': db.now + timedelta(seconds=ttl)}
+        elif sql.startswith('DELETE FROM llm_response_cache WHERE username'):
+            for key in [k for k, r in db.rows.items() if r['username'] == params[0]]:
+                del db.rows[key]
+        elif sql.startswith('DELETE FROM llm_response_cache WHERE expires_at'):
+            by_recency = sorted(db.rows, key=lambda k: db.rows[k]['last_hit_at'], reverse=True)
+            for key in by_recency[params[0]:] + [k for k, r in db.rows.items() if r['expires_at'] <= db.now]:
+                db.rows.pop(key, None)
+        else:
+            raise AssertionError(f'unexpected query: {sql}')
+        return self
+
+
+class FakeCacheDB(FakeTables):
+    """In-memory llm_response_cache answering the cache's statements."""
+
+    cursor_class = FakeCursor
+
+    def __init__(self):
+        self.rows = {}
+        self.now = datetime(2026, 1, 1, 12, 0, 0)
+        self.tick = 0
+
+
+@pytest.fixture
+def db():
+    return FakeCacheDB()
+
+
+@pytest.fixture
+def cache(db):
+    return llm_cache.LLMResponseCache(db.connection, ttl=3600, max_entries=3)
+
+
+def generator(text='summary', usage=None):
+    usage = usage or {'prompt_tokens': 900, 'completion_tokens': 300}
+
+    def generate():
+        generate.calls += 1
+        llm_client.client._local.usage = usage
+        return text
+    generate.calls = 0
+    return generate
+
+
+class TestCacheKey:
+
+    def test_key_depends_on_every_part(self):
+        base = llm_cache.cache_key('insights', 1, 'model-a', {'mood': [5, 6]})
+        assert base == llm_cache.cache_key('insights', 1, 'model-a', {'mood': [5, 6]})
+        assert base != llm_cache.cache_key('insights', 2, 'model-a', {'mood': [5, 6]})
+        assert base != llm_cache.cache_key('insights', 1, 'model-b', {'mood': [5, 6]})
+        assert base != llm_cache.cache_key('insights', 1, 'model-a', {'mood': [5, 7]})
+        assert base != llm_cache.cache_key('greeting', 1, 'model-a', {'mood': [5, 6]})
+
+
+class TestGetOrGenerate:
+
+    def test_miss_then_hit_counts_saved_tokens(self, cache):
+        generate = generator()
+        assert cache.get_or_generate('insights', 'alice', ['prompt'], generate) == 'summary'
+        assert cache.get_or_generate('insights', 'alice', ['prompt'], generate) == 'summary'
+        assert generate.calls == 1
+        stats = cache.snapshot()
+        assert stats['hits'] == 1 and stats['misses'] == 1 and stats['hit_rate'] == 0.5
+        assert stats['saved_prompt_tokens'] == 900 and stats['saved_completion_tokens'] == 300
+
+    def test_changed_inputs_miss(self, cache):
+        generate = generator()
+        cache.get_or_generate('insights', 'alice', ['mood 5'], generate)
+        cache.get_or_generate('insights', 'alice', ['mood 6'], generate)
+        assert generate.calls == 2
+
+    def test_expired_entry_is_regenerated(self, cache, db):
+        generate = generator()
+        cache.get_or_generate('greeting', 'alice', ['hi'], generate, ttl=60)
+        db.now += timedelta(seconds=61)
+        cache.get_or_generate('greeting', 'alice', ['hi'], generate, ttl=60)
+        assert generate.calls == 2
+
+    def test_invalidate_drops_only_that_patient(self, cache, db):
+        cache.get_or_generate('insights', 'alice', ['a'], generator())
+        cache.get_or_generate('insights', 'bob', ['b'], generator())
+        with db.connection() as conn:
+            cache.invalidate(conn.cursor(), 'alice')
+        assert [r['username'] for r in db.rows.values()] == ['bob']
+
+    def test_lru_trims_to_max_entries(self, cache, db, monkeypatch):
+        monkeypatch.setattr(llm_cache, 'EVICT_EVERY', 1)
+        for i in range(3):
+            cache.get_or_generate('insights', 'alice', [i], generator())
+        cache.get_or_generate('insights', 'alice', [0], generator())  # touch the oldest
+        cache.get_or_generate('insights', 'alice', [3], generator())
+        kept = {r['response'] for r in db.rows.values()}
+        assert len(db.rows) == 3
+        assert llm_cache.cache_key('insights', 1, llm_client.DEFAULT_MODEL, [1]) not in db.rows
+        assert llm_cache.cache_key('insights', 1, llm_client.DEFAULT_MODEL, [0]) in db.rows
+        assert kept == {'summary'}
+
+    def test_generation_errors_are_not_cached(self, cache, db):
+        def failing():
+            raise RuntimeError('groq down')
+        with pytest.raises(RuntimeError):
+            cache.get_or_generate('insights', 'alice', ['p'], failing)
+        assert db.rows == {}
+
+    def test_unavailable_cache_still_generates(self):
+        @contextmanager
+        def broken():
+            raise RuntimeError('no database')
+            yield
+        cache = llm_cache.LLMResponseCache(broken)
+        generate = generator()
+        assert cache.get_or_generate('insights', 'alice', ['p'], generate) == 'summary'
+        assert generate.calls == 1 and cache.stats['errors'] == 2
+
+
+class TestGreetingCache:
+
+    def test_repeat_greeting_served_from_cache(self, client, mock_db, db, monkeypatch):
+        monkeypatch.setattr(llm_cache.cache, 'connection_factory', db.connection)
+        mock_db({
+            'SELECT memory_summary FROM ai_memory': [('Recent mood average: 6.0/10',)],
+            'SELECT mood_val FROM mood_logs': [(7,)],
+        })
+        ai = api.TherapistAI.__new__(api.TherapistAI)
+        ai.username, ai.groq_key = 'test_patient', 'key'
+        with patch.object(api, 'TherapistAI', return_value=ai), \
+             patch.object(ai, 'get_response', return_value='Hello again!') as get_response, \
+             patch.object(api, 'update_ai_memory') as update_memory:
+            for _ in range(2):
+                resp = client.post('/api/therapy/greeting', json={'username': 'test_patient'})
+                assert resp.get_json()['greeting'] == 'Hello again!'
+        get_response.assert_called_once()
+        update_memory.assert_not_called()
+        assert next(iter(db.rows.values()))['feature'] == 'greeting'
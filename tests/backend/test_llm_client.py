@@ -0,0 +1,244 @@
+"""
+Tests for the shared Groq client (llm_client.py) against a local fake
+OpenAI-compatible server.
+
+Covers: connection reuse, retry with backoff on 429/5xx, no retry on other
+errors, the concurrency cap, the circuit breaker (open, fail fast, half-open
+recovery), token/latency metrics and the safe reply from /api/therapy/chat
+while the circuit is open.
+"""
+
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+
+import api
+import llm_client
+from llm_client import CircuitBreaker, LLMClient, LLMError, LLMUnavailable
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers with the next (status, body) from server.script, then 200s."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body are separate writes on a kept-alive connection
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests.append(body)
+            server.peers.add(self.client_address)
+            status = server.script.pop(0) if server.script else 200
+        time.sleep(server.delay)
+        if status == 200:
+            payload = {'choices': [{'message': {'content': 'ok'}}],
+                       'usage': {'prompt_tokens': 12, 'completion_tokens': 3}}
+        else:
+            payload = {'error': {'message': f'status {status}'}}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    srv.requests, srv.peers, srv.script, srv.delay = [], set(), [], 0.0
+    srv.lock = threading.Lock()
+    srv.url = f'http://127.0.0.1:{srv.server_address[1]}/v1/chat/completions'
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_client(**kwargs):
+    kwargs.setdefault('breaker', CircuitBreaker(threshold=3, cooldown=30, clock=FakeClock()))
+    client = LLMClient(**kwargs)
+    client.sleeps = []
+    client.sleep = client.sleeps.append
+    return client
+
+
+def chat(client, url, purpose='test'):
+    return client.chat_completion(url, 'key', [{'role': 'user', 'content': 'hi'}], purpose=purpose)
+
+
+class TestPooling:
+
+    def test_keep_alive_reuses_one_connection(self, server):
+        client = make_client()
+        for _ in range(5):
+            assert chat(client, server.url) == 'ok'
+        assert len(server.requests) == 5
+        assert len(server.peers) == 1
+
+    def test_metrics_record_latency_and_tokens(self, server):
+        client = make_client()
+        chat(client, server.url, purpose='risk_analysis')
+        chat(client, server.url, purpose='risk_analysis')
+        stats = client.snapshot()['calls']['risk_analysis']
+        assert stats['calls'] == 2 and stats['ok'] == 2
+        assert stats['prompt_tokens'] == 24 and stats['completion_tokens'] == 6
+        assert stats['latency_p50_ms'] is not None
+
+
+class TestRetries:
+
+    def test_retryable_statuses_are_retried_with_backoff(self, server):
+        server.script = [503, 429]
+        client = make_client(max_retries=2, backoff_base=0.5)
+        assert chat(client, server.url) == 'ok'
+        assert len(server.requests) == 3
+        assert len(client.sleeps) == 2
+        assert 0.25 <= client.sleeps[0] <= 0.5  # jittered base delay
+        assert client.sleeps[1] == 0.0           # Retry-After honoured
+        assert client.snapshot()['calls']['test']['retries'] == 2
+
+    def test_client_errors_are_not_retried(self, server):
+        server.script = [400]
+        client = make_client()
+        with pytest.raises(LLMError) as exc:
+            chat(client, server.url)
+        assert exc.value.status_code == 400
+        assert len(server.requests) == 1
+        assert client.breaker.state == 'closed'
+
+    def test_connection_errors_exhaust_retries(self):
+        client = make_client(max_retries=1)
+        with pytest.raises(LLMUnavailable):
+            chat(client, 'http://127.0.0.1:9/v1/chat/completions')
+        assert len(client.sleeps) == 1
+        assert client.breaker.failures == 1
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_fails_fast(self, server):
+        server.script = [500] * 3
+        client = make_client(max_retries=0)
+        for _ in range(3):
+            with pytest.raises(LLMUnavailable):
+                chat(client, server.url)
+        assert client.breaker.state == 'open'
+        with pytest.raises(LLMUnavailable, match='circuit open'):
+            chat(client, server.url)
+        assert len(server.requests) == 3  # rejected without a request
+        assert client.snapshot()['calls']['test']['rejected'] == 1
+
+    def test_half_open_trial_closes_circuit(self, server):
+        server.script = [500] * 3
+        client = make_client(max_retries=0)
+        for _ in range(3):
+            with pytest.raises(LLMUnavailable):
+                chat(client, server.url)
+        client.breaker.clock.now += 31
+        assert chat(client, server.url) == 'ok'
+        assert client.breaker.state == 'closed' and client.breaker.failures == 0
+
+    @pytest.mark.parametrize('error', [requests.exceptions.ChunkedEncodingError('cut off'),
+                                       requests.exceptions.TooManyRedirects('loop'),
+                                       KeyError('unexpected')])
+    def test_other_errors_on_the_trial_call_reopen(self, error):
+        client = make_client(max_retries=2)
+        client.breaker.threshold = 1
+        client.breaker.record_failure()
+        client.breaker.clock.now = 31
+        with patch.object(client.session, 'post', side_effect=error), \
+             pytest.raises((LLMUnavailable, KeyError)):
+            chat(client, 'http://127.0.0.1:9/v1/chat/completions')
+        assert client.sleeps == []  # not retried
+        assert client.breaker.state == 'open' and not client.breaker._trial_in_flight
+        client.breaker.clock.now = 62
+        assert client.breaker.allow()
+        assert client.snapshot()['calls']['test']['errors'] == 1
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=10, clock=FakeClock())
+        breaker.record_failure()
+        breaker.clock.now = 11
+        assert breaker.allow()
+        assert not breaker.allow()  # one trial at a time
+        breaker.record_failure()
+        assert breaker.state == 'open' and not breaker.allow()
+
+
+class TestConcurrencyCap:
+
+    def test_calls_beyond_the_cap_fail_fast(self, server):
+        server.delay = 0.3
+        client = make_client(max_concurrency=1, acquire_timeout=0.05)
+        results = []
+        worker = threading.Thread(target=lambda: results.append(chat(client, server.url)))
+        worker.start()
+        time.sleep(0.1)
+        with pytest.raises(LLMUnavailable, match='concurrency'):
+            chat(client, server.url)
+        worker.join()
+        assert results == ['ok']
+        assert client.breaker.state == 'closed'
+
+
+class TestSafeReply:
+
+    def test_therapy_chat_answers_with_safe_reply_when_circuit_open(self, client, mock_db, monkeypatch):
+        mock_db({
+            'WITH active_chat_session': [(1, [], None, {}, [])],
+            'SELECT keyword, category, severity_weight FROM risk_keywords': [],
+        })
+        monkeypatch.setattr(llm_client.client, 'breaker', CircuitBreaker(threshold=1, cooldown=60))
+        llm_client.client.breaker.record_failure()
+        with patch.object(api, '_complete_therapy_chat') as complete, \
+             patch.object(api, 'log_event'):
+            resp = client.post('/api/therapy/chat', json={'username': 'test_patient', 'message': 'Hello there'})
+        data = resp.get_json()
+        assert resp.status_code == 200
+        assert data['response'] == llm_client.SAFE_REPLY and data['degraded']
+        assert '116 123' in data['response']
+        complete.assert_not_called()
+
+
+@pytest.mark.slow
+class TestLLMClientBenchmark:
+
+    def test_pooled_vs_fresh_connections(self, server):
+        payload = {'model': 'm', 'messages': [{'role': 'user', 'content': 'hi'}]}
+        n = 200
+
+        start = time.perf_counter()
+        for _ in range(n):
+            requests.post(server.url, json=payload, timeout=5)
+        fresh = (time.perf_counter() - start) / n
+
+        client = make_client()
+        start = time.perf_counter()
+        for _ in range(n):
+            chat(client, server.url)
+        pooled = (time.perf_counter() - start) / n
+
+        print(f"\n[benchmark] {n} calls: new connection each {fresh * 1000:.2f} ms/call, "
+              f"pooled keep-alive {pooled * 1000:.2f} ms/call ({len(server.peers)} connections)")
+        assert pooled < fresh
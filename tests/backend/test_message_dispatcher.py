@@ -0,0 +1,272 @@
+"""
+Tests for scheduled message delivery and mood reminders (message_dispatcher.py).
+
+Covers: batched SKIP LOCKED claims through the due-message index, bulk
+notification and status writes, at-least-once redelivery without duplicate
+notifications, the periodic dispatch job, the once-a-day anti-join mood
+reminder, the schedule endpoint and hiding undelivered messages from the
+recipient's reads.
+"""
+
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import api
+import job_queue
+import message_dispatcher
+import search_index
+from message_dispatcher import (CLAIM_SQL, MARK_SENT_SQL, MOOD_REMINDER_SQL, REQUEUE_STALE_SQL,
+                                TOUCH_CONVERSATIONS_SQL, Dispatcher)
+from message_service import MessageService
+from tests.conftest import FakeTables
+
+NOW = datetime(2026, 3, 1, 9, 0)
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        db = self.db
+        self._rows = []
+        if sql == CLAIM_SQL:
+            db.statements.append('claim')
+            due = sorted((m['scheduled_for'], i) for i, m in db.messages.items()
+                         if m['status'] == 'scheduled' and m['scheduled_for'] <= params[0])
+            for _, i in due[:params[1]]:
+                m = db.messages[i]
+                m.update(status='delivering', claimed_at=db.now)
+                self._rows.append((i, m['conversation_id'], m['sender'], m['recipient'], m['subject'], m['content']))
+            self.rowcount = len(self._rows)
+        elif sql == MARK_SENT_SQL:
+            db.statements.append('mark_sent')
+            ids = [i for i in params[0] if db.messages[i]['status'] == 'delivering']
+            for i in ids:
+                db.messages[i].update(status='sent', claimed_at=None, sent_at=db.now)
+            self.rowcount = len(ids)
+        elif sql == TOUCH_CONVERSATIONS_SQL:
+            db.touched.append(params[0])
+        elif sql == REQUEUE_STALE_SQL:
+            cutoff = db.now - timedelta(seconds=params[0])
+            stale = [m for m in db.messages.values() if m['status'] == 'delivering' and m['claimed_at'] < cutoff]
+            for m in stale:
+                m.update(status='scheduled', claimed_at=None)
+            self.rowcount = len(stale)
+        elif sql == MOOD_REMINDER_SQL:
+            db.statements.append('mood_reminders')
+            db.reminder_days.append(params[1:])
+            self.rowcount = 3
+        return self
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeMessageDB(FakeTables):
+    """Scheduled messages and notifications, updated the way the dispatcher SQL would."""
+
+    cursor_class = FakeCursor
+
+    def __init__(self, due=0, future=0):
+        self.now = NOW
+        self.messages = {}
+        for i in range(1, due + future + 1):
+            self.messages[i] = {
+                'conversation_id': 100 + i % 2, 'sender': 'dr_a', 'recipient': f'user{i}',
+                'subject': None, 'content': f'check-in {i}', 'status': 'scheduled', 'claimed_at': None,
+                'scheduled_for': NOW - timedelta(minutes=i) if i <= due else NOW + timedelta(hours=1),
+            }
+        self.notifications = {}
+        self.touched = []
+        self.statements = []
+        self.reminder_days = []
+
+    def insert_notifications(self, cur, sql, rows, page_size=100):
+        self.statements.append('notify')
+        inserted = 0
+        for recipient, text, kind, key in rows:
+            if key not in self.notifications:
+                self.notifications[key] = (recipient, text, kind)
+                inserted += 1
+        cur.rowcount = inserted
+
+
+@pytest.fixture
+def notify():
+    """Routes the bulk notification insert (execute_values) to the fake database."""
+    with patch.object(message_dispatcher, 'execute_values') as execute_values:
+        yield execute_values
+
+
+def dispatcher(db, notify, **kwargs):
+    notify.side_effect = db.insert_notifications
+    kwargs.setdefault('reminder_hour', -1)
+    kwargs.setdefault('clock', lambda: db.now)
+    return Dispatcher(db.connection, **kwargs)
+
+
+class TestDelivery:
+
+    def test_claim_uses_due_index_and_skip_locked(self):
+        claim = ' '.join(CLAIM_SQL.split())
+        assert "WHERE delivery_status = 'scheduled' AND scheduled_for <= %s ORDER BY scheduled_for, id" in claim
+        assert 'FOR UPDATE SKIP LOCKED' in claim
+        assert any("ON messages(scheduled_for, id) WHERE delivery_status = 'scheduled'" in sql
+                   for sql in message_dispatcher.SCHEMA_SQLS)
+
+    def test_batch_is_delivered_with_bulk_writes(self, notify):
+        db = FakeMessageDB(due=3, future=2)
+        d = dispatcher(db, notify)
+        assert d.dispatch_once() == 3
+        assert db.statements == ['claim', 'notify', 'mark_sent']
+        assert [m['status'] for m in db.messages.values()] == ['sent'] * 3 + ['scheduled'] * 2
+        assert db.notifications['message:2'] == ('user2', 'New message from dr_a: check-in 2', 'message')
+        assert db.touched == [[100, 101]]
+        assert d.stats['delivered'] == d.stats['notified'] == 3
+
+    def test_nothing_due_is_one_claim(self, notify):
+        db = FakeMessageDB(future=2)
+        assert dispatcher(db, notify).dispatch_once() == 0
+        assert db.statements == ['claim'] and not notify.called
+
+    def test_due_is_judged_by_the_app_clock(self, notify):
+        # scheduled_for is app-local; a database clock in another zone must not decide
+        db = FakeMessageDB(due=2)
+        assert dispatcher(db, notify, clock=lambda: NOW - timedelta(hours=1)).dispatch_once() == 0
+        assert dispatcher(db, notify).dispatch_once() == 2
+
+    def test_tick_drains_full_batches(self, notify):
+        db = FakeMessageDB(due=5)
+        dispatcher(db, notify, batch_size=2).tick()
+        assert db.statements.count('claim') == 3
+        assert all(m['status'] == 'sent' for m in db.messages.values())
+
+    def test_abandoned_claims_are_redelivered_once(self, notify):
+        db = FakeMessageDB(due=2)
+        crashed = dispatcher(db, notify)
+        with db.connection() as conn:
+            crashed.claim(conn.cursor())  # claimed, then the process dies
+
+        d = dispatcher(db, notify)
+        assert d.dispatch_once() == 0 and d.requeue_stale() == 0
+        db.now += timedelta(seconds=message_dispatcher.DISPATCH_VISIBILITY_TIMEOUT + 1)
+        assert d.requeue_stale() == 2
+        assert d.dispatch_once() == 2
+        assert len(db.notifications) == 2
+
+    def test_overlapping_deliveries_notify_once(self, notify):
+        db = FakeMessageDB(due=2)
+        slow, fast = dispatcher(db, notify), dispatcher(db, notify)
+        with db.connection() as conn:
+            cur = conn.cursor()
+            rows = slow.claim(cur)
+            # slow stalls past the visibility timeout; fast delivers the same rows
+            db.now += timedelta(seconds=message_dispatcher.DISPATCH_VISIBILITY_TIMEOUT + 1)
+            fast.requeue_stale()
+            assert fast.dispatch_once() == 2
+            assert slow.deliver(cur, rows) == (0, 0)
+        assert len(db.notifications) == 2
+
+
+class TestDispatchJob:
+
+    def test_registered_as_a_periodic_job(self):
+        spec = job_queue.get_job_type('message_dispatch')
+        assert spec.concurrency == 1
+        # conftest turns delivery off; otherwise it runs every DISPATCH_INTERVAL
+        assert spec.interval is None
+        with patch.object(message_dispatcher, 'MESSAGE_DISPATCHER_MODE', 'on'):
+            assert message_dispatcher.job_interval() == message_dispatcher.DISPATCH_INTERVAL
+
+    def test_job_ticks_one_dispatcher_per_process(self, notify):
+        db = FakeMessageDB(due=2)
+        notify.side_effect = db.insert_notifications
+        with patch.object(message_dispatcher, '_dispatcher', None):
+            message_dispatcher.run(db.connection)
+            first = message_dispatcher.get_dispatcher()
+            db.now += timedelta(minutes=1)
+            message_dispatcher.run(db.connection)
+            assert message_dispatcher.get_dispatcher() is first
+        assert first.stats['delivered'] == 2 and db.statements.count('claim') == 2
+
+
+class TestMoodReminders:
+
+    def test_single_anti_join_keyed_per_day(self):
+        sql = ' '.join(MOOD_REMINDER_SQL.split())
+        assert sql.startswith('INSERT INTO notifications') and 'NOT EXISTS' in sql
+        assert "ml.entrestamp >= %s::date AND ml.entrestamp < %s::date + 1" in sql
+        assert "ON mood_logs(username, entrestamp)" in ' '.join(message_dispatcher.SCHEMA_SQLS)
+        assert "'mood_reminder:' || u.username || ':' || %s::date" in sql
+        assert 'NOW()' not in sql and 'CURRENT_DATE' not in sql
+        assert 'ON CONFLICT (idempotency_key)' in sql
+
+    def test_entrestamp_exists_before_it_is_indexed(self):
+        sqls = message_dispatcher.SCHEMA_SQLS
+        fix = sqls.index(message_dispatcher.MOOD_LOGS_ENTRESTAMP_SQL)
+        index = next(i for i, sql in enumerate(sqls) if 'ON mood_logs(username, entrestamp)' in sql)
+        assert fix < index
+        # init_db, the frozen baseline, still creates entry_timestamp
+        assert 'RENAME COLUMN entry_timestamp TO entrestamp' in sqls[fix]
+
+    def test_sent_once_after_the_reminder_hour(self):
+        db = FakeMessageDB()
+        d = Dispatcher(db.connection, reminder_hour=20)
+        assert d.remind_if_due(datetime(2026, 3, 1, 19, 59)) == 0
+        assert d.remind_if_due(datetime(2026, 3, 1, 20, 0)) == 3
+        assert d.remind_if_due(datetime(2026, 3, 1, 22, 0)) == 0
+        assert d.remind_if_due(datetime(2026, 3, 2, 20, 30)) == 3
+        assert db.statements == ['mood_reminders', 'mood_reminders']
+        assert db.reminder_days == [(date(2026, 3, 1),) * 3, (date(2026, 3, 2),) * 3]
+
+    def test_disabled_hour_never_reminds(self):
+        db = FakeMessageDB()
+        assert Dispatcher(db.connection, reminder_hour=-1).remind_if_due(datetime(2026, 3, 1, 23, 0)) == 0
+        assert db.statements == []
+
+
+class TestScheduling:
+
+    @pytest.fixture
+    def service(self, auth_patient):
+        service = MagicMock()
+        service.schedule_message.return_value = {'message_id': 7, 'scheduled_for': '2026-03-02T09:00:00'}
+        with patch.object(api, 'MessageService', return_value=service), \
+             patch.object(api, 'validate_csrf_token', return_value=True), \
+             patch.object(api, 'get_db_connection'), patch.object(api, 'get_wrapped_cursor'):
+            yield auth_patient[0], service
+
+    def test_schedule_parses_iso_timestamp(self, service):
+        client, svc = service
+        due = datetime(2026, 3, 2, 9, 0, tzinfo=timezone.utc)
+        resp = client.post('/api/messages/scheduled', json={
+            'recipient': 'dr_a', 'content': 'See you tomorrow', 'scheduled_for': due.isoformat()})
+        assert resp.status_code == 201
+        kwargs = svc.schedule_message.call_args.kwargs
+        assert kwargs['recipient_username'] == 'dr_a' and kwargs['content'] == 'See you tomorrow'
+        assert kwargs['scheduled_for'] == due.astimezone().replace(tzinfo=None)
+        assert kwargs['subject'] is None
+
+    def test_schedule_rejects_bad_timestamp(self, service):
+        client, svc = service
+        resp = client.post('/api/messages/scheduled', json={
+            'recipient': 'dr_a', 'content': 'Hi', 'scheduled_for': 'tomorrow'})
+        assert resp.status_code == 400 and not svc.schedule_message.called
+
+
+class TestUndeliveredHidden:
+
+    def test_recipient_reads_skip_scheduled_messages(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+        svc = MessageService(MagicMock(), cur, 'alice')
+        svc.get_conversation('dr_a')
+        svc.get_unread_count()
+        search_index.search_messages(cur, 'alice', 'panic')
+        for call in cur.execute.call_args_list:
+            sql = ' '.join(call.args[0].split())
+            assert "NOT IN ('scheduled', 'delivering')" in sql
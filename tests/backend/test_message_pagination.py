@@ -0,0 +1,151 @@
+"""
+Tests for keyset pagination of messages (message_service.py) and the
+messaging endpoints that expose it.
+
+Covers: newest-first pages returned oldest-first, (sent_at, id) seek
+conditions, cursors round-tripping through the API, batched read receipts
+and the constant number of queries behind the inbox.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import api
+from message_service import MessageService
+
+START = datetime(2026, 3, 1, 9, 0)
+
+
+class RecordingCursor:
+    """Answers queries by substring (first match wins) and records every call."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        self.calls.append((sql, params))
+        self._rows = next((rows for key, rows in self.results.items() if key in sql), [])
+        self.rowcount = len(self._rows)
+        return self
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def queries(self, fragment):
+        return [(sql, params) for sql, params in self.calls if fragment in sql]
+
+
+class FakeConn:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def message_rows(n, sender='dr_a', recipient='alice', is_read=0):
+    """Newest-first message rows in MessageService.MESSAGE_COLUMNS order."""
+    return [(i, sender, recipient, None, f'msg {i}', is_read, None, START + timedelta(minutes=i), 'direct')
+            for i in range(n, 0, -1)]
+
+
+def service(results, username='alice'):
+    cur = RecordingCursor(results)
+    return MessageService(FakeConn(), cur, username), cur
+
+
+class TestMessageServiceKeyset:
+
+    def test_conversation_page_is_oldest_first_with_seek_cursor(self):
+        svc, cur = service({'FROM messages': message_rows(4)})
+        page = svc.get_conversation('dr_a', limit=3)
+        assert [m['id'] for m in page['messages']] == [2, 3, 4]
+        assert page['has_more'] is True
+        assert page['next_before'] == ((START + timedelta(minutes=2)).isoformat(), 2)
+
+        svc.get_conversation('dr_a', limit=3, before=page['next_before'])
+        sql, params = cur.calls[-1]
+        assert sql.count('(sent_at, id) < (%s::timestamp, %s)') == 2
+        assert 'OFFSET' not in sql
+        assert params == ('alice', 'dr_a', page['next_before'][0], 2, 4,
+                          'dr_a', 'alice', page['next_before'][0], 2, 4, 4)
+
+    def test_last_page_has_no_cursor(self):
+        svc, _ = service({'FROM messages': message_rows(2)})
+        page = svc.get_conversation('dr_a', limit=3)
+        assert len(page['messages']) == 2
+        assert page['has_more'] is False and page['next_before'] is None
+
+    def test_thread_marks_page_read_in_one_update(self):
+        svc, cur = service({'FROM conversation_participants': [(1,)], 'FROM messages': message_rows(3)})
+        thread = svc.get_conversation_thread(7, limit=2)
+        assert thread['message_count'] == 2 and thread['has_more'] is True
+        updates = cur.queries('UPDATE messages')
+        assert len(updates) == 1 and updates[0][1] == ([3, 2],)
+
+    def test_sent_messages_accept_string_timestamps(self):
+        rows = [(5, 'dr_a', 'Hi', 'Hello', 0, '2026-03-01T09:05:00', 'direct', 1),
+                (4, 'dr_a', 'Hi', 'Again', 1, '2026-03-01T09:04:00', 'direct', 1)]
+        svc, cur = service({'FROM messages': rows})
+        page = svc.get_sent_messages_page(limit=1)
+        assert page['messages'][0]['sent_at'] == '2026-03-01T09:05:00'
+        assert page['next_before'] == ('2026-03-01T09:05:00', 5)
+        assert svc.get_sent_messages(limit=1) == page['messages']
+
+    def test_inbox_query_count_does_not_grow_with_conversations(self):
+        def inbox(n):
+            rows = [(i, None, 'direct', 2, 'dr_a', 'hello', START, 'dr_a', START) for i in range(n, 0, -1)]
+            svc, cur = service({
+                'GROUP BY conversation_id': [(1, 2)],
+                'SELECT COUNT(*)': [(n,)],
+                'FROM conversation_participants cp': rows,
+            })
+            result = svc.get_conversations_list(limit=50)
+            return result, len(cur.calls)
+
+        small, small_queries = inbox(2)
+        large, large_queries = inbox(40)
+        assert small_queries == large_queries == 3
+        assert large['total_conversations'] == 40 and len(large['conversations']) == 40
+        assert large['conversations'][-1]['unread_count'] == 2
+
+
+class TestMessagingEndpointCursors:
+
+    @pytest.fixture
+    def cur(self):
+        cur = RecordingCursor({'FROM messages': message_rows(3, recipient='test_patient')})
+        with patch.object(api, 'get_db_connection', return_value=FakeConn()), \
+             patch.object(api, 'get_wrapped_cursor', return_value=cur):
+            yield cur
+
+    @pytest.fixture
+    def client(self, auth_patient):
+        return auth_patient[0]
+
+    def test_conversation_cursor_round_trip(self, client, cur):
+        data = client.get('/api/messages/conversation/dr_a?limit=2').get_json()
+        assert [m['id'] for m in data['messages']] == [2, 3]
+        assert data['has_more'] is True and data['next_cursor']
+        assert len(cur.queries('UPDATE messages')) == 1
+
+        client.get(f"/api/messages/conversation/dr_a?limit=2&cursor={data['next_cursor']}")
+        sql, params = cur.calls[-1]
+        assert '(sent_at, id) < (%s::timestamp, %s)' in sql
+        assert params[2:4] == ((START + timedelta(minutes=2)).isoformat(), 2)
+        # Older pages do not re-mark the conversation read
+        assert len(cur.queries('UPDATE messages')) == 1
+
+    def test_sent_rejects_bad_limit(self, client, cur):
+        assert client.get('/api/messages/sent?limit=0').status_code == 400
@@ -0,0 +1,258 @@
+"""
+Tests for versioned schema migrations (migrations.py) and the boot path.
+
+Covers: ordered application and schema_version bookkeeping, idempotent
+re-runs, failure handling and lock release, serialisation of concurrent
+runners on the advisory lock, the one-query boot check, the baseline
+migration and a startup benchmark (statement counts always; wall-clock
+against a real Postgres with MIGRATIONS_BENCHMARK_DATABASE_URL).
+"""
+
+import os
+import threading
+import time
+import pytest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+
+import api
+import migrations
+from migrations import (APPLIED_SQL, CURRENT_VERSION_SQL, LOCK_SQL, RECORD_SQL, SCHEMA_VERSION_SQL,
+                        UNLOCK_SQL)
+from tests.conftest import FakeTables
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        db = self.db
+        db.statements.append(sql)
+        self._rows = []
+        if sql == LOCK_SQL:
+            db.advisory.acquire()
+        elif sql == UNLOCK_SQL:
+            db.advisory.release()
+        elif sql == SCHEMA_VERSION_SQL:
+            db.table = True
+        elif sql in (APPLIED_SQL, CURRENT_VERSION_SQL):
+            if not db.table:
+                raise psycopg2.errors.UndefinedTable('relation "schema_version" does not exist')
+            applied = sorted(db.versions)
+            self._rows = [(v,) for v in applied] if sql == APPLIED_SQL else [(max(applied, default=None),)]
+        elif sql == RECORD_SQL:
+            self.connection.pending.append((params[0], params[1]))
+        return self
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeSchemaDB(FakeTables):
+    """schema_version plus a process-wide stand-in for the advisory lock."""
+
+    cursor_class = FakeCursor
+
+    def __init__(self, versions=None, table=True):
+        self.table = table or versions is not None
+        self.versions = dict.fromkeys(versions or [], 'earlier')
+        self.advisory = threading.Lock()
+        self.statements = []
+
+    def on_commit(self, conn):
+        self.versions.update(conn.pending)
+
+
+@pytest.fixture
+def registry():
+    """An empty migration registry; returns the applied-order log."""
+    log = []
+    with patch.dict(migrations._registry, clear=True):
+        for version in (1, 2, 3):
+            migrations.migration(version, f'step {version}')(lambda conn, v=version: log.append(v))
+        yield log
+
+
+class TestRunner:
+
+    def test_applies_pending_in_order(self, registry):
+        db = FakeSchemaDB(table=False)
+        assert migrations.migrate(db.connection) == [1, 2, 3]
+        assert registry == [1, 2, 3]
+        assert db.versions == {1: 'step 1', 2: 'step 2', 3: 'step 3'}
+        assert db.statements[0] == LOCK_SQL and db.statements[-1] == UNLOCK_SQL
+
+    def test_rerun_applies_nothing(self, registry):
+        db = FakeSchemaDB(versions=[1, 2])
+        assert migrations.migrate(db.connection) == [3]
+        assert migrations.migrate(db.connection) == []
+        assert registry == [3]
+
+    def test_target_stops_early(self, registry):
+        db = FakeSchemaDB()
+        assert migrations.migrate(db.connection, target=2) == [1, 2]
+        assert 3 not in db.versions
+
+    def test_failure_is_not_recorded_and_releases_lock(self, registry):
+        migrations._registry[2] = migrations.Migration(2, 'broken', MagicMock(side_effect=RuntimeError('boom')))
+        db = FakeSchemaDB()
+        with pytest.raises(RuntimeError):
+            migrations.migrate(db.connection)
+        assert set(db.versions) == {1}
+        assert db.advisory.acquire(blocking=False)
+
+    def test_sql_migration_runs_on_the_runner_connection(self, registry):
+        migrations.sql_migration(4, 'two statements', ["CREATE TABLE a (x INT)", "CREATE INDEX i ON a(x)"])
+        db = FakeSchemaDB(versions=[1, 2, 3])
+        assert migrations.migrate(db.connection) == [4]
+        assert db.statements[3:5] == ["CREATE TABLE a (x INT)", "CREATE INDEX i ON a(x)"]
+        assert db.versions[4] == 'two statements'
+
+    def test_duplicate_version_rejected(self, registry):
+        with pytest.raises(ValueError):
+            migrations.migration(2, 'again')(lambda conn: None)
+
+    def test_concurrent_runners_apply_each_migration_once(self, registry):
+        db = FakeSchemaDB()
+        release = threading.Event()
+        migrations._registry[1] = migrations.Migration(1, 'slow', lambda conn: (release.wait(2), registry.append(1)))
+        results = []
+        runners = [threading.Thread(target=lambda: results.append(migrations.migrate(db.connection)))
+                   for _ in range(3)]
+        for t in runners:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in runners:
+            t.join(5)
+        assert sorted(results) == [[], [], [1, 2, 3]]
+        assert registry == [1, 2, 3]
+
+
+class TestBootCheck:
+
+    def test_up_to_date_is_one_query(self, registry):
+        db = FakeSchemaDB(versions=[1, 2, 3])
+        assert migrations.check(db.connection) == 3
+        assert db.statements == [CURRENT_VERSION_SQL]
+
+    def test_behind_is_reported_not_migrated(self, registry):
+        db = FakeSchemaDB(table=False)
+        with patch.object(migrations, 'MIGRATE_ON_STARTUP', False):
+            assert migrations.check(db.connection) == 0
+        assert registry == [] and LOCK_SQL not in db.statements
+
+    def test_migrate_on_startup(self, registry):
+        db = FakeSchemaDB(versions=[1])
+        with patch.object(migrations, 'MIGRATE_ON_STARTUP', True):
+            assert migrations.check(db.connection) == 3
+        assert registry == [2, 3]
+
+    def test_first_request_runs_no_schema_work(self, client):
+        with patch.object(api, 'init_db') as init_db, \
+             patch.object(api, 'startup_security_checks') as checks, \
+             patch.object(api.app, '_tier0_initialized', create=True):
+            del api.app._tier0_initialized
+            client.get('/api/health')
+            client.get('/api/health')
+        assert checks.call_count == 1 and not init_db.called
+
+    def test_baseline_is_version_one(self):
+        assert migrations.migrations()[0].version == 1
+        assert migrations.migrations()[0].apply is api.migrate_baseline
+        conn = MagicMock()
+        with patch.object(api, 'init_db', return_value=False) as init_db, pytest.raises(RuntimeError):
+            api.migrate_baseline(conn)
+        init_db.assert_called_once_with(conn)
+
+    def test_later_versions_are_strict_and_leave_commit_to_the_runner(self):
+        later = migrations.migrations()[1:]
+        assert [m.version for m in later] == list(range(2, len(later) + 2))
+        for m in later:
+            conn = MagicMock()
+            m.apply(conn)
+            assert conn.cursor.return_value.execute.called and not conn.commit.called
+            conn.cursor.return_value.execute.side_effect = psycopg2.errors.UndefinedColumn('no such column')
+            with pytest.raises(psycopg2.Error):
+                m.apply(conn)
+
+    def test_baseline_holds_only_the_original_schema(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (True,)
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        assert api.init_db(conn) is True and not conn.close.called
+        executed = ' '.join(str(c.args[0]) for c in cursor.execute.call_args_list)
+        for table in ('background_jobs', 'llm_response_cache', 'data_exports', 'search_vector', 'idempotency_key'):
+            assert table not in executed
+
+
+class TestStartupBenchmark:
+
+    def test_boot_statements_vs_init_db(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (True,)
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        assert api.init_db(conn) is True
+        for m in migrations.migrations()[1:]:
+            m.apply(conn)
+        # What every boot used to run: init_db plus the DDL now in versions 2+
+        init_db_statements = cursor.execute.call_count
+
+        db = FakeSchemaDB(versions=[v.version for v in migrations.migrations()])
+        migrations.check(db.connection)
+        print(f"\n[benchmark] boot statements: init_db + schema DDL {init_db_statements}, "
+              f"migrations.check {len(db.statements)}")
+        assert init_db_statements > 50 and len(db.statements) == 1
+
+    @pytest.mark.slow
+    def test_boot_time_against_postgres(self):
+        dsn = os.environ.get('MIGRATIONS_BENCHMARK_DATABASE_URL')
+        if not dsn:
+            pytest.skip('MIGRATIONS_BENCHMARK_DATABASE_URL not set')
+        from psycopg2 import pool
+
+        setup = psycopg2.connect(dsn)
+        setup.autocommit = True
+        setup.cursor().execute("DROP SCHEMA IF EXISTS migrations_bench CASCADE; CREATE SCHEMA migrations_bench")
+        bench_pool = pool.ThreadedConnectionPool(1, 4, dsn, options='-c search_path=migrations_bench')
+
+        @contextmanager
+        def factory():
+            conn = bench_pool.getconn()
+            try:
+                yield conn
+            finally:
+                bench_pool.putconn(conn)
+
+        try:
+            with patch.object(api, '_db_pool', bench_pool), patch.object(api, '_db_pool_pid', os.getpid()), \
+                 patch.object(api, 'init_cbt_tools_schema', lambda: None, create=True):
+                start = time.perf_counter()
+                assert migrations.migrate(factory) == [m.version for m in migrations.migrations()]
+                first = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in range(10):
+                    init_db_ok = api.init_db()
+                per_init_db = (time.perf_counter() - start) / 10
+
+                start = time.perf_counter()
+                for _ in range(10):
+                    assert migrations.check(factory) == migrations.latest_version()
+                per_check = (time.perf_counter() - start) / 10
+            print(f"\n[benchmark] first migrate {first * 1000:.0f} ms, init_db per boot {per_init_db * 1000:.1f} ms, "
+                  f"migrations.check per boot {per_check * 1000:.2f} ms")
+            assert init_db_ok and per_check < per_init_db / 20
+        finally:
+            bench_pool.closeall()
+            setup.cursor().execute("DROP SCHEMA IF EXISTS migrations_bench CASCADE")
+            setup.close()
@@ -175,10 +175,7 @@ class TestMoodCheckReminder:
 
     def test_check_reminder_forced(self, client, mock_db):
         """With force=True, reminders are sent regardless of hour."""
-        conn, cursor = mock_db({
-            "SELECT username FROM users": [('alice',), ('bob',)],
-            'SELECT id FROM mood_logs': [],  # neither has logged today
-        })
+        conn, cursor = mock_db({})
 
         resp = client.post('/api/mood/check-reminder', json={'force': True})
         data = resp.get_json()
@@ -186,6 +183,8 @@ class TestMoodCheckReminder:
         assert resp.status_code == 200
         assert data['success'] is True
         assert data['reminders_sent'] >= 0
+        # One anti-join insert rather than a query per patient
+        assert 'NOT EXISTS' in cursor._last_query
 
     def test_check_reminder_not_8pm(self, client, mock_db):
         """Without force, returns early if current hour is not 20."""
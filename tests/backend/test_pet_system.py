@@ -6,6 +6,8 @@ Covers:
   - POST /api/pet/create
   - POST /api/pet/feed
   - POST /api/pet/reward
+  - POST /api/pet/adventure, /api/pet/check-return
+  - pets.py: decay computed on read, single guarded UPDATE ... RETURNING
 """
 
 import json
@@ -28,13 +30,11 @@ class TestPetStatus:
         now = time.time()
         conn, cursor = mock_db({
             'SELECT username FROM users': [('test_patient',)],
-            'SELECT * FROM pet': [(1, 'test_patient', 'Buddy', 'Dog', 'Male',
+            'FROM pet WHERE username': [(1, 'test_patient', 'Buddy', 'Dog', 'Male',
                                     80, 75, 60, 90, 50, 100, 'Child', 0, now, 'None')],
         })
 
-        with patch.object(api, 'get_pet_db_connection', return_value=conn), \
-             patch.object(api, 'ensure_pet_table'):
-            resp = client.get('/api/pet/status?username=test_patient')
+        resp = client.get('/api/pet/status?username=test_patient')
 
         data = resp.get_json()
         assert resp.status_code == 200
@@ -46,12 +46,10 @@ class TestPetStatus:
         """Returns exists=False when no pet found."""
         conn, cursor = mock_db({
             'SELECT username FROM users': [('test_patient',)],
-            'SELECT * FROM pet': [],
+            'FROM pet WHERE username': [],
         })
 
-        with patch.object(api, 'get_pet_db_connection', return_value=conn), \
-             patch.object(api, 'ensure_pet_table'):
-            resp = client.get('/api/pet/status?username=test_patient')
+        resp = client.get('/api/pet/status?username=test_patient')
 
         data = resp.get_json()
         assert resp.status_code == 200
@@ -92,14 +90,12 @@ class TestPetCreate:
             'INSERT INTO pet': [],
         })
 
-        with patch.object(api, 'get_pet_db_connection', return_value=conn), \
-             patch.object(api, 'ensure_pet_table'):
-            resp = client.post('/api/pet/create', json={
-                'username': 'test_patient',
-                'name': 'Buddy',
-                'species': 'Dog',
-                'gender': 'Male',
-            })
+        resp = client.post('/api/pet/create', json={
+            'username': 'test_patient',
+            'name': 'Buddy',
+            'species': 'Dog',
+            'gender': 'Male',
+        })
 
         data = resp.get_json()
         assert resp.status_code == 201
@@ -139,37 +135,37 @@ class TestPetFeed:
         now = time.time()
         conn, cursor = mock_db({
             'SELECT username FROM users': [('test_patient',)],
-            'SELECT * FROM pet': [(1, 'test_patient', 'Buddy', 'Dog', 'Male',
-                                    50, 75, 60, 90, 100, 50, 'Baby', 0, now, 'None')],
-            'UPDATE pet': [],
+            'UPDATE pet': [(1, 'test_patient', 'Buddy', 'Dog', 'Male',
+                            80, 75, 60, 90, 90, 50, 'Baby', 0, now, 'None')],
         })
 
-        with patch.object(api, 'get_pet_db_connection', return_value=conn):
-            resp = client.post('/api/pet/feed', json={
-                'username': 'test_patient',
-                'cost': 10,
-            })
+        resp = client.post('/api/pet/feed', json={
+            'username': 'test_patient',
+            'cost': 10,
+        })
 
         data = resp.get_json()
         assert resp.status_code == 200
         assert data['success'] is True
         assert data['new_hunger'] == 80  # 50 + 30
         assert data['coins'] == 90  # 100 - 10
+        # One guarded UPDATE ... RETURNING, no read-modify-write
+        assert cursor._last_query.lstrip().startswith('UPDATE pet')
+        assert cursor._last_params['min_coins'] == 10 and cursor._last_params['coins'] == -10
 
     def test_feed_pet_not_enough_coins(self, client, mock_db):
         """Feeding pet without enough coins returns 400."""
         now = time.time()
         conn, cursor = mock_db({
             'SELECT username FROM users': [('test_patient',)],
-            'SELECT * FROM pet': [(1, 'test_patient', 'Buddy', 'Dog', 'Male',
+            'FROM pet WHERE username': [(1, 'test_patient', 'Buddy', 'Dog', 'Male',
                                     50, 75, 60, 90, 5, 50, 'Baby', 0, now, 'None')],
         })
 
-        with patch.object(api, 'get_pet_db_connection', return_value=conn):
-            resp = client.post('/api/pet/feed', json={
-                'username': 'test_patient',
-                'cost': 10,
-            })
+        resp = client.post('/api/pet/feed', json={
+            'username': 'test_patient',
+            'cost': 10,
+        })
 
         assert resp.status_code == 400
         assert 'coins' in resp.get_json()['error'].lower()
@@ -178,14 +174,13 @@ class TestPetFeed:
         """Feeding non-existent pet returns 404."""
         conn, cursor = mock_db({
             'SELECT username FROM users': [('test_patient',)],
-            'SELECT * FROM pet': [],
+            'FROM pet WHERE username': [],
         })
 
-        with patch.object(api, 'get_pet_db_connection', return_value=conn):
-            resp = client.post('/api/pet/feed', json={
-                'username': 'test_patient',
-                'cost': 10,
-            })
+        resp = client.post('/api/pet/feed', json={
+            'username': 'test_patient',
+            'cost': 10,
+        })
 
         assert resp.status_code == 404
 
@@ -214,3 +209,99 @@ class TestPetReward:
         })
         # Returns 200 with success=False when user not found for pet
         assert resp.status_code == 200
+
+    def test_reward_reports_evolution(self, auth_patient, mock_db):
+        """Crossing 500 XP in the update moves a Baby to Child."""
+        conn, cursor = mock_db({
+            'SELECT username FROM users': [('test_patient',)],
+            'UPDATE pet': [(1, 'test_patient', 'Buddy', 'Dog', 'Male',
+                            80, 90, 60, 90, 60, 505, 'Child', 0, time.time(), 'None')],
+        })
+        client, _ = auth_patient
+
+        data = client.post('/api/pet/reward', json={'action': 'mood'}).get_json()
+        assert data['success'] is True and data['evolved'] is True
+        assert data['new_stage'] == 'Child' and data['xp_earned'] == 15
+
+
+# ==================== ADVENTURES ====================
+
+class TestPetAdventure:
+    """Tests for POST /api/pet/adventure and /api/pet/check-return"""
+
+    ROW = (1, 'test_patient', 'Buddy', 'Dog', 'Male', 80, 75, 10, 90, 50, 100, 'Baby', 0, None, 'None')
+
+    def test_too_tired_is_distinguished_from_no_pet(self, client, mock_db):
+        mock_db({'SELECT username FROM users': [('test_patient',)], 'UPDATE pet': [],
+                 'FROM pet WHERE username': [self.ROW]})
+        resp = client.post('/api/pet/adventure', json={'username': 'test_patient'})
+        assert resp.status_code == 400 and 'tired' in resp.get_json()['error']
+
+        mock_db({'SELECT username FROM users': [('test_patient',)]})
+        assert client.post('/api/pet/adventure', json={'username': 'test_patient'}).status_code == 404
+
+    def test_check_return_before_adventure_ends_is_one_read(self, auth_patient, mock_db):
+        row = self.ROW[:12] + (time.time() + 600,) + self.ROW[13:]
+        conn, cursor = mock_db({'SELECT username FROM users': [('test_patient',)],
+                                'FROM pet WHERE username': [row]})
+        client, _ = auth_patient
+        with patch.object(api.pets, 'update_pet') as update_pet:
+            assert client.post('/api/pet/check-return', json={}).get_json() == {'returned': False}
+        assert not update_pet.called
+
+
+# ==================== LAZY DECAY (pets.py) ====================
+
+class TestPetDecay:
+    """Stats decay on read; updates fold the decay in atomically."""
+
+    ROW = (1, 'alice', 'Buddy', 'Dog', 'Male', 80, 75, 60, 15, 50, 100, 'Baby', 0, 1_000_000.0, 'None')
+
+    def test_read_applies_decay_since_last_update(self):
+        hours = 100
+        pet = api.pets.decayed(self.ROW, now=self.ROW[13] + hours * 3600)
+        assert pet[5] == 80 - 30 and pet[7] == 60 - 30  # 0.3 points per hour
+        assert pet[6] == 75  # happiness does not decay
+        assert pet[8] == 15  # already below the floor: never pushed up, never lower
+
+    def test_decay_stops_at_floor(self):
+        pet = api.pets.decayed(self.ROW, now=self.ROW[13] + 1000 * 3600)
+        assert pet[5] == pet[7] == api.pets.DECAY_FLOOR
+
+    def test_update_is_single_guarded_statement(self):
+        cur = MagicMock()
+        cur.fetchone.return_value = None
+        api.pets.update_pet(cur, 'alice', energy=-20, min_energy=20, adventure_end=123.0, now=5.0)
+        sql, params = cur.execute.call_args.args
+        sql = ' '.join(sql.split())
+        assert sql.startswith('UPDATE pet SET') and 'RETURNING id, username' in sql
+        assert "WHERE username = %(username)s AND coins >= %(min_coins)s AND GREATEST(LEAST(energy, 20)" in sql
+        # last_updated advances only by the time the folded decay accounts for
+        assert "last_updated + (FLOOR(" in sql and "::int / 3 * 3) * 3600.0 / 0.3" in sql
+        assert params['energy'] == -20 and params['adventure_end'] == 123.0 and params['now'] == 5.0
+
+    def test_frequent_updates_still_decay_hygiene(self):
+        """Touching the pet every two hours loses no hygiene decay."""
+        row, now = list(self.ROW), self.ROW[13]
+        row[8] = 80
+        for _ in range(50):
+            now += 2 * 3600
+            points = api.pets._decay_points(row[13], now)
+            folded = points // api.pets.HYGIENE_DECAY_DIVISOR * api.pets.HYGIENE_DECAY_DIVISOR
+            # What update_pet's SQL stores: the folded decay and the time it accounts for
+            row[8] = api.pets._decay(row[8], folded // api.pets.HYGIENE_DECAY_DIVISOR)
+            row[13] += folded * 3600.0 / api.pets.DECAY_PER_HOUR
+        assert api.pets.decayed(tuple(row), now)[8] == 80 - 10  # 100 hours: 30 points, a third of them
+
+    def test_update_returns_the_row_decayed_to_now(self):
+        cur = MagicMock()
+        cur.fetchone.return_value = self.ROW
+        pet = api.pets.update_pet(cur, 'alice', coins=5, now=self.ROW[13] + 100 * 3600)
+        assert pet[5] == 80 - 30 and pet[9] == 50
+
+    def test_evolution_only_on_the_crossing_update(self):
+        row = list(self.ROW)
+        row[10:12] = [510, 'Child']
+        assert api.pets.evolved(tuple(row), 15) is True
+        row[10] = 530
+        assert api.pets.evolved(tuple(row), 15) is False
@@ -0,0 +1,220 @@
+"""
+Tests for rate limit backends (rate_limit_backend.py) and api.RateLimiter.
+
+Covers: sliding-window counter decisions, wait time, cleanup (periodic job
+and in-process pruning), Postgres backend SQL/fallback, and a contention
+microbenchmark.
+"""
+
+import threading
+import time
+import pytest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import api
+import job_queue
+import rate_limit_backend
+from rate_limit_backend import (
+    InMemoryRateLimitBackend, PostgresRateLimitBackend, create_backend
+)
+
+
+class TestInMemoryBackend:
+    """Sliding-window counter semantics."""
+
+    def test_allows_up_to_limit_then_blocks(self):
+        backend = InMemoryRateLimitBackend()
+        now = 1000 * 60.0  # start of a window
+        results = [backend.hit('k', 5, 60, now=now) for _ in range(6)]
+        assert results == [True] * 5 + [False]
+
+    def test_denied_requests_are_not_counted(self):
+        backend = InMemoryRateLimitBackend()
+        now = 1000 * 60.0
+        for _ in range(10):
+            backend.hit('k', 2, 60, now=now)
+        assert backend._counters['k'][2] == 2
+
+    def test_previous_window_decays(self):
+        backend = InMemoryRateLimitBackend()
+        start = 1000 * 60.0
+        for _ in range(4):
+            assert backend.hit('k', 4, 60, now=start)
+        # Half way into the next window the previous 4 hits weigh as 2
+        assert backend.hit('k', 4, 60, now=start + 90)
+        assert backend.hit('k', 4, 60, now=start + 90)
+        assert not backend.hit('k', 4, 60, now=start + 90)
+
+    def test_window_gap_resets_counts(self):
+        backend = InMemoryRateLimitBackend()
+        start = 1000 * 60.0
+        for _ in range(3):
+            backend.hit('k', 3, 60, now=start)
+        assert not backend.hit('k', 3, 60, now=start + 1)
+        assert backend.hit('k', 3, 60, now=start + 180)
+
+    def test_keys_are_independent(self):
+        backend = InMemoryRateLimitBackend()
+        now = 1000 * 60.0
+        assert backend.hit('a', 1, 60, now=now)
+        assert not backend.hit('a', 1, 60, now=now)
+        assert backend.hit('b', 1, 60, now=now)
+
+    def test_wait_time_zero_when_allowed(self):
+        backend = InMemoryRateLimitBackend()
+        assert backend.wait_time('k', 5, 60, now=6000.0) == 0
+
+    def test_wait_time_positive_and_bounded_when_blocked(self):
+        backend = InMemoryRateLimitBackend()
+        now = 1000 * 60.0
+        for _ in range(5):
+            backend.hit('k', 5, 60, now=now)
+        wait = backend.wait_time('k', 5, 60, now=now + 10)
+        assert 0 < wait <= 120
+        # After waiting the reported time the key is usable again
+        assert backend.hit('k', 5, 60, now=now + 10 + wait)
+
+    def test_wait_time_is_read_only(self):
+        backend = InMemoryRateLimitBackend()
+        assert backend.wait_time('absent', 5, 60, now=6000.0) == 0
+        assert 'absent' not in backend._counters
+        now = 1000 * 60.0
+        for _ in range(5):
+            backend.hit('k', 5, 60, now=now)
+        before = list(backend._counters['k'])
+        assert backend.wait_time('k', 5, 60, now=now + 10) > 0
+        # The next window decays the count in the estimate but not in storage
+        assert backend.wait_time('k', 5, 60, now=now + 70) == 0
+        assert backend._counters['k'] == before
+
+    def test_cleanup_drops_stale_keys(self):
+        backend = InMemoryRateLimitBackend()
+        backend.hit('old', 5, 60, now=60.0)
+        backend.hit('new', 5, 60, now=6000.0)
+        backend.cleanup(60, now=6000.0)
+        assert 'old' not in backend._counters
+        assert 'new' in backend._counters
+
+    def test_prunes_itself_every_cleanup_interval(self):
+        backend = InMemoryRateLimitBackend()
+        backend._last_cleanup = 0.0
+        backend.hit('old', 5, 60, now=60.0)
+        assert 'old' in backend._counters
+        backend.hit('new', 5, 60, now=60.0 + rate_limit_backend.CLEANUP_INTERVAL)
+        assert 'old' not in backend._counters and 'new' in backend._counters
+
+    def test_memory_is_constant_per_key(self):
+        backend = InMemoryRateLimitBackend()
+        now = 1000 * 60.0
+        for i in range(1000):
+            backend.hit('hot', 10000, 60, now=now + i * 0.01)
+        assert len(backend) == 1
+        assert len(backend._counters['hot']) == 4
+
+
+class TestPostgresBackend:
+    """Shared backend issues one upsert per decision and degrades safely."""
+
+    def _factory(self, fetchone):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = fetchone
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+
+        @contextmanager
+        def factory():
+            yield conn
+        return factory, conn, cursor
+
+    def test_allowed_hit(self):
+        factory, conn, cursor = self._factory((1, 0))
+        backend = PostgresRateLimitBackend(factory)
+        assert backend.hit('k', 5, 60, now=6000.0) is True
+        sqls = [c[0][0] for c in cursor.execute.call_args_list]
+        assert not any('CREATE' in q for q in sqls)  # the table comes from a migration
+        assert any('ON CONFLICT (bucket_key, window_index)' in q for q in sqls)
+        assert not any('hits - 1' in q for q in sqls)
+
+    def test_denied_hit_is_rolled_back(self):
+        factory, conn, cursor = self._factory((6, 0))
+        backend = PostgresRateLimitBackend(factory)
+        assert backend.hit('k', 5, 60, now=6000.0) is False
+        assert any('hits - 1' in c[0][0] for c in cursor.execute.call_args_list)
+
+    def test_falls_back_to_memory_on_db_error(self):
+        @contextmanager
+        def broken():
+            raise RuntimeError('db down')
+            yield
+        backend = PostgresRateLimitBackend(broken)
+        assert backend.hit('k', 1, 60, now=6000.0) is True
+        assert backend.hit('k', 1, 60, now=6000.0) is False
+
+    def test_table_is_created_by_a_migration(self):
+        applied = {m.version: m for m in api.migrations.migrations()}
+        assert any('CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_counters' in sql
+                   for m in applied.values() for sql in getattr(m.apply, 'statements', []))
+
+    def test_cleanup_deletes_expired_windows(self):
+        factory, conn, cursor = self._factory(None)
+        PostgresRateLimitBackend(factory).cleanup(now=6000.0)
+        sql, params = cursor.execute.call_args[0]
+        assert sql.startswith('DELETE FROM rate_limit_counters') and params == (6000,)
+        assert conn.commit.called
+
+    def test_create_backend(self):
+        assert isinstance(create_backend('memory'), InMemoryRateLimitBackend)
+        assert isinstance(create_backend('postgres'), InMemoryRateLimitBackend)
+        assert isinstance(create_backend('postgres', MagicMock()), PostgresRateLimitBackend)
+
+
+class TestRateLimiterIntegration:
+    """api.RateLimiter keeps its public API on top of a backend."""
+
+    def test_limits_by_type(self):
+        limiter = api.RateLimiter(InMemoryRateLimitBackend())
+        allowed = [limiter.is_allowed('ip:1:login', 'login') for _ in range(6)]
+        assert allowed.count(True) == 5
+        assert limiter.get_wait_time('ip:1:login', 'login') > 0
+
+    def test_unknown_type_uses_default(self):
+        limiter = api.RateLimiter(InMemoryRateLimitBackend())
+        assert limiter.is_allowed('k', 'no_such_type')
+        limiter.cleanup()
+
+    def test_cleanup_runs_as_a_periodic_job(self):
+        spec = job_queue.get_job_type('rate_limit_cleanup')
+        assert spec.concurrency == 1 and spec.interval == rate_limit_backend.CLEANUP_INTERVAL
+        with patch.object(api.rate_limiter, 'cleanup') as cleanup:
+            spec.handler()
+        cleanup.assert_called_once_with()
+
+
+@pytest.mark.slow
+class TestRateLimiterBenchmark:
+    """Microbenchmark: decisions per second under thread contention."""
+
+    @pytest.mark.parametrize('hot_key', [True, False], ids=['one-hot-key', 'many-keys'])
+    def test_decisions_per_second_under_contention(self, hot_key):
+        backend = InMemoryRateLimitBackend()
+        threads, per_thread = 8, 5000
+        barrier = threading.Barrier(threads)
+
+        def worker(n):
+            barrier.wait()
+            for i in range(per_thread):
+                key = 'hot' if hot_key else f'user:{n}:{i % 50}'
+                backend.hit(key, 10 ** 9, 60)
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        rate = threads * per_thread / elapsed
+        print(f"\n[benchmark] {'hot key' if hot_key else 'spread keys'}: {rate:,.0f} decisions/sec")
+        assert backend._counters and rate > 10000
@@ -0,0 +1,281 @@
+"""
+Tests for incremental risk signals (risk_signals.py) and RiskScoringEngine.
+
+Covers: equivalence with the full recompute, event folding without double
+counting, keyword-change rebuilds, bounded state, fallback and a per-event
+cost benchmark.
+"""
+
+import json
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import api
+import risk_signals
+from risk_signals import IncrementalRiskEngine
+
+
+class FakeRiskDB:
+    """In-memory stand-in answering the risk scoring queries for one patient."""
+
+    def __init__(self, username='alice'):
+        self.username = username
+        self.now = datetime.now()
+        self.scales = []        # (scale_name, score, ts)
+        self.alerts = []        # ts
+        self.moods = []         # (mood_val, ts)
+        self.cbt = []           # ts
+        self.chat = []          # (sender, message, ts)
+        self.keywords = [('kill myself', 'suicide', 10), ('cut myself', 'self_harm', 8),
+                         ('hopeless', 'crisis', 6), ('drunk', 'substance', 3)]
+        self.signals = {}
+        self.queries = 0
+        self._result = []
+
+    def since(self, days):
+        return self.now - timedelta(days=days)
+
+    # cursor protocol (PostgreSQLCursorWrapper style chaining)
+    def execute(self, sql, params=None):
+        self.queries += 1
+        self._result = self._answer(' '.join(sql.split()), params)
+        return self
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return list(self._result)
+
+    def _answer(self, sql, params):
+        late = lambda ts: 2 <= ts.hour <= 4
+        user_chat = [c for c in self.chat if c[0] == 'user' and c[2] >= self.since(7)]
+        user_chat.sort(key=lambda c: c[2], reverse=True)
+        if 'SAVEPOINT' in sql:
+            return []
+        if 'FROM patient_risk_signals' in sql:
+            state = self.signals.get(params[0])
+            return [(json.loads(state),)] if state else []
+        if 'INSERT INTO patient_risk_signals' in sql:
+            self.signals[params[0]] = params[1]
+            return []
+        if 'FROM risk_keywords' in sql:
+            return list(self.keywords)
+        if 'DISTINCT ON (scale_name)' in sql:
+            out = []
+            for name in ('GAD-7', 'PHQ-9'):
+                rows = sorted([r for r in self.scales if r[0] == name], key=lambda r: r[2])
+                if rows:
+                    out.append(rows[-1])
+            return out
+        if 'FROM clinical_scales' in sql:
+            name = 'PHQ-9' if "'PHQ-9'" in sql else 'GAD-7'
+            rows = sorted([r for r in self.scales if r[0] == name], key=lambda r: r[2])
+            return [(rows[-1][1], 'x')] if rows else []
+        if 'COUNT(*) FROM alerts' in sql:
+            return [(sum(1 for t in self.alerts if t >= self.since(7)),)]
+        if 'created_at FROM alerts' in sql:
+            return [(t,) for t in self.alerts if t >= self.since(7)]
+        if 'MAX(entrestamp)' in sql:
+            return [(max((m[1] for m in self.moods), default=None),)]
+        if 'SELECT entrestamp FROM mood_logs' in sql:
+            rows = sorted(self.moods, key=lambda m: m[1])
+            return [(rows[-1][1],)] if rows else []
+        if "INTERVAL '2 days' ORDER BY entrestamp ASC" in sql:
+            return sorted([m for m in self.moods if m[1] >= self.since(2)], key=lambda m: m[1])
+        if 'COUNT(DISTINCT DATE(entrestamp))' in sql:
+            return [(len({m[1].date() for m in self.moods if m[0] <= 3 and m[1] >= self.since(7)}),)]
+        if 'mood_val, entrestamp FROM mood_logs' in sql:
+            return [m for m in self.moods if m[1] >= self.since(7)]
+        if 'COUNT(*) FROM cbt_tool_entries' in sql:
+            if 'created_at <' in sql:
+                return [(sum(1 for t in self.cbt if self.since(30) <= t < self.since(7)),)]
+            return [(sum(1 for t in self.cbt if t >= self.since(7)),)]
+        if 'created_at FROM cbt_tool_entries' in sql:
+            return [(t,) for t in self.cbt if t >= self.since(30)]
+        if 'COUNT(*) FROM chat_history' in sql:
+            return [(sum(1 for c in self.chat if late(c[2]) and c[2] >= self.since(7)),)]
+        if 'SELECT timestamp FROM chat_history' in sql:
+            return [(c[2],) for c in self.chat if late(c[2]) and c[2] >= self.since(7)]
+        if 'SELECT message, timestamp FROM chat_history' in sql:
+            return [(c[1], c[2]) for c in user_chat[:50]]
+        if 'SELECT message FROM chat_history' in sql:
+            return [(c[1],) for c in user_chat[:50]]
+        raise AssertionError(f'unexpected query: {sql}')
+
+    # helpers keeping the fake tables and the engine in step
+    def log_mood(self, engine, val, ts):
+        self.moods.append((val, ts))
+        engine.record(self, self.username, 'mood', mood_val=val, at=ts, now=self.now.timestamp())
+
+    def log_chat(self, engine, sender, message, ts):
+        self.chat.append((sender, message, ts))
+        engine.record(self, self.username, 'chat_message', sender=sender, message=message,
+                      at=ts, now=self.now.timestamp())
+
+
+def full_scores(db):
+    return api.RiskScoringEngine.calculate_full_scores(db.username, db)
+
+
+def incremental_scores(engine, db):
+    return engine.score(db, db.username, now=db.now.timestamp())
+
+
+def materialise(engine, db, minutes_ago):
+    """Build the patient's state as a score() some minutes before db.now would."""
+    engine.score(db, db.username, now=(db.now - timedelta(minutes=minutes_ago)).timestamp())
+
+
+@pytest.fixture
+def populated_db():
+    db = FakeRiskDB()
+    n = db.now
+    db.scales = [('PHQ-9', 8, n - timedelta(days=20)), ('PHQ-9', 21, n - timedelta(days=1)),
+                 ('GAD-7', 11, n - timedelta(days=3))]
+    db.alerts = [n - timedelta(days=1), n - timedelta(days=2), n - timedelta(days=9)]
+    db.moods = [(2, n - timedelta(days=d, hours=1)) for d in range(6)] + [(9, n - timedelta(days=1, hours=10))]
+    db.cbt = [n - timedelta(days=d) for d in (10, 12, 15, 40)]
+    db.chat = [('user', 'I feel hopeless and want to kill myself', n - timedelta(hours=5)),
+               ('ai', 'I am here with you', n - timedelta(hours=5)),
+               ('user', 'had a drink', n - timedelta(days=8))]
+    db.chat += [('user', 'cannot sleep', n.replace(hour=3, minute=0) - timedelta(days=d)) for d in (1, 2, 3)]
+    return db
+
+
+class TestIncrementalEquivalence:
+
+    def test_hydrated_state_matches_full_recompute(self, populated_db):
+        engine = IncrementalRiskEngine()
+        assert incremental_scores(engine, populated_db) == full_scores(populated_db)
+
+    def test_events_after_hydration_match_full_recompute(self, populated_db):
+        db = populated_db
+        engine = IncrementalRiskEngine()
+        materialise(engine, db, minutes_ago=10)
+        db.log_mood(engine, 1, db.now - timedelta(minutes=5))
+        db.log_chat(engine, 'user', 'going to cut myself tonight', db.now - timedelta(minutes=1))
+        db.scales.append(('GAD-7', 17, db.now))
+        engine.record(db, db.username, 'assessment', scale_name='GAD-7', score=17,
+                      at=db.now, now=db.now.timestamp())
+        db.alerts.append(db.now)
+        engine.record(db, db.username, 'alert', at=db.now, now=db.now.timestamp())
+
+        result = incremental_scores(engine, db)
+        assert result == full_scores(db)
+        assert 'self_harm' in result[6]
+
+    def test_chat_job_after_a_rebuild_is_not_applied_twice(self, populated_db):
+        db = populated_db
+        engine = IncrementalRiskEngine()
+        materialise(engine, db, minutes_ago=10)
+        at = db.now - timedelta(minutes=1)
+        db.chat.append(('user', 'going to cut myself tonight', at))  # turn committed, job queued
+        engine.refresh_seconds = 0
+        incremental_scores(engine, db)  # a stale read rebuilds the state, message included
+        engine.refresh_seconds = risk_signals.RISK_SIGNALS_REFRESH
+        engine.record(db, db.username, 'chat_message', sender='user', message='going to cut myself tonight',
+                      at=at, now=db.now.timestamp())
+
+        state = json.loads(db.signals[db.username])
+        assert sum(1 for m in state['messages'] if m[0] == at.timestamp()) == 1
+        assert incremental_scores(engine, db) == full_scores(db)
+
+    def test_first_event_hydrates_without_double_counting(self, populated_db):
+        db = populated_db
+        engine = IncrementalRiskEngine()
+        db.log_mood(engine, 3, db.now)  # no state yet: rebuilt from tables incl. this row
+        state = json.loads(db.signals[db.username])
+        assert len(state['moods']) == len([m for m in db.moods if m[1] >= db.since(7)])
+        assert incremental_scores(engine, db) == full_scores(db)
+
+    def test_keyword_change_triggers_rebuild(self, populated_db):
+        db = populated_db
+        engine = IncrementalRiskEngine()
+        incremental_scores(engine, db)
+        db.keywords.append(('cannot sleep', 'crisis', 7))
+        engine.invalidate_keywords()
+        assert incremental_scores(engine, db) == full_scores(db)
+        assert engine.stats['hydrations'] == 2
+
+
+class TestSignalState:
+
+    def test_message_history_is_bounded(self):
+        db = FakeRiskDB()
+        engine = IncrementalRiskEngine()
+        materialise(engine, db, minutes_ago=180)
+        for i in range(120):
+            db.log_chat(engine, 'user', f'message {i}', db.now - timedelta(minutes=120 - i))
+        state = json.loads(db.signals[db.username])
+        assert len(state['messages']) == risk_signals.MESSAGE_LIMIT
+
+    def test_windows_are_pruned(self):
+        state = risk_signals.empty_state(now=0)
+        now = 100 * risk_signals.DAY
+        risk_signals.apply_mood(state, 5, now - 10 * risk_signals.DAY)
+        risk_signals.apply_cbt_entry(state, now - 40 * risk_signals.DAY)
+        risk_signals.prune(state, now)
+        assert state['moods'] == [] and state['cbt'] == []
+        assert state['last_mood_at'] == now - 10 * risk_signals.DAY
+
+    def test_unknown_event_rejected(self, populated_db):
+        engine = IncrementalRiskEngine()
+        incremental_scores(engine, populated_db)
+        with pytest.raises(ValueError):
+            engine.record(populated_db, 'alice', 'nonsense')
+
+
+class TestRiskScoringEngineIntegration:
+
+    def test_falls_back_to_full_recompute(self, populated_db):
+        with patch.object(risk_signals.engine, 'score', side_effect=RuntimeError('no table')):
+            result = api.RiskScoringEngine.calculate_incremental_scores('alice', populated_db)
+        assert result == full_scores(populated_db)
+
+    def test_check_consistency_reports_and_repairs_drift(self, populated_db):
+        db = populated_db
+        conn = MagicMock()
+        with patch.object(api, 'get_db_connection', return_value=conn), \
+             patch.object(api, 'get_wrapped_cursor', return_value=db), \
+             patch.object(risk_signals, 'engine', IncrementalRiskEngine()):
+            assert api.RiskScoringEngine.check_consistency('alice')['consistent']
+            # An alert written without record_risk_event leaves the signals stale
+            db.alerts.append(db.now)
+            report = api.RiskScoringEngine.check_consistency('alice')
+            assert not report['consistent']
+            assert 'clinical_score' in report['mismatches']
+            assert api.RiskScoringEngine.check_consistency('alice')['consistent']
+
+    def test_record_risk_event_never_raises(self):
+        with patch.object(api, 'get_db_connection_pooled', side_effect=RuntimeError('pool down')):
+            api.record_risk_event('alice', 'mood', mood_val=5)
+
+
+@pytest.mark.slow
+class TestIncrementalCostBenchmark:
+    """Per-event cost must not grow with the patient's history."""
+
+    @pytest.mark.parametrize('history', [10, 100, 1000])
+    def test_event_cost_is_independent_of_history(self, history):
+        db = FakeRiskDB()
+        start_ts = db.now - timedelta(days=6)
+        db.moods = [(5, start_ts + timedelta(seconds=i)) for i in range(history)]
+        db.chat = [('user', f'message {i}', start_ts + timedelta(seconds=i)) for i in range(history)]
+        engine = IncrementalRiskEngine()
+        incremental_scores(engine, db)
+
+        db.queries = 0
+        start = time.perf_counter()
+        for i in range(50):
+            db.log_mood(engine, 4, db.now - timedelta(minutes=i))
+        elapsed = time.perf_counter() - start
+        per_event_queries = db.queries / 50
+        db.queries = 0
+        full_scores(db)
+        print(f"\n[benchmark] history={history}: {per_event_queries:.0f} queries/event "
+              f"({elapsed / 50 * 1000:.2f} ms), full recompute {db.queries} queries")
+        # state read + upsert; the keyword list is cached
+        assert per_event_queries == 2
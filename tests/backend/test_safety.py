@@ -727,12 +727,12 @@ class TestRiskDashboard:
         client, user = auth_clinician
         mock_conn, mock_cursor = _mock_db()
         # 1) role lookup → ('clinician',)
-        # 2-3) per-patient risk lookups → None (no assessment)
-        # 4) unreviewed count → (0,) (fetchone()[0] used)
-        mock_cursor.fetchone.side_effect = [('clinician',), None, None, (0,)] + [None] * 6
+        mock_cursor.fetchone.side_effect = [('clinician',)] + [None] * 6
         mock_cursor.fetchall.side_effect = [
             # patient_approvals query
             [('patient1', 'Patient One'), ('patient2', 'Patient Two')],
+            # caseload latest risk + unreviewed alerts (patient2 has neither)
+            [('patient1', 72, 'high', datetime(2026, 1, 5), 2)],
             # recent alerts
             [],
         ]
@@ -744,6 +744,10 @@ class TestRiskDashboard:
 
             assert resp.status_code == 200
             assert data['success'] is True
+            assert data['summary'] == {'critical': 0, 'high': 1, 'moderate': 0, 'low': 1}
+            assert data['unreviewed_alerts'] == 2
+            assert [p['username'] for p in data['patients']] == ['patient1', 'patient2']
+            assert data['patients'][1]['risk_level'] == 'low'
 
     def test_patient_cannot_access_dashboard(self, auth_patient):
         """Patient role cannot access risk dashboard."""
@@ -762,6 +766,81 @@ class TestRiskDashboard:
         assert resp.status_code == 401
 
 
+class TestCaseloadReport:
+    """GET /api/risk/report/caseload"""
+
+    def test_caseload_report_uses_single_risk_query(self, auth_clinician):
+        client, user = auth_clinician
+        mock_conn, mock_cursor = _mock_db()
+        mock_cursor.fetchone.side_effect = [('clinician',)]
+        mock_cursor.fetchall.side_effect = [
+            [('p1', 'One'), ('p2', 'Two'), ('p3', 'Three')],
+            [('p1', 90, 'critical', datetime(2026, 1, 5), 1),
+             ('p3', None, None, None, 4)],
+        ]
+
+        with patch.object(api, 'get_db_connection', return_value=mock_conn), \
+             patch.object(api, 'get_wrapped_cursor', return_value=mock_cursor):
+            resp = client.get('/api/risk/report/caseload')
+
+        assert resp.status_code == 200
+        report = resp.get_json()['report']
+        assert report['risk_distribution'] == {'critical': 1, 'high': 0, 'moderate': 0, 'low': 2}
+        assert report['total_unreviewed_alerts'] == 5
+        assert report['patients'][0]['username'] == 'p1'
+        sqls = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert sum('FROM risk_assessments' in q for q in sqls) == 1
+        assert any('DISTINCT ON (patient_username)' in q for q in sqls)
+
+
+def _caseload_cursor(n_patients):
+    """Cursor answering the caseload endpoints for n synthetic patients."""
+    patients = [(f'patient{i}', f'Patient {i}') for i in range(n_patients)]
+    risk_rows = [(u, i % 100, ('critical', 'high', 'moderate', 'low')[i % 4], datetime(2026, 1, 1), i % 3)
+                 for i, (u, _) in enumerate(patients)]
+    mock_conn, mock_cursor = _mock_db()
+
+    def execute(sql, params=None):
+        if 'SELECT role FROM users' in sql:
+            mock_cursor.fetchone.return_value = ('clinician',)
+        elif 'FROM patient_approvals' in sql:
+            mock_cursor.fetchall.return_value = patients
+        elif 'UNNEST' in sql:
+            mock_cursor.fetchall.return_value = risk_rows
+        else:
+            mock_cursor.fetchall.return_value = []
+        return mock_cursor
+
+    mock_cursor.execute.side_effect = execute
+    return mock_conn, mock_cursor
+
+
+@pytest.mark.slow
+class TestCaseloadQueryCount:
+    """Benchmark: caseload endpoints issue a constant number of queries."""
+
+    @pytest.mark.parametrize('n_patients', [10, 100, 1000])
+    @pytest.mark.parametrize('url,expected_queries', [
+        ('/api/risk/dashboard', 4),
+        ('/api/risk/report/caseload', 3),
+    ])
+    def test_query_count_is_constant(self, auth_clinician, n_patients, url, expected_queries):
+        import time
+        client, user = auth_clinician
+        mock_conn, mock_cursor = _caseload_cursor(n_patients)
+
+        with patch.object(api, 'get_db_connection', return_value=mock_conn), \
+             patch.object(api, 'get_wrapped_cursor', return_value=mock_cursor):
+            start = time.perf_counter()
+            resp = client.get(url)
+            elapsed = time.perf_counter() - start
+
+        assert resp.status_code == 200
+        print(f"\n[benchmark] {url} {n_patients} patients: "
+              f"{mock_cursor.execute.call_count} queries, {elapsed * 1000:.1f} ms")
+        assert mock_cursor.execute.call_count == expected_queries
+
+
 # ========================= PHQ-9 =========================
 
 class TestPHQ9:
@@ -0,0 +1,164 @@
+"""
+Tests for the real-time chat safety analyzer (safety_monitor.py).
+
+Covers: equivalence of the single-pass scan with per-category regex matching,
+mitigators and protective factors, escalation from history, the batch API and
+a per-message latency benchmark.
+"""
+
+import random
+import re
+import time
+import pytest
+
+import safety_monitor
+from safety_monitor import SafetyMonitor, analyze_chat_messages
+
+
+def legacy_patterns(monitor):
+    """One compiled regex per group, as the previous implementation built them."""
+    def compile_group(keywords, expand):
+        patterns = []
+        for kw in keywords:
+            if expand:
+                kw = kw.replace('[ing]*', r'(?:ing)?').replace('[ed]* ', r'(?:ed)? ')
+            patterns.append(f"\\b{kw}\\b")
+        return re.compile('|'.join(patterns), re.IGNORECASE | re.UNICODE)
+
+    groups = {('risk', c): compile_group(d['keywords'], True) for c, d in monitor.RISK_KEYWORDS.items()}
+    groups.update({('mitigator', m): compile_group(k, False) for m, k in monitor.CONTEXT_MITIGATORS.items()})
+    groups[('protective', None)] = compile_group(monitor.PROTECTIVE_FACTORS, False)
+    return groups
+
+
+def legacy_counts(monitor, text, patterns=None):
+    """Per-group findall counts using the per-group regexes."""
+    text = text.lower()
+    counts = {}
+    for group, pattern in (patterns or legacy_patterns(monitor)).items():
+        n = len(pattern.findall(text))
+        if n:
+            counts[group] = n
+    return counts
+
+
+def all_phrases(monitor):
+    phrases = []
+    for data in monitor.RISK_KEYWORDS.values():
+        for kw in data['keywords']:
+            phrases.extend(safety_monitor._expand_optional_suffixes(kw))
+    for keywords in monitor.CONTEXT_MITIGATORS.values():
+        phrases.extend(keywords)
+    phrases.extend(monitor.PROTECTIVE_FACTORS)
+    # Realise leftover 'stem[chars]*' classes as a plain word
+    return [re.sub(r'\[(\w+)\]\*', lambda m: m.group(1), p) for p in phrases]
+
+
+def random_corpus(monitor, n, seed=7):
+    rng = random.Random(seed)
+    phrases = all_phrases(monitor)
+    filler = ['i', 'feel', 'today', 'the', 'and', 'really', 'not', 'so', 'okay', 'tired',
+              'killer', 'pills', 'myself', 'self', 'harm', 'ending', 'want', 'to']
+    seps = [' ', ' ', ' ', ', ', '. ', '-', '  ', '!']
+    corpus = []
+    for _ in range(n):
+        words = []
+        for _ in range(rng.randint(1, 12)):
+            words.append(rng.choice(phrases) if rng.random() < 0.4 else rng.choice(filler))
+        text = words[0]
+        for w in words[1:]:
+            text += rng.choice(seps) + w
+        corpus.append(text.upper() if rng.random() < 0.1 else text)
+    return corpus
+
+
+@pytest.fixture(scope='module')
+def monitor():
+    return SafetyMonitor()
+
+
+class TestSinglePassScan:
+
+    def test_matches_per_group_regex_counts(self, monitor):
+        patterns = legacy_patterns(monitor)
+        for text in random_corpus(monitor, 2000):
+            assert monitor.scan(text) == legacy_counts(monitor, text, patterns), text
+
+    @pytest.mark.parametrize('text', [
+        'skill myself', 'kill myselfish', 'kill  myself', 'KILL MYSELF',
+        'i have been gathering pills', 'i researched methods', 'feeling rejected',
+        'self-harm again', 'selfharm', 'i am not going to, i promise',
+    ])
+    def test_boundaries_and_suffixes(self, monitor, text):
+        assert monitor.scan(text) == legacy_counts(monitor, text)
+
+    def test_optional_suffix_variants(self, monitor):
+        assert monitor.scan('i have been gathering pills') == monitor.scan('i gather pills')
+
+
+class TestAnalyzeMessage:
+
+    def test_mitigator_reduces_score(self, monitor):
+        plain = monitor.analyze_message('I want to kill myself')
+        helped = monitor.analyze_message('I want to kill myself, please help me')
+        assert helped['risk_score'] < plain['risk_score']
+
+    def test_protective_factors_reduce_score(self, monitor):
+        plain = monitor.analyze_message('I feel hopeless and worthless')
+        protected = monitor.analyze_message('I feel hopeless and worthless but my children need me')
+        assert protected['risk_score'] < plain['risk_score']
+
+    def test_short_and_empty_messages(self, monitor):
+        assert monitor.analyze_message('')['risk_score'] == 0
+        assert monitor.analyze_message('hi')['risk_level'] == 'green'
+
+    def test_repeated_ideation_in_history_escalates(self, monitor):
+        message = 'i feel worthless and hopeless'
+        history = [{'role': 'user', 'content': 'I want to die'},
+                   {'role': 'ai', 'content': 'I hear you'},
+                   {'role': 'user', 'content': 'I really want to die'}]
+        assert monitor.analyze_message(message, history)['risk_score'] > \
+            monitor.analyze_message(message)['risk_score']
+
+
+class TestAnalyzeBatch:
+
+    def test_batch_matches_individual_calls(self, monitor):
+        history = [{'role': 'user', 'content': 'I want to die'}] * 3
+        messages = random_corpus(monitor, 200, seed=11)
+        batch = monitor.analyze_batch(messages, history)
+        assert batch == [monitor.analyze_message(m, history) for m in messages]
+
+    def test_per_item_history(self, monitor):
+        history = [{'role': 'user', 'content': 'I want to die'}] * 2
+        results = analyze_chat_messages([('i feel hopeless', history), 'i feel hopeless'])
+        assert results[0]['risk_score'] > results[1]['risk_score']
+
+
+@pytest.mark.slow
+class TestSafetyMonitorBenchmark:
+    """Per-message latency of the single-pass scan vs per-group regex matching."""
+
+    def test_latency_percentiles(self, monitor):
+        corpus = random_corpus(monitor, 5000, seed=3)
+
+        def timings(fn):
+            out = []
+            for text in corpus:
+                start = time.perf_counter()
+                fn(text)
+                out.append(time.perf_counter() - start)
+            out.sort()
+            return out[len(out) // 2] * 1e6, out[int(len(out) * 0.99)] * 1e6
+
+        patterns = legacy_patterns(monitor)
+        legacy_p50, legacy_p99 = timings(lambda text: legacy_counts(monitor, text, patterns))
+        p50, p99 = timings(monitor.analyze_message)
+        print(f"\n[benchmark] {len(corpus)} messages: per-group regex p50 {legacy_p50:.0f} us "
+              f"p99 {legacy_p99:.0f} us; analyze_message p50 {p50:.0f} us p99 {p99:.0f} us")
+
+        start = time.perf_counter()
+        monitor.analyze_batch(corpus)
+        batch = time.perf_counter() - start
+        print(f"[benchmark] analyze_batch: {batch / len(corpus) * 1e6:.0f} us/message")
+        assert p99 < 10000  # documented budget: <10ms per message
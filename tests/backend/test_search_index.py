@@ -0,0 +1,276 @@
+"""
+Tests for full-text search (search_index.py) and the search endpoints.
+
+Covers: blind-index tokens for encrypted names, tsvector schema and
+triggers, ranked keyset pages, the username/name match used by the patient
+and recipient searches, the backfill job and a 1M-message benchmark against
+a real Postgres (SEARCH_BENCHMARK_DATABASE_URL).
+"""
+
+import os
+import time
+import pytest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import api
+import search_index
+from message_service import MessageService
+
+
+class RecordingCursor:
+    """Returns scripted result sets in order and records every statement."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        self.calls.append((sql, params))
+        self._rows = self.results.pop(0) if self.results else []
+        self.rowcount = len(self._rows) if isinstance(self._rows, list) else self._rows
+        return self
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+@pytest.fixture(autouse=True)
+def blind_key():
+    with patch.object(search_index, 'SEARCH_BLIND_INDEX_KEY', 'test-blind-index-key'), \
+         patch.object(search_index, '_key', None):
+        yield
+
+
+class TestBlindIndex:
+
+    def test_query_words_match_name_prefixes(self):
+        tokens = set(search_index.name_tokens('Zoë Ellis-Hart', 'zoe.hart@example.org'))
+        for query in ('zoe', 'ZO', 'Ellis', 'hart', 'zoe hart', 'zoe.hart@example.org'):
+            assert set(search_index.query_tokens(query)) <= tokens, query
+        assert not set(search_index.query_tokens('zoe smith')) <= tokens
+        assert not set(search_index.query_tokens('other@example.org')) <= tokens
+
+    def test_tokens_do_not_contain_plaintext(self):
+        tokens = search_index.name_tokens('Alice Walker')
+        assert all(len(t) == 32 and 'alice' not in t for t in tokens)
+
+    def test_tokens_depend_on_key(self):
+        first = search_index.name_tokens('Alice Walker')
+        with patch.object(search_index, 'SEARCH_BLIND_INDEX_KEY', 'another-key'), \
+             patch.object(search_index, '_key', None):
+            assert not set(first) & set(search_index.name_tokens('Alice Walker'))
+
+    def test_missing_key_leaves_names_unindexed(self):
+        def invalid_key():
+            raise ValueError('Invalid ENCRYPTION_KEY format')
+
+        with patch.object(search_index, 'SEARCH_BLIND_INDEX_KEY', ''), \
+             patch.object(search_index, '_key_provider', invalid_key):
+            assert search_index.name_tokens('Alice') is None
+            cur = RecordingCursor()
+            search_index.set_name_tokens(cur, 'alice', 'Alice')
+            assert cur.calls == []
+            assert search_index.user_match('alice') == ("u.username ILIKE %s", ['%alice%'])
+
+    def test_unset_key_leaves_names_unindexed_and_warns_once(self, caplog):
+        with patch.object(search_index, 'SEARCH_BLIND_INDEX_KEY', ''), \
+             patch.object(search_index, '_key_provider', None), \
+             patch.object(search_index, '_warned', False):
+            assert search_index.name_tokens('Alice') is None
+            assert search_index.query_tokens('alice') == []
+            assert search_index.name_tokens('Bob') is None
+        assert [r.message for r in caplog.records].count(
+            "SEARCH_BLIND_INDEX_KEY is not set: names are not indexed, name search is limited to usernames") == 1
+
+    def test_user_match_escapes_like_wildcards(self):
+        sql, params = search_index.user_match('50%_off')
+        assert sql == "(u.username ILIKE %s OR u.name_search_tokens @> %s::text[])"
+        assert params[0] == '%50\\%\\_off%'
+        assert params[1] == search_index.query_tokens('50%_off')
+
+
+class TestSchema:
+
+    def test_each_table_gets_trigger_and_gin_index(self):
+        sql = '\n'.join(' '.join(s.split()) for s in search_index.schema_sqls())
+        for table in ('messages', 'chat_history', 'community_posts'):
+            assert f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector" in sql
+            assert f"CREATE TRIGGER {table}_search_vector" in sql
+            assert f"ON {table} USING GIN (search_vector)" in sql
+        assert "BEFORE INSERT OR UPDATE OF subject, content ON messages" in sql
+        assert "USING GIN (username gin_trgm_ops)" in sql
+        assert "USING GIN (name_search_tokens)" in sql
+
+    def test_document_weights_subject_above_content(self):
+        doc = search_index.document_sql(search_index.SEARCH_TABLES['messages'], 'NEW.')
+        assert "coalesce(NEW.subject, '')), 'A')" in doc and "coalesce(NEW.content, '')), 'B')" in doc
+
+
+class TestRankedSearch:
+
+    def test_ranked_page_and_keyset(self):
+        rows = [(9, 1, 'bob', 'alice', None, 'panic attack at work', None, 0, 0.9),
+                (4, 1, 'alice', 'bob', None, 'another panic attack', None, 1, 0.5),
+                (2, 1, 'bob', 'alice', None, 'panic', None, 1, 0.1)]
+        cur = RecordingCursor(rows)
+        page, has_more, next_after = search_index.search_messages(cur, 'alice', 'panic attack', limit=2)
+        assert [r[0] for r in page] == [9, 4] and has_more and next_after == (0.5, 4)
+        sql, params = cur.calls[0]
+        assert 'search_vector @@ q' in sql and 'ILIKE' not in sql
+        assert "websearch_to_tsquery('english', %s)" in sql
+        assert params == ('panic attack', 'alice', 'alice', 3)
+
+        search_index.search_messages(cur, 'alice', 'panic attack', limit=2, after=next_after)
+        sql, params = cur.calls[1]
+        assert 'WHERE (rank, id) < (%s, %s)' in sql
+        assert params[-3:] == (0.5, 4, 3)
+
+    def test_message_service_uses_the_index(self):
+        row = (9, 3, 'bob', 'alice', 'Hi', 'x' * 300, '2026-03-01T09:00:00', 0, 0.7)
+        cur = RecordingCursor([row])
+        result = MessageService(None, cur, 'alice').search_messages('panic')
+        assert result['count'] == 1 and result['has_more'] is False
+        assert result['results'][0]['content'].endswith('...') and result['results'][0]['rank'] == 0.7
+        assert 'search_vector @@ q' in cur.calls[0][0]
+
+    def test_community_search_endpoint_returns_cursor(self, client):
+        rows = [(i, 'alice', f'post {i}', 2, '2026-03-01T09:00:00', 'anxiety', 0, 1.0 - i / 10) for i in range(1, 4)]
+        cur = RecordingCursor(rows)
+        with patch.object(api, 'get_db_connection'), patch.object(api, 'get_wrapped_cursor', return_value=cur):
+            data = client.get('/api/community/search?q=breathing&category=anxiety&limit=2').get_json()
+        assert [p['id'] for p in data['posts']] == [1, 2]
+        assert data['has_more'] is True
+        assert api.decode_page_cursor(data['next_cursor'], 'number', 'int') == [0.8, 2]
+        assert cur.calls[0][1][:2] == ('breathing', 'anxiety')
+
+    def test_short_query_rejected(self, client):
+        assert client.get('/api/community/search?q=a').status_code == 400
+
+
+class TestBackfill:
+
+    def test_fills_in_batches_until_done(self):
+        users = [('alice', 'gAAAAencrypted', 'alice@example.org'), ('bob', None, None)]
+        cur = RecordingCursor(2, 1, 0, 0, users, [])
+        written = []
+
+        class Conn:
+            def cursor(self):
+                return cur
+
+            def commit(self):
+                pass
+
+        @contextmanager
+        def factory():
+            yield Conn()
+
+        def fake_execute_values(cur, sql, rows, template=None):
+            written.extend(rows)
+
+        with patch.object(search_index, 'execute_values', side_effect=fake_execute_values):
+            filled = search_index.backfill(factory, decrypt=lambda vals: ['Alice Walker' if v == 'gAAAAencrypted' else v for v in vals],
+                                           batch_size=2)
+        assert filled == {'messages': 3, 'chat_history': 0, 'community_posts': 0, 'users': 2}
+        assert written[0] == ('alice', search_index.name_tokens('Alice Walker', 'alice@example.org'))
+        assert written[1] == ('bob', [])
+
+
+@pytest.mark.slow
+class TestSearchBenchmark:
+    """Compares ILIKE and tsvector search over 1M generated messages.
+
+    Needs a scratch Postgres: set SEARCH_BENCHMARK_DATABASE_URL (the
+    benchmark works in its own schema and drops it afterwards).
+    """
+
+    ROWS = 1_000_000
+
+    def test_tsvector_beats_ilike_at_1m_messages(self):
+        dsn = os.environ.get('SEARCH_BENCHMARK_DATABASE_URL')
+        if not dsn:
+            pytest.skip('SEARCH_BENCHMARK_DATABASE_URL not set')
+        import psycopg2
+
+        conn = psycopg2.connect(dsn)
+        cur = conn.cursor()
+        try:
+            cur.execute("DROP SCHEMA IF EXISTS search_bench CASCADE; CREATE SCHEMA search_bench; SET search_path = search_bench")
+            cur.execute("""
+                CREATE TABLE messages (id SERIAL PRIMARY KEY, conversation_id INTEGER, sender_username TEXT,
+                    recipient_username TEXT, subject TEXT, content TEXT, sent_at TIMESTAMP, is_read INTEGER,
+                    deleted_at TIMESTAMP, delivery_status TEXT)
+            """)
+            cur.execute("""
+                INSERT INTO messages (conversation_id, sender_username, recipient_username, subject, content, sent_at, is_read)
+                SELECT g % 5000, 'user' || (g % 2000), 'user' || ((g + 1) % 2000), NULL,
+                       (ARRAY['feeling calm today', 'slept badly again', 'panic attack at work',
+                              'great session with my therapist', 'struggling with motivation'])[1 + g % 5]
+                       || ' note ' || g,
+                       TIMESTAMP '2026-01-01' + g * INTERVAL '1 second', 0
+                FROM generate_series(1, %s) g
+            """, (self.ROWS,))
+            conn.commit()
+            sqls = search_index.schema_sqls()
+            for sql in (sqls[0], sqls[3]):  # messages column and GIN index (rows are filled below)
+                cur.execute(sql)
+            cur.execute(f"UPDATE messages SET search_vector = {search_index.document_sql(search_index.SEARCH_TABLES['messages'])}")
+            cur.execute("CREATE INDEX ON messages (sender_username); CREATE INDEX ON messages (recipient_username); ANALYZE messages")
+            conn.commit()
+
+            def timed(fn, repeat=5):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    fn()
+                return (time.perf_counter() - start) / repeat
+
+            def ilike():
+                cur.execute("""
+                    SELECT id FROM messages WHERE (content ILIKE %s OR subject ILIKE %s)
+                    AND deleted_at IS NULL ORDER BY sent_at DESC LIMIT 50
+                """, ('%panic attack%', '%panic attack%'))
+                return cur.fetchall()
+
+            def ranked():
+                return search_index._ranked_page(cur, 'messages', 't.id', 't.deleted_at IS NULL', (),
+                                                 'panic attack', 50, None)[0]
+
+            def ilike_user():
+                cur.execute("""
+                    SELECT id FROM messages WHERE (sender_username = %s OR recipient_username = %s)
+                    AND deleted_at IS NULL AND (content ILIKE %s OR subject ILIKE %s)
+                    ORDER BY sent_at DESC LIMIT 50
+                """, ('user7', 'user7', '%panic attack%', '%panic attack%'))
+                return cur.fetchall()
+
+            def ranked_user():
+                return search_index.search_messages(cur, 'user7', 'panic attack', 50)[0]
+
+            # A rare term shows the index at its best; a common one bounds the ranking cost
+            def rare_ilike():
+                cur.execute("SELECT id FROM messages WHERE content ILIKE %s LIMIT 50", ('%note 123457 %',))
+                return cur.fetchall()
+
+            def rare_ranked():
+                return search_index._ranked_page(cur, 'messages', 't.id', 'TRUE', (), '"note 123457"', 50, None)[0]
+
+            results = {name: timed(fn) for name, fn in [
+                ('ilike (common term)', ilike), ('tsvector (common term)', ranked),
+                ('ilike (one user)', ilike_user), ('tsvector (one user)', ranked_user),
+                ('ilike (rare term)', rare_ilike), ('tsvector (rare term)', rare_ranked)]}
+            for name, seconds in results.items():
+                print(f"\n[benchmark] {self.ROWS} messages, {name}: {seconds * 1000:.1f} ms")
+            assert rare_ranked() and results['tsvector (rare term)'] < results['ilike (rare term)'] / 10
+            assert results['tsvector (one user)'] < results['ilike (one user)']
+        finally:
+            conn.rollback()
+            cur.execute("DROP SCHEMA IF EXISTS search_bench CASCADE")
+            conn.commit()
+            conn.close()
@@ -0,0 +1,204 @@
+"""
+Tests for the production server configuration (gunicorn.conf.py), fork-safe
+pool handling in api.py and the chat load-test harness (loadtest.py).
+
+Covers: worker/thread sizing from cores and pool limits, cooperative worker
+patching, closing the master's pool before fork and re-creating it per pid,
+and concurrent throughput against the fake LLM backend.
+"""
+
+import os
+import runpy
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+import api
+import llm_client
+import loadtest
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'gunicorn.conf.py')
+
+
+def load_config(**env):
+    keys = ['GUNICORN_WORKER_CLASS', 'WEB_CONCURRENCY', 'GUNICORN_THREADS', 'GUNICORN_WORKER_CONNECTIONS',
+            'DB_POOL_MAX', 'DB_POOL_HEADROOM', 'DB_POOL_REQUEST_RESERVE', 'WEB_DB_CONNECTIONS', 'JOB_WORKER_THREADS', 'RISK_ANALYSIS_WORKERS']
+    clean = {k: v for k, v in os.environ.items() if k not in keys}
+    with patch.dict(os.environ, {**clean, **env}, clear=True):
+        return runpy.run_path(CONFIG_PATH)
+
+
+class TestSizing:
+
+    def test_workers_fit_the_connection_budget(self):
+        default_workers = load_config()['default_workers']
+        assert default_workers(1, pool_max=20, budget=80) == 3
+        assert default_workers(2, pool_max=20, budget=80) == 4
+        assert default_workers(16, pool_max=20, budget=80) == 4
+        assert default_workers(16, pool_max=10, budget=400) == 33
+        assert default_workers(4, pool_max=200, budget=80) == 1
+
+    def test_threads_leave_pool_headroom_for_background_threads(self):
+        config = load_config(DB_POOL_MAX='20', WEB_CONCURRENCY='2')
+        assert config['worker_class'] == 'gthread'
+        # audit writer + 2 job threads + 4 risk-analysis workers
+        assert config['DB_POOL_HEADROOM'] == 7
+        # ... and 2 kept for requests nesting a pooled connection inside their own
+        assert config['DB_POOL_REQUEST_RESERVE'] == 2
+        assert config['workers'] == 2 and config['threads'] == 11 and config['worker_connections'] == 11
+        assert config['preload_app'] is True and config['timeout'] >= 60
+        assert load_config(DB_POOL_MAX='12', RISK_ANALYSIS_WORKERS='1')['threads'] == 6
+        assert load_config(DB_POOL_MAX='12', DB_POOL_REQUEST_RESERVE='0')['threads'] == 5
+        assert load_config(DB_POOL_MAX='4')['threads'] == 1
+
+    def test_sync_and_overrides(self):
+        assert load_config(GUNICORN_WORKER_CLASS='sync')['threads'] == 1
+        assert load_config(GUNICORN_THREADS='4')['threads'] == 4
+
+    def test_cooperative_worker_patches_before_app_import(self):
+        with patch.dict(os.environ, {'GUNICORN_WORKER_CLASS': 'gthread'}):
+            config = runpy.run_path(CONFIG_PATH)
+        monkey = MagicMock()
+        with patch.dict('sys.modules', {'gevent': MagicMock(monkey=monkey), 'gevent.monkey': monkey,
+                                        'gevent.socket': MagicMock()}), \
+             patch('psycopg2.extensions.set_wait_callback') as set_wait_callback:
+            assert config['patch_for']('gevent') is True
+        assert monkey.patch_all.called and set_wait_callback.called
+        assert config['patch_for']('gthread') is False
+
+    def test_green_wait_callback_polls_until_ready(self):
+        from psycopg2 import extensions
+
+        with patch.dict(os.environ, {'GUNICORN_WORKER_CLASS': 'gthread'}):
+            config = runpy.run_path(CONFIG_PATH)
+        waits = []
+        fake_socket = MagicMock(wait_read=lambda fd, timeout=None: waits.append(('read', fd)),
+                                wait_write=lambda fd, timeout=None: waits.append(('write', fd)))
+        with patch.dict('sys.modules', {'gevent': MagicMock(socket=fake_socket), 'gevent.socket': fake_socket}), \
+             patch('psycopg2.extensions.set_wait_callback') as set_wait_callback:
+            config['make_psycopg_green']('gevent')
+        callback = set_wait_callback.call_args.args[0]
+        conn = MagicMock()
+        conn.fileno.return_value = 7
+        conn.poll.side_effect = [extensions.POLL_WRITE, extensions.POLL_READ, extensions.POLL_OK]
+        callback(conn)
+        assert waits == [('write', 7), ('read', 7)]
+
+
+class TestForkSafety:
+
+    @pytest.fixture
+    def pool_state(self):
+        with patch.object(api, '_db_pool', None), patch.object(api, '_db_pool_pid', None), \
+             patch.object(api, '_inherited_pools', []):
+            yield
+
+    def test_pool_recreated_in_forked_child(self, pool_state):
+        inherited = MagicMock()
+        api._db_pool, api._db_pool_pid = inherited, os.getpid() + 1
+        with patch.object(api, 'BlockingConnectionPool') as pool_cls:
+            assert api._get_db_pool() is pool_cls.return_value
+            assert api._get_db_pool() is pool_cls.return_value
+        assert pool_cls.call_count == 1
+        # The parent's connections are left alone, not closed from the child
+        assert not inherited.closeall.called and api._inherited_pools == [inherited]
+
+    def test_pre_fork_closes_master_pool(self, pool_state):
+        master = MagicMock()
+        api._db_pool, api._db_pool_pid = master, os.getpid()
+        load_config()['pre_fork'](MagicMock(), MagicMock())
+        assert master.closeall.called and api._db_pool is None
+
+    def test_pool_size_from_env(self, pool_state):
+        with patch.object(api, 'DB_POOL_MIN', 1), patch.object(api, 'DB_POOL_MAX', 7), \
+             patch.object(api, 'BlockingConnectionPool') as pool_cls:
+            api._get_db_pool()
+        assert pool_cls.call_args.kwargs['minconn'] == 1 and pool_cls.call_args.kwargs['maxconn'] == 7
+
+    def test_empty_pool_waits_for_a_returned_connection(self):
+        with patch('psycopg2.pool.psycopg2.connect', side_effect=lambda *a, **k: MagicMock(closed=False)):
+            blocking = api.BlockingConnectionPool(1, 2, timeout=2)
+            held = [blocking.getconn(), blocking.getconn()]
+            threading.Timer(0.1, blocking.putconn, args=(held[0],)).start()
+            started = time.perf_counter()
+            assert blocking.getconn() is held[0]
+            assert 0.05 < time.perf_counter() - started < 1.5
+
+            blocking._timeout = 0.05
+            with pytest.raises(api.pool.PoolError):
+                blocking.getconn()
+            # A timed-out checkout does not use up a slot
+            blocking.putconn(held[1])
+            assert blocking.getconn() is held[1]
+
+    def test_rejected_putconn_still_frees_its_slot(self):
+        with patch('psycopg2.pool.psycopg2.connect', side_effect=lambda *a, **k: MagicMock(closed=False)):
+            blocking = api.BlockingConnectionPool(1, 2, timeout=0.05)
+            held = [blocking.getconn(), blocking.getconn()]
+            blocking.closeall()  # close_db_pool() while both were checked out
+            for conn in held:
+                with pytest.raises(api.pool.PoolError):
+                    blocking.putconn(conn)
+            assert blocking._slots._value == 2
+
+    def test_repeat_calls_in_a_request_reuse_its_connection(self):
+        held = MagicMock(closed=False)
+        pool_instance = MagicMock()
+        pool_instance.getconn.return_value = held
+        with patch.object(api, '_get_db_pool', return_value=pool_instance), api.app.test_request_context('/'):
+            assert api.get_db_connection() is held
+            assert api.get_db_connection() is held
+            assert pool_instance.getconn.call_count == 1 and not pool_instance.putconn.called
+            # An endpoint that closed its connection gets a fresh one; the dead slot goes back
+            held.closed = True
+            fresh = MagicMock(closed=False)
+            pool_instance.getconn.return_value = fresh
+            assert api.get_db_connection() is fresh
+            pool_instance.putconn.assert_called_once_with(held, close=True)
+            api.g._db_conn_pool = None
+
+    def test_second_call_does_not_wait_on_a_saturated_pool(self):
+        with patch('psycopg2.pool.psycopg2.connect', side_effect=lambda *a, **k: MagicMock(closed=False)):
+            saturated = api.BlockingConnectionPool(1, 1, timeout=2)
+        with patch.object(api, '_get_db_pool', return_value=saturated), api.app.test_request_context('/'):
+            conn = api.get_db_connection()
+            started = time.perf_counter()
+            assert api.get_db_connection() is conn
+            assert time.perf_counter() - started < 0.5
+            api.g._db_conn_pool = None
+
+
+class TestLoadHarness:
+
+    @pytest.fixture
+    def fake_llm(self):
+        server, url = loadtest.start_fake_llm(latency=0.2)
+        yield server, url
+        server.shutdown()
+
+    def test_fake_backend_speaks_chat_completions(self, fake_llm):
+        server, url = fake_llm
+        client = llm_client.LLMClient(max_retries=0)
+        assert client.chat_completion(url, 'key', [{'role': 'user', 'content': 'hi'}]) == loadtest.FAKE_REPLY
+        assert client.last_usage()['completion_tokens'] == 20
+        streamed = requests.post(url, json={'stream': True}, stream=True)
+        assert streamed.headers['Content-Type'] == 'text/event-stream'
+        assert streamed.text.rstrip().endswith('data: [DONE]')
+
+    def test_run_load_measures_concurrency(self, fake_llm):
+        server, url = fake_llm
+        stats = loadtest.run_load(lambda: requests.post(url, json={}).status_code, total=10, concurrency=10)
+        assert stats['ok'] == 10 and stats['statuses'] == {200: 10}
+        # Ten 0.2s completions in parallel, not 2s back to back
+        assert stats['elapsed_s'] < 1.5 and stats['throughput_rps'] > 5
+        assert server.calls == 10
+
+    def test_run_load_reports_errors(self):
+        def flaky():
+            raise requests.ConnectionError('refused')
+        stats = loadtest.run_load(flaky, total=3, concurrency=2)
+        assert stats['ok'] == 0 and stats['statuses'] == {'ConnectionError': 3}
+        assert stats['latency_p50_s'] is None
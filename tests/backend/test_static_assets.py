@@ -0,0 +1,144 @@
+"""
+Tests for the pre-rendered index shell and hashed static files (static_assets.py).
+
+Covers: precompressed variants and Accept-Encoding negotiation, strong ETags
+and 304 revalidation, immutable content-hashed URLs, stale hashes served
+briefly cached, rejection of unknown files, and re-hashing in reload mode
+when files change.
+"""
+
+import gzip
+import os
+import re
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+from werkzeug.datastructures import Accept
+
+import static_assets
+from static_assets import Asset
+
+
+def dist_urls(html):
+    return re.findall(r'/static/dist/[^"\']+', html)
+
+
+class TestShell:
+
+    def test_index_is_precompressed_and_revalidated(self, client):
+        resp = client.get('/', headers={'Accept-Encoding': 'gzip, deflate'})
+        assert resp.status_code == 200
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert resp.headers['Cache-Control'] == 'no-cache'
+        assert 'Accept-Encoding' in resp.headers['Vary']
+        html = gzip.decompress(resp.data).decode('utf-8')
+        assert html.startswith('<!DOCTYPE html>') and '<style>' not in html
+
+        again = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': resp.headers['ETag']})
+        assert again.status_code == 304 and again.data == b''
+        assert again.headers['ETag'] == resp.headers['ETag']
+
+    def test_identity_when_client_does_not_compress(self, client):
+        resp = client.get('/')
+        assert 'Content-Encoding' not in resp.headers
+        assert '<!DOCTYPE html>' in resp.get_data(as_text=True)
+        # Same content, so the gzip tag a browser holds still validates it
+        gzip_tag = client.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+        assert resp.headers['ETag'] != gzip_tag
+        assert client.get('/', headers={'If-None-Match': gzip_tag}).status_code == 304
+
+    def test_changed_etag_gets_full_body(self, client):
+        resp = client.get('/', headers={'If-None-Match': '"0123456789abcdef"'})
+        assert resp.status_code == 200 and resp.data
+
+
+class TestHashedAssets:
+
+    def test_index_links_hashed_immutable_assets(self, client):
+        urls = dist_urls(client.get('/').get_data(as_text=True))
+        assert '/static/dist/js/app.' in ' '.join(urls) and '/static/dist/css/app.' in ' '.join(urls)
+        for url in urls:
+            resp = client.get(url, headers={'Accept-Encoding': 'gzip'})
+            assert resp.status_code == 200, url
+            assert resp.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+            assert resp.headers['Content-Encoding'] == 'gzip'
+
+    def test_hash_is_content_digest(self, client):
+        url = next(u for u in dist_urls(client.get('/').get_data(as_text=True)) if '/js/app.' in u)
+        with open(os.path.join('static', 'js', 'app.js'), 'rb') as f:
+            body = f.read()
+        assert client.get(url).data == body
+        assert url == '/static/dist/' + static_assets.hashed_name('js/app.js', Asset(body, 'text/javascript').digest)
+
+    def test_stale_hash_gets_current_file_briefly_cached(self, client):
+        """A shell from the previous build still loads its JS and CSS."""
+        current = next(u for u in dist_urls(client.get('/').get_data(as_text=True)) if '/js/app.' in u)
+        resp = client.get('/static/dist/js/app.000000000000.js')
+        assert resp.status_code == 200 and resp.data == client.get(current).data
+        assert resp.headers['Cache-Control'] == 'public, max-age=60'
+
+    @pytest.mark.parametrize('path', [
+        '/static/dist/js/app.js',
+        '/static/dist/js/missing.0123456789ab.js',
+        '/static/dist/..%2Fapi.0123456789ab.py',
+    ])
+    def test_unknown_file_is_404(self, client, path):
+        assert client.get(path).status_code == 404
+
+
+class TestEncodings:
+
+    def test_brotli_preferred_when_installed(self):
+        fake_brotli = MagicMock()
+        fake_brotli.compress.side_effect = lambda body, quality: b'br' + body[:10]
+        with patch.object(static_assets, 'brotli', fake_brotli):
+            asset = Asset(b'body { color: red; }' * 100, 'text/css')
+        assert set(asset.variants) == {'identity', 'gzip', 'br'}
+        assert asset.negotiate(Accept([('gzip', 1), ('br', 1)])) == 'br'
+        assert asset.negotiate(Accept([('gzip', 1), ('br', 0)])) == 'gzip'
+        assert asset.negotiate(Accept([('*', 1)])) == 'br'
+        assert len(set(asset.etags.values())) == 3
+
+    def test_without_brotli_gzip_is_used(self):
+        with patch.object(static_assets, 'brotli', None):
+            asset = Asset(b'x' * 1000, 'text/plain')
+        assert set(asset.variants) == {'identity', 'gzip'}
+        assert asset.negotiate(Accept([('br', 1)])) == 'identity'
+
+    def test_tiny_bodies_are_not_compressed(self):
+        asset = Asset(b'ok', 'text/plain')
+        assert set(asset.variants) == {'identity'}
+
+
+class TestReload:
+
+    @pytest.fixture
+    def app(self, tmp_path):
+        (tmp_path / 'js').mkdir()
+        (tmp_path / 'js' / 'page.js').write_text('console.log(1);')
+        (tmp_path / 'page.html').write_text("<script src=\"{{ asset_url('js/page.js') }}\"></script>")
+        app = Flask(__name__, static_folder=str(tmp_path), template_folder=str(tmp_path))
+        app.add_template_global(static_assets.asset_url, 'asset_url')
+        with patch.dict(static_assets._assets, clear=True), patch.dict(static_assets._shells, clear=True), \
+             app.test_request_context('/'):
+            yield app, tmp_path
+
+    def test_shell_rendered_once(self, app):
+        with patch.object(static_assets, 'STATIC_ASSETS_RELOAD', False), \
+             patch.object(static_assets, 'render_template', wraps=static_assets.render_template) as render:
+            static_assets.serve_template('page.html')
+            static_assets.serve_template('page.html')
+        assert render.call_count == 1
+
+    def test_edited_asset_gets_new_url(self, app):
+        _, folder = app
+        with patch.object(static_assets, 'STATIC_ASSETS_RELOAD', True):
+            first = static_assets.serve_template('page.html').get_data(as_text=True)
+            script = folder / 'js' / 'page.js'
+            script.write_text('console.log(2);')
+            os.utime(script, (time.time() + 5, time.time() + 5))
+            second = static_assets.serve_template('page.html').get_data(as_text=True)
+        assert dist_urls(first) != dist_urls(second)
+        assert static_assets.serve_hashed(dist_urls(second)[0][len('/static/dist/'):]).status_code == 200
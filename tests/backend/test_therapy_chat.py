@@ -2,7 +2,7 @@
 Tests for Therapy Chat, Chat History, Chat Sessions, and Chat Export endpoints.
 
 Covers:
-  - POST /api/therapy/chat
+  - POST /api/therapy/chat (JSON and SSE streaming modes)
   - GET  /api/therapy/history
   - GET  /api/therapy/sessions
   - POST /api/therapy/sessions
@@ -10,7 +10,10 @@ Covers:
 """
 
 import json
+import threading
+import time
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 
@@ -26,9 +29,7 @@ class TestTherapyChat:
     def test_chat_success(self, client, mock_db):
         """Valid chat message returns AI response."""
         conn, cursor = mock_db({
-            'SELECT id FROM chat_sessions': [(1,)],
-            'SELECT sender, message FROM chat_history': [],
-            'SELECT memory_summary FROM ai_memory': None,
+            'WITH active_chat_session': [(1, [], None, {}, [])],
             'SELECT keyword, category, severity_weight FROM risk_keywords': [],
             'INSERT INTO chat_history': [],
         })
@@ -76,9 +77,7 @@ class TestTherapyChat:
     def test_chat_input_validation_xss(self, client, mock_db):
         """Script tags in message are handled by input validation."""
         conn, cursor = mock_db({
-            'SELECT id FROM chat_sessions': [(1,)],
-            'SELECT sender, message FROM chat_history': [],
-            'SELECT memory_summary FROM ai_memory': None,
+            'WITH active_chat_session': [(1, [], None, {}, [])],
             'SELECT keyword, category, severity_weight FROM risk_keywords': [],
         })
 
@@ -101,10 +100,8 @@ class TestTherapyChat:
     def test_chat_creates_session_if_none(self, client, mock_db):
         """If no active session exists, one is created."""
         conn, cursor = mock_db({
-            'SELECT id FROM chat_sessions': [],  # no session
+            'WITH active_chat_session': [(None, [], None, None, [])],  # no session
             'INSERT INTO chat_sessions': [(99,)],  # RETURNING id
-            'SELECT sender, message FROM chat_history': [],
-            'SELECT memory_summary FROM ai_memory': None,
             'SELECT keyword, category, severity_weight FROM risk_keywords': [],
         })
 
@@ -124,6 +121,265 @@ class TestTherapyChat:
         assert resp.status_code in (200, 500)
 
 
+def parse_sse(body):
+    """Split an SSE body into [(event, payload)]."""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+CHAT_DB = {
+    'WITH active_chat_session': [(1, [], None, {}, [])],
+    'SELECT keyword, category, severity_weight FROM risk_keywords': [],
+}
+
+
+class TestTherapyChatStreaming:
+    """POST /api/therapy/chat with stream=true relays tokens over SSE."""
+
+    def _post(self, client, mock_ai, complete):
+        with patch.object(api, 'update_ai_memory'), \
+             patch.object(api, 'TherapistAI', return_value=mock_ai), \
+             patch.object(api, 'get_user_ai_memory', return_value=None), \
+             patch.object(api, '_complete_therapy_chat', complete), \
+             patch.object(api, 'log_event'):
+            resp = client.post('/api/therapy/chat', json={
+                'username': 'test_patient',
+                'message': 'I feel anxious today',
+                'stream': True,
+            })
+            body = resp.get_data(as_text=True)
+        return resp, body
+
+    def test_tokens_then_done(self, client, mock_db):
+        mock_db(CHAT_DB)
+        mock_ai = MagicMock()
+        mock_ai.stream_response.return_value = iter(['I hear ', 'you.'])
+        complete = MagicMock(return_value={'success': True, 'response': 'I hear you.'})
+
+        resp, body = self._post(client, mock_ai, complete)
+
+        assert resp.status_code == 200
+        assert resp.mimetype == 'text/event-stream'
+        events = parse_sse(body)
+        assert events[:2] == [('token', {'content': 'I hear '}), ('token', {'content': 'you.'})]
+        assert events[-1] == ('done', {'success': True, 'response': 'I hear you.'})
+        # Persistence and risk analysis run once, with the full reply
+        args = complete.call_args[0]
+        assert args[:5] == ('test_patient', 'I feel anxious today', 'I hear you.', 'none', [])
+        assert args[5] == 1  # session id from the context query, not looked up again
+        mock_ai.get_response.assert_not_called()
+
+    def test_accept_header_selects_streaming(self, client, mock_db):
+        mock_db(CHAT_DB)
+        mock_ai = MagicMock()
+        mock_ai.stream_response.return_value = iter(['ok'])
+        with patch.object(api, 'update_ai_memory'), \
+             patch.object(api, 'TherapistAI', return_value=mock_ai), \
+             patch.object(api, 'get_user_ai_memory', return_value=None), \
+             patch.object(api, '_complete_therapy_chat', return_value={'success': True}), \
+             patch.object(api, 'log_event'):
+            resp = client.post('/api/therapy/chat', json={'username': 'test_patient', 'message': 'Hello there'},
+                               headers={'Accept': 'text/event-stream'})
+            assert resp.mimetype == 'text/event-stream'
+
+    def test_upstream_failure_sends_error_and_skips_save(self, client, mock_db):
+        mock_db(CHAT_DB)
+
+        def failing_stream(*args, **kwargs):
+            yield 'partial '
+            raise RuntimeError('upstream reset')
+
+        mock_ai = MagicMock()
+        mock_ai.stream_response.side_effect = failing_stream
+        complete = MagicMock()
+
+        resp, body = self._post(client, mock_ai, complete)
+
+        events = parse_sse(body)
+        assert events[-1][0] == 'error'
+        assert events[-1][1]['code'] == 'AI_RESPONSE_ERROR'
+        complete.assert_not_called()
+
+
+RISKY_DB = {
+    'WITH active_chat_session': [(1, [], None, {}, [])],
+    'SELECT keyword, category, severity_weight FROM risk_keywords': [('hopeless', 'hopelessness', 5)],
+}
+
+CONFIRMED_RISK = {'risk_detected': True, 'risk_type': 'suicide', 'confidence': 0.9,
+                  'reasoning': 'escalating', 'immediate_action_needed': True}
+
+
+class TestChatRiskFanOut:
+    """Keyword hits run the Groq risk analysis concurrently with the reply."""
+
+    def _post(self, client, mock_ai, analysis, stream=False):
+        complete = MagicMock(return_value={'success': True})
+        with patch.object(api, 'TherapistAI', return_value=mock_ai), \
+             patch.object(api, 'analyze_conversation_risk', side_effect=analysis), \
+             patch.object(api, '_complete_therapy_chat', complete), \
+             patch.object(api, 'log_event'):
+            start = time.perf_counter()
+            resp = client.post('/api/therapy/chat', json={
+                'username': 'test_patient', 'message': 'I feel hopeless about everything', 'stream': stream,
+            })
+            body = resp.get_data(as_text=True)
+            elapsed = time.perf_counter() - start
+        return resp, body, complete, elapsed
+
+    @staticmethod
+    def slow_reply(*args, **kwargs):
+        time.sleep(0.3)
+        return 'I hear you.'
+
+    def test_analysis_overlaps_reply_and_escalation_adds_addendum(self, client, mock_db):
+        mock_db(RISKY_DB)
+        mock_ai = MagicMock()
+        mock_ai.get_response.side_effect = self.slow_reply
+
+        def analysis(*args):
+            time.sleep(0.3)
+            return CONFIRMED_RISK
+
+        resp, _, complete, elapsed = self._post(client, mock_ai, analysis)
+        assert resp.status_code == 200
+        assert elapsed < 0.55  # two 300 ms calls, not back to back
+        prompt_level = mock_ai.get_response.call_args.kwargs['risk_context']
+        assert prompt_level != 'critical'
+        args = complete.call_args[0]
+        assert args[2] == 'I hear you.' + api.RISK_SAFETY_ADDENDUM
+        assert args[3] == 'critical'
+
+    def test_late_analysis_falls_back_to_local_level(self, client, mock_db, monkeypatch):
+        monkeypatch.setattr(api, 'RISK_ANALYSIS_DEADLINE', 0.05)
+        mock_db(RISKY_DB)
+        mock_ai = MagicMock()
+        mock_ai.get_response.return_value = 'I hear you.'
+
+        def analysis(*args):
+            time.sleep(0.5)
+            return CONFIRMED_RISK
+
+        resp, _, complete, elapsed = self._post(client, mock_ai, analysis)
+        assert resp.status_code == 200 and elapsed < 0.4
+        args = complete.call_args[0]
+        assert args[2] == 'I hear you.'
+        assert args[3] == mock_ai.get_response.call_args.kwargs['risk_context']
+
+    def test_stream_sends_addendum_before_done(self, client, mock_db):
+        mock_db(RISKY_DB)
+        mock_ai = MagicMock()
+        mock_ai.stream_response.return_value = iter(['I hear ', 'you.'])
+        resp, body, complete, _ = self._post(client, mock_ai, lambda *args: CONFIRMED_RISK, stream=True)
+        events = parse_sse(body)
+        assert events[-2] == ('token', {'content': api.RISK_SAFETY_ADDENDUM})
+        assert events[-1][0] == 'done'
+        assert complete.call_args[0][2] == 'I hear you.' + api.RISK_SAFETY_ADDENDUM
+
+    def test_no_keyword_hits_skip_analysis(self, client, mock_db):
+        mock_db(CHAT_DB)
+        mock_ai = MagicMock()
+        mock_ai.get_response.return_value = 'ok'
+        _, _, complete, _ = self._post(client, mock_ai, AssertionError('should not run'))
+        assert complete.call_args[0][3] == 'none'
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible chat-completions endpoint (chunked SSE when streaming)."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body are separate writes on a kept-alive connection
+    chunks = ['Hello', ', ', 'friend', '.']
+    delay = 0.0
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body)
+        if not body.get('stream'):
+            time.sleep(self.delay * len(self.chunks))
+            payload = json.dumps({'choices': [{'message': {'content': ''.join(self.chunks)}}]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        first = {'choices': [{'delta': {'role': 'assistant'}}]}
+        self._write_chunk(f"data: {json.dumps(first)}\n\n".encode())
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            event = {'choices': [{'delta': {'content': chunk}}]}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenAIHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('GROQ_API_KEY', 'test-key')
+    monkeypatch.setattr(api, 'API_URL', f'http://127.0.0.1:{server.server_address[1]}/v1/chat/completions')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestTherapistAIStreaming:
+    """TherapistAI against a local OpenAI-compatible server."""
+
+    def test_stream_response_yields_deltas(self, fake_llm):
+        ai = api.TherapistAI('test_patient')
+        chunks = list(ai.stream_response('Hello'))
+        assert chunks == FakeOpenAIHandler.chunks
+        request = fake_llm.requests[0]
+        assert request['stream'] is True
+        assert request['messages'][-1] == {'role': 'user', 'content': 'Hello'}
+
+    def test_stream_and_blocking_send_same_prompt(self, fake_llm):
+        ai = api.TherapistAI('test_patient')
+        assert ai.get_response('Hello', risk_context='high') == ''.join(ai.stream_response('Hello', risk_context='high'))
+        blocking, streaming = fake_llm.requests
+        assert blocking['messages'] == streaming['messages']
+
+    @pytest.mark.slow
+    def test_time_to_first_token(self, fake_llm, monkeypatch):
+        monkeypatch.setattr(FakeOpenAIHandler, 'chunks', [f'tok{i} ' for i in range(20)])
+        monkeypatch.setattr(FakeOpenAIHandler, 'delay', 0.02)
+        ai = api.TherapistAI('test_patient')
+
+        start = time.perf_counter()
+        ai.get_response('Hello')
+        blocking = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stream = ai.stream_response('Hello')
+        next(stream)
+        first_token = time.perf_counter() - start
+        list(stream)
+        total = time.perf_counter() - start
+
+        print(f"\n[benchmark] blocking reply {blocking * 1000:.0f} ms; "
+              f"streaming first token {first_token * 1000:.0f} ms, complete {total * 1000:.0f} ms")
+        assert first_token < total / 4
+
+
 # ==================== CHAT HISTORY (GET /api/therapy/history) ====================
 
 class TestChatHistory:
@@ -134,9 +390,9 @@ class TestChatHistory:
         now = datetime.now().isoformat()
         conn, cursor = mock_db({
             'SELECT id FROM chat_sessions': [(1,)],
-            'SELECT sender, message, timestamp FROM chat_history': [
-                ('user', 'Hello', now),
-                ('ai', 'Hi there!', now),
+            'SELECT sender, message, timestamp, id FROM chat_history': [
+                ('ai', 'Hi there!', now, 2),
+                ('user', 'Hello', now, 1),
             ],
         })
 
@@ -145,7 +401,41 @@ class TestChatHistory:
 
         assert resp.status_code == 200
         assert data['success'] is True
-        assert len(data['history']) == 2
+        assert [h['message'] for h in data['history']] == ['Hello', 'Hi there!']
+        assert data['has_more'] is False and data['next_cursor'] is None
+
+    def test_get_history_is_bounded_without_paging_args(self, client, mock_db):
+        """The chat view's first request gets the newest page, not the whole history."""
+        rows = [('user', f'msg {i}', f'2026-01-05T10:{i // 60:02d}:{i % 60:02d}', i) for i in range(300, 0, -1)]
+        conn, cursor = mock_db({
+            'SELECT id FROM chat_sessions': [(1,)],
+            'SELECT sender, message, timestamp, id FROM chat_history': rows[:api.CHAT_HISTORY_PAGE_SIZE + 1],
+        })
+
+        data = client.get('/api/therapy/history?username=test_patient').get_json()
+        assert len(data['history']) == api.CHAT_HISTORY_PAGE_SIZE
+        assert data['history'][-1]['message'] == 'msg 300'
+        assert 'LIMIT' in cursor._last_query and cursor._last_params[-1] == api.CHAT_HISTORY_PAGE_SIZE + 1
+        assert data['has_more'] is True and data['next_cursor']
+
+    def test_get_history_pages_back_by_cursor(self, client, mock_db):
+        """A full page returns a cursor that resumes before its oldest message."""
+        conn, cursor = mock_db({
+            'SELECT id FROM chat_sessions': [(1,)],
+            'SELECT sender, message, timestamp, id FROM chat_history': [
+                ('ai', 'third', '2026-01-05T10:02:00', 3),
+                ('user', 'second', '2026-01-05T10:01:00', 2),
+                ('ai', 'first', '2026-01-05T10:00:00', 1),
+            ],
+        })
+
+        data = client.get('/api/therapy/history?username=test_patient&limit=2').get_json()
+        assert [h['message'] for h in data['history']] == ['second', 'third']
+        assert data['has_more'] is True
+
+        client.get(f"/api/therapy/history?username=test_patient&limit=2&cursor={data['next_cursor']}")
+        assert '(timestamp, id) < (%s::timestamp, %s)' in cursor._last_query
+        assert cursor._last_params == (1, '2026-01-05T10:01:00', 2, 3)
 
     def test_get_history_no_username(self, client, mock_db):
         """Missing username returns 400."""
@@ -169,7 +459,7 @@ class TestChatHistory:
         """Empty history returns empty list."""
         conn, cursor = mock_db({
             'SELECT id FROM chat_sessions': [(1,)],
-            'SELECT sender, message, timestamp FROM chat_history': [],
+            'SELECT sender, message, timestamp, id FROM chat_history': [],
         })
 
         resp = client.get('/api/therapy/history?username=nobody')
@@ -17,6 +17,7 @@ import sys
 import json
 import sqlite3
 import pytest
+from contextlib import contextmanager
 from unittest.mock import MagicMock, patch, PropertyMock
 from datetime import datetime, timezone, timedelta
 
@@ -43,8 +44,29 @@ except Exception:
     os.environ.setdefault('ENCRYPTION_KEY', 'dGVzdGtleQ==')
 
 os.environ.setdefault('GROQ_API_KEY', 'test_groq_key_not_real')
+# Tests drive job workers and the message dispatcher explicitly; no embedded threads
+os.environ.setdefault('JOB_WORKER_MODE', 'external')
+os.environ.setdefault('MESSAGE_DISPATCHER_MODE', 'off')
+# Audit events are written synchronously, and to memory (see below), not by a drain thread
+os.environ.setdefault('AUDIT_ASYNC', '0')
 
 import api
+import audit
+
+
+class InMemoryAuditWriter(audit.AuditLogWriter):
+    """Audit writer that keeps rows in a list; the suite has no audit_logs table."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+
+    def write_rows(self, rows):
+        self.rows.extend(rows)
+        self.stats['written'] += len(rows)
+
+
+audit._writer = InMemoryAuditWriter()
 
 
 # ==================== MOCK DATABASE HELPERS ====================
@@ -76,6 +98,11 @@ class MockCursor:
         self._result_index = len(self._results)
         return results
 
+    def fetchmany(self, size=1):
+        results = self._results[self._result_index:self._result_index + size]
+        self._result_index += len(results)
+        return results
+
     def close(self):
         pass
 
@@ -86,7 +113,7 @@ class MockConnection:
     def __init__(self, cursor=None):
         self._cursor = cursor or MockCursor()
 
-    def cursor(self):
+    def cursor(self, *args, **kwargs):
         return self._cursor
 
     def commit(self):
@@ -137,6 +164,57 @@ def make_mock_db(query_results=None):
     return mock_get_db, mock_get_cursor, conn, cursor
 
 
+class FakeTables:
+    """
+    Base for an in-memory stand-in for the tables one module queries.
+
+    ``connection`` is the zero-arg connection factory that the background
+    modules (job_queue, exports, migrations, ...) accept. Subclasses set
+    ``cursor_class`` to a cursor answering that module's SQL; it is built with
+    the FakeTables instance and, as on psycopg2, gets a ``connection``
+    attribute. Override on_commit()/on_rollback() to apply or drop the writes
+    a transaction staged in ``connection.pending``.
+    """
+
+    cursor_class = MockCursor
+    commits = 0
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+    def cursor(self, conn, name=None):
+        cursor = self.cursor_class(self)
+        cursor.connection = conn
+        return cursor
+
+    def on_commit(self, conn):
+        pass
+
+    def on_rollback(self, conn):
+        pass
+
+
+class FakeConnection:
+    """Connection handed out by FakeTables.connection()."""
+
+    def __init__(self, db):
+        self.db = db
+        self.pending = []
+
+    def cursor(self, name=None):
+        return self.db.cursor(self, name)
+
+    def commit(self):
+        self.db.commits += 1
+        self.db.on_commit(self)
+        self.pending = []
+
+    def rollback(self):
+        self.db.on_rollback(self)
+        self.pending = []
+
+
 # ==================== FLASK TEST CLIENT ====================
 
 @pytest.fixture
@@ -155,6 +233,38 @@ def client(app):
         yield test_client
 
 
+@pytest.fixture(autouse=True)
+def _reset_session_validation_cache():
+    """Stop cached session validity leaking between tests."""
+    api.session_validation_cache.clear()
+    yield
+    api.session_validation_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_risk_keyword_cache():
+    """Stop one test's risk keyword rows being reused by the next."""
+    api.risk_signals.engine.invalidate_keywords()
+    yield
+    api.risk_signals.engine.invalidate_keywords()
+
+
+@pytest.fixture(autouse=True)
+def _reset_chat_context_cache():
+    """Stop one test's cached chat context being reused by the next."""
+    api.chat_context.loader.clear()
+    yield
+    api.chat_context.loader.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_llm_circuit():
+    """Start every test with a closed LLM circuit breaker."""
+    api.llm_client.client.breaker.record_success()
+    yield
+    api.llm_client.client.breaker.record_success()
+
+
 # ==================== AUTHENTICATED SESSION FIXTURES ====================
 
 @pytest.fixture
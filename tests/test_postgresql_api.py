@@ -20,7 +20,6 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 os.environ['DB_HOST'] = 'localhost'
 os.environ['DB_PORT'] = '5432'
 os.environ['DB_NAME'] = 'healing_space_test'
-os.environ['DB_NAME_PET'] = 'healing_space_pet_test'
 os.environ['DB_NAME_TRAINING'] = 'healing_space_training_test'
 os.environ['DB_USER'] = 'healing_space'
 os.environ['DB_PASSWORD'] = 'healing_space_dev_pass'
@@ -30,7 +29,7 @@ os.environ['GROQ_API_KEY'] = 'test_key'
 os.environ['SECRET_KEY'] = 'test_secret_key_do_not_use_in_production'
 
 import pytest
-from api import app, get_db_connection, get_pet_db_connection
+from api import app, get_db_connection
 
 
 class TestPostgreSQLConnections:
@@ -47,17 +46,6 @@ class TestPostgreSQLConnections:
         cur.close()
         conn.close()
     
-    def test_pet_db_connection(self):
-        """Test connection to pet game database"""
-        conn = get_pet_db_connection()
-        assert conn is not None
-        cur = conn.cursor()
-        cur.execute("SELECT 1")
-        result = cur.fetchone()
-        assert result[0] == 1
-        cur.close()
-        conn.close()
-    
     def test_postgresql_version(self):
         """Verify PostgreSQL version"""
         conn = get_db_connection()
@@ -241,8 +229,8 @@ class TestPetDatabase:
     """Test pet game database operations"""
     
     def test_pet_table_exists(self):
-        """Test that pet game table exists"""
-        conn = get_pet_db_connection()
+        """Test that the pet game table exists in the main database"""
+        conn = get_db_connection()
         try:
             cur = conn.cursor()
             cur.execute(
@@ -250,7 +238,7 @@ class TestPetDatabase:
                 "WHERE table_schema = 'public'"
             )
             tables = [row[0] for row in cur.fetchall()]
-            assert len(tables) > 0
+            assert 'pet' in tables
         finally:
             cur.close()
             conn.close()
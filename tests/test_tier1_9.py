@@ -94,8 +94,8 @@ class TestTier19PoolConfiguration:
             # Check for minconn parameter
             assert 'minconn=' in content or 'minconn =' in content, \
                 "Pool should specify minconn parameter"
-            assert 'minconn=2' in content, \
-                "Pool should have minconn=2 (at least 2 connections always ready)"
+            assert 'minconn=DB_POOL_MIN' in content and "DB_POOL_MIN', '2'" in content, \
+                "Pool should have minconn=2 by default (at least 2 connections always ready)"
     
     def test_pool_max_connections_configured(self):
         """Pool should have maximum connection limit"""
@@ -104,8 +104,8 @@ class TestTier19PoolConfiguration:
             # Check for maxconn parameter
             assert 'maxconn=' in content or 'maxconn =' in content, \
                 "Pool should specify maxconn parameter"
-            assert 'maxconn=20' in content, \
-                "Pool should have maxconn=20 (limit connection exhaustion)"
+            assert 'maxconn=DB_POOL_MAX' in content and "DB_POOL_MAX', '20'" in content, \
+                "Pool should have maxconn=20 by default (limit connection exhaustion)"
     
     def test_pool_uses_correct_database_credentials(self):
         """Pool should read credentials from environment"""
@@ -334,8 +334,8 @@ class TestTier19CodeQuality:
         """Pool settings should not be hardcoded magic numbers"""
         with open(os.path.join(os.path.dirname(api.__file__), 'api.py'), 'r') as f:
             content = f.read()
-            # Should have clear minconn/maxconn values
-            assert 'minconn=2' in content and 'maxconn=20' in content, \
+            # Should have clear minconn/maxconn defaults (overridable from the environment)
+            assert "DB_POOL_MIN', '2'" in content and "DB_POOL_MAX', '20'" in content, \
                 "Pool settings should be explicit and clear"
     
     def test_credentials_from_env_only(self):
@@ -384,7 +384,7 @@ class TestTier19Performance:
             content = f.read()
             # maxconn should be set to a reasonable limit
             import re
-            match = re.search(r'maxconn=(\d+)', content)
+            match = re.search(r"DB_POOL_MAX', '(\d+)'", content)
             assert match, "maxconn should be configured"
             max_conn = int(match.group(1))
             assert max_conn >= 10 and max_conn <= 50, \
@@ -396,7 +396,7 @@ class TestTier19Performance:
             content = f.read()
             # minconn should be set
             import re
-            match = re.search(r'minconn=(\d+)', content)
+            match = re.search(r"DB_POOL_MIN', '(\d+)'", content)
             assert match, "minconn should be configured"
             min_conn = int(match.group(1))
             assert min_conn >= 1, f"minconn should be at least 1 (got {min_conn})"
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Background job worker.
+
+Runs queued jobs from background_jobs (see job_queue.py), including the
+periodic delivery of scheduled messages and mood reminders (see
+message_dispatcher.py), outside the web processes. Set JOB_WORKER_MODE=external
+on the web service when this runs as its own service, otherwise web processes
+also run embedded worker threads.
+
+Usage:
+    python worker.py              # JOB_WORKER_THREADS threads (default 2)
+    python worker.py --threads 4
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background jobs from the Postgres queue')
+    parser.add_argument('--threads', type=int, default=None, help='worker threads (default JOB_WORKER_THREADS)')
+    args = parser.parse_args()
+
+    # The web app's queue settings and job handlers are registered on import
+    import api  # noqa: F401
+    import job_queue
+
+    job_queue.configure(worker_mode='external')
+    worker = job_queue.create_worker(threads=args.threads or job_queue.JOB_WORKER_THREADS)
+    print(f"Job worker {worker.name} running {worker.threads} thread(s) for: "
+          f"{', '.join(sorted(t.name for t in job_queue.job_types()))}")
+    worker.run_forever()
+
+
+if __name__ == '__main__':
+    main()